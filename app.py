@@ -37,6 +37,44 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("**État :** ✅ Authentifié")
+    
+    # Clusters de quasi-doublons (administrateurs)
+    if user_info.get('role') == 'admin':
+        from src.documents.dedup import NearDuplicateDetector
+        from src.core.config import DEDUP_THRESHOLD, DEDUP_INDEX_PATH
+        
+        detector = NearDuplicateDetector(threshold=DEDUP_THRESHOLD, index_path=DEDUP_INDEX_PATH)
+        clusters = detector.get_clusters()
+        detector.close()
+        with st.expander(f"♊ Quasi-doublons ({len(clusters)} groupes)"):
+            for cluster in clusters:
+                st.markdown("- " + " ≈ ".join(cluster))
+
+# Serveur HTTP de l'agent (API_URL) : l'interface ne fait qu'appeler l'API,
+# sans charger de modèle ni ouvrir la base à chaque interaction
+@st.cache_resource
+def get_api_client():
+    from src.api.client import create_api_client
+    return create_api_client()
+
+
+# Cache sémantique des réponses, partagé par toutes les sessions et par
+# l'indexation (les réponses sur des chunks réindexés y sont supprimées)
+@st.cache_resource
+def get_answer_cache():
+    from src.storage import SemanticAnswerCache
+    from src.core.config import (ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD,
+                                 ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_HOURS)
+    if ANSWER_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return SemanticAnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD,
+                               ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_HOURS)
+
+
+# Requêtes authentifiées avec le jeton de session de l'utilisateur
+api_client = get_api_client()
+if api_client is not None:
+    api_client = api_client.with_token(st.session_state.get("session_token"))
 
 # Contenu principal
 st.header("🎯 Agent IA")
@@ -47,7 +85,24 @@ st.markdown("Posez une question et trouvez les documents pertinents dans la base
 
 search_query = st.text_input("Votre question :", placeholder="Ex: Quels sont les avantages du télétravail ?")
 
-if search_query:
+if search_query and api_client is not None:
+    with st.spinner("Recherche en cours..."):
+        try:
+            api_results = api_client.search(search_query, n_results=5)
+            if api_results:
+                st.success(f"✅ {len(api_results)} résultats trouvés")
+                for i, found in enumerate(api_results, 1):
+                    metadata = found.get('metadata') or {}
+                    with st.expander(f"📄 Résultat {i}", expanded=True):
+                        st.markdown(f"**Document:**\n{found['content']}")
+                        st.markdown(f"**Source:** {metadata.get('source', 'N/A')}")
+                        st.markdown(f"**Chunk:** {metadata.get('chunk_index', 'N/A')}/{metadata.get('total_chunks', 'N/A')}")
+                        st.markdown(f"**Type:** {metadata.get('file_type', 'N/A')}")
+            else:
+                st.warning("Aucun résultat trouvé. Essayez de stocker des documents d'abord.")
+        except Exception as e:
+            st.error(f"❌ Erreur lors de la recherche: {e}")
+elif search_query:
     with st.spinner("Recherche en cours..."):
         try:
             from src.vector_store import VectorStore
@@ -95,56 +150,216 @@ st.markdown("Posez une question et obtenez une réponse basée sur vos documents
 
 chat_query = st.text_input("Votre question :", placeholder="Ex: Expliquez le télétravail", key="chat_input")
 
-if chat_query:
+if chat_query and api_client is not None:
+    try:
+        st.success("✅ Réponse :")
+        placeholder = st.empty()
+        response = ""
+        final = {}
+        for event in api_client.ask_stream(chat_query):
+            if event.get("done"):
+                final = event
+            else:
+                response += event["token"]
+                placeholder.markdown(response + "▌")
+        placeholder.markdown(response)
+        if final.get("error"):
+            st.error(f"❌ {final['error']}")
+        
+        if final.get("timings"):
+            st.caption("🔎 " + " · ".join(f"{name} {ms:.0f} ms" for name, ms in final["timings"].items()))
+        if final.get("sources"):
+            with st.expander(f"📚 Documents utilisés ({len(final['sources'])} sources)"):
+                for i, source in enumerate(final["sources"], 1):
+                    st.markdown(f"**Source {i}:** {source.get('filename', 'Document')}")
+                    st.text(source.get("content_preview", ""))
+    except Exception as e:
+        st.error(f"❌ Erreur: {e}")
+elif chat_query:
     with st.spinner("Recherche et génération de réponse..."):
         try:
-            from src.llm_client import OllamaClient
-            from src.vector_store import VectorStore
+            import threading
+            import time
+            from src.clients import OllamaClient
+            from src.storage import VectorStore
+            from src.core.config import CONTEXT_CANDIDATES
             from sentence_transformers import SentenceTransformer
             
+            # Client partagé par toutes les sessions (connexions persistantes,
+            # état de connexion mis en cache)
+            @st.cache_resource
+            def get_llm_client():
+                from src.clients import OllamaClientPool
+                from src.core.config import OLLAMA_BASE_URLS
+                # Plusieurs serveurs configurés : requêtes réparties sur le moins chargé
+                client = OllamaClientPool() if OLLAMA_BASE_URLS else OllamaClient()
+                # Charger le modèle dès maintenant (puis le garder OLLAMA_KEEP_ALIVE)
+                threading.Thread(target=client.warm_up, daemon=True).start()
+                return client
+            
+            # Questions identiques simultanées : une seule génération, partagée
+            @st.cache_resource
+            def get_single_flight():
+                from src.agents.single_flight import SingleFlight
+                return SingleFlight()
+            
+            # File d'attente devant Ollama, partagée par toutes les sessions
+            @st.cache_resource
+            def get_llm_scheduler():
+                from src.clients import LLMScheduler
+                return LLMScheduler()
+            
+            # Seuils de pertinence : recherche hors sujet = pas d'appel au LLM
+            @st.cache_resource
+            def get_relevance_gate():
+                from src.agents.relevance_gate import create_gate
+                return create_gate()
+            
+            # Destination des traces (durée de chaque étape), selon TRACE_SINK
+            @st.cache_resource
+            def get_trace_sink():
+                from src.core.tracing import create_sink
+                return create_sink()
+            
+            # Questions de comptage / filtre / liste sur les CV : index structuré, sans LLM
+            @st.cache_resource
+            def get_cv_router():
+                from src.agents.cv_query import create_router
+                return create_router()
+            
+            cv_router = get_cv_router()
+            route_start = time.perf_counter()
+            routed = cv_router.answer(chat_query) if cv_router is not None else None
+            
             # Vérifier Ollama
-            llm_client = OllamaClient()
-            if not llm_client.check_connection():
+            llm_client = get_llm_client()
+            if routed is not None:
+                st.success("✅ Réponse :")
+                st.markdown(routed["answer"])
+                st.caption(f"🗂️ Réponse de l'index des CV, sans LLM ({(time.perf_counter() - route_start) * 1000:.0f} ms)")
+                if routed["sources"]:
+                    with st.expander(f"📚 CV correspondants ({len(routed['sources'])})"):
+                        for source in routed["sources"]:
+                            st.markdown(f"**{source['filename']}** — {source['content_preview']}")
+            elif not llm_client.check_connection():
                 st.error("⚠️ Ollama n'est pas accessible sur http://localhost:11434")
             else:
+                from src.core.tracing import Trace, export_trace
+                trace = Trace("chat")
+                
                 # Rechercher dans ChromaDB
                 model = SentenceTransformer('all-MiniLM-L6-v2')
-                query_emb = model.encode([chat_query], convert_to_tensor=False)[0].tolist()
+                with trace.span("query_embedding"):
+                    query_emb = model.encode([chat_query], convert_to_tensor=False)[0].tolist()
                 
                 vector_store = VectorStore()
                 vector_store.create_collection()
-                results = vector_store.search(query_emb, n_results=3)
+                with trace.span("vector_search", candidates=CONTEXT_CANDIDATES):
+                    results = vector_store.search(query_emb, n_results=CONTEXT_CANDIDATES)
                 
-                if results['documents'] and len(results['documents'][0]) > 0:
-                    # Construire le contexte (limiter à 2 documents et 1500 chars max)
-                    context_parts = []
-                    total_length = 0
-                    max_length = 1500
-                    
-                    for doc in results['documents'][0][:2]:  # Max 2 documents
-                        if total_length + len(doc) > max_length:
-                            remaining = max_length - total_length
-                            context_parts.append(doc[:remaining])
-                            break
-                        context_parts.append(doc)
-                        total_length += len(doc)
+                relevant = bool(results['documents'] and len(results['documents'][0]) > 0)
+                if relevant and not get_relevance_gate().admit([1.0 - distance for distance in results['distances'][0]]):
+                    from src.agents.knowledge_agent import NO_DOCUMENTS_ANSWER
+                    trace.set(relevance_gated=True)
+                    export_trace(get_trace_sink(), trace)
+                    st.info(NO_DOCUMENTS_ANSWER)
+                elif relevant:
+                    # Construire le contexte : chunks les plus pertinents dans le budget de tokens
+                    from src.agents.context_packer import ContextPacker
                     
-                    context = "\n\n".join(context_parts)
+                    candidates = [
+                        {
+                            "id": chunk_id,
+                            "content": doc,
+                            "metadata": metadata or {},
+                            "similarity_score": 1.0 - distance
+                        }
+                        for chunk_id, doc, metadata, distance in zip(
+                            results['ids'][0], results['documents'][0],
+                            results['metadatas'][0], results['distances'][0]
+                        )
+                    ]
+                    with trace.span("context_packing"):
+                        packed = ContextPacker().pack(
+                            candidates, header=lambda doc: f"Source: {doc['metadata'].get('source', 'Document')}\n"
+                        )
+                    context = packed["context"]
                     
                     # Récupérer le nom d'utilisateur
                     user_name = user_info.get('name', 'Utilisateur')
                     
-                    # Générer la réponse
-                    response = llm_client.generate_response(chat_query, context, user_name)
+                    # Même question (ou paraphrase), mêmes chunks : réponse en cache
+                    from src.storage.answer_cache import context_fingerprint, scoped_fingerprint
                     
-                    st.success("✅ Réponse générée :")
-                    st.markdown(response)
+                    answer_cache = get_answer_cache()
+                    used_chunks = packed["chunks"]
+                    chunk_ids = [chunk["id"] for chunk in used_chunks]
+                    content_hash = context_fingerprint(used_chunks, llm_client.model)
+                    fingerprint = scoped_fingerprint(content_hash, user_name)
+                    with trace.span("answer_cache_lookup"):
+                        cached = answer_cache.get(query_emb, chunk_ids, fingerprint, content_hash) if answer_cache else None
+                    trace.set(cache_hit=cached is not None)
+                    
+                    st.success("✅ Réponse :")
+                    if cached is not None:
+                        st.markdown(cached)
+                        st.caption("⚡ Réponse en cache (question similaire, mêmes documents)")
+                    else:
+                        # Générer la réponse en flux : les tokens s'affichent dès leur arrivée
+                        from src.agents.single_flight import normalize_question
+                        from src.clients import GenerationError, OverloadError
+                        from src.clients.ollama_client import OVERLOAD_ANSWER
+                        
+                        placeholder = st.empty()
+                        response = ""
+                        scheduler = get_llm_scheduler()
+                        
+                        def generate():
+                            # Exécuté une seule fois pour toutes les sessions qui posent la même question
+                            try:
+                                trace.add_span("llm_queue_wait", scheduler.acquire())
+                            except OverloadError:
+                                raise GenerationError(OVERLOAD_ANSWER)
+                            start = time.monotonic()
+                            try:
+                                answer = ""
+                                for token in llm_client.generate_stream(chat_query, context, user_name, trace=trace):
+                                    answer += token
+                                    yield token
+                                # Flux terminé par "done": true (une interruption lève GenerationError)
+                                if answer_cache and answer:
+                                    answer_cache.put(query_emb, chunk_ids, fingerprint, chat_query, answer.strip(),
+                                                     content_hash)
+                            finally:
+                                scheduler.release(time.monotonic() - start)
+                        
+                        tokens = get_single_flight().stream((normalize_question(chat_query), fingerprint), generate)
+                        error = None
+                        with trace.span("llm_answer"):
+                            try:
+                                for token in tokens:
+                                    response += token
+                                    placeholder.markdown(response + "▌")
+                            except GenerationError as e:
+                                error = str(e)
+                                trace.set(error=True)
+                        placeholder.markdown(response)
+                        if error:
+                            st.error(f"❌ {error}")
+                        
+                        # Mesures de cette requête (le client est partagé par toutes les sessions)
+                        stats = trace.generation
+                        if stats:
+                            st.caption(f"⏱️ Premier token : {stats.ttft:.2f} s · {stats.tokens} tokens · {stats.tokens_per_second:.1f} tokens/s")
+                    
+                    export_trace(get_trace_sink(), trace)
+                    st.caption("🔎 " + " · ".join(f"{name} {ms:.0f} ms" for name, ms in trace.timings().items()))
                     
                     # Sources
-                    with st.expander("📚 Documents utilisés (3 sources)"):
-                        for i, doc in enumerate(results['documents'][0], 1):
-                            st.markdown(f"**Source {i}:**")
-                            st.text(doc[:300] + "..." if len(doc) > 300 else doc)
+                    with st.expander(f"📚 Documents utilisés ({len(packed['chunks'])} sources, ~{packed['tokens']} tokens)"):
+                        for i, chunk in enumerate(packed["chunks"], 1):
+                            st.markdown(f"**Source {i}:** {chunk['metadata'].get('source', 'Document')}")
+                            st.text(chunk["content"][:300] + "..." if len(chunk["content"]) > 300 else chunk["content"])
                 else:
                     st.warning("Aucun document trouvé dans ChromaDB. Upload et stockez des documents d'abord.")
                     
@@ -164,147 +379,74 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-if uploaded_files is not None and len(uploaded_files) > 0:
-    from src.document_reader import DocumentReader
-    
-    # Créer le dossier data s'il n'existe pas
-    data_dir = Path("data")
-    data_dir.mkdir(exist_ok=True)
+# File d'indexation en arrière-plan, partagée par toutes les sessions : l'envoi
+# rend la main immédiatement, le chat reste utilisable pendant l'indexation et
+# une tâche interrompue reprend à l'étape où elle s'était arrêtée
+@st.cache_resource
+def get_ingestion_queue():
+    from sentence_transformers import SentenceTransformer
+    from src.documents import DocumentReader
+    from src.documents.dedup import NearDuplicateDetector
+    from src.documents.ingestion_queue import create_ingestion_queue
+    from src.storage import CVIndex, ExtractionCache, VectorStore
+    from src.core.config import (CV_INDEX_PATH, DEDUP_INDEX_PATH, DEDUP_THRESHOLD,
+                                 EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB)
     
-    # Traiter chaque fichier
-    all_results = []
-    total_chunks = []
-    all_metadata = []
+    vector_store = VectorStore()
+    vector_store.create_collection()
+    reader = DocumentReader(
+        extraction_cache=ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB),
+        dedup=NearDuplicateDetector(threshold=DEDUP_THRESHOLD, index_path=DEDUP_INDEX_PATH)
+    )
+    cv_index = CVIndex(CV_INDEX_PATH) if CV_INDEX_PATH else None
+    return create_ingestion_queue(reader, SentenceTransformer('all-MiniLM-L6-v2'), vector_store, cv_index,
+                                  answer_cache=get_answer_cache())
+
+
+STAGE_LABELS = {
+    "queued": "⏳ en file", "extracted": "📄 extrait", "embedded": "🔢 encodé",
+    "stored": "✅ stocké", "failed": "❌ échec", "skipped": "⏭️ ignoré"
+}
+
+# Avec l'API, les tâches sont créées et suivies par le serveur (même interface)
+ingestion = api_client if api_client is not None else get_ingestion_queue()
+username = st.session_state.get("username", "default")
+
+if uploaded_files:
+    keep_copy = api_client is None and st.checkbox("Conserver une copie des fichiers dans data/", value=False)
     
-    for uploaded_file in uploaded_files:
-        with st.spinner(f"Extraction du texte en cours: {uploaded_file.name}..."):
-            # Sauvegarder temporairement
-            temp_path = data_dir / uploaded_file.name
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Extraire le texte
-            reader = DocumentReader()
-            result = reader.process_document(temp_path)
+    if st.button("📥 Indexer en arrière-plan", type="primary"):
+        try:
+            job_id = ingestion.submit_job([(file.name, file.getvalue()) for file in uploaded_files], user_id=username)
+            st.session_state.setdefault("ingestion_jobs", []).insert(0, job_id)
+            st.success(f"✅ {len(uploaded_files)} fichier(s) en file d'indexation")
             
-            if result["success"]:
-                all_results.append({
-                    "file": uploaded_file.name,
-                    "result": result
-                })
-                st.success(f"✅ Document traité: {uploaded_file.name}")
-                
-                # Collecter les chunks pour l'upload en batch
-                for i, chunk in enumerate(result["chunks"]):
-                    total_chunks.append(chunk)
-                    all_metadata.append({
-                        "source": uploaded_file.name,
-                        "chunk_index": i,
-                        "total_chunks": len(result["chunks"]),
-                        "file_type": result["metadata"]["file_type"]
-                    })
-                
-                # Nettoyer le fichier temporaire
-                temp_path.unlink()
-            else:
-                st.error(f"❌ Erreur lors du traitement de {uploaded_file.name}")
-    
-    # Si des fichiers ont été traités avec succès
-    if all_results:
-        st.markdown("---")
-        st.success(f"✅ {len(all_results)} fichier(s) traité(s) avec succès")
-        
-        # Afficher le résumé global
-        total_chunks_count = sum(len(r["result"]["chunks"]) for r in all_results)
-        st.info(f"📊 Total: {total_chunks_count} chunks créés à partir de {len(all_results)} fichier(s)")
-        
-        # Afficher les détails par fichier
-        for idx, file_data in enumerate(all_results):
-            result = file_data["result"]
-            with st.expander(f"📄 {file_data['file']}", expanded=False):
-                metadata = result["metadata"]
-                st.write(f"**Type:** {metadata['file_type']}")
-                st.write(f"**Chunks:** {metadata['num_chunks']}")
-                st.write(f"**Mots:** {metadata['total_words']}")
-                st.write(f"**Caractères:** {metadata['total_characters']}")
-        
-        # Génération des embeddings pour tous les fichiers en batch
-        st.markdown("---")
-        st.subheader("🔢 Génération des Embeddings pour tous les fichiers")
-        
-        with st.spinner(f"Génération des embeddings pour {total_chunks_count} chunks..."):
-            try:
-                from sentence_transformers import SentenceTransformer
-                model = SentenceTransformer('all-MiniLM-L6-v2')
-                
-                # Générer tous les embeddings en une fois
-                embeddings = model.encode(total_chunks, convert_to_tensor=False)
-                
-                st.success(f"✅ {len(embeddings)} embeddings générés pour tous les fichiers!")
-                
-                # Préparer les IDs
-                doc_ids = []
-                for file_data in all_results:
-                    filename = file_data["file"]
-                    num_chunks = len(file_data["result"]["chunks"])
-                    for i in range(num_chunks):
-                        doc_ids.append(f"{filename}_{i}")
-                
-                # Stockage dans ChromaDB
-                st.markdown("---")
-                st.subheader("💾 Stockage dans ChromaDB")
-                
-                # Afficher le résumé avant le stockage
-                with st.expander("📊 Résumé avant stockage", expanded=True):
-                    st.markdown(f"**Nombre de fichiers:** {len(all_results)}")
-                    st.markdown(f"**Nombre total de chunks:** {total_chunks_count}")
-                    st.markdown(f"**Nombre total d'embeddings:** {len(embeddings)}")
-                    
-                    # Taille approximative
-                    total_size = total_chunks_count * 384 * 4  # 384 dimensions * 4 bytes
-                    st.info(f"📊 Taille approximative: ~{total_size/1024:.2f} KB")
-                
-                if st.button("💾 Stocker tous les fichiers dans ChromaDB", type="primary"):
-                    with st.spinner("Stockage en cours..."):
-                        try:
-                            from src.vector_store import VectorStore
-                            
-                            # Initialiser la base vectorielle
-                            vector_store = VectorStore()
-                            vector_store.create_collection()
-                            
-                            # Convertir en listes (ChromaDB n'aime pas numpy arrays)
-                            embeddings_list = [emb.tolist() if hasattr(emb, 'tolist') else list(emb) for emb in embeddings]
-                            
-                            # Stocker dans ChromaDB
-                            vector_store.add_documents(
-                                embeddings=embeddings_list,
-                                documents=total_chunks,
-                                metadatas=all_metadata,
-                                ids=doc_ids
-                            )
-                            
-                            st.success(f"✅ {total_chunks_count} chunks stockés dans ChromaDB depuis {len(all_results)} fichier(s)!")
-                            
-                            # Afficher les infos de la collection
-                            info = vector_store.get_collection_info()
-                            st.info(f"📊 Total dans la base: {info['count']} documents")
-                            
-                        except Exception as e:
-                            st.error(f"❌ Erreur lors du stockage: {e}")
-                            st.exception(e)
-                
-            except ImportError:
-                st.warning("⚠️ sentence-transformers non installé.")
-                st.markdown("""
-                **Pour installer les dépendances:**
-                
-                ```bash
-                pip install -r requirements.txt
-                ```
-                """)
-            except Exception as e:
-                st.error(f"❌ Erreur: {e}")
-                st.exception(e)
-
+            if keep_copy:
+                from src.documents.sources import persist_source
+                for uploaded_file in uploaded_files:
+                    persist_source(uploaded_file, Path("data") / Path(uploaded_file.name).name)
+        except Exception as e:
+            st.error(f"❌ Erreur lors de l'envoi: {e}")
 
+# Avancement des tâches de la session
+job_ids = st.session_state.get("ingestion_jobs", [])
+if job_ids:
+    st.markdown("**📊 Indexations en cours et récentes**")
+    st.button("🔄 Actualiser")
+    for job_id in job_ids[:5]:
+        try:
+            job = ingestion.get_job(job_id)
+        except Exception as e:
+            st.error(f"❌ Tâche {job_id[:8]} : {e}")
+            continue
+        if job is None:
+            continue
+        st.progress(job["progress"], text=f"Tâche {job_id[:8]} — {job['done']}/{job['total']} fichier(s) ({job['status']})")
+        with st.expander(f"📄 Détail de la tâche {job_id[:8]}", expanded=job["status"] == "failed"):
+            for file in job["files"]:
+                line = f"**{file['name']}** — {STAGE_LABELS.get(file['stage'], file['stage'])}"
+                if file["stage"] == "stored":
+                    line += f" · {file['chunks']} chunks" + (" · CV indexé" if file["cv_indexed"] else "")
+                if file["error"]:
+                    line += f" · {file['error']}"
+                st.markdown(line)
@@ -0,0 +1,95 @@
+"""
+Benchmark : extraction Word en flux (docx_reader) vs python-docx
+
+Génère un .docx volumineux (paragraphes, tableaux, en-tête, pied de page)
+puis compare le temps d'extraction et le pic mémoire Python des deux méthodes.
+
+Usage :
+    python benchmarks/bench_docx.py --paragraphs 50000 --repeat 3
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.documents.docx_reader import iter_docx_paragraphs
+
+
+def build_docx(path: Path, num_paragraphs: int):
+    """Créer un document Word de test avec python-docx"""
+    from docx import Document
+
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Politique interne - Confidentiel"
+    doc.sections[0].footer.paragraphs[0].text = "Entreprise - Document généré pour benchmark"
+
+    for i in range(num_paragraphs):
+        doc.add_paragraph(f"Paragraphe {i} : procédure de remboursement des frais, télétravail et congés.")
+        if i % 1000 == 0:
+            table = doc.add_table(rows=5, cols=3)
+            for row_idx, row in enumerate(table.rows):
+                for col_idx, cell in enumerate(row.cells):
+                    cell.text = f"Cellule {row_idx}.{col_idx}"
+    doc.save(str(path))
+
+
+def extract_python_docx(path: Path) -> int:
+    """Extraction de référence (ancienne implémentation)"""
+    from docx import Document
+
+    doc = Document(path)
+    return len("\n".join(p.text for p in doc.paragraphs if p.text))
+
+
+def extract_streaming(path: Path) -> int:
+    """Extraction en flux"""
+    return len("\n".join(iter_docx_paragraphs(path)))
+
+
+def measure(func, path: Path, repeat: int):
+    """Mesurer le meilleur temps et le pic mémoire d'une extraction"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chars = func(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--file", type=Path, help="Fichier .docx existant (sinon généré)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "bench.docx"
+            print(f"Génération d'un document de {args.paragraphs} paragraphes...")
+            build_docx(path, args.paragraphs)
+        print(f"Fichier: {path} ({path.stat().st_size / 1024:.0f} Ko)\n")
+
+        print(f"{'Méthode':<14} {'Temps (s)':>10} {'Pic mémoire (Mo)':>18} {'Caractères':>12}")
+        print("-" * 58)
+        results = {}
+        for name, func in (("python-docx", extract_python_docx), ("streaming", extract_streaming)):
+            seconds, peak, chars = measure(func, path, args.repeat)
+            results[name] = seconds
+            print(f"{name:<14} {seconds:>10.3f} {peak / (1024 * 1024):>18.1f} {chars:>12}")
+
+        print(f"\nAccélération: x{results['python-docx'] / results['streaming']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark de bout en bout sans LLM : ingestion, recherche et questions
+
+Fait passer les vrais chemins de code (DocumentReader, VectorStore/ChromaDB,
+KnowledgeAgent, OllamaClient) contre le serveur Ollama simulé
+(benchmarks/mock_ollama.py), et affiche pour chaque étape le débit et les
+latences p50/p95/p99 :
+
+- ingest : extraction + découpage + embeddings + ajout dans ChromaDB (par document) ;
+- search : embedding de la question + recherche des chunks ;
+- ask : KnowledgeAgent.ask_question (recherche + contexte + génération) ;
+- ask_stream : KnowledgeAgent.ask_question_stream, avec le temps du premier token ;
+- ask_many : KnowledgeAgent.ask_many (embeddings et recherche par lots, --concurrency
+  générations simultanées) ; latences = attente + génération de chaque réponse.
+
+Les embeddings viennent de all-MiniLM-L6-v2 (sentence-transformers) ou, avec
+--embedder hashing, d'un encodeur par hachage des mots sans modèle à
+télécharger (pour la CI).
+
+Usage :
+    python benchmarks/bench_end_to_end.py --documents 50 --questions 100 --concurrency 4
+    python benchmarks/bench_end_to_end.py --embedder hashing --latency 0.05 --json resultats.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.mock_ollama import MockOllama
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.ollama_client import GenerationError, OllamaClient, is_error_answer
+from src.core.config import CONTEXT_CANDIDATES
+from src.documents.document_reader import DocumentReader
+from src.storage.vector_store import VectorStore
+
+TOPICS = ["télétravail", "congés payés", "notes de frais", "formation", "sécurité informatique",
+          "mutuelle", "tickets restaurant", "astreintes", "recrutement", "entretien annuel"]
+
+
+class HashingEmbedder:
+    """Encodeur par hachage des mots (interface SentenceTransformer.encode), sans modèle"""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def encode(self, texts: Sequence[str], convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+def load_embedder(name: str):
+    if name == "hashing":
+        return HashingEmbedder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def write_corpus(directory: Path, count: int, paragraphs: int) -> List[Path]:
+    """Documents texte synthétiques, un thème principal par document"""
+    paths = []
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        lines = [f"Politique interne n°{i} : {topic}."]
+        for j in range(paragraphs):
+            other = TOPICS[(i + j) % len(TOPICS)]
+            lines.append(
+                f"Article {j}. Les règles de {topic} s'appliquent au service {i % 7} à partir du {j + 1} janvier. "
+                f"Le plafond est fixé à {100 + i + j} euros par mois et la demande passe par le responsable. "
+                f"Voir aussi la procédure de {other}, révisée chaque année par les ressources humaines."
+            )
+        path = directory / f"politique_{i:04d}.txt"
+        path.write_text("\n\n".join(lines), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, extra: Dict[str, float] = None) -> Dict:
+    result = {
+        "stage": name,
+        "operations": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000
+    }
+    result.update(extra or {})
+    return result
+
+
+def run_stage(operation: Callable[[int], None], count: int, concurrency: int):
+    """Exécuter operation(i) count fois sur concurrency threads ; latences et durée totale"""
+    latencies = [0.0] * count
+
+    def timed(i: int):
+        start = time.perf_counter()
+        operation(i)
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(count):
+            timed(i)
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(timed, range(count)))
+    return latencies, time.perf_counter() - start
+
+
+def ingest(paths: List[Path], reader: DocumentReader, embedder, vector_store: VectorStore, chunk_size: int):
+    def operation(i: int):
+        path = paths[i]
+        result = reader.process_document(path, chunk_size=chunk_size)
+        chunks = result["chunks"]
+        if not chunks:
+            return
+        embeddings = embedder.encode(chunks, convert_to_tensor=False)
+        vector_store.add_documents(
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            documents=chunks,
+            metadatas=[{"source": path.name, "filename": path.name, "chunk_index": j,
+                        "total_chunks": len(chunks), "file_type": result["metadata"]["file_type"]}
+                       for j in range(len(chunks))],
+            ids=[f"{path.name}_{j}" for j in range(len(chunks))]
+        )
+    return operation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphes par document")
+    parser.add_argument("--chunk-size", type=int, default=150, help="Taille des chunks en mots")
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions simultanées (étapes ask)")
+    parser.add_argument("--embedder", choices=["minilm", "hashing"], default="minilm")
+    parser.add_argument("--latency", type=float, default=0.05, help="Ollama simulé : délai du premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Ollama simulé : débit")
+    parser.add_argument("--tokens", type=int, default=30, help="Ollama simulé : tokens par réponse")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Ollama simulé : proportion d'erreurs 500")
+    parser.add_argument("--url", help="Utiliser ce serveur Ollama au lieu du serveur simulé")
+    parser.add_argument("--json", type=Path, help="Écrire les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    embedder = load_embedder(args.embedder)
+    mock = None
+    if args.url is None:
+        mock = MockOllama(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                          tokens=args.tokens, error_rate=args.error_rate, seed=0).start()
+    url = args.url or mock.url
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = Path(temp_dir) / "corpus"
+        corpus.mkdir()
+        paths = write_corpus(corpus, args.documents, args.paragraphs)
+
+        vector_store = VectorStore(persist_directory=str(Path(temp_dir) / "chroma"))
+        vector_store.create_collection("benchmark")
+        reader = DocumentReader()
+
+        latencies, elapsed = run_stage(ingest(paths, reader, embedder, vector_store, args.chunk_size), len(paths), 1)
+        results.append(summarize("ingest", latencies, elapsed,
+                                 {"chunks": vector_store.get_collection_info().get("count", 0)}))
+
+        questions = [f"Quel est le plafond pour {TOPICS[i % len(TOPICS)]} au service {i % 7} ? ({i})"
+                     for i in range(args.questions)]
+
+        latencies, elapsed = run_stage(
+            lambda i: vector_store.search_similar(questions[i], n_results=CONTEXT_CANDIDATES, embedding_model=embedder),
+            len(questions), 1
+        )
+        results.append(summarize("search", latencies, elapsed))
+
+        client = OllamaClient(base_url=url)
+        agent = KnowledgeAgent(vector_store, client, embedding_model=embedder)
+        errors = []
+
+        def ask(i: int):
+            answer = agent.ask_question(questions[i], include_sources=False)["answer"]
+            if is_error_answer(answer):
+                errors.append(i)
+
+        latencies, elapsed = run_stage(ask, len(questions), args.concurrency)
+        results.append(summarize("ask", latencies, elapsed, {"errors": len(errors)}))
+
+        first_tokens = [0.0] * len(questions)
+        stream_errors = []
+
+        def ask_stream(i: int):
+            start = time.perf_counter()
+            tokens = agent.ask_question_stream(questions[i], include_sources=False)["tokens"]
+            try:
+                for n, _ in enumerate(tokens):
+                    if n == 0:
+                        first_tokens[i] = time.perf_counter() - start
+            except GenerationError:
+                stream_errors.append(i)
+
+        latencies, elapsed = run_stage(ask_stream, len(questions), args.concurrency)
+        results.append(summarize("ask_stream", latencies, elapsed,
+                                 {"errors": len(stream_errors),
+                                  "ttft_p50_ms": percentile(first_tokens, 50) * 1000,
+                                  "ttft_p95_ms": percentile(first_tokens, 95) * 1000}))
+        
+        start = time.perf_counter()
+        answers = list(agent.ask_many(questions, concurrency=args.concurrency, include_sources=False))
+        elapsed = time.perf_counter() - start
+        results.append(summarize("ask_many", [answer["timings"].get("llm_answer", 0.0) / 1000 for answer in answers],
+                                 elapsed, {"errors": sum(answer["error"] for answer in answers)}))
+        client.close()
+
+    if mock is not None:
+        mock.stop()
+
+    print(f"{args.documents} documents, {args.questions} questions, {args.concurrency} questions simultanées, "
+          f"embeddings {args.embedder}, Ollama {'simulé' if mock else url}\n")
+    print(f"{'étape':<12} {'opérations':>10} {'débit/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for result in results:
+        print(f"{result['stage']:<12} {result['operations']:>10} {result['throughput']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+    stages = {result["stage"]: result for result in results}
+    stream = stages["ask_stream"]
+    print(f"\nPremier token (ask_stream) : p50 {stream['ttft_p50_ms']:.1f} ms, p95 {stream['ttft_p95_ms']:.1f} ms")
+    for stage in ("ask", "ask_many"):
+        if stages[stage]["errors"]:
+            print(f"Réponses en erreur ({stage}) : {stages[stage]['errors']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark : coût par requête d'OllamaClient (connexions et test de connexion)
+
+Compare, contre un serveur HTTP local qui imite /api/tags et /api/generate
+(réponse immédiate, on ne mesure que le surcoût client/réseau) :
+
+- ancien fonctionnement : requests.get/post au niveau module (nouvelle
+  connexion TCP à chaque appel) et check_connection() avant chaque question ;
+- OllamaClient : session partagée (keep-alive) et état de connexion en cache.
+
+Usage :
+    python benchmarks/bench_ollama_client.py --requests 500
+    python benchmarks/bench_ollama_client.py --url http://localhost:11434   # vrai Ollama (/api/tags seulement)
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.clients.ollama_client import OllamaClient
+
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    """Réponses minimales d'Ollama, en HTTP/1.1 (keep-alive)"""
+    protocol_version = "HTTP/1.1"
+    # Comme le serveur Go d'Ollama (sinon Nagle + ACK retardé ajoutent ~40 ms en keep-alive)
+    disable_nagle_algorithm = True
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send({"models": [{"name": "llama3:8b"}]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send({"response": "ok", "done": True, "eval_count": 1, "eval_duration": 1})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_question(client: OllamaClient):
+    """Ancien chemin : connexion vérifiée puis génération, nouvelle connexion à chaque appel"""
+    with patch.object(client, "session", requests):
+        client._healthy = None
+        client.check_connection()
+        client.generate_response("Question")
+
+
+def pooled_question(client: OllamaClient):
+    """Nouveau chemin : session partagée et état de connexion en cache"""
+    client.check_connection()
+    client.generate_response("Question")
+
+
+def measure(func, client: OllamaClient, count: int):
+    """Latences (ms) de count appels"""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func(client)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<30} {statistics.mean(latencies):>8.2f} ms {statistics.median(latencies):>8.2f} ms {p95:>8.2f} ms")
+    return statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--url", help="Ollama réel : ne mesure que /api/tags (pas de génération)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_stub()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = OllamaClient(base_url=url, health_ttl=30)
+    print(f"Serveur: {url} - {args.requests} requêtes\n")
+    print(f"{'':<30} {'moyenne':>11} {'médiane':>11} {'p95':>11}")
+
+    if args.url:
+        legacy = report("requests.get (sans pool)", measure(
+            lambda c: requests.get(f"{url}/api/tags", timeout=5), client, args.requests))
+        pooled = report("session.get (keep-alive)", measure(
+            lambda c: c.session.get(f"{url}/api/tags", timeout=5), client, args.requests))
+    else:
+        legacy = report("sans pool, check à chaque fois", measure(legacy_question, client, args.requests))
+        pooled = report("pool + check en cache", measure(pooled_question, client, args.requests))
+
+    print(f"\nSurcoût évité par requête : {legacy - pooled:.2f} ms ({legacy / pooled:.1f}x)")
+
+    client.close()
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark des backends d'extraction PDF (src/documents/pdf_backends.py)
+
+Génère un corpus de CV avec generate_cvs.py (ou utilise un dossier de PDF
+existant), puis mesure pour chaque backend installé :
+- pages/s
+- RSS maximal du processus et sa hausse pendant l'extraction (chaque backend
+  tourne dans un processus séparé)
+- fidélité : part des mots attendus (nom, métier, compétences, entreprises,
+  loisirs du CV généré) retrouvés dans le texte extrait. Pour un dossier
+  existant, la référence est le texte extrait par --reference.
+
+Usage :
+    python benchmarks/bench_pdf_backends.py --count 50
+    python benchmarks/bench_pdf_backends.py --corpus data/pdf_cv --reference pdfminer
+"""
+import argparse
+import multiprocessing
+import re
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.documents.pdf_backends import PDF_BACKENDS, available_backends, iter_pdf_pages
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def words(text: str) -> Set[str]:
+    """Mots normalisés (minuscules, sans ponctuation)"""
+    return set(_WORD.findall(text.lower()))
+
+
+def build_corpus(directory: Path, count: int) -> Dict[Path, Set[str]]:
+    """Générer des CV PDF et les mots attendus pour chacun"""
+    import generate_cvs
+
+    jobs = list(generate_cvs.JOBS)
+    corpus = {}
+    for i in range(count):
+        cv = generate_cvs.generate_cv(jobs[i % len(jobs)])
+        path = directory / f"cv_{i:04d}.pdf"
+        generate_cvs.create_pdf_cv(cv, path)
+
+        expected = [cv["first_name"], cv["last_name"], cv["job_title"], *cv["competences"][:15], *cv["hobbies"]]
+        expected += [experience["company"] for experience in cv["experiences"]]
+        corpus[path] = words(" ".join(expected))
+    return corpus
+
+
+def run_backend(name: str, files: List[Path], expected: Optional[List[Set[str]]], queue):
+    """Extraire tout le corpus avec un backend (exécuté dans un processus dédié)"""
+    backend = PDF_BACKENDS[name]()
+    rss_before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    pages = 0
+    texts = []
+    start = time.perf_counter()
+    for path in files:
+        page_texts = list(iter_pdf_pages(path, [backend]))
+        pages += len(page_texts)
+        texts.append("\n".join(page_texts))
+    seconds = time.perf_counter() - start
+
+    fidelity = None
+    if expected is not None:
+        scores = [len(truth & words(text)) / len(truth) for truth, text in zip(expected, texts) if truth]
+        fidelity = sum(scores) / len(scores) if scores else 0.0
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put({
+        "pages": pages,
+        "seconds": seconds,
+        "rss_mb": rss_mb,
+        "rss_delta_mb": rss_mb - rss_before_mb,
+        "fidelity": fidelity,
+        "texts": texts
+    })
+
+
+def run_in_subprocess(name: str, files: List[Path], expected: Optional[List[Set[str]]]) -> dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_backend, args=(name, files, expected, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50, help="Nombre de CV à générer")
+    parser.add_argument("--corpus", type=Path, help="Dossier de PDF existants (sinon corpus généré)")
+    parser.add_argument("--reference", default="pdfminer", help="Backend de référence pour un corpus existant")
+    parser.add_argument("--backends", help="Liste de backends séparés par des virgules (défaut : tous ceux installés)")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",") if args.backends else available_backends()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            files = sorted(args.corpus.glob("*.pdf"))
+            reference = run_in_subprocess(args.reference, files, None)
+            expected = [words(text) for text in reference["texts"]]
+            print(f"Corpus: {len(files)} PDF de {args.corpus} (référence : {args.reference})\n")
+        else:
+            print(f"Génération de {args.count} CV avec generate_cvs.py...")
+            corpus = build_corpus(Path(tmp), args.count)
+            files = list(corpus)
+            expected = list(corpus.values())
+            print(f"Corpus: {len(files)} CV générés\n")
+
+        print(f"{'Backend':<12} {'Version':<10} {'Pages/s':>9} {'RSS max (Mo)':>13} {'Δ RSS (Mo)':>11} {'Fidélité':>9}")
+        print("-" * 69)
+        for name in backends:
+            result = run_in_subprocess(name, files, expected)
+            pages_per_second = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+            print(f"{name:<12} {PDF_BACKENDS[name].version():<10} {pages_per_second:>9.1f} "
+                  f"{result['rss_mb']:>13.1f} {result['rss_delta_mb']:>11.1f} {result['fidelity']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
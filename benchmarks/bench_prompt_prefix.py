@@ -0,0 +1,215 @@
+"""
+Benchmark : réutilisation du préfixe du prompt et keep_alive
+
+Serveur local qui imite le coût d'Ollama/llama.cpp :
+- le prompt est « tokenisé » (un mot ou signe = un token) ;
+- seuls les tokens après le plus long préfixe commun avec la requête
+  précédente (cache KV d'un slot) sont évalués, à --ms-per-token chacun ;
+- le modèle est déchargé après keep_alive d'inactivité (5 min par défaut
+  côté Ollama, simulé par --default-keep-alive) et son rechargement coûte
+  --load-ms.
+
+Scénarios comparés, sur les mêmes questions et documents :
+- ancien prompt : documents avant les instructions, pas de system, pas de keep_alive ;
+- préfixe stable : instructions fixes dans system, keep_alive envoyé ;
+- conversation : préfixe stable + tokens du tour précédent (champ context).
+
+Usage :
+    python benchmarks/bench_prompt_prefix.py --questions 30 --ms-per-token 2
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.clients.ollama_client import ConversationState, OllamaClient
+
+ANSWER = "Selon la politique interne, deux jours de télétravail sont autorisés par semaine."
+
+
+def tokenize(text: str):
+    return [zlib.crc32(piece.encode()) % 128000 for piece in re.findall(r"\w+|[^\w\s]", text)]
+
+
+def parse_duration(value, default: float) -> float:
+    """keep_alive Ollama ("30m", "10s", nombre de secondes) en secondes"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float("inf") if float(value) < 0 else float(value)
+
+
+class SimulatedModel:
+    """Un slot llama.cpp : cache KV du dernier prompt, chargement/déchargement"""
+
+    def __init__(self, ms_per_token: float, load_ms: float, default_keep_alive: float):
+        self.ms_per_token = ms_per_token
+        self.load_ms = load_ms
+        self.default_keep_alive = default_keep_alive
+        self.cached = []
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def generate(self, body: dict) -> dict:
+        with self.lock:
+            load = 0.0
+            if time.monotonic() > self.expires_at:
+                load = self.load_ms / 1000
+                time.sleep(load)
+                self.cached = []
+
+            prompt = tokenize(f"<|user|> {body.get('prompt', '')} <|assistant|>")
+            if body.get("context"):
+                tokens = list(body["context"]) + prompt
+            else:
+                tokens = tokenize(f"<|system|> {body.get('system', '')}") + prompt
+
+            common = 0
+            for cached, new in zip(self.cached, tokens):
+                if cached != new:
+                    break
+                common += 1
+            evaluated = len(tokens) - common
+            time.sleep(evaluated * self.ms_per_token / 1000)
+
+            context = tokens + tokenize(ANSWER)
+            self.cached = context
+            self.expires_at = time.monotonic() + parse_duration(body.get("keep_alive"), self.default_keep_alive)
+
+        return {
+            "response": ANSWER,
+            "done": True,
+            "context": context,
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": int(evaluated * self.ms_per_token * 1e6),
+            "eval_count": len(tokenize(ANSWER)),
+            "eval_duration": 1
+        }
+
+
+def make_handler(model: SimulatedModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            payload = json.dumps(model.generate(body)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def legacy_prompt(question: str, context: str, user_name: str) -> str:
+    """Ancienne disposition : documents puis instructions, tout dans prompt"""
+    return f"""Tu es un assistant IA interne d'entreprise. Réponds en français en utilisant uniquement les informations des documents fournis.
+
+DOCUMENTS INTERNES:
+{context}
+
+QUESTION: {question}
+
+INSTRUCTIONS:
+- Réponds uniquement en français
+- Utilise uniquement les informations des documents ci-dessus
+- Donne une réponse complète et détaillée
+- Si l'information n'est pas dans les documents, réponds: "Je ne trouve pas cette information dans les documents internes disponibles."
+- Sois précis et cite les sources quand c'est possible
+- Réponds de manière professionnelle et utile
+- Ne mentionne JAMAIS les noms des personnes trouvés dans les documents dans ta réponse
+- L'utilisateur qui pose la question est: {user_name}. Ne confonds PAS ce nom avec les noms mentionnés dans les documents.
+
+RÉPONSE:"""
+
+
+def build_questions(count: int):
+    documents = [
+        f"Document {i} : la procédure {i} précise les règles de remboursement, de congés et de télétravail "
+        f"applicables au service {i % 7}, avec un plafond de {100 + i} euros par mois."
+        for i in range(40)
+    ]
+    return [
+        (f"Quelle est la règle numéro {i} pour le service {i % 7} ?",
+         "\n\n".join(f"Source: doc{j}.pdf\n{documents[j]}" for j in ((3 * i) % 40, (7 * i + 1) % 40)))
+        for i in range(count)
+    ]
+
+
+def run(client: OllamaClient, questions, mode: str, pause: float):
+    evaluated, eval_times, load_times = [], [], []
+    conversation = ConversationState(max_tokens=10**6) if mode == "conversation" else None
+    for question, context in questions:
+        if mode == "legacy":
+            payload = client._build_payload(legacy_prompt(question, context, "Alice"), stream=False)
+            payload.pop("keep_alive")
+        else:
+            payload = client._build_payload(
+                client._build_prompt(question, context, "Alice"), stream=False,
+                system=client._system_prompt(context), conversation=conversation
+            )
+        data = client.session.post(f"{client.base_url}/api/generate", json=payload, timeout=60).json()
+        if conversation is not None:
+            conversation.update(data.get("context"))
+        evaluated.append(data["prompt_eval_count"])
+        eval_times.append(data["prompt_eval_duration"] / 1e6)
+        load_times.append(data["load_duration"] / 1e6)
+        time.sleep(pause)
+    return evaluated, eval_times, load_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--ms-per-token", type=float, default=2.0, help="Coût d'évaluation d'un token du prompt")
+    parser.add_argument("--load-ms", type=float, default=200.0, help="Coût de (re)chargement du modèle")
+    parser.add_argument("--default-keep-alive", type=float, default=0.05,
+                        help="keep_alive appliqué si la requête n'en envoie pas (s, simule 5 min d'inactivité)")
+    parser.add_argument("--pause", type=float, default=0.1, help="Temps entre deux questions (s)")
+    args = parser.parse_args()
+
+    questions = build_questions(args.questions)
+    print(f"{args.questions} questions, {args.ms_per_token} ms/token, rechargement {args.load_ms} ms\n")
+    print(f"{'':<18} {'tokens évalués':>15} {'éval. prompt':>13} {'chargement':>11} {'total':>10}")
+
+    totals = {}
+    for mode, label in (("legacy", "ancien prompt"), ("prefix", "préfixe stable"), ("conversation", "conversation")):
+        model = SimulatedModel(args.ms_per_token, args.load_ms, args.default_keep_alive)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(model))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = OllamaClient(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+
+        evaluated, eval_times, load_times = run(client, questions, mode, args.pause)
+        total = statistics.mean(eval_times) + statistics.mean(load_times)
+        totals[mode] = total
+        print(f"{label:<18} {statistics.mean(evaluated):>15.0f} {statistics.mean(eval_times):>10.1f} ms "
+              f"{statistics.mean(load_times):>8.1f} ms {total:>7.1f} ms")
+
+        client.close()
+        server.shutdown()
+
+    print(f"\nGain par question (préfixe stable) : {totals['legacy'] - totals['prefix']:.1f} ms")
+    print(f"Gain par question (conversation)   : {totals['legacy'] - totals['conversation']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Calibration de l'estimation des tokens (CONTEXT_TOKEN_SCALE) sur le modèle Ollama
+
+Découpe des documents en chunks, demande à Ollama le nombre réel de tokens de
+chaque chunk (prompt_eval_count d'une génération d'un seul token en mode raw)
+et ajuste le facteur d'échelle de TokenCounter. Affiche l'erreur moyenne avant
+et après calibration, et la valeur à reporter dans config.env.
+
+Usage :
+    python benchmarks/calibrate_tokens.py --corpus data/ --samples 200
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.context_packer import TokenCounter
+from src.clients.ollama_client import OllamaClient
+from src.documents.document_reader import DocumentReader
+
+
+def load_samples(corpus: Path, count: int, chunk_size: int):
+    """Chunks de texte extraits des documents du corpus"""
+    reader = DocumentReader()
+    samples = []
+    for path in sorted(corpus.rglob("*")):
+        if not path.is_file() or not reader.is_supported(path):
+            continue
+        result = reader.process_document(path, chunk_size=chunk_size)
+        samples.extend(result["chunks"])
+        if len(samples) >= count:
+            break
+    return samples[:count]
+
+
+def ollama_token_count(client: OllamaClient, text: str) -> int:
+    """Nombre de tokens du texte selon le tokenizer du modèle (BOS exclu)"""
+    response = client.session.post(
+        f"{client.base_url}/api/generate",
+        json={"model": client.model, "prompt": text, "raw": True, "stream": False,
+              "options": {"num_predict": 1}},
+        timeout=client.timeout
+    )
+    response.raise_for_status()
+    return max(response.json().get("prompt_eval_count", 0) - 1, 1)
+
+
+def mean_error(counter: TokenCounter, samples, actual) -> float:
+    return statistics.mean(abs(counter.count(text) - tokens) / tokens for text, tokens in zip(samples, actual))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=Path("data"))
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=150, help="Taille des chunks en mots")
+    parser.add_argument("--url", help="URL d'Ollama (OLLAMA_BASE_URL par défaut)")
+    args = parser.parse_args()
+
+    client = OllamaClient(base_url=args.url)
+    if not client.check_connection(force=True):
+        sys.exit(f"Ollama injoignable sur {client.base_url}")
+
+    samples = load_samples(args.corpus, args.samples, args.chunk_size)
+    if not samples:
+        sys.exit(f"Aucun document lisible dans {args.corpus}")
+    print(f"{len(samples)} chunks, modèle {client.model}")
+
+    actual = [ollama_token_count(client, text) for text in samples]
+
+    counter = TokenCounter(scale=1.0)
+    before = mean_error(counter, samples, actual)
+    scale = counter.calibrate(zip(samples, actual))
+    after = mean_error(counter, samples, actual)
+
+    print(f"Erreur moyenne : {before:.1%} (échelle 1.0) -> {after:.1%} (échelle {scale:.3f})")
+    print(f"\nÀ reporter dans config.env :\nCONTEXT_TOKEN_SCALE={scale:.3f}")
+
+
+if __name__ == "__main__":
+    main()
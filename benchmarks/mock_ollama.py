@@ -0,0 +1,228 @@
+"""
+Serveur Ollama simulé, pour les benchmarks et les tests sans LLM
+
+Implémente /api/tags et /api/generate (réponse complète ou flux NDJSON) avec
+un coût configurable :
+- latence avant le premier token (--latency) ;
+- débit de génération (--tokens-per-second) et longueur des réponses (--tokens) ;
+- injection de pannes : erreur HTTP 500 (--error-rate) ou connexion coupée
+  sans réponse (--drop-rate).
+
+Les réponses portent les mêmes champs qu'Ollama (context, prompt_eval_count,
+eval_count, eval_duration...), ce qui permet de faire passer OllamaClient,
+OllamaClientPool et KnowledgeAgent par leurs chemins de code réels.
+
+Usage :
+    python benchmarks/mock_ollama.py --port 11434 --latency 0.2 --tokens-per-second 30
+
+    # Dans un script ou un test
+    with MockOllama(latency=0.05) as server:
+        client = OllamaClient(base_url=server.url)
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+WORDS = ("selon les documents internes la politique de l'entreprise prévoit deux jours de télétravail "
+         "par semaine après accord du responsable et la prise en charge des frais sur justificatif").split()
+
+
+def _tokenize(text: str) -> List[int]:
+    return [zlib.crc32(piece.encode()) % 128000 for piece in re.findall(r"\w+|[^\w\s]", text)]
+
+
+class MockOllama:
+    """Serveur HTTP local qui se comporte comme Ollama"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, model: str = "llama3:8b",
+                 latency: float = 0.0, tokens_per_second: float = 0.0, tokens: int = 20,
+                 error_rate: float = 0.0, drop_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            host, port: Adresse d'écoute (port 0 = port libre choisi par le système)
+            model: Modèle annoncé par /api/tags
+            latency: Délai avant le premier token (secondes)
+            tokens_per_second: Débit de génération (0 = instantané)
+            tokens: Nombre de tokens par réponse
+            error_rate: Proportion de requêtes en erreur HTTP 500
+            drop_rate: Proportion de requêtes dont la connexion est coupée sans réponse
+            seed: Graine des tirages de pannes (reproductibilité)
+        """
+        self.model = model
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.stats: Dict[str, int] = {"tags": 0, "generate": 0, "stream": 0, "errors": 0, "drops": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllama":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockOllama":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fault(self) -> Optional[str]:
+        """Panne à simuler pour la requête courante : "drop", "error" ou None"""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.drop_rate:
+            return "drop"
+        if draw < self.drop_rate + self.error_rate:
+            return "error"
+        return None
+
+    def _answer(self, prompt: str) -> List[str]:
+        """Tokens de la réponse, déterministes pour un même prompt"""
+        start = zlib.crc32(prompt.encode()) % len(WORDS)
+        return [("" if i == 0 else " ") + WORDS[(start + i) % len(WORDS)] for i in range(self.tokens)]
+
+    def _final(self, body: Dict[str, Any], answer: List[str], started: float) -> Dict[str, Any]:
+        prompt_tokens = _tokenize(f"{body.get('system', '')} {body.get('prompt', '')}")
+        context = list(body.get("context") or []) + prompt_tokens + _tokenize("".join(answer))
+        eval_seconds = len(answer) / self.tokens_per_second if self.tokens_per_second else 0.0
+        return {
+            "model": self.model,
+            "done": True,
+            "context": context,
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(prompt_tokens),
+            "prompt_eval_duration": int(self.latency * 1e9),
+            "eval_count": len(answer),
+            "eval_duration": int(eval_seconds * 1e9)
+        }
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Comme le serveur Go d'Ollama (sinon Nagle + ACK retardé ajoutent ~40 ms en keep-alive)
+            disable_nagle_algorithm = True
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, payload: Dict[str, Any]):
+                line = json.dumps(payload).encode() + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path != "/api/tags":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                mock._count("tags")
+                self._send_json({"models": [{"name": mock.model, "model": mock.model}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+
+                fault = mock._fault()
+                if fault == "drop":
+                    mock._count("drops")
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if fault == "error":
+                    mock._count("errors")
+                    self._send_json({"error": "simulated failure"}, 500)
+                    return
+
+                started = time.perf_counter()
+                # Préchargement (warm_up) : pas de prompt, rien à générer
+                if not body.get("prompt"):
+                    self._send_json({"model": mock.model, "response": "", "done": True})
+                    return
+
+                answer = mock._answer(body["prompt"])
+                delay = 1 / mock.tokens_per_second if mock.tokens_per_second else 0.0
+                time.sleep(mock.latency)
+
+                if body.get("stream", True):
+                    mock._count("stream")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for token in answer:
+                        self._send_chunk({"model": mock.model, "response": token, "done": False})
+                        time.sleep(delay)
+                    self._send_chunk({**mock._final(body, answer, started), "response": ""})
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    mock._count("generate")
+                    time.sleep(delay * len(answer))
+                    self._send_json({**mock._final(body, answer, started), "response": "".join(answer)})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="llama3:8b")
+    parser.add_argument("--latency", type=float, default=0.2, help="Délai avant le premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens par réponse")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses HTTP 500")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Proportion de connexions coupées")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = MockOllama(args.host, args.port, args.model, args.latency, args.tokens_per_second,
+                        args.tokens, args.error_rate, args.drop_rate, args.seed)
+    print(f"Ollama simulé sur {server.url} (Ctrl+C pour arrêter)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@
 Package agents - Agents intelligents
 """
 from src.agents.knowledge_agent import KnowledgeAgent
+from src.agents.single_flight import SingleFlight
+from src.agents.conversation_history import ConversationHistory
+from src.agents.relevance_gate import RelevanceGate
+from src.agents.cv_query import CVQueryRouter
 
-__all__ = ['KnowledgeAgent']
-
+__all__ = ['KnowledgeAgent', 'SingleFlight', 'ConversationHistory', 'RelevanceGate', 'CVQueryRouter']
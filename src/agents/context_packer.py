@@ -0,0 +1,185 @@
+"""
+Construction du contexte envoyé au LLM selon un budget de tokens
+
+Le coût d'une question (évaluation du prompt par le modèle) et la taille
+maximale du prompt (num_ctx) se mesurent en tokens, pas en caractères. Le
+contexte est rempli avec les chunks les plus pertinents d'abord, entiers
+tant qu'ils tiennent dans le budget ; le dernier est coupé à une fin de phrase.
+
+Les tokens sont estimés par une approximation rapide du tokenizer BPE de
+llama3 (mots courts = 1 token, mots longs découpés par ~4 caractères, une
+ponctuation = 1 token), corrigée par un facteur d'échelle calibrable sur les
+prompt_eval_count renvoyés par Ollama (voir benchmarks/calibrate_tokens.py).
+"""
+import math
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+from src.core.config import CONTEXT_TOKEN_BUDGET, CONTEXT_TOKEN_SCALE
+
+logger = logging.getLogger(__name__)
+
+# Mots et signes de ponctuation (les espaces sont absorbés par le mot suivant)
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Fin de phrase : ponctuation finale suivie d'un blanc, ou saut de ligne
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# Nombre moyen de caractères par sous-mot BPE pour un mot long
+_CHARS_PER_SUBWORD = 4
+
+# Séparateur entre deux chunks du contexte
+SEPARATOR = "\n\n"
+
+
+class TokenCounter:
+    """Estimation rapide du nombre de tokens d'un texte"""
+
+    def __init__(self, scale: float = CONTEXT_TOKEN_SCALE, tokenizer: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            scale: Facteur de correction de l'approximation (calibré sur le modèle)
+            tokenizer: Compteur exact optionnel (ex. tokenizer du modèle), prioritaire
+        """
+        self.scale = scale
+        self.tokenizer = tokenizer
+
+    @staticmethod
+    def _raw_count(text: str) -> int:
+        count = 0
+        for piece in _PIECES.findall(text):
+            count += math.ceil(len(piece) / _CHARS_PER_SUBWORD) if piece[0].isalnum() or piece[0] == '_' else 1
+        return count
+
+    def count(self, text: str) -> int:
+        """Nombre de tokens (estimé) d'un texte"""
+        if self.tokenizer is not None:
+            return self.tokenizer(text)
+        return math.ceil(self._raw_count(text) * self.scale)
+
+    def calibrate(self, samples: Iterable[Tuple[str, int]]) -> float:
+        """
+        Ajuster le facteur d'échelle sur des comptes exacts
+
+        Args:
+            samples: Couples (texte, nombre de tokens réel, ex. prompt_eval_count d'Ollama)
+
+        Returns:
+            Nouveau facteur d'échelle
+        """
+        estimated = actual = 0
+        for text, tokens in samples:
+            estimated += self._raw_count(text)
+            actual += tokens
+        if estimated:
+            self.scale = actual / estimated
+        return self.scale
+
+
+def split_sentences(text: str) -> List[str]:
+    """Découper un texte en phrases (les séparateurs restent attachés à la phrase précédente)"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+class ContextPacker:
+    """
+    Remplissage glouton d'un budget de tokens avec les chunks les plus pertinents
+    """
+
+    def __init__(self, budget_tokens: int = CONTEXT_TOKEN_BUDGET, counter: Optional[TokenCounter] = None,
+                 min_chunk_tokens: int = 32):
+        """
+        Args:
+            budget_tokens: Nombre maximal de tokens du contexte
+            counter: Compteur de tokens (approximation par défaut)
+            min_chunk_tokens: Taille minimale d'un chunk coupé (en dessous, il est omis)
+        """
+        self.budget_tokens = budget_tokens
+        self.counter = counter or TokenCounter()
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def _trim(self, text: str, budget: int) -> str:
+        """Garder le début du texte qui tient dans budget tokens, coupé à une fin de phrase"""
+        kept = []
+        used = 0
+        for sentence in split_sentences(text):
+            tokens = self.counter.count(sentence)
+            if used + tokens > budget:
+                break
+            kept.append(sentence)
+            used += tokens
+
+        if kept:
+            return "".join(kept).rstrip()
+
+        # Première phrase trop longue : coupe au dernier mot qui tient
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.counter.count(" ".join(words[:middle]) + "...") <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low]) + "..." if low else ""
+
+    def pack(self, docs: Sequence[Dict[str, Any]],
+             header: Callable[[Dict[str, Any]], str] = lambda doc: f"Source: {doc['metadata'].get('filename', 'Document')}\n"
+             ) -> Dict[str, Any]:
+        """
+        Construire le contexte
+
+        Args:
+            docs: Chunks retrouvés ({'content', 'metadata', 'similarity_score', ...})
+            header: En-tête de chaque chunk dans le contexte
+
+        Returns:
+            {'context': texte, 'chunks': chunks retenus (contenu éventuellement coupé),
+            'tokens': tokens estimés, 'trimmed': nombre de chunks coupés, 'dropped': nombre de chunks omis}
+        """
+        ranked = sorted(docs, key=lambda doc: doc.get('similarity_score', 0.0), reverse=True)
+        separator_tokens = self.counter.count(SEPARATOR)
+
+        parts: List[str] = []
+        chunks: List[Dict[str, Any]] = []
+        used = 0
+        trimmed = 0
+
+        for doc in ranked:
+            head = header(doc)
+            cost = self.counter.count(head) + (separator_tokens if parts else 0)
+            remaining = self.budget_tokens - used - cost
+            if remaining < self.min_chunk_tokens:
+                continue
+
+            content = doc['content']
+            tokens = self.counter.count(content)
+            if tokens > remaining:
+                content = self._trim(content, remaining)
+                if not content or self.counter.count(content) < self.min_chunk_tokens:
+                    continue
+                tokens = self.counter.count(content)
+                trimmed += 1
+
+            parts.append(head + content)
+            chunks.append({**doc, 'content': content})
+            used += cost + tokens
+
+        if trimmed or len(chunks) < len(docs):
+            logger.debug(f"Contexte : {len(chunks)}/{len(docs)} chunks, {trimmed} coupés, ~{used} tokens")
+
+        return {
+            'context': SEPARATOR.join(parts),
+            'chunks': chunks,
+            'tokens': used,
+            'trimmed': trimmed,
+            'dropped': len(docs) - len(chunks)
+        }
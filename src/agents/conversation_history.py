@@ -0,0 +1,189 @@
+"""
+Historique borné des échanges d'une conversation
+
+Les échanges récents sont gardés dans un tampon circulaire, borné en nombre
+d'échanges et en octets : la mémoire d'une session reste constante, même
+pour un agent partagé qui tourne des jours. Un échange stocke la question,
+la réponse et des sources réduites (fichier, score), sans les extraits.
+
+Les échanges qui sortent du tampon sont résumés en une ligne (question et
+début de réponse) dans un résumé lui aussi borné, utilisable comme contexte
+des questions de suivi, et peuvent être déversés dans SQLite par utilisateur
+(ConversationStore).
+"""
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence
+import logging
+
+from src.core.config import HISTORY_MAX_TURNS, HISTORY_MAX_BYTES, HISTORY_SUMMARY_CHARS, HISTORY_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Taille fixe d'un échange en mémoire (objet, champs, tuples), hors texte
+_TURN_OVERHEAD = 200
+
+
+class Turn:
+    """Échange compact (question, réponse, sources réduites)"""
+    __slots__ = ("question", "answer", "sources", "confidence", "created_at", "size")
+
+    def __init__(self, question: str, answer: str, sources: Sequence[tuple], confidence: float,
+                 created_at: Optional[float] = None):
+        self.question = question
+        self.answer = answer
+        self.sources = tuple(sources)
+        self.confidence = confidence
+        self.created_at = created_at if created_at is not None else time.time()
+        self.size = (_TURN_OVERHEAD + len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+                     + sum(len(filename.encode("utf-8")) + 24 for filename, _ in self.sources))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'question': self.question,
+            'answer': self.answer,
+            'sources': [{'filename': filename, 'similarity_score': score} for filename, score in self.sources],
+            'confidence': self.confidence,
+            'created_at': self.created_at
+        }
+
+    def summary(self, question_chars: int = 100, answer_chars: int = 160) -> str:
+        """Une ligne : question et première phrase de la réponse, tronquées"""
+        answer = _SENTENCE_END.split(self.answer.strip(), maxsplit=1)[0] if self.answer else ""
+        return f"- {_truncate(self.question, question_chars)} → {_truncate(answer, answer_chars)}"
+
+
+def _truncate(text: str, chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= chars else text[:chars - 1].rstrip() + "…"
+
+
+class ConversationHistory:
+    """Tampon circulaire des échanges récents, résumé des anciens, déversement optionnel"""
+
+    def __init__(self, max_turns: int = HISTORY_MAX_TURNS, max_bytes: int = HISTORY_MAX_BYTES,
+                 summary_chars: int = HISTORY_SUMMARY_CHARS, store=None, user_id: str = "default"):
+        """
+        Args:
+            max_turns: Nombre maximal d'échanges gardés en mémoire
+            max_bytes: Taille maximale (approchée) des échanges gardés en mémoire
+            summary_chars: Taille maximale du résumé des échanges sortis du tampon
+            store: ConversationStore où déverser les échanges sortis du tampon (None = oubliés)
+            user_id: Utilisateur de la conversation (clé dans store)
+        """
+        self.max_turns = max(1, max_turns)
+        self.max_bytes = max_bytes
+        self.summary_chars = summary_chars
+        self.store = store
+        self.user_id = user_id
+
+        self._turns: Deque[Turn] = deque()
+        self._bytes = 0
+        self._summary: Deque[str] = deque()
+        self._summary_size = 0
+        self.compacted = 0
+        self._lock = threading.Lock()
+
+    def add(self, question: str, answer: str, sources: Sequence[Dict[str, Any]] = (),
+            confidence: float = 0.0) -> Turn:
+        """Ajouter un échange ; les plus anciens sortent du tampon au-delà des limites"""
+        turn = Turn(question, answer,
+                    [(source.get('filename', 'Document'), round(float(source.get('similarity_score', 0.0)), 4))
+                     for source in sources],
+                    confidence)
+        with self._lock:
+            self._turns.append(turn)
+            self._bytes += turn.size
+            # Le dernier échange est toujours gardé, même s'il dépasse le budget
+            while len(self._turns) > 1 and (len(self._turns) > self.max_turns or self._bytes > self.max_bytes):
+                self._compact(self._turns.popleft())
+        return turn
+
+    def _compact(self, turn: Turn):
+        """Résumer un échange sorti du tampon (et le déverser dans store)"""
+        self._bytes -= turn.size
+        self.compacted += 1
+        line = turn.summary()
+        self._summary.append(line)
+        self._summary_size += len(line) + 1
+        while len(self._summary) > 1 and self._summary_size > self.summary_chars:
+            self._summary_size -= len(self._summary.popleft()) + 1
+
+        if self.store is not None:
+            try:
+                self.store.append(self.user_id, turn.to_dict())
+            except Exception as e:
+                logger.warning(f"Échange non sauvegardé dans l'historique sur disque: {e}")
+
+    @property
+    def summary(self) -> str:
+        """Résumé des échanges sortis du tampon (les plus récents)"""
+        with self._lock:
+            return "\n".join(self._summary)
+
+    def follow_up_context(self, max_chars: Optional[int] = None) -> str:
+        """
+        Rappel de la conversation pour une question de suivi : résumé des
+        anciens échanges puis une ligne par échange récent, borné à max_chars
+        (summary_chars par défaut), en gardant les plus récents
+        """
+        max_chars = self.summary_chars if max_chars is None else max_chars
+        with self._lock:
+            lines = list(self._summary) + [turn.summary() for turn in self._turns]
+        kept, size = [], 0
+        for line in reversed(lines):
+            size += len(line) + 1
+            if kept and size > max_chars:
+                break
+            kept.append(line)
+        return "\n".join(reversed(kept))
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Échanges en mémoire, du plus ancien au plus récent (les limit derniers)"""
+        with self._lock:
+            turns = list(self._turns)
+        if limit is not None:
+            turns = turns[-limit:] if limit > 0 else []
+        return [turn.to_dict() for turn in turns]
+
+    def load_spilled(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Échanges déversés sur disque pour cet utilisateur"""
+        return self.store.load(self.user_id, limit) if self.store is not None else []
+
+    def clear(self, spilled: bool = False):
+        """Vider le tampon et le résumé (et les échanges déversés si spilled)"""
+        with self._lock:
+            self._turns.clear()
+            self._bytes = 0
+            self._summary.clear()
+            self._summary_size = 0
+        if spilled and self.store is not None:
+            self.store.clear(self.user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'turns': len(self._turns),
+                'bytes': self._bytes,
+                'summary_chars': self._summary_size,
+                'compacted': self.compacted
+            }
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.recent())
+
+
+def create_history(user_id: str = "default") -> ConversationHistory:
+    """Historique configuré (HISTORY_*), déversé dans HISTORY_DB_PATH si défini"""
+    store = None
+    if HISTORY_DB_PATH:
+        from src.storage.conversation_store import ConversationStore
+        store = ConversationStore(HISTORY_DB_PATH)
+    return ConversationHistory(store=store, user_id=user_id)
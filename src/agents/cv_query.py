@@ -0,0 +1,294 @@
+"""
+Questions sur les CV servies par l'index structuré, sans LLM
+
+Les questions de comptage, de filtre et de liste sur les CV (« combien de
+DevOps », « profils React avec 5 ans d'expérience », « répartition des
+CV par ville ») sont mal servies par la recherche vectorielle + LLM : la
+réponse dépend de tous les CV, pas de quelques chunks. Elles sont reconnues
+ici et calculées sur l'index SQLite des CV (CVIndex) en quelques
+millisecondes.
+
+Les critères reconnus :
+- poste : intitulé exact (pluriel accepté), quelques alias (« DevOps », « RH »),
+  « développeurs » seul = tous les postes de développeur ;
+- technologies et langages : valeurs présentes dans l'index ;
+- ville : valeur de l'index précédée de « à », « sur »... ;
+- expérience : « 5 ans d'expérience », « plus de / au moins / moins de N ans »,
+  « entre 3 et 5 ans ».
+
+Le vocabulaire des technologies contient des mots courants (« Communication »,
+« Linux », « Recrutement ») : une question n'est servie par l'index que si
+elle désigne explicitement des CV (« CV », « profils », « candidats »), ou
+si elle demande un comptage ou une répartition avec un critère de poste ou
+de technologie. « Qui gère la communication interne ? » suit donc le chemin
+habituel (recherche + LLM), comme une question sans critère reconnu ou qui
+demande une explication.
+"""
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+import logging
+
+from src.core.config import CV_LIST_LIMIT, CV_INDEX_PATH
+from src.documents.cv_extractor import normalize
+
+logger = logging.getLogger(__name__)
+
+# Alias de postes (forme normalisée) vers l'intitulé des CV
+JOB_ALIASES = {
+    "devops": "devops engineer",
+    "rh": "responsable rh",
+    "recruteur": "charge de recrutement",
+    "po": "product owner",
+    "fullstack": "developpeur full stack",
+}
+
+# Famille de postes désignée par un mot générique
+JOB_FAMILIES = {"developpeur": "developpeur", "dev": "developpeur"}
+FAMILY_LABELS = {"developpeur": "tous les développeurs"}
+
+_COUNT = re.compile(r"\b(combien|nombre)\b")
+_EXPLAIN = re.compile(r"\b(comment|pourquoi|explique[rz]?|expliquez)\b")
+_CV_WORDS = re.compile(r"\b(cv|candidats?|candidatures?|profils?|consultants?)\b")
+# Critères qui désignent des CV (poste, technologie) ; ville et expérience seules ne suffisent pas
+_CV_FILTERS = ("job_titles", "job_prefix", "technologies", "languages")
+_GROUP_BY = [(re.compile(r"\bpar (ville|localisation)\b"), "city"),
+             (re.compile(r"\b(par (metier|poste|profil)s?|repartition)\b"), "job_title")]
+_YEARS_RANGE = re.compile(r"\bentre (\d+(?:[.,]\d+)?) et (\d+(?:[.,]\d+)?) ans\b")
+_YEARS = re.compile(r"(?:\b(?P<op>plus de|au moins|minimum|moins de|au plus|maximum)\s+|(?P<sym>[<>]=?)\s*)?"
+                    r"\b(?P<n>\d+(?:[.,]\d+)?)\s*\+?\s*ans?\b")
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def _phrase_pattern(terms: List[str], plural: bool = False) -> Optional[Pattern]:
+    """Expression qui reconnaît un des termes (mots entiers, pluriel optionnel)"""
+    if not terms:
+        return None
+    alternatives = []
+    for term in sorted(set(terms), key=len, reverse=True):
+        words = [re.escape(word) + ("(?:s|x)?" if plural else "") for word in term.split()]
+        alternatives.append(r"\s+".join(words))
+    return re.compile(r"(?<![\w])(" + "|".join(alternatives) + r")(?![\w])")
+
+
+@dataclass
+class CVQuery:
+    """Question structurée : comptage (éventuellement par groupe) ou liste"""
+    intent: str
+    filters: Dict[str, Any] = field(default_factory=dict)
+    group_by: Optional[str] = None
+
+    def describe(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """Critères en clair, pour la réponse (labels : libellés des valeurs normalisées)"""
+        labels = labels or {}
+        parts = []
+        filters = self.filters
+        if filters.get("job_titles"):
+            parts.append(" ou ".join(labels.get(title, title) for title in filters["job_titles"]))
+        if filters.get("job_prefix"):
+            parts.append(FAMILY_LABELS.get(filters["job_prefix"], filters["job_prefix"]))
+        parts += filters.get("technologies", []) + filters.get("languages", [])
+        if filters.get("cities"):
+            parts.append("à " + " ou ".join(labels.get(city, city) for city in filters["cities"]))
+        if filters.get("min_years") is not None and filters.get("max_years") is not None:
+            parts.append(f"{filters['min_years']:g} à {filters['max_years']:g} ans d'expérience")
+        elif filters.get("min_years") is not None:
+            parts.append(f"≥ {filters['min_years']:g} ans d'expérience")
+        elif filters.get("max_years") is not None:
+            parts.append(f"< {filters['max_years']:g} ans d'expérience")
+        return ", ".join(parts) if parts else "tous les CV"
+
+
+class CVQueryRouter:
+    """Reconnaît les questions structurées sur les CV et y répond depuis l'index"""
+
+    def __init__(self, index, list_limit: int = CV_LIST_LIMIT):
+        """
+        Args:
+            index: Index des CV (CVIndex)
+            list_limit: Nombre maximal de CV listés dans une réponse
+        """
+        self.index = index
+        self.list_limit = list_limit
+        self.routed = 0
+
+        self._lock = threading.Lock()
+        self._indexed = -1
+        self._patterns: Dict[str, Optional[Pattern]] = {}
+        self._job_titles: List[str] = []
+        self._labels: Dict[str, str] = {}
+
+    def _refresh(self):
+        """Reconstruire les expressions quand le nombre de CV indexés change"""
+        indexed = len(self.index)
+        with self._lock:
+            if indexed == self._indexed:
+                return
+            vocabulary = self.index.vocabulary()
+            technologies = set(vocabulary["technologies"])
+            languages = [language for language in vocabulary["languages"] if language not in technologies]
+            job_titles = list(vocabulary["job_titles"])
+            self._patterns = {
+                "job_titles": _phrase_pattern(job_titles + [alias for alias, title in JOB_ALIASES.items()
+                                                            if title in job_titles], plural=True),
+                "families": _phrase_pattern(list(JOB_FAMILIES), plural=True),
+                "technologies": _phrase_pattern(list(technologies)),
+                "languages": _phrase_pattern(languages),
+                "cities": _phrase_pattern(list(vocabulary["cities"]))
+            }
+            self._labels = {**vocabulary["cities"], **vocabulary["job_titles"]}
+            self._job_titles = job_titles
+            self._indexed = indexed
+
+    @staticmethod
+    def _singular(match: str) -> str:
+        return " ".join(word[:-1] if word.endswith(("s", "x")) and len(word) > 3 else word for word in match.split())
+
+    def parse(self, question: str) -> Optional[CVQuery]:
+        """Question structurée, ou None si la question doit suivre le chemin habituel"""
+        if len(self.index) == 0:
+            return None
+        self._refresh()
+        text = normalize(question)
+        if _EXPLAIN.search(text):
+            return None
+
+        filters: Dict[str, Any] = {}
+        taken: List[Tuple[int, int]] = []
+
+        def free(span: Tuple[int, int]) -> bool:
+            return all(span[1] <= start or span[0] >= end for start, end in taken)
+
+        pattern = self._patterns["job_titles"]
+        for match in pattern.finditer(text) if pattern else ():
+            value = re.sub(r"\s+", " ", match.group(1))
+            title = JOB_ALIASES.get(value) or JOB_ALIASES.get(self._singular(value)) or self._resolve_title(value)
+            if title not in filters.get("job_titles", []):
+                filters.setdefault("job_titles", []).append(title)
+            taken.append(match.span())
+
+        pattern = self._patterns["families"]
+        if "job_titles" not in filters and pattern:
+            match = pattern.search(text)
+            if match:
+                filters["job_prefix"] = JOB_FAMILIES[self._singular(match.group(1))]
+                taken.append(match.span())
+
+        for key in ("technologies", "languages"):
+            pattern = self._patterns[key]
+            for match in pattern.finditer(text) if pattern else ():
+                if free(match.span()):
+                    filters.setdefault(key, []).append(match.group(1))
+                    taken.append(match.span())
+
+        pattern = self._patterns["cities"]
+        for match in pattern.finditer(text) if pattern else ():
+            before = text[:match.start()].rstrip()
+            if free(match.span()) and re.search(r"(?<![\w])(a|sur|vers|de|en)$", before):
+                filters.setdefault("cities", []).append(match.group(1))
+                taken.append(match.span())
+
+        self._parse_years(text, filters)
+
+        count = bool(_COUNT.search(text))
+        group_by = next((column for regex, column in _GROUP_BY if regex.search(text)), None)
+        explicit = bool(_CV_WORDS.search(text))
+        if not filters:
+            # « Combien de CV ? », « Répartition des profils par ville »
+            return CVQuery("count", {}, group_by) if explicit and (count or group_by) else None
+        if not (explicit or ((count or group_by) and any(key in filters for key in _CV_FILTERS))):
+            # « Qui gère la communication interne ? », « Quelle est l'expérience de
+            # Lucie en Python ? » : question sur les documents
+            return None
+        if group_by is not None:
+            return CVQuery("count", filters, group_by)
+        if count:
+            return CVQuery("count", filters)
+        return CVQuery("list", filters)
+
+    def _resolve_title(self, value: str) -> str:
+        """Intitulé de l'index correspondant à un intitulé reconnu (éventuellement au pluriel)"""
+        for title in self._job_titles:
+            if re.fullmatch(r"\s+".join(re.escape(word) + "(?:s|x)?" for word in title.split()), value):
+                return title
+        return value
+
+    @staticmethod
+    def _parse_years(text: str, filters: Dict[str, Any]):
+        """Critère d'expérience, si la question parle d'expérience ou d'ancienneté"""
+        if not re.search(r"\b(experience|exp|ancienne?te|seniorite)\b", text):
+            return
+        match = _YEARS_RANGE.search(text)
+        if match:
+            filters["min_years"], filters["max_years"] = _number(match.group(1)), _number(match.group(2))
+            return
+        match = _YEARS.search(text)
+        if not match:
+            return
+        years = _number(match.group("n"))
+        op = match.group("op") or match.group("sym") or ""
+        if op in ("moins de", "au plus", "maximum", "<", "<="):
+            filters["max_years"] = years
+        else:
+            filters["min_years"] = years
+
+    def answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Réponse depuis l'index des CV
+
+        Returns:
+            {'answer', 'sources', 'confidence', 'cv_query'} ou None si la
+            question n'est pas une question structurée sur les CV
+        """
+        query = self.parse(question)
+        if query is None:
+            return None
+        start = time.perf_counter()
+        description = query.describe(self._labels)
+
+        if query.group_by is not None:
+            groups = self.index.count(group_by=query.group_by, **query.filters)
+            label = "ville" if query.group_by == "city" else "métier"
+            lines = [f"- {value or 'non renseigné'} : {count}" for value, count in groups.items()]
+            answer = f"Répartition par {label} ({description}, {sum(groups.values())} CV) :\n" + "\n".join(lines)
+            sources = []
+        elif query.intent == "count":
+            count = self.index.count(**query.filters)
+            answer = f"{count} CV correspondent ({description})."
+            sources = []
+        else:
+            total = self.index.count(**query.filters)
+            rows = self.index.search(limit=self.list_limit, **query.filters)
+            lines = [
+                f"- {row['name']} — {row['job_title']}, {row['experience_years']:g} ans d'expérience"
+                + (f", {row['city']}" if row['city'] else "")
+                + (f" ({', '.join(row['technologies'][:6])})" if row['technologies'] else "")
+                for row in rows
+            ]
+            answer = f"{total} CV correspondent ({description})" + (" :\n" + "\n".join(lines) if lines else ".")
+            if total > len(rows):
+                answer += f"\n… et {total - len(rows)} autres."
+            sources = [
+                {'filename': row['source'], 'source': row['source'], 'similarity_score': 1.0,
+                 'content_preview': f"{row['name']} — {row['job_title']}"}
+                for row in rows
+            ]
+
+        with self._lock:
+            self.routed += 1
+        logger.info(f"Question servie par l'index des CV ({query.intent}, {description}) en "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return {'answer': answer, 'sources': sources, 'confidence': 1.0, 'cv_query': query}
+
+
+def create_router(path: Optional[str] = CV_INDEX_PATH) -> Optional[CVQueryRouter]:
+    """Routeur sur l'index configuré (CV_INDEX_PATH), ou None si l'index est désactivé"""
+    if not path:
+        return None
+    from src.storage.cv_index import CVIndex
+    return CVQueryRouter(CVIndex(path))
@@ -1,42 +1,184 @@
 """
 Agent principal qui combine recherche vectorielle et génération LLM
 """
-from typing import List, Dict, Any
+import asyncio
+import copy
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+import json
+from pathlib import Path
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Iterator, Optional, Sequence, Set, Tuple
 import logging
 
+from src.agents.context_packer import ContextPacker
+from src.agents.conversation_history import ConversationHistory, create_history
+from src.agents.cv_query import CVQueryRouter
+from src.agents.relevance_gate import RelevanceGate, create_gate
+from src.agents.single_flight import SingleFlight, normalize_question
+from src.clients.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, OverloadError
+from src.clients.ollama_client import (
+    NUM_PREDICT, OVERLOAD_ANSWER, ConversationState, ErrorAnswer, GenerationError, is_error_answer
+)
+from src.core.config import CONTEXT_CANDIDATES, OLLAMA_MAX_CONCURRENCY, OLLAMA_NUM_CTX
+from src.core.tracing import Trace, TraceSink, export_trace, traced
+from src.storage.answer_cache import context_fingerprint, scoped_fingerprint
+
 logger = logging.getLogger(__name__)
 
+NO_DOCUMENTS_ANSWER = "Je ne trouve pas d'informations pertinentes dans les documents internes pour répondre à votre question."
+
+
+def _answered_questions(output_path: Path, questions: Sequence[str]) -> Set[int]:
+    """Questions déjà répondues sans erreur dans un fichier JSONL de ask_many (même index, même question)"""
+    answered = set()
+    if not output_path.exists():
+        return answered
+    with output_path.open(encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Ligne tronquée par un arrêt brutal
+            index = record.get('index')
+            if (isinstance(index, int) and 0 <= index < len(questions)
+                    and record.get('question') == questions[index] and not record.get('error')):
+                answered.add(index)
+    return answered
+
 
 class KnowledgeAgent:
     """Agent principal qui combine recherche vectorielle et génération LLM"""
     
-    def __init__(self, vector_store, ollama_client):
+    def __init__(self, vector_store, ollama_client, async_client=None, executor: Optional[Executor] = None,
+                 embedding_model=None, answer_cache=None, context_packer: Optional[ContextPacker] = None,
+                 n_candidates: int = CONTEXT_CANDIDATES, single_flight: Optional[SingleFlight] = None,
+                 scheduler: Optional[LLMScheduler] = None, trace_sink: Optional[TraceSink] = None,
+                 history: Optional[ConversationHistory] = None, relevance_gate: Optional[RelevanceGate] = None,
+                 cv_router: Optional[CVQueryRouter] = None):
+        """
+        Args:
+            vector_store: Base vectorielle (search_similar)
+            ollama_client: Client Ollama synchrone
+            async_client: Client Ollama asynchrone (AsyncOllamaClient) utilisé par aask_question
+            executor: Pool de threads pour l'embedding et la recherche en mode asynchrone
+                (pool par défaut de la boucle si None)
+            embedding_model: Modèle d'embeddings (SentenceTransformer) ; la question
+                n'est encodée qu'une fois pour la recherche et le cache de réponses
+            answer_cache: Cache sémantique des réponses (SemanticAnswerCache),
+                utilisé seulement avec embedding_model
+            context_packer: Construction du contexte selon un budget de tokens
+            n_candidates: Nombre de chunks retrouvés parmi lesquels le contexte est choisi
+            single_flight: Regroupement des questions identiques simultanées
+                (partageable entre plusieurs agents)
+            scheduler: File d'attente à priorités devant le LLM (partageable entre
+                plusieurs agents) ; sans file, les générations partent directement
+            trace_sink: Destination des traces de chaque question (create_sink()) ;
+                la trace est aussi jointe au résultat ('trace')
+            history: Historique borné des échanges (create_history() par défaut)
+            relevance_gate: Seuils de similarité en dessous desquels la réponse
+                « pas d'information » est donnée sans appel au LLM (create_gate() par défaut)
+            cv_router: Questions de comptage / filtre / liste sur les CV servies par
+                l'index structuré, sans recherche ni LLM (create_router())
+        """
         self.vector_store = vector_store
         self.ollama_client = ollama_client
-        self.conversation_history = []
+        self.async_client = async_client
+        self.executor = executor
+        self.embedding_model = embedding_model
+        self.answer_cache = answer_cache
+        self.context_packer = context_packer or ContextPacker()
+        self.n_candidates = n_candidates
+        self.single_flight = single_flight or SingleFlight()
+        self.scheduler = scheduler
+        self.trace_sink = trace_sink
+        self.conversation_history = history if history is not None else create_history()
+        self.relevance_gate = relevance_gate if relevance_gate is not None else create_gate()
+        self.cv_router = cv_router
+        # Nom de l'utilisateur transmis au LLM (agents de for_user())
+        self.user_name: Optional[str] = None
+        
+        # Tokens de la conversation déjà évalués par Ollama, réutilisés au tour
+        # suivant tant que le tour suivant tient dans la fenêtre du modèle
+        self.conversation = ConversationState(
+            max_tokens=max(0, OLLAMA_NUM_CTX - self.context_packer.budget_tokens - NUM_PREDICT)
+        )
+        # Un tour contient au moins le contexte et la réponse : en dessous,
+        # la conversation repart de zéro à chaque question
+        if self.conversation.max_tokens < self.context_packer.budget_tokens + NUM_PREDICT:
+            logger.warning(
+                f"Réutilisation des tokens de conversation désactivée : OLLAMA_NUM_CTX={OLLAMA_NUM_CTX} "
+                f"laisse {self.conversation.max_tokens} tokens pour le tour précédent "
+                f"(OLLAMA_NUM_CTX >= {2 * (self.context_packer.budget_tokens + NUM_PREDICT)} nécessaire)"
+            )
     
-    def ask_question(self, question: str, include_sources: bool = True) -> Dict[str, Any]:
-        """Poser une question à l'agent"""
-        logger.info(f"Question reçue: {question}")
+    def for_user(self, user_id: str, user_name: Optional[str] = None) -> "KnowledgeAgent":
+        """
+        Agent d'un utilisateur : mêmes ressources partagées (base, clients,
+        caches, file d'attente, regroupement), mais historique et tokens de
+        conversation propres, et nom de l'utilisateur transmis au LLM
+        """
+        agent = copy.copy(self)
+        agent.conversation_history = create_history(user_id)
+        agent.conversation = ConversationState(max_tokens=self.conversation.max_tokens)
+        agent.user_name = user_name
+        return agent
+    
+    def _retrieve(self, question: str, trace: Optional[Trace] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rechercher les documents pertinents et construire le contexte
         
-        # Rechercher des documents pertinents (limiter à 2 pour réduire le contexte)
-        relevant_docs = self.vector_store.search_similar(question, n_results=2)
+        Étapes tracées : query_embedding, vector_search, context_packing
         
+        Returns:
+            {'context', 'context_tokens', 'sources', 'confidence', 'chunk_ids',
+            'content_hash', 'fingerprint', 'query_embedding'} ou None si aucun document pertinent
+        """
+        relevant_docs, query_embedding = self._search(question, trace)
+        return self._build_retrieval(relevant_docs, query_embedding, trace)
+    
+    def _search(self, question: str, trace: Optional[Trace] = None) -> Tuple[List[Dict[str, Any]], Optional[List[float]]]:
+        """Chunks candidats de la recherche vectorielle et embedding de la question"""
+        query_embedding = None
+        if self.embedding_model is not None:
+            with traced(trace, "query_embedding"):
+                query_embedding = self.embedding_model.encode([question], convert_to_tensor=False)[0].tolist()
+            with traced(trace, "vector_search", candidates=self.n_candidates):
+                relevant_docs = self.vector_store.search_similar(
+                    question, n_results=self.n_candidates, embedding_model=self.embedding_model,
+                    query_embedding=query_embedding
+                )
+        else:
+            # L'embedding de la question est fait par la base vectorielle
+            with traced(trace, "vector_search", candidates=self.n_candidates):
+                relevant_docs = self.vector_store.search_similar(question, n_results=self.n_candidates)
+        return relevant_docs, query_embedding
+    
+    def _build_retrieval(self, relevant_docs: List[Dict[str, Any]], query_embedding: Optional[List[float]],
+                         trace: Optional[Trace] = None) -> Optional[Dict[str, Any]]:
+        """Construire le contexte et les sources à partir des chunks retrouvés"""
         if not relevant_docs:
-            return {
-                'answer': "Je ne trouve pas d'informations pertinentes dans les documents internes pour répondre à votre question.",
-                'sources': [],
-                'confidence': 0.0
-            }
+            return None
         
-        # Construire le contexte à partir des documents trouvés
-        context_parts = []
-        sources = []
+        # Chunks trop éloignés de la question : inutile d'interroger le LLM
+        if self.relevance_gate is not None and not self.relevance_gate.admit(
+            [doc['similarity_score'] for doc in relevant_docs]
+        ):
+            if trace is not None:
+                trace.set(relevance_gated=True)
+            return None
+        
+        # Remplir le budget de tokens avec les chunks les plus pertinents
+        with traced(trace, "context_packing") as span:
+            packed = self.context_packer.pack(relevant_docs)
+            if span is not None:
+                span.attributes.update(chunks=len(packed['chunks']), context_tokens=packed['tokens'])
+        used_docs = packed['chunks']
+        if not used_docs:
+            return None
         
-        for doc in relevant_docs:
-            # Limiter la taille du contenu pour éviter les timeouts
-            content = doc['content'][:800] + "..." if len(doc['content']) > 800 else doc['content']
-            context_parts.append(f"Source: {doc['metadata'].get('filename', 'Document')}\n{content}")
+        sources = []
+        for doc in used_docs:
             sources.append({
                 'filename': doc['metadata'].get('filename', 'Document'),
                 'source': doc['metadata'].get('source', ''),
@@ -44,26 +186,506 @@ class KnowledgeAgent:
                 'content_preview': doc['content'][:200] + "..." if len(doc['content']) > 200 else doc['content']
             })
         
-        context = "\n\n".join(context_parts)
-        
-        # Générer la réponse avec Ollama
-        answer = self.ollama_client.generate_response(question, context)
-        
         # Calculer un score de confiance basé sur la similarité
-        avg_similarity = sum(doc['similarity_score'] for doc in relevant_docs) / len(relevant_docs)
+        avg_similarity = sum(doc['similarity_score'] for doc in used_docs) / len(used_docs)
         confidence = min(avg_similarity * 1.2, 1.0)  # Amplifier légèrement le score
         
+        # Contenu des chunks et modèle (réponses périmées si modifiés) ;
+        # l'utilisateur, présent dans le prompt, ne sert qu'à retrouver la réponse
+        content_hash = context_fingerprint(used_docs, str(getattr(self.ollama_client, 'model', '')))
+        
+        return {
+            'context': packed['context'],
+            'context_tokens': packed['tokens'],
+            'sources': sources,
+            'confidence': confidence,
+            'chunk_ids': [str(doc.get('id', '')) for doc in used_docs],
+            'content_hash': content_hash,
+            'fingerprint': scoped_fingerprint(content_hash, self.user_name or ""),
+            'query_embedding': query_embedding
+        }
+    
+    def _cached_answer(self, retrieval: Dict[str, Any], trace: Optional[Trace] = None) -> Optional[str]:
+        """Réponse du cache sémantique pour une question paraphrasée sur les mêmes chunks"""
+        if self.answer_cache is None or retrieval['query_embedding'] is None:
+            return None
+        with traced(trace, "answer_cache_lookup"):
+            answer = self.answer_cache.get(
+                retrieval['query_embedding'], retrieval['chunk_ids'], retrieval['fingerprint'], retrieval['content_hash']
+            )
+        if trace is not None:
+            trace.set(cache_hit=answer is not None)
+        return answer
+    
+    def _cache_answer(self, question: str, retrieval: Dict[str, Any], answer: str):
+        """Mettre une réponse générée en cache (jamais les messages d'erreur)"""
+        if self.answer_cache is None or retrieval['query_embedding'] is None or not answer or is_error_answer(answer):
+            return
+        self.answer_cache.put(
+            retrieval['query_embedding'], retrieval['chunk_ids'], retrieval['fingerprint'], question, answer,
+            retrieval['content_hash']
+        )
+    
+    def _conversation_key(self) -> str:
+        """
+        Empreinte de l'état de la conversation envoyé au LLM avec la question
+        (tokens de la conversation, sinon résumé des échanges ; '' au premier échange)
+        """
+        if self.conversation.tokens:
+            state = ",".join(map(str, self.conversation.tokens))
+        elif len(self.conversation_history):
+            state = self.conversation_history.follow_up_context()
+        else:
+            return ""
+        return hashlib.sha256(state.encode('utf-8')).hexdigest()
+    
+    def _in_conversation(self, retrieval: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Recherche d'une question posée dans la conversation : la réponse dépend
+        aussi des échanges précédents (_llm_context), dont l'empreinte complète
+        celle de la réponse. Cache et regroupement ne partagent ainsi une réponse
+        qu'entre questions posées au même état de conversation ; l'empreinte du
+        contenu ('content_hash') ne change pas, les réponses des autres tours
+        sur les mêmes chunks restent en cache.
+        """
+        conversation_key = self._conversation_key()
+        if retrieval is None or not conversation_key:
+            return retrieval
+        return {**retrieval, 'fingerprint': scoped_fingerprint(retrieval['fingerprint'], conversation_key)}
+    
+    @staticmethod
+    def _flight_key(question: str, retrieval: Dict[str, Any]) -> tuple:
+        """Deux questions identiques sur les mêmes chunks partagent une seule génération"""
+        return (normalize_question(question), retrieval['fingerprint'])
+    
+    @staticmethod
+    def _trace_wait(trace: Optional[Trace], waited: float):
+        """Temps passé dans la file d'attente du LLM"""
+        if trace is not None:
+            trace.add_span("llm_queue_wait", waited)
+    
+    def _scheduled(self, priority: int, generate: Callable[[], str], trace: Optional[Trace] = None) -> str:
+        """Exécuter une génération quand la file d'attente lui donne une place"""
+        if self.scheduler is None:
+            return generate()
+        try:
+            with self.scheduler.slot(priority) as waited:
+                self._trace_wait(trace, waited)
+                return generate()
+        except OverloadError:
+            if trace is not None:
+                trace.set(overloaded=True)
+            return OVERLOAD_ANSWER
+    
+    async def _aacquire(self, priority: int, trace: Optional[Trace] = None) -> bool:
+        """
+        Obtenir une place dans la file d'attente du LLM sans bloquer la boucle
+        (l'attente se fait dans la boucle, sans occuper de thread du pool)
+        
+        Returns:
+            False si la file est saturée (OVERLOAD_ANSWER)
+        """
+        try:
+            self._trace_wait(trace, await self.scheduler.aacquire(priority))
+        except OverloadError:
+            if trace is not None:
+                trace.set(overloaded=True)
+            return False
+        return True
+    
+    async def _ascheduled(self, priority: int, generate: Callable[[], Awaitable[str]],
+                          trace: Optional[Trace] = None) -> str:
+        """Version asynchrone de _scheduled"""
+        if self.scheduler is None:
+            return await generate()
+        if not await self._aacquire(priority, trace):
+            return OVERLOAD_ANSWER
+        
+        start = time.monotonic()
+        try:
+            return await generate()
+        finally:
+            self.scheduler.release(time.monotonic() - start)
+    
+    async def _astream(self, question: str, retrieval: Dict[str, Any], priority: int,
+                       trace: Optional[Trace] = None) -> AsyncIterator[str]:
+        """Générer la réponse en flux quand la file d'attente lui donne une place (GenerationError en cas d'échec)"""
+        if self.scheduler is not None and not await self._aacquire(priority, trace):
+            raise GenerationError(OVERLOAD_ANSWER)
+        
+        start = time.monotonic()
+        try:
+            if self.async_client is not None:
+                async for token in self.async_client.generate_stream(question, retrieval['context'],
+                                                                     user_name=self.user_name, trace=trace):
+                    yield token
+            else:
+                # Sans client asynchrone : réponse complète, générée dans un thread
+                answer = await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    lambda: self.ollama_client.generate_response(question, retrieval['context'],
+                                                                 user_name=self.user_name, trace=trace)
+                )
+                if is_error_answer(answer):
+                    raise GenerationError(answer)
+                yield answer
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.release(time.monotonic() - start)
+    
+    def _llm_context(self, retrieval: Dict[str, Any]) -> str:
+        """
+        Contexte envoyé au LLM : les documents et, quand les tokens de la
+        conversation ne sont plus transmis (fenêtre dépassée), le résumé des
+        échanges précédents pour les questions de suivi
+        """
+        if self.conversation.tokens or not len(self.conversation_history):
+            return retrieval['context']
+        return f"{retrieval['context']}\n\nÉCHANGES PRÉCÉDENTS:\n{self.conversation_history.follow_up_context()}"
+    
+    def _generate(self, question: str, retrieval: Dict[str, Any], priority: int,
+                  trace: Optional[Trace] = None, in_conversation: bool = True) -> str:
+        """Générer la réponse avec Ollama et la mettre en cache (hors conversation : question indépendante)"""
+        if in_conversation:
+            context, conversation = self._llm_context(retrieval), self.conversation
+        else:
+            context, conversation = retrieval['context'], None
+        answer = self._scheduled(priority, lambda: self.ollama_client.generate_response(
+            question, context, user_name=self.user_name, conversation=conversation, trace=trace
+        ), trace)
+        self._cache_answer(question, retrieval, answer)
+        return answer
+    
+    def _structured_answer(self, question: str, trace: Optional[Trace] = None) -> Optional[Dict[str, Any]]:
+        """Réponse de l'index des CV, ou None si la question suit le chemin habituel"""
+        if self.cv_router is None:
+            return None
+        with traced(trace, "cv_index"):
+            try:
+                routed = self.cv_router.answer(question)
+            except Exception as e:
+                logger.warning(f"Index des CV indisponible, recherche habituelle: {e}")
+                return None
+        if routed is not None and trace is not None:
+            trace.set(routed="cv_index")
+        return routed
+    
+    def _routed_result(self, question: str, routed: Dict[str, Any], trace: Trace,
+                       include_sources: bool) -> Dict[str, Any]:
+        """Résultat de ask_question / aask_question pour une réponse de l'index des CV"""
+        self._record(question, routed['answer'], routed['sources'], routed['confidence'], include_sources)
+        result = {
+            'answer': routed['answer'],
+            'confidence': routed['confidence'],
+            'trace': self._finish_trace(trace, routed['answer']).to_dict()
+        }
+        if include_sources:
+            result['sources'] = routed['sources']
+        return result
+    
+    def _finish_trace(self, trace: Trace, answer: str) -> Trace:
+        """Terminer la trace d'une question et l'exporter"""
+        trace.set(error=is_error_answer(answer))
+        export_trace(self.trace_sink, trace)
+        return trace
+    
+    def _record(self, question: str, answer: str, sources: List[Dict[str, Any]],
+                confidence: float, include_sources: bool):
+        """Ajouter un échange à l'historique (borné : les plus anciens sont résumés)"""
+        self.conversation_history.add(question, answer, sources if include_sources else [], confidence)
+    
+    def ask_question(self, question: str, include_sources: bool = True,
+                     priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """
+        Poser une question à l'agent
+        
+        Args:
+            question: Question
+            include_sources: Joindre les sources à la réponse
+            priority: Priorité dans la file d'attente du LLM (PRIORITY_BATCH pour les traitements par lots)
+        
+        Returns:
+            {'answer', 'confidence', 'sources', 'trace'} ; 'trace' donne la durée de
+            chaque étape (Trace.to_dict())
+        """
+        logger.info(f"Question reçue: {question}")
+        trace = Trace("ask_question", priority=priority)
+        
+        routed = self._structured_answer(question, trace)
+        if routed is not None:
+            return self._routed_result(question, routed, trace, include_sources)
+        
+        retrieval = self._in_conversation(self._retrieve(question, trace))
+        if retrieval is None:
+            return {
+                'answer': NO_DOCUMENTS_ANSWER,
+                'sources': [],
+                'confidence': 0.0,
+                'trace': self._finish_trace(trace, NO_DOCUMENTS_ANSWER).to_dict()
+            }
+        sources, confidence = retrieval['sources'], retrieval['confidence']
+        
+        # Générer la réponse avec Ollama (sauf si une paraphrase est en cache) ;
+        # une même question déjà en cours de génération n'est pas relancée
+        answer = self._cached_answer(retrieval, trace)
+        if answer is None:
+            leader = []
+            
+            def generate() -> str:
+                leader.append(True)
+                return self._generate(question, retrieval, priority, trace)
+            
+            with traced(trace, "llm_answer"):
+                answer = self.single_flight.do(self._flight_key(question, retrieval), generate)
+            trace.set(coalesced=not leader)
+        
         # Ajouter à l'historique
-        self.conversation_history.append({
-            'question': question,
+        self._record(question, answer, sources, confidence, include_sources)
+        
+        result = {
             'answer': answer,
-            'sources': sources if include_sources else [],
-            'confidence': confidence
-        })
+            'confidence': confidence,
+            'trace': self._finish_trace(trace, answer).to_dict()
+        }
+        
+        if include_sources:
+            result['sources'] = sources
+        
+        return result
+    
+    def ask_question_stream(self, question: str, include_sources: bool = True,
+                            priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """
+        Poser une question à l'agent et recevoir la réponse en flux
+        
+        La recherche est faite immédiatement ; la génération démarre quand on
+        itère sur 'tokens'. Une fois le flux consommé, l'échange est ajouté à
+        l'historique et la trace (result['trace']) est terminée et exportée ;
+        les mesures (TTFT, tokens/s) de la génération sont dans result['trace'].generation.
+        Une même question déjà en cours de génération partage son flux.
+        
+        Une génération interrompue (file saturée, timeout, erreur d'Ollama) lève
+        GenerationError après les tokens déjà produits ; str(e) est le message à
+        afficher. La réponse incomplète n'est ni mise en cache ni ajoutée à
+        l'historique.
+        
+        Returns:
+            {'tokens': générateur de fragments de texte, 'confidence', 'sources',
+            'trace': Trace complétée pendant le flux}
+        """
+        logger.info(f"Question reçue (flux): {question}")
+        trace = Trace("ask_question_stream", priority=priority)
+        
+        routed = self._structured_answer(question, trace)
+        if routed is not None:
+            self._record(question, routed['answer'], routed['sources'], routed['confidence'], include_sources)
+            result = {
+                'tokens': iter([routed['answer']]),
+                'confidence': routed['confidence'],
+                'trace': self._finish_trace(trace, routed['answer'])
+            }
+            if include_sources:
+                result['sources'] = routed['sources']
+            return result
+        
+        retrieval = self._in_conversation(self._retrieve(question, trace))
+        if retrieval is None:
+            return {
+                'tokens': iter([NO_DOCUMENTS_ANSWER]),
+                'sources': [],
+                'confidence': 0.0,
+                'trace': self._finish_trace(trace, NO_DOCUMENTS_ANSWER)
+            }
+        sources, confidence = retrieval['sources'], retrieval['confidence']
+        cached = self._cached_answer(retrieval, trace)
+        leader = []
+        
+        def generate() -> Iterator[str]:
+            leader.append(True)
+            if self.scheduler is not None:
+                try:
+                    self._trace_wait(trace, self.scheduler.acquire(priority))
+                except OverloadError:
+                    trace.set(overloaded=True)
+                    raise GenerationError(OVERLOAD_ANSWER)
+            start = time.monotonic()
+            try:
+                parts = []
+                for token in self.ollama_client.generate_stream(
+                    question, self._llm_context(retrieval), user_name=self.user_name,
+                    conversation=self.conversation, trace=trace
+                ):
+                    parts.append(token)
+                    yield token
+                # Flux terminé par "done": true (sinon GenerationError)
+                self._cache_answer(question, retrieval, "".join(parts).strip())
+            finally:
+                if self.scheduler is not None:
+                    self.scheduler.release(time.monotonic() - start)
+        
+        def tokens() -> Iterator[str]:
+            if cached is not None:
+                yield cached
+                self._record(question, cached, sources, confidence, include_sources)
+                self._finish_trace(trace, cached)
+                return
+            parts = []
+            try:
+                with traced(trace, "llm_answer"):
+                    for token in self.single_flight.stream(self._flight_key(question, retrieval), generate):
+                        parts.append(token)
+                        yield token
+            except GenerationError as e:
+                trace.set(coalesced=not leader)
+                self._finish_trace(trace, ErrorAnswer(str(e)))
+                raise
+            answer = "".join(parts).strip()
+            trace.set(coalesced=not leader)
+            self._record(question, answer, sources, confidence, include_sources)
+            self._finish_trace(trace, answer)
+        
+        result = {
+            'tokens': tokens(),
+            'confidence': confidence,
+            'trace': trace
+        }
+        
+        if include_sources:
+            result['sources'] = sources
+        
+        return result
+    
+    async def aask_question(self, question: str, include_sources: bool = True,
+                            priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """
+        Poser une question à l'agent sans bloquer la boucle d'événements
+        
+        L'embedding et la recherche (bloquants, CPU) sont exécutés dans un pool
+        de threads ; la génération passe par async_client (sinon par le client
+        synchrone dans un thread). Une même question déjà en cours de génération
+        partage son résultat. Annuler la tâche ne l'ajoute pas à l'historique ; la
+        génération est annulée si plus aucune question ne l'attend. Les questions simultanées étant
+        indépendantes, les tokens de la conversation ne sont pas réutilisés ici.
+        """
+        logger.info(f"Question reçue (async): {question}")
+        loop = asyncio.get_running_loop()
+        trace = Trace("aask_question", priority=priority)
+        
+        # Quelques millisecondes de SQLite : pas besoin du pool de threads
+        routed = self._structured_answer(question, trace)
+        if routed is not None:
+            return self._routed_result(question, routed, trace, include_sources)
+        
+        retrieval = await loop.run_in_executor(self.executor, self._retrieve, question, trace)
+        if retrieval is None:
+            return {
+                'answer': NO_DOCUMENTS_ANSWER,
+                'sources': [],
+                'confidence': 0.0,
+                'trace': self._finish_trace(trace, NO_DOCUMENTS_ANSWER).to_dict()
+            }
+        sources, confidence = retrieval['sources'], retrieval['confidence']
+        
+        async def call_llm() -> str:
+            if self.async_client is not None:
+                return await self.async_client.generate(question, retrieval['context'],
+                                                        user_name=self.user_name, trace=trace)
+            return await loop.run_in_executor(
+                self.executor, lambda: self.ollama_client.generate_response(question, retrieval['context'],
+                                                                            user_name=self.user_name, trace=trace)
+            )
+        
+        leader = []
+        
+        async def generate() -> str:
+            leader.append(True)
+            answer = await self._ascheduled(priority, call_llm, trace)
+            self._cache_answer(question, retrieval, answer)
+            return answer
+        
+        answer = self._cached_answer(retrieval, trace)
+        if answer is None:
+            with traced(trace, "llm_answer"):
+                answer = await self.single_flight.ado(self._flight_key(question, retrieval), generate)
+            trace.set(coalesced=not leader)
+        
+        self._record(question, answer, sources, confidence, include_sources)
         
         result = {
             'answer': answer,
-            'confidence': confidence
+            'confidence': confidence,
+            'trace': self._finish_trace(trace, answer).to_dict()
+        }
+        
+        if include_sources:
+            result['sources'] = sources
+        
+        return result
+    
+    async def aask_question_stream(self, question: str, include_sources: bool = True,
+                                   priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """
+        Version asynchrone de ask_question_stream (serveur HTTP)
+        
+        La recherche est faite dans le pool de threads ; la génération passe par
+        async_client et démarre quand on itère sur 'tokens'. Comme pour
+        aask_question, les questions simultanées sont indépendantes : ni les
+        tokens de la conversation ni les flux ne sont partagés. Interrompre
+        l'itération (client déconnecté) ferme la requête vers Ollama. Une
+        génération interrompue lève GenerationError, comme ask_question_stream.
+        
+        Returns:
+            {'tokens': générateur asynchrone de fragments de texte, 'confidence',
+            'sources', 'trace': Trace complétée pendant le flux}
+        """
+        logger.info(f"Question reçue (flux async): {question}")
+        loop = asyncio.get_running_loop()
+        trace = Trace("aask_question_stream", priority=priority)
+        
+        async def single(answer: str) -> AsyncIterator[str]:
+            yield answer
+        
+        routed = self._structured_answer(question, trace)
+        if routed is not None:
+            result = self._routed_result(question, routed, trace, include_sources)
+            result['tokens'] = single(result.pop('answer'))
+            result['trace'] = trace
+            return result
+        
+        retrieval = await loop.run_in_executor(self.executor, self._retrieve, question, trace)
+        if retrieval is None:
+            return {
+                'tokens': single(NO_DOCUMENTS_ANSWER),
+                'sources': [],
+                'confidence': 0.0,
+                'trace': self._finish_trace(trace, NO_DOCUMENTS_ANSWER)
+            }
+        sources, confidence = retrieval['sources'], retrieval['confidence']
+        cached = self._cached_answer(retrieval, trace)
+        
+        async def tokens() -> AsyncIterator[str]:
+            if cached is not None:
+                answer = cached
+                yield cached
+            else:
+                parts = []
+                try:
+                    with traced(trace, "llm_answer"):
+                        async for token in self._astream(question, retrieval, priority, trace):
+                            parts.append(token)
+                            yield token
+                except GenerationError as e:
+                    self._finish_trace(trace, ErrorAnswer(str(e)))
+                    raise
+                answer = "".join(parts).strip()
+                self._cache_answer(question, retrieval, answer)
+            self._record(question, answer, sources, confidence, include_sources)
+            self._finish_trace(trace, answer)
+        
+        result = {
+            'tokens': tokens(),
+            'confidence': confidence,
+            'trace': trace
         }
         
         if include_sources:
@@ -71,12 +693,211 @@ class KnowledgeAgent:
         
         return result
     
-    def get_conversation_history(self) -> List[Dict[str, Any]]:
-        """Obtenir l'historique de conversation"""
-        return self.conversation_history.copy()
+    def _retrieve_batch(self, questions: List[str], traces: List[Trace]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Recherche pour un lot de questions : un seul encodage et une seule
+        requête vectorielle pour tout le lot (sinon, une recherche par question)
+        """
+        if not questions:
+            return []
+        if self.embedding_model is None or not hasattr(self.vector_store, 'search_similar_batch'):
+            return [self._retrieve(question, trace) for question, trace in zip(questions, traces)]
+        
+        start = time.perf_counter()
+        embeddings = [embedding.tolist() for embedding in self.embedding_model.encode(questions, convert_to_tensor=False)]
+        encoded = time.perf_counter()
+        results = self.vector_store.search_similar_batch(embeddings, n_results=self.n_candidates)
+        searched = time.perf_counter()
+        
+        retrievals = []
+        for trace, query_embedding, relevant_docs in zip(traces, embeddings, results):
+            trace.add_span("query_embedding", encoded - start, start=start, batch=len(questions))
+            trace.add_span("vector_search", searched - encoded, start=encoded, batch=len(questions),
+                           candidates=self.n_candidates)
+            retrievals.append(self._build_retrieval(relevant_docs, query_embedding, trace))
+        return retrievals
+    
+    def _answer_one(self, index: int, question: str, retrieval: Optional[Dict[str, Any]], trace: Trace,
+                    priority: int, include_sources: bool, routed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Réponse d'une question de ask_many (indépendante de la conversation)"""
+        if routed is not None:
+            answer, sources, confidence = routed['answer'], routed['sources'], routed['confidence']
+        elif retrieval is None:
+            answer, sources, confidence = NO_DOCUMENTS_ANSWER, [], 0.0
+        else:
+            sources, confidence = retrieval['sources'], retrieval['confidence']
+            answer = self._cached_answer(retrieval, trace)
+            if answer is None:
+                try:
+                    with traced(trace, "llm_answer"):
+                        answer = self.single_flight.do(
+                            self._flight_key(question, retrieval),
+                            lambda: self._generate(question, retrieval, priority, trace, in_conversation=False)
+                        )
+                except Exception as e:
+                    logger.error(f"Erreur: {e}")
+                    answer = ErrorAnswer(f"Erreur: {str(e)}")
+        
+        self._finish_trace(trace, answer)
+        result = {
+            'index': index,
+            'question': question,
+            'answer': answer,
+            'confidence': confidence,
+            'error': is_error_answer(answer),
+            'timings': trace.timings()
+        }
+        if include_sources:
+            result['sources'] = sources
+        return result
+    
+    def ask_many(self, questions: Sequence[str], output_path: Optional[str] = None,
+                 concurrency: Optional[int] = None, batch_size: int = 64,
+                 priority: int = PRIORITY_BATCH, include_sources: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Répondre à une liste de questions (évaluations, génération de FAQ)
+        
+        Les questions sont préparées par lots de batch_size (embeddings en un
+        appel, recherche vectorielle en une requête) et les générations partent
+        dans un pool de concurrency threads (par défaut, les places du LLM :
+        scheduler.max_concurrency ou OLLAMA_MAX_CONCURRENCY) pendant que le lot
+        suivant est préparé. Les questions sont indépendantes : les tokens de la
+        conversation ne sont pas réutilisés et l'historique n'est pas modifié. Les questions
+        structurées sur les CV (cv_router) sont répondues directement par l'index.
+        
+        Les résultats sont produits au fil de l'eau, dans l'ordre où ils se
+        terminent (voir 'index'), et ajoutés à output_path (JSONL) s'il est
+        donné. Relancé sur le même fichier, ask_many reprend où il s'était
+        arrêté : les questions déjà répondues sans erreur ne sont pas reposées.
+        
+        Args:
+            questions: Questions à poser
+            output_path: Fichier JSONL des résultats (une ligne par question)
+            concurrency: Générations simultanées
+            batch_size: Questions encodées et recherchées ensemble
+            priority: Priorité dans la file d'attente du LLM (PRIORITY_BATCH : après les utilisateurs)
+            include_sources: Joindre les sources aux résultats
+        
+        Returns:
+            Générateur de {'index', 'question', 'answer', 'confidence', 'error',
+            'timings', 'sources'} ; les questions ne sont traitées qu'en itérant
+        """
+        questions = list(questions)
+        if concurrency is None:
+            concurrency = self.scheduler.max_concurrency if self.scheduler is not None else OLLAMA_MAX_CONCURRENCY
+        concurrency = max(1, concurrency)
+        
+        output = None
+        remaining = list(range(len(questions)))
+        if output_path is not None:
+            path = Path(output_path)
+            answered = _answered_questions(path, questions)
+            if answered:
+                logger.info(f"Reprise de {path}: {len(answered)}/{len(questions)} questions déjà répondues")
+                remaining = [index for index in remaining if index not in answered]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            truncated = False
+            if path.exists() and path.stat().st_size > 0:
+                with path.open("rb") as file:
+                    file.seek(-1, 2)
+                    truncated = file.read(1) != b"\n"
+            output = path.open("a", encoding="utf-8")
+            # Terminer une dernière ligne tronquée avant d'ajouter les résultats
+            if truncated:
+                output.write("\n")
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ask-many")
+        running: Set[Future] = set()
+        
+        def emit(result: Dict[str, Any]) -> Dict[str, Any]:
+            if output is not None:
+                output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+            return result
+        
+        def finished() -> Iterator[Dict[str, Any]]:
+            nonlocal running
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield emit(future.result())
+        
+        try:
+            for offset in range(0, len(remaining), batch_size):
+                batch = remaining[offset:offset + batch_size]
+                traces = {index: Trace("ask_many", priority=priority, index=index) for index in batch}
+                
+                # Questions structurées sur les CV : réponse immédiate de l'index
+                pending = []
+                for index in batch:
+                    routed = self._structured_answer(questions[index], traces[index])
+                    if routed is None:
+                        pending.append(index)
+                    else:
+                        yield emit(self._answer_one(index, questions[index], None, traces[index], priority,
+                                                    include_sources, routed=routed))
+                
+                retrievals = self._retrieve_batch([questions[index] for index in pending],
+                                                  [traces[index] for index in pending])
+                for index, retrieval in zip(pending, retrievals):
+                    trace = traces[index]
+                    # Au plus 2 × concurrency générations en cours ou prêtes : mémoire bornée
+                    while len(running) >= 2 * concurrency:
+                        yield from finished()
+                    running.add(executor.submit(
+                        self._answer_one, index, questions[index], retrieval, trace, priority, include_sources
+                    ))
+            while running:
+                yield from finished()
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if output is not None:
+                output.close()
+    
+    def calibrate_relevance(self, labelled_questions: Sequence[Tuple[str, bool]], min_recall: float = 0.95,
+                            save_path: Optional[str] = None) -> float:
+        """
+        Apprendre le seuil de pertinence sur des questions étiquetées
+        
+        Args:
+            labelled_questions: (question, répondable par les documents)
+            min_recall: Proportion minimale de questions répondables qui doivent passer
+            save_path: Fichier où sauvegarder les seuils (ex. RELEVANCE_GATE_PATH)
+        
+        Returns:
+            Le seuil appris sur le meilleur score
+        """
+        if self.relevance_gate is None:
+            self.relevance_gate = RelevanceGate()
+        samples = []
+        for question, answerable in labelled_questions:
+            relevant_docs, _ = self._search(question)
+            samples.append(([doc['similarity_score'] for doc in relevant_docs], answerable))
+        threshold = self.relevance_gate.calibrate(samples, min_recall)
+        if save_path:
+            self.relevance_gate.save(save_path)
+        return threshold
+    
+    def get_relevance_stats(self) -> Dict[str, Any]:
+        """Questions filtrées par pertinence et appels au LLM évités"""
+        return self.relevance_gate.get_stats() if self.relevance_gate is not None else {}
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Métriques du regroupement des questions identiques (générations, appelants regroupés)"""
+        return self.single_flight.get_stats()
+    
+    def get_conversation_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Obtenir les échanges récents gardés en mémoire (les limit derniers)"""
+        return self.conversation_history.recent(limit)
+    
+    def get_conversation_summary(self) -> str:
+        """Résumé de la conversation, utilisable comme contexte d'une question de suivi"""
+        return self.conversation_history.follow_up_context()
     
     def clear_history(self):
         """Effacer l'historique de conversation"""
         self.conversation_history.clear()
+        self.conversation.reset()
         logger.info("Historique de conversation effacé")
 
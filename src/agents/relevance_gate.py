@@ -0,0 +1,132 @@
+"""
+Filtre de pertinence de la recherche, avant la génération
+
+La recherche vectorielle renvoie toujours des chunks, même pour une question
+sans rapport avec les documents. Quand les scores de similarité sont trop
+faibles, le LLM ne ferait que répondre « je ne trouve pas cette
+information » après plusieurs dizaines de secondes : l'agent répond
+directement la réponse prévue, sans appel au LLM.
+
+Une question passe si le meilleur score atteint min_top_score ET si la
+moyenne des avg_top_k meilleurs scores atteint min_avg_score. Le seuil sur le
+meilleur score peut être appris sur des questions étiquetées (répondables ou
+non par les documents) avec calibrate(), et sauvegardé dans un fichier JSON
+relu au démarrage (RELEVANCE_GATE_PATH).
+"""
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import logging
+
+from src.core.config import (RELEVANCE_MIN_TOP_SCORE, RELEVANCE_MIN_AVG_SCORE, RELEVANCE_AVG_TOP_K,
+                             RELEVANCE_GATE_PATH)
+
+logger = logging.getLogger(__name__)
+
+
+class RelevanceGate:
+    """Seuils de similarité en dessous desquels la génération est évitée"""
+
+    def __init__(self, min_top_score: float = RELEVANCE_MIN_TOP_SCORE,
+                 min_avg_score: float = RELEVANCE_MIN_AVG_SCORE, avg_top_k: int = RELEVANCE_AVG_TOP_K):
+        """
+        Args:
+            min_top_score: Score minimal du meilleur chunk
+            min_avg_score: Score moyen minimal des avg_top_k meilleurs chunks
+            avg_top_k: Nombre de chunks pris dans la moyenne
+        """
+        self.min_top_score = min_top_score
+        self.min_avg_score = min_avg_score
+        self.avg_top_k = max(1, avg_top_k)
+
+        self.checked = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def scores(self, similarity_scores: Sequence[float]) -> Tuple[float, float]:
+        """Meilleur score et moyenne des avg_top_k meilleurs"""
+        best = sorted(similarity_scores, reverse=True)[:self.avg_top_k]
+        if not best:
+            return 0.0, 0.0
+        return best[0], sum(best) / len(best)
+
+    def admit(self, similarity_scores: Sequence[float]) -> bool:
+        """La recherche est-elle assez pertinente pour interroger le LLM ?"""
+        top, average = self.scores(similarity_scores)
+        admitted = top >= self.min_top_score and average >= self.min_avg_score
+        with self._lock:
+            self.checked += 1
+            if not admitted:
+                self.rejected += 1
+        if not admitted:
+            logger.info(f"Recherche non pertinente (meilleur score {top:.3f}, moyenne {average:.3f}) : LLM évité")
+        return admitted
+
+    def calibrate(self, samples: Iterable[Tuple[Sequence[float], bool]], min_recall: float = 0.95) -> float:
+        """
+        Apprendre min_top_score sur des questions étiquetées
+
+        Le seuil retenu est le plus élevé qui laisse passer au moins min_recall
+        des questions répondables : le moins d'appels inutiles au LLM sans
+        refuser plus de (1 - min_recall) des bonnes questions.
+
+        Args:
+            samples: (scores de similarité de la recherche, question répondable)
+            min_recall: Proportion minimale de questions répondables admises
+
+        Returns:
+            Le nouveau min_top_score
+        """
+        samples = [(self.scores(scores)[0], answerable) for scores, answerable in samples]
+        positives = sorted((top for top, answerable in samples if answerable), reverse=True)
+        if not positives:
+            raise ValueError("calibrate() nécessite au moins une question répondable")
+
+        # Plus grand seuil qui admet ceil(min_recall × n) questions répondables
+        keep = min(len(positives), max(1, math.ceil(round(min_recall * len(positives), 9))))
+        threshold = positives[keep - 1]
+        negatives = [top for top, answerable in samples if not answerable]
+        avoided = sum(top < threshold for top in negatives)
+        logger.info(
+            f"Seuil de pertinence calibré : {threshold:.3f} ({keep}/{len(positives)} questions répondables admises, "
+            f"{avoided}/{len(negatives)} questions hors sujet évitées)"
+        )
+        self.min_top_score = threshold
+        return threshold
+
+    def save(self, path: str = RELEVANCE_GATE_PATH):
+        """Sauvegarder les seuils (relus par create_gate)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'min_top_score': self.min_top_score,
+            'min_avg_score': self.min_avg_score,
+            'avg_top_k': self.avg_top_k
+        }, indent=2), encoding='utf-8')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Questions vérifiées et appels au LLM évités"""
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'llm_calls_avoided': self.rejected,
+                'avoided_rate': self.rejected / self.checked if self.checked else 0.0,
+                'min_top_score': self.min_top_score,
+                'min_avg_score': self.min_avg_score
+            }
+
+
+def create_gate(path: Optional[str] = RELEVANCE_GATE_PATH) -> RelevanceGate:
+    """Filtre configuré (RELEVANCE_*), avec les seuils calibrés de path s'il existe"""
+    gate = RelevanceGate()
+    if path and Path(path).exists():
+        try:
+            thresholds = json.loads(Path(path).read_text(encoding='utf-8'))
+            gate = RelevanceGate(thresholds['min_top_score'], thresholds.get('min_avg_score', gate.min_avg_score),
+                                 thresholds.get('avg_top_k', gate.avg_top_k))
+            logger.info(f"Seuils de pertinence chargés depuis {path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Seuils de pertinence illisibles ({path}): {e}")
+    return gate
@@ -0,0 +1,252 @@
+"""
+Regroupement des questions identiques en cours de traitement (single-flight)
+
+Quand plusieurs utilisateurs posent la même question au même moment (même
+question normalisée, mêmes chunks retrouvés), une seule génération est
+lancée : les demandes suivantes attendent son résultat au lieu de relancer
+chacune une génération de plusieurs dizaines de secondes.
+
+Trois variantes partagent les mêmes métriques :
+- do() : appel bloquant (threads), chaque appelant reçoit le résultat ;
+- stream() : flux de tokens, chaque appelant reçoit tous les tokens depuis le
+  début ; le lecteur le plus rapide fait avancer la génération ;
+- ado() : coroutine, la génération n'est annulée que si tous les appelants
+  sont annulés.
+"""
+import asyncio
+import re
+import threading
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Forme canonique d'une question (casse, espaces, ponctuation finale)"""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return _SPACES.sub(" ", text).strip().rstrip("?!. ").strip()
+
+
+class _Call:
+    """Appel en cours et ses appelants"""
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class _SharedStream:
+    """Flux de tokens lu par plusieurs appelants, chacun depuis le début"""
+
+    def __init__(self, source: Iterator[str], on_close: Callable[[], None]):
+        self.source = source
+        self.on_close = on_close
+        self.items: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self.waiters = 1
+        self._pumping = False
+        self._condition = threading.Condition()
+
+    def _finish(self, error: Optional[BaseException] = None):
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._pumping = False
+            self._condition.notify_all()
+        self.on_close()
+
+    def read(self) -> Iterator[str]:
+        with self._condition:
+            self.readers += 1
+        position = 0
+        try:
+            while True:
+                with self._condition:
+                    while position >= len(self.items) and not self.done and self._pumping:
+                        self._condition.wait()
+                    if position < len(self.items):
+                        item = self.items[position]
+                        position += 1
+                    elif self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    else:
+                        # Aucun lecteur ne fait avancer le flux : ce lecteur s'en charge
+                        self._pumping = True
+                        item = None
+
+                if item is not None:
+                    yield item
+                    continue
+
+                try:
+                    token = next(self.source)
+                except StopIteration:
+                    self._finish()
+                    continue
+                except Exception as e:
+                    self._finish(e)
+                    continue
+                with self._condition:
+                    self.items.append(token)
+                    self._pumping = False
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self.readers -= 1
+                abandoned = self.readers == 0 and not self.done
+                if abandoned:
+                    self.done = True
+            if abandoned:
+                # Plus personne ne lit : arrêter la génération
+                logger.info("Flux partagé abandonné par tous ses lecteurs")
+                close = getattr(self.source, "close", None)
+                if close is not None:
+                    close()
+                self.on_close()
+
+
+class _AsyncCall:
+    """Tâche asyncio en cours et nombre d'appelants qui l'attendent"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Un seul appel à la fois par clé ; les appels simultanés de même clé partagent son résultat
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self._tasks: Dict[Hashable, _AsyncCall] = {}
+
+        self.flights = 0       # Appels réellement exécutés
+        self.coalesced = 0     # Appelants servis par un appel déjà en cours
+        self.max_waiters = 0   # Plus grand nombre d'appelants sur un même appel
+
+    def _joined(self, waiters: int):
+        """Comptabiliser un appelant qui rejoint un appel en cours (verrou tenu)"""
+        self.coalesced += 1
+        self.max_waiters = max(self.max_waiters, waiters)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Exécuter fn, ou attendre le résultat d'un appel en cours de même clé
+
+        Une exception levée par fn est propagée à tous les appelants.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.flights += 1
+            else:
+                call.waiters += 1
+                self._joined(call.waiters)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Lire le flux produit par fn, ou rejoindre un flux en cours de même clé
+
+        fn n'est appelée qu'au premier pas du flux. Un appelant qui rejoint le
+        flux reçoit d'abord les tokens déjà produits. Si tous les lecteurs
+        abandonnent, le flux source est fermé.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = _SharedStream(_deferred(fn), lambda: self._release_stream(key, shared))
+                self._streams[key] = shared
+                self.flights += 1
+            else:
+                shared.waiters += 1
+                self._joined(shared.waiters)
+        return shared.read()
+
+    def _release_stream(self, key: Hashable, shared: _SharedStream):
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Attendre la coroutine factory(), ou une coroutine en cours de même clé
+
+        Annuler un appelant ne fait que le retirer ; la coroutine partagée est
+        annulée quand plus aucun appelant ne l'attend.
+        """
+        with self._lock:
+            call = self._tasks.get(key)
+            if call is None:
+                call = self._tasks[key] = _AsyncCall(asyncio.ensure_future(factory()))
+                self.flights += 1
+                call.task.add_done_callback(lambda task: self._release_task(key, call))
+            else:
+                self._joined(call.waiters + 1)
+            call.waiters += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0
+            if abandoned:
+                call.task.cancel()
+            raise
+
+    def _release_task(self, key: Hashable, call: _AsyncCall):
+        with self._lock:
+            if self._tasks.get(key) is call:
+                del self._tasks[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métriques du regroupement"""
+        with self._lock:
+            requests = self.flights + self.coalesced
+            return {
+                "flights": self.flights,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._streams) + len(self._tasks),
+                "max_waiters": self.max_waiters,
+                "coalesced_rate": self.coalesced / requests if requests else 0.0
+            }
+
+
+def _deferred(fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+    """Appeler fn au premier pas du flux seulement"""
+    yield from fn()
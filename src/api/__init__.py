@@ -0,0 +1,9 @@
+"""
+Package api - Serveur HTTP de l'agent et son client
+
+Le serveur (src.api.server, FastAPI) n'est pas importé ici : l'interface
+Streamlit n'utilise que le client.
+"""
+from src.api.client import ApiClient
+
+__all__ = ['ApiClient']
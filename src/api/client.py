@@ -0,0 +1,123 @@
+"""
+Client du serveur HTTP de l'agent (src/api/server.py)
+
+Utilisé par l'interface Streamlit quand API_URL est défini : l'interface ne
+charge alors ni modèle, ni base vectorielle, ni client Ollama. Chaque
+session de l'interface passe son jeton de session (with_token) ; les
+connexions HTTP restent partagées.
+"""
+import json
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+import logging
+
+import requests
+
+from src.core.config import API_URL
+
+logger = logging.getLogger(__name__)
+
+
+class ApiClient:
+    """Client HTTP de l'API (connexions persistantes)"""
+
+    def __init__(self, base_url: str = API_URL, timeout: float = 180, token: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Args:
+            base_url: URL du serveur (API_URL)
+            timeout: Délai maximal d'une requête (secondes)
+            token: Jeton de session de l'utilisateur (en-tête Authorization)
+            session: Connexions HTTP à réutiliser (with_token)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+        self.session = session or requests.Session()
+
+    def with_token(self, token: Optional[str]) -> "ApiClient":
+        """Client d'un utilisateur, sur les mêmes connexions"""
+        return ApiClient(self.base_url, self.timeout, token=token, session=self.session)
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def _post(self, path: str, **kwargs) -> requests.Response:
+        response = self.session.post(f"{self.base_url}{path}", timeout=self.timeout, headers=self._headers(),
+                                     **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _get(self, path: str, timeout: Optional[float] = None) -> requests.Response:
+        return self.session.get(f"{self.base_url}{path}", timeout=timeout or self.timeout, headers=self._headers())
+
+    def login(self, username: str, password: str) -> str:
+        """Jeton de session d'un compte (à passer à with_token)"""
+        return self._post("/login", json={"username": username, "password": password}).json()["token"]
+
+    def health(self) -> Dict[str, Any]:
+        """État du service ({'status', 'ollama', 'documents'})"""
+        response = self.session.get(f"{self.base_url}/health", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Compteurs des requêtes et des composants (jeton d'administrateur, 403 sinon)"""
+        response = self._get("/metrics", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        """Chunks les plus proches ('id', 'content', 'metadata', 'similarity_score')"""
+        return self._post("/search", json={"query": query, "n_results": n_results}).json()["results"]
+
+    def ask(self, question: str, include_sources: bool = True) -> Dict[str, Any]:
+        """Réponse complète ({'answer', 'confidence', 'sources', 'trace'})"""
+        return self._post("/ask", json={"question": question, "include_sources": include_sources}).json()
+
+    def ask_stream(self, question: str, include_sources: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Réponse en flux : {'token': ...} pour chaque fragment, puis
+        {'done': True, 'error', 'confidence', 'sources', 'timings'} ('error' :
+        message d'une génération interrompue, sinon None)
+        """
+        response = self._post("/ask", json={"question": question, "stream": True, "include_sources": include_sources},
+                              stream=True)
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+
+    def submit_job(self, files: List[Tuple[str, Union[bytes, BinaryIO]]], user_id: Optional[str] = None) -> str:
+        """
+        Envoyer des documents à indexer en arrière-plan (même interface que IngestionQueue)
+
+        Args:
+            files: (nom du fichier, contenu ou fichier ouvert)
+            user_id: Ignoré : l'utilisateur est celui du jeton de session
+
+        Returns:
+            Identifiant de la tâche (get_job)
+        """
+        response = self._post("/ingest", files=[("files", (name, content)) for name, content in files])
+        return response.json()["id"]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Avancement d'une tâche ({'status', 'progress', 'files', ...}), ou None si inconnue"""
+        response = self._get(f"/ingest/{job_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def ingest(self, files: List[Tuple[str, Union[bytes, BinaryIO]]]) -> Dict[str, Any]:
+        """Envoyer des documents et attendre la fin de leur indexation (état de la tâche)"""
+        return self._post("/ingest", params={"wait": "true"},
+                          files=[("files", (name, content)) for name, content in files]).json()
+
+    def close(self):
+        self.session.close()
+
+
+def create_api_client(base_url: Optional[str] = API_URL) -> Optional[ApiClient]:
+    """Client de l'API configurée (API_URL), ou None si l'interface travaille seule"""
+    return ApiClient(base_url) if base_url else None
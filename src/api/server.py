@@ -0,0 +1,443 @@
+"""
+Serveur HTTP de l'agent (FastAPI), indépendant de Streamlit
+
+Les ressources coûteuses (modèle d'embeddings, base vectorielle, clients
+Ollama, caches, file d'attente du LLM) sont créées une fois par processus au
+démarrage et partagées par toutes les requêtes ; le travail bloquant
+(embeddings, recherche, extraction) passe par un pool de API_THREADS
+threads, la génération par le client Ollama asynchrone. Plusieurs processus
+(API_WORKERS) ou plusieurs réplicas derrière nginx se partagent la charge.
+
+Toutes les routes sauf /health, /login et DELETE /session demandent un jeton
+de session (en-tête "Authorization: Bearer <jeton>", src/core/sessions.py), le
+même que celui de l'interface Streamlit ; chaque utilisateur a son propre
+historique. /login et POST /session posent aussi le jeton dans un cookie
+HttpOnly (SameSite=Strict, Secure en HTTPS) : servie par nginx sur la même
+origine (/api/), l'interface y garde sa session sans que les scripts de la
+page puissent lire le jeton (SESSION_COOKIE_URL).
+
+Routes :
+    GET  /health   état du service, d'Ollama et de la base
+    POST /login    jeton de session (et cookie)        {"username", "password"}
+    POST   /session  cookie de session HttpOnly du jeton de la requête
+    DELETE /session  effacer le cookie de session
+    GET  /metrics  compteurs des requêtes et des composants (JSON, administrateurs)
+    POST /search   recherche vectorielle               {"query", "n_results"}
+    POST /ask      question (réponse complète ou flux) {"question", "stream", "include_sources"}
+    POST /ingest   upload de documents (multipart, champ "files") : tâche d'indexation
+                   en arrière-plan (?wait=true : attendre la fin) ; 413 au-delà de
+                   MAX_DOCUMENT_SIZE_MB par fichier, sans le lire en entier
+    GET  /ingest/{job_id}  avancement d'une tâche
+
+Le flux de /ask est en NDJSON : une ligne {"token": ...} par fragment, puis
+{"done": true, "error", "confidence", "sources", "timings"} ; "error" est le
+message d'une génération interrompue (null sinon), jamais envoyé comme token.
+
+Usage :
+    python -m src.api.server              # API_HOST:API_PORT, API_WORKERS processus
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import logging
+
+from fastapi import Depends, FastAPI, File, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from src.clients.ollama_client import GenerationError
+from src.core.config import API_HOST, API_PORT, API_THREADS, API_WORKERS, CONTEXT_CANDIDATES
+from src.core.sessions import SESSION_COOKIE
+
+logger = logging.getLogger(__name__)
+
+# Attente maximale de /ingest?wait=true (secondes) : la tâche continue au-delà
+INGEST_WAIT_TIMEOUT = 600
+
+# Agents par utilisateur gardés en mémoire (historiques) ; au-delà, les moins récents sont oubliés
+MAX_USER_AGENTS = 1000
+
+# Taille des lectures d'un fichier envoyé (octets)
+UPLOAD_READ_SIZE = 1024 * 1024
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(min_length=1)
+    n_results: int = Field(CONTEXT_CANDIDATES, ge=1, le=50)
+
+
+class LoginRequest(BaseModel):
+    username: str = Field(min_length=1)
+    password: str = Field(min_length=1)
+
+
+class AskRequest(BaseModel):
+    question: str = Field(min_length=1)
+    stream: bool = False
+    include_sources: bool = True
+
+
+class RequestMetrics:
+    """Nombre de requêtes, erreurs et durée cumulée par route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self.in_flight = 0
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, route: str, duration: float, error: bool):
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes.setdefault(route, {"requests": 0, "errors": 0, "total_seconds": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += error
+            stats["total_seconds"] += duration
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "routes": {
+                    route: {**stats, "avg_ms": stats["total_seconds"] * 1000 / stats["requests"]}
+                    for route, stats in self._routes.items()
+                }
+            }
+
+
+class Services:
+    """Ressources partagées par toutes les requêtes d'un processus"""
+
+    def __init__(self, agent, vector_store, embedding_model, ingestion, tokens, user_store=None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            agent: KnowledgeAgent (aask_question, aask_question_stream), modèle des agents par utilisateur
+            vector_store: Base vectorielle (search_similar)
+            embedding_model: Modèle d'embeddings (encode)
+            ingestion: File d'indexation en arrière-plan (IngestionQueue)
+            tokens: Jetons de session (SessionTokens)
+            user_store: Comptes utilisateurs (UserStore) pour /login, ou None
+            executor: Pool de threads du travail bloquant
+        """
+        self.agent = agent
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.ingestion = ingestion
+        self.tokens = tokens
+        self.user_store = user_store
+        self.executor = executor or ThreadPoolExecutor(max_workers=API_THREADS, thread_name_prefix="api")
+        self.metrics = RequestMetrics()
+        self._agents: "OrderedDict[str, Any]" = OrderedDict()
+        self._agents_lock = threading.Lock()
+
+    @classmethod
+    def create(cls) -> "Services":
+        """Ressources configurées (config.env), créées une seule fois au démarrage du processus"""
+        from sentence_transformers import SentenceTransformer
+        from src.agents import KnowledgeAgent
+        from src.agents.cv_query import CVQueryRouter
+        from src.agents.single_flight import SingleFlight
+        from src.clients import AsyncOllamaClient, LLMScheduler, OllamaClient, OllamaClientPool
+        from src.core.config import (ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD,
+                                     ANSWER_CACHE_TTL_HOURS, CV_INDEX_PATH, DEDUP_INDEX_PATH, DEDUP_THRESHOLD,
+                                     EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB, OLLAMA_BASE_URLS,
+                                     USERS_DB_PATH)
+        from src.core.sessions import create_session_tokens
+        from src.core.tracing import create_sink
+        from src.documents import DocumentReader
+        from src.documents.dedup import NearDuplicateDetector
+        from src.documents.ingestion_queue import create_ingestion_queue
+        from src.storage import CVIndex, ExtractionCache, SemanticAnswerCache, UserStore, VectorStore
+
+        executor = ThreadPoolExecutor(max_workers=API_THREADS, thread_name_prefix="api")
+        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        vector_store = VectorStore()
+        vector_store.create_collection()
+
+        # Plusieurs serveurs Ollama : client synchrone réparti (appelé dans le pool de threads)
+        client = OllamaClientPool() if OLLAMA_BASE_URLS else OllamaClient()
+        async_client = None if OLLAMA_BASE_URLS else AsyncOllamaClient()
+        threading.Thread(target=client.warm_up, daemon=True).start()
+
+        answer_cache = None
+        if ANSWER_CACHE_MAX_ENTRIES > 0:
+            answer_cache = SemanticAnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD,
+                                               ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_HOURS)
+        cv_index = CVIndex(CV_INDEX_PATH) if CV_INDEX_PATH else None
+
+        agent = KnowledgeAgent(
+            vector_store, client, async_client=async_client, executor=executor,
+            embedding_model=embedding_model, answer_cache=answer_cache, single_flight=SingleFlight(),
+            scheduler=LLMScheduler(), trace_sink=create_sink(),
+            cv_router=CVQueryRouter(cv_index) if cv_index is not None else None
+        )
+        reader = DocumentReader(
+            extraction_cache=ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB),
+            dedup=NearDuplicateDetector(threshold=DEDUP_THRESHOLD, index_path=DEDUP_INDEX_PATH)
+        )
+        ingestion = create_ingestion_queue(reader, embedding_model, vector_store, cv_index,
+                                           answer_cache=answer_cache)
+        return cls(agent, vector_store, embedding_model, ingestion, create_session_tokens(),
+                   UserStore(USERS_DB_PATH), executor=executor)
+
+    def agent_for(self, user: Dict[str, Any]):
+        """Agent de l'utilisateur (historique propre), créé à sa première question"""
+        with self._agents_lock:
+            agent = self._agents.get(user["username"])
+            if agent is None:
+                agent = self.agent.for_user(user["username"], user["name"])
+                self._agents[user["username"]] = agent
+                while len(self._agents) > MAX_USER_AGENTS:
+                    self._agents.popitem(last=False)
+            else:
+                self._agents.move_to_end(user["username"])
+            return agent
+
+    async def run(self, function, *args):
+        """Exécuter un appel bloquant dans le pool de threads"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métriques du processus : requêtes et composants de l'agent"""
+        agent = self.agent
+        stats = {
+            "requests": self.metrics.get_stats(),
+            "coalescing": agent.get_coalescing_stats(),
+            "relevance": agent.get_relevance_stats(),
+        }
+        if agent.scheduler is not None:
+            stats["llm_queue"] = agent.scheduler.get_stats()
+        if agent.async_client is not None:
+            stats["ollama"] = agent.async_client.get_stats()
+        if agent.answer_cache is not None:
+            stats["answer_cache"] = agent.answer_cache.get_stats()
+        if agent.cv_router is not None:
+            stats["cv_index"] = {"documents": len(agent.cv_router.index), "routed": agent.cv_router.routed}
+        stats["ingestion"] = {"pending_files": self.ingestion.store.pending()}
+        stats["sessions"] = {**self.tokens.get_stats(), "users": len(self._agents)}
+        return stats
+
+    async def aclose(self):
+        self.ingestion.stop(timeout=5)
+        if self.agent.async_client is not None:
+            await self.agent.async_client.aclose()
+        self.ingestion.store.close()
+        if self.ingestion.cv_index is not None:
+            self.ingestion.cv_index.close()
+        if self.user_store is not None:
+            self.user_store.close()
+        self.executor.shutdown(wait=False)
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    """Jeton de l'en-tête "Authorization: Bearer <jeton>", ou None"""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" else None
+
+
+def current_user(request: Request) -> Dict[str, Any]:
+    """Utilisateur du jeton de session de la requête (401 sans jeton valide)"""
+    user = request.app.state.services.tokens.verify(bearer_token(request))
+    if user is None:
+        raise HTTPException(status_code=401, detail="Jeton de session absent ou invalide",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def set_session_cookie(request: Request, response: Response, token: str, max_age: int):
+    """
+    Poser (ou effacer, max_age=0) le cookie de session : HttpOnly (illisible par
+    les scripts de la page), SameSite=Strict, Secure derrière un proxy HTTPS
+    """
+    secure = request.headers.get("X-Forwarded-Proto", request.url.scheme) == "https"
+    response.set_cookie(SESSION_COOKIE, token, max_age=max_age, path="/", secure=secure,
+                        httponly=True, samesite="strict")
+
+
+async def read_upload(upload: UploadFile, max_bytes: int) -> bytes:
+    """
+    Lire un fichier envoyé par blocs, en s'arrêtant dès que max_bytes est dépassé
+
+    Raises:
+        HTTPException: 413 si le fichier dépasse max_bytes
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Fichier trop volumineux (> {max_bytes / (1024 * 1024):.0f} Mo): {upload.filename}"
+    )
+    # Taille annoncée par le formulaire : rejet sans lecture
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+    content = bytearray()
+    while True:
+        block = await upload.read(UPLOAD_READ_SIZE)
+        if not block:
+            return bytes(content)
+        content += block
+        if len(content) > max_bytes:
+            raise too_large
+
+
+def create_app(services: Optional[Services] = None) -> FastAPI:
+    """
+    Application FastAPI
+
+    Args:
+        services: Ressources partagées (tests) ; créées au démarrage si None
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.services = services if services is not None else Services.create()
+        logger.info("Serveur prêt")
+        yield
+        await app.state.services.aclose()
+
+    app = FastAPI(title="Enterprise Knowledge Agent", lifespan=lifespan)
+
+    @app.middleware("http")
+    async def measure(request: Request, call_next):
+        metrics = request.app.state.services.metrics
+        metrics.start()
+        start = time.perf_counter()
+        error = True
+        try:
+            response = await call_next(request)
+            error = response.status_code >= 500
+            return response
+        finally:
+            metrics.record(request.url.path, time.perf_counter() - start, error)
+
+    @app.get("/health")
+    async def health(request: Request) -> Dict[str, Any]:
+        services: Services = request.app.state.services
+        agent = services.agent
+        if agent.async_client is not None:
+            ollama = await agent.async_client.check_connection()
+        else:
+            ollama = await services.run(agent.ollama_client.check_connection)
+        try:
+            documents = (await services.run(services.vector_store.get_collection_info))["count"]
+        except Exception as e:
+            logger.error(f"Base vectorielle indisponible: {e}")
+            documents = None
+        return {"status": "ok" if ollama and documents is not None else "degraded",
+                "ollama": ollama, "documents": documents}
+
+    @app.post("/login")
+    async def login(body: LoginRequest, request: Request, response: Response) -> Dict[str, Any]:
+        services: Services = request.app.state.services
+        if services.user_store is None:
+            raise HTTPException(status_code=404, detail="Connexion indisponible")
+        # Hachage du mot de passe (PBKDF2) : dans le pool de threads
+        if not await services.run(services.user_store.authenticate, body.username, body.password):
+            raise HTTPException(status_code=401, detail="Nom d'utilisateur ou mot de passe incorrect")
+        user = services.user_store.get_user_info(body.username)
+        token = services.tokens.issue(user)
+        set_session_cookie(request, response, token, int(services.tokens.expiration_hours * 3600))
+        return {"token": token, "user": user}
+
+    @app.post("/session", status_code=204)
+    async def open_session(request: Request, user: Dict[str, Any] = Depends(current_user)) -> Response:
+        # Jeton déjà vérifié (current_user) : posé tel quel, même expiration
+        tokens = request.app.state.services.tokens
+        response = Response(status_code=204)
+        set_session_cookie(request, response, bearer_token(request), int(tokens.expiration_hours * 3600))
+        return response
+
+    @app.delete("/session", status_code=204)
+    async def close_session(request: Request) -> Response:
+        response = Response(status_code=204)
+        set_session_cookie(request, response, "", 0)
+        return response
+
+    @app.get("/metrics")
+    async def metrics(request: Request, user: Dict[str, Any] = Depends(current_user)) -> Dict[str, Any]:
+        # Détails internes (caches, files d'attente) : administrateurs seulement
+        if user["role"] != "admin":
+            raise HTTPException(status_code=403, detail="Réservé aux administrateurs")
+        return request.app.state.services.get_stats()
+
+    @app.post("/search")
+    async def search(body: SearchRequest, request: Request,
+                     user: Dict[str, Any] = Depends(current_user)) -> Dict[str, Any]:
+        services: Services = request.app.state.services
+        results = await services.run(
+            lambda: services.vector_store.search_similar(body.query, n_results=body.n_results,
+                                                         embedding_model=services.embedding_model)
+        )
+        return {"results": results}
+
+    @app.post("/ask")
+    async def ask(body: AskRequest, request: Request, user: Dict[str, Any] = Depends(current_user)):
+        agent = request.app.state.services.agent_for(user)
+        if not body.stream:
+            return await agent.aask_question(body.question, include_sources=body.include_sources)
+
+        result = await agent.aask_question_stream(body.question, include_sources=body.include_sources)
+
+        async def lines():
+            error = None
+            try:
+                async for token in result["tokens"]:
+                    yield json.dumps({"token": token}, ensure_ascii=False) + "\n"
+            except GenerationError as e:
+                # Hors du texte de la réponse : le client l'affiche à part
+                error = str(e)
+            yield json.dumps({
+                "done": True,
+                "error": error,
+                "confidence": result["confidence"],
+                "sources": result.get("sources", []),
+                "timings": result["trace"].timings()
+            }, ensure_ascii=False, default=str) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.post("/ingest", status_code=202)
+    async def ingest(request: Request, files: List[UploadFile] = File(...), wait: bool = False,
+                     user: Dict[str, Any] = Depends(current_user)) -> Dict[str, Any]:
+        services: Services = request.app.state.services
+        ingestion = services.ingestion
+        for upload in files:
+            if not ingestion.reader.is_supported(upload.filename or ""):
+                raise HTTPException(status_code=415, detail=f"Format non supporté: {upload.filename}")
+        # Même limite que DocumentReader, appliquée avant de charger le fichier en mémoire
+        max_bytes = ingestion.reader.limits.max_document_bytes
+        contents = [(upload.filename, await read_upload(upload, max_bytes)) for upload in files]
+        job_id = await services.run(ingestion.submit_job, contents, user["username"])
+        if wait:
+            return await services.run(ingestion.wait, job_id, INGEST_WAIT_TIMEOUT)
+        return await services.run(ingestion.get_job, job_id)
+
+    @app.get("/ingest/{job_id}")
+    async def ingest_job(job_id: str, request: Request,
+                         user: Dict[str, Any] = Depends(current_user)) -> Dict[str, Any]:
+        services: Services = request.app.state.services
+        job = await services.run(services.ingestion.get_job, job_id)
+        # Les tâches des autres utilisateurs ne sont visibles que des administrateurs
+        if job is None or (job["user_id"] != user["username"] and user["role"] != "admin"):
+            raise HTTPException(status_code=404, detail=f"Tâche inconnue: {job_id}")
+        return job
+
+    return app
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+    uvicorn.run("src.api.server:app", host=API_HOST, port=API_PORT, workers=API_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
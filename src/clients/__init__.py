@@ -1,7 +1,10 @@
 """
 Package clients - Clients pour services externes
 """
-from src.clients.ollama_client import OllamaClient
-
-__all__ = ['OllamaClient']
+from src.clients.ollama_client import OllamaClient, ErrorAnswer, GenerationError, GenerationStats, ConversationState
+from src.clients.async_ollama_client import AsyncOllamaClient
+from src.clients.ollama_pool import OllamaClientPool
+from src.clients.llm_scheduler import LLMScheduler, OverloadError, PRIORITY_INTERACTIVE, PRIORITY_BATCH
 
+__all__ = ['OllamaClient', 'AsyncOllamaClient', 'OllamaClientPool', 'ErrorAnswer', 'GenerationError', 'GenerationStats',
+           'ConversationState', 'LLMScheduler', 'OverloadError', 'PRIORITY_INTERACTIVE', 'PRIORITY_BATCH']
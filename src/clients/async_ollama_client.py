@@ -0,0 +1,211 @@
+"""
+Client asynchrone pour Ollama (asyncio + httpx)
+
+Une requête en attente de génération n'occupe aucun thread : un seul
+processus peut garder des centaines de conversations ouvertes. Le nombre
+de générations envoyées simultanément à Ollama est borné par un sémaphore
+(les autres attendent leur tour sans bloquer la boucle d'événements) ; cette
+attente est tracée sous "client_slot_wait", distincte de "llm_queue_wait"
+(file à priorités de LLMScheduler, en amont).
+Annuler la tâche (utilisateur parti) ferme la requête HTTP en cours.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+import logging
+
+import httpx
+
+from src.clients.ollama_client import (
+    TIMEOUT_ANSWER, ConversationState, ErrorAnswer, GenerationError, GenerationStats, OllamaClient, generated_text
+)
+from src.core.config import OLLAMA_POOL_SIZE, OLLAMA_MAX_CONCURRENCY, OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX
+from src.core.tracing import Trace, traced
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOllamaClient:
+    """Client asynchrone pour Ollama API"""
+
+    # Même prompt, mêmes paramètres et mêmes mesures que le client synchrone
+    _system_prompt = staticmethod(OllamaClient._system_prompt)
+    _build_prompt = OllamaClient._build_prompt
+    _build_payload = OllamaClient._build_payload
+    _record_stats = OllamaClient._record_stats
+
+    def __init__(self, base_url: Optional[str] = None, max_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+                 pool_size: int = OLLAMA_POOL_SIZE, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialise le client Ollama asynchrone
+
+        Args:
+            base_url: URL d'Ollama (OLLAMA_BASE_URL par défaut)
+            max_concurrency: Nombre maximal de générations simultanées
+            pool_size: Nombre maximal de connexions persistantes (keep-alive)
+            transport: Transport httpx (tests)
+        """
+        if base_url is None:
+            base_url = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
+        self.base_url = base_url
+        self.model = "llama3:8b"
+        self.timeout = 180
+        self.keep_alive = OLLAMA_KEEP_ALIVE
+        self.num_ctx = OLLAMA_NUM_CTX
+        self.max_concurrency = max_concurrency
+        self.last_stats: Optional[GenerationStats] = None
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(self.timeout, connect=5),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport
+        )
+
+        # Métriques
+        self.in_flight = 0
+        self.waiting = 0
+        self.cancelled = 0
+
+    async def __aenter__(self) -> "AsyncOllamaClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Fermer les connexions persistantes"""
+        await self._client.aclose()
+
+    async def check_connection(self) -> bool:
+        """Vérifie que Ollama est accessible"""
+        try:
+            response = await self._client.get("/api/tags", timeout=5)
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"Impossible de se connecter à Ollama: {e}")
+            return False
+
+    async def _acquire(self):
+        """Attendre une place parmi les générations simultanées"""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def generate(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                       conversation: Optional[ConversationState] = None, trace: Optional[Trace] = None) -> str:
+        """
+        Génère une réponse avec le LLM
+
+        Raises:
+            asyncio.CancelledError: si la tâche est annulée (la requête HTTP est fermée)
+        """
+        with traced(trace, "prompt_build"):
+            payload = self._build_payload(
+                self._build_prompt(prompt, context, user_name), stream=False,
+                system=self._system_prompt(context), conversation=conversation
+            )
+
+        with traced(trace, "client_slot_wait"):
+            await self._acquire()
+        try:
+            start = time.perf_counter()
+            response = await self._client.post("/api/generate", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            self._record_stats(start, None, 1, data, trace)
+            if conversation is not None:
+                conversation.update(data.get("context"))
+            return generated_text(data)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            logger.info("Génération annulée")
+            raise
+        except httpx.TimeoutException:
+            logger.error("Timeout lors de la génération de la réponse")
+            return TIMEOUT_ANSWER
+        except Exception as e:
+            logger.error(f"Erreur: {e}")
+            return ErrorAnswer(f"Erreur: {str(e)}")
+        finally:
+            self._release()
+
+    async def generate_stream(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                              conversation: Optional[ConversationState] = None,
+                              trace: Optional[Trace] = None) -> AsyncIterator[str]:
+        """
+        Génère une réponse en flux (NDJSON d'Ollama), token par token
+
+        Interrompre l'itération (aclose, annulation) ferme la requête et libère
+        la place de génération. Une génération qui ne va pas jusqu'au bout
+        ("done": true) lève GenerationError après les tokens déjà produits.
+        """
+        with traced(trace, "prompt_build"):
+            payload = self._build_payload(
+                self._build_prompt(prompt, context, user_name), stream=True,
+                system=self._system_prompt(context), conversation=conversation
+            )
+
+        with traced(trace, "client_slot_wait"):
+            await self._acquire()
+        start = time.perf_counter()
+        first_token = None
+        chunks = 0
+        final: Dict[str, Any] = {}
+        try:
+            async with self._client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(data["error"])
+                    token = data.get("response", "")
+                    if token:
+                        if first_token is None:
+                            token = token.lstrip()
+                            if not token:
+                                continue
+                            first_token = time.perf_counter()
+                        chunks += 1
+                        yield token
+                    if data.get("done"):
+                        final = data
+                        break
+            if not final:
+                raise RuntimeError("flux interrompu avant la fin de la génération")
+            self._record_stats(start, first_token, chunks, final, trace)
+            if conversation is not None:
+                conversation.update(final.get("context"))
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            logger.info("Génération en flux interrompue")
+            raise
+        except httpx.TimeoutException:
+            logger.error("Timeout lors de la génération de la réponse")
+            raise GenerationError(TIMEOUT_ANSWER)
+        except Exception as e:
+            logger.error(f"Erreur: {e}")
+            raise GenerationError(f"Erreur: {str(e)}") from e
+        finally:
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Générations en cours, en attente et annulées"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "cancelled": self.cancelled
+        }
@@ -0,0 +1,277 @@
+"""
+File d'attente à priorités devant le LLM (contrôle d'admission)
+
+Ollama sur CPU ne sert que quelques générations à la fois. Au-delà de
+max_concurrency, les demandes attendent dans une file bornée, servies par
+priorité (chat interactif avant traitements par lots) puis par ordre
+d'arrivée. Une demande est refusée immédiatement, plutôt que d'attendre le
+timeout de 180 s du client, si :
+- la file est pleine (une demande moins prioritaire en attente lui cède sa place) ;
+- l'attente estimée (position dans la file × durée moyenne d'une génération)
+  dépasse son délai d'attente ;
+- son délai d'attente expire avant qu'une place se libère.
+
+acquire() attend dans le thread appelant ; aacquire() attend dans la boucle
+d'événements (serveur HTTP) sans occuper de thread : release(), appelé
+depuis n'importe quel thread, réveille la coroutine de la demande servie.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from src.core.config import OLLAMA_MAX_CONCURRENCY, LLM_QUEUE_SIZE, LLM_QUEUE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Priorités (plus petit = servi en premier)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class OverloadError(Exception):
+    """Demande refusée par le contrôle d'admission"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Demande refusée ({reason})")
+        self.reason = reason
+
+
+class _Ticket:
+    """Demande en attente d'une place (wake : réveil d'une demande asynchrone)"""
+    __slots__ = ("priority", "deadline", "granted", "rejected", "wake")
+
+    def __init__(self, priority: int, deadline: float, wake: Optional[Callable[[], None]] = None):
+        self.priority = priority
+        self.deadline = deadline
+        self.granted = False
+        self.rejected: Optional[str] = None
+        self.wake = wake
+
+
+class LLMScheduler:
+    """
+    Limite le nombre de générations simultanées et ordonne les demandes en attente
+    """
+
+    def __init__(self, max_concurrency: int = OLLAMA_MAX_CONCURRENCY, max_queue: int = LLM_QUEUE_SIZE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT, history_size: int = 1000):
+        """
+        Args:
+            max_concurrency: Générations simultanées
+            max_queue: Demandes en attente au maximum
+            queue_timeout: Attente maximale par défaut (secondes)
+            history_size: Nombre de temps d'attente gardés pour les percentiles
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._condition = threading.Condition()
+        self._queue: List[tuple] = []  # (priorité, ordre d'arrivée, ticket)
+        self._order = itertools.count()
+        self._waiting = 0
+        self._running = 0
+        self._service_time: Optional[float] = None  # Moyenne mobile d'une génération (s)
+
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "estimated_wait": 0, "deadline": 0, "preempted": 0}
+        self.max_queue_depth = 0
+        self._waits = deque(maxlen=history_size)
+
+    def _estimated_wait(self, position: int) -> float:
+        """Attente estimée d'une demande placée après position demandes (verrou tenu)"""
+        if self._service_time is None:
+            return 0.0
+        return (position // self.max_concurrency + (self._running >= self.max_concurrency)) * self._service_time
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        logger.warning(f"LLM surchargé : demande refusée ({reason}), {self._waiting} en attente")
+        raise OverloadError(reason)
+
+    def _grant_next(self):
+        """Donner les places libres aux demandes les plus prioritaires (verrou tenu)"""
+        while self._queue and self._running < self.max_concurrency:
+            _, _, ticket = heapq.heappop(self._queue)
+            if ticket.granted or ticket.rejected:
+                continue
+            ticket.granted = True
+            self._waiting -= 1
+            self._running += 1
+            if ticket.wake is not None:
+                ticket.wake()
+        self._condition.notify_all()
+
+    def _preempt(self, priority: int) -> bool:
+        """Retirer de la file la demande en attente la moins prioritaire, si elle l'est moins que priority"""
+        pending = [entry for entry in self._queue if not entry[2].granted and not entry[2].rejected]
+        if not pending:
+            return False
+        victim = max(pending, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        victim[2].rejected = "preempted"
+        self._waiting -= 1
+        if victim[2].wake is not None:
+            victim[2].wake()
+        self._condition.notify_all()
+        return True
+
+    def _admit(self, priority: int, timeout: float, start: float,
+               wake: Optional[Callable[[], None]] = None) -> Optional[_Ticket]:
+        """
+        Place immédiate (None) ou ticket placé dans la file (verrou tenu)
+
+        Raises:
+            OverloadError: file pleine ou attente estimée trop longue
+        """
+        if self._running < self.max_concurrency and not self._waiting:
+            self._running += 1
+            self.admitted += 1
+            self._waits.append(0.0)
+            return None
+
+        if self._waiting >= self.max_queue and not self._preempt(priority):
+            self._reject("queue_full")
+        ahead = sum(1 for entry in self._queue
+                    if not entry[2].granted and not entry[2].rejected and entry[0] <= priority)
+        if self._estimated_wait(ahead) > timeout:
+            self._reject("estimated_wait")
+
+        ticket = _Ticket(priority, start + timeout, wake)
+        heapq.heappush(self._queue, (priority, next(self._order), ticket))
+        self._waiting += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._waiting)
+        return ticket
+
+    def _settle(self, ticket: _Ticket, start: float) -> float:
+        """Issue d'une attente : temps passé dans la file, ou OverloadError (verrou tenu)"""
+        if not ticket.granted and not ticket.rejected:
+            ticket.rejected = "deadline"
+            self._waiting -= 1
+        if ticket.rejected:
+            self._reject(ticket.rejected)
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self._waits.append(waited)
+        return waited
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """
+        Obtenir une place de génération
+
+        Args:
+            priority: Priorité de la demande (PRIORITY_INTERACTIVE, PRIORITY_BATCH...)
+            timeout: Attente maximale (queue_timeout par défaut)
+
+        Returns:
+            Temps passé dans la file (secondes)
+
+        Raises:
+            OverloadError: file pleine, attente estimée ou délai dépassé
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+
+        with self._condition:
+            ticket = self._admit(priority, timeout, start)
+            if ticket is None:
+                return 0.0
+            while not ticket.granted and not ticket.rejected:
+                remaining = ticket.deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._settle(ticket, start)
+
+    async def aacquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """
+        Version asynchrone d'acquire : la demande attend dans la boucle
+        d'événements, sans occuper de thread
+
+        Annuler la coroutine retire la demande de la file (ou rend la place si
+        elle venait d'être obtenue).
+
+        Raises:
+            OverloadError: file pleine, attente estimée ou délai dépassé
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+
+        def wake_up():
+            if not woken.done():
+                woken.set_result(None)
+
+        def wake():
+            # Appelé par release() ou _preempt(), éventuellement depuis un autre thread
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(wake_up)
+
+        with self._condition:
+            ticket = self._admit(priority, timeout, start, wake)
+            if ticket is None:
+                return 0.0
+
+        try:
+            await asyncio.wait_for(woken, max(0.0, ticket.deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            pass  # Délai expiré, sauf si la place a été donnée entre-temps
+        except asyncio.CancelledError:
+            with self._condition:
+                granted = ticket.granted
+                if not granted and not ticket.rejected:
+                    ticket.rejected = "cancelled"
+                    self._waiting -= 1
+            if granted:
+                self.release()
+            raise
+
+        with self._condition:
+            return self._settle(ticket, start)
+
+    def release(self, service_time: Optional[float] = None):
+        """
+        Libérer une place
+
+        Args:
+            service_time: Durée de la génération (met à jour l'estimation des attentes)
+        """
+        with self._condition:
+            self._running -= 1
+            if service_time is not None:
+                self._service_time = service_time if self._service_time is None \
+                    else 0.8 * self._service_time + 0.2 * service_time
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> Iterator[float]:
+        """Place de génération pour la durée du bloc (renvoie le temps d'attente)"""
+        waited = self.acquire(priority, timeout)
+        start = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profondeur de la file, générations en cours, temps d'attente et refus"""
+        with self._condition:
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": self._waiting,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self._running,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                "service_time": self._service_time or 0.0
+            }
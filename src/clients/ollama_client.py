@@ -2,18 +2,144 @@
 Client pour interagir avec Ollama (LLM local)
 """
 import requests
+import json
 import os
-from typing import Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
 import logging
 
+from requests.adapters import HTTPAdapter
+
+from src.core.config import OLLAMA_POOL_SIZE, OLLAMA_HEALTH_TTL, OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX
+from src.core.tracing import Trace, traced
+
 logger = logging.getLogger(__name__)
 
+class ErrorAnswer(str):
+    """
+    Message d'erreur renvoyé à la place d'une génération (jamais mis en cache)
+
+    S'affiche comme une réponse ; son type, et non son texte, le distingue
+    d'une réponse du LLM (qui peut très bien commencer par "Erreur").
+    """
+
+
+TIMEOUT_ANSWER = ErrorAnswer("Délai d'attente dépassé. Veuillez réessayer.")
+OVERLOAD_ANSWER = ErrorAnswer("Le service est actuellement surchargé. Veuillez réessayer dans quelques instants.")
+MISSING_RESPONSE_ANSWER = ErrorAnswer("Erreur lors de la génération")
+
+
+def is_error_answer(answer: str) -> bool:
+    """La réponse est-elle un message d'erreur du client plutôt qu'une génération ?"""
+    return isinstance(answer, ErrorAnswer)
+
+
+def generated_text(data: Dict[str, Any]) -> str:
+    """Texte généré d'une réponse d'Ollama (MISSING_RESPONSE_ANSWER sans champ "response")"""
+    response = data.get("response")
+    return MISSING_RESPONSE_ANSWER if response is None else response.strip()
+
+
+class GenerationError(Exception):
+    """
+    Génération en flux interrompue (timeout, erreur d'Ollama, flux coupé avant
+    "done": true), levée après les tokens déjà produits
+
+    str(e) est le message à afficher (TIMEOUT_ANSWER, "Erreur: ...") : il ne
+    fait pas partie de la réponse et une réponse interrompue n'est jamais mise
+    en cache.
+    """
+
+
+# Instructions fixes, envoyées dans le champ system. Identiques d'une requête à
+# l'autre, elles forment le début du prompt évalué : Ollama réutilise leur
+# évaluation (cache KV du préfixe commun) et n'évalue que les documents et la question.
+SYSTEM_PROMPT = """Tu es un assistant IA interne d'entreprise. Réponds en français en utilisant uniquement les informations des documents fournis.
+
+INSTRUCTIONS:
+- Réponds uniquement en français
+- Utilise uniquement les informations des DOCUMENTS INTERNES fournis avec la question
+- Donne une réponse complète et détaillée
+- Si l'information n'est pas dans les documents, réponds: "Je ne trouve pas cette information dans les documents internes disponibles."
+- Sois précis et cite les sources quand c'est possible
+- Réponds de manière professionnelle et utile
+- Ne mentionne JAMAIS les noms des personnes trouvés dans les documents dans ta réponse
+- L'UTILISATEUR indiqué avant la question est la personne qui la pose. Ne confonds PAS ce nom avec les noms mentionnés dans les documents."""
+
+SYSTEM_PROMPT_NO_CONTEXT = "Tu es un assistant IA interne d'entreprise. Réponds en français."
+
+# Longueur maximale d'une réponse (tokens)
+NUM_PREDICT = 1000
+
+
+@dataclass
+class ConversationState:
+    """
+    Tokens déjà évalués par Ollama pour une conversation (champ context)
+    
+    Renvoyés au tour suivant, ils évitent de ré-évaluer les échanges
+    précédents. Au-delà de max_tokens, la conversation repart de zéro pour
+    rester dans la fenêtre du modèle (num_ctx).
+    """
+    tokens: List[int] = field(default_factory=list)
+    max_tokens: int = OLLAMA_NUM_CTX // 2
+    
+    def update(self, tokens: Optional[List[int]]):
+        self.tokens = list(tokens or [])
+        if len(self.tokens) > self.max_tokens:
+            logger.info(f"Conversation de {len(self.tokens)} tokens : réinitialisée")
+            self.tokens = []
+    
+    def reset(self):
+        self.tokens = []
+
+
+@dataclass
+class GenerationStats:
+    """
+    Mesures d'une génération
+    
+    - ttft : délai avant le premier token (secondes), = total_time sans streaming
+    - total_time : durée totale de la requête (secondes)
+    - tokens : nombre de tokens générés (eval_count d'Ollama si disponible)
+    - tokens_per_second : débit de génération (eval_duration d'Ollama si disponible)
+    - prompt_tokens : tokens du prompt évalués par le modèle (prompt_eval_count,
+      hors préfixe déjà en cache)
+    - prompt_eval_time : durée d'évaluation du prompt (secondes)
+    """
+    ttft: float
+    total_time: float
+    tokens: int
+    tokens_per_second: float
+    prompt_tokens: int = 0
+    prompt_eval_time: float = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ttft": self.ttft,
+            "total_time": self.total_time,
+            "tokens": self.tokens,
+            "tokens_per_second": self.tokens_per_second,
+            "prompt_tokens": self.prompt_tokens,
+            "prompt_eval_time": self.prompt_eval_time
+        }
+
 
 class OllamaClient:
     """Client pour Ollama API"""
     
-    def __init__(self, base_url: Optional[str] = None):
-        """Initialise le client Ollama"""
+    def __init__(self, base_url: Optional[str] = None, pool_size: int = OLLAMA_POOL_SIZE,
+                 health_ttl: float = OLLAMA_HEALTH_TTL):
+        """
+        Initialise le client Ollama
+        
+        Args:
+            base_url: URL d'Ollama (OLLAMA_BASE_URL par défaut)
+            pool_size: Nombre maximal de connexions persistantes (keep-alive)
+            health_ttl: Durée de validité du dernier test de connexion (secondes)
+        """
         # Utiliser la variable d'environnement ou le paramètre, sinon valeur par défaut
         # Dans Docker, utiliser le nom du service 'ollama'
         if base_url is None:
@@ -21,84 +147,276 @@ class OllamaClient:
         self.base_url = base_url
         self.model = "llama3:8b"
         self.timeout = 180  # Augmenter le timeout à 3 minutes
+        self.keep_alive = OLLAMA_KEEP_ALIVE  # Durée pendant laquelle le modèle reste chargé
+        self.num_ctx = OLLAMA_NUM_CTX
+        # Dernière génération du client, toutes requêtes confondues (mesures
+        # d'une requête : trace.generation)
+        self.last_stats: Optional[GenerationStats] = None
+        
+        # Session partagée : les connexions TCP sont réutilisées d'une requête à l'autre
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # État de connexion mis en cache (rafraîchi en arrière-plan une fois expiré)
+        self.health_ttl = health_ttl
+        self._healthy: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._health_lock = threading.Lock()
+        self._health_refreshing = False
     
-    def check_connection(self) -> bool:
-        """Vérifie que Ollama est accessible"""
+    def _probe(self) -> bool:
+        """Interroger Ollama et mettre à jour l'état de connexion"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+            healthy = response.status_code == 200
         except Exception as e:
             logger.error(f"Impossible de se connecter à Ollama: {e}")
+            healthy = False
+        
+        with self._health_lock:
+            self._healthy = healthy
+            self._health_checked_at = time.monotonic()
+            self._health_refreshing = False
+        return healthy
+    
+    def check_connection(self, force: bool = False) -> bool:
+        """
+        Vérifie que Ollama est accessible
+        
+        Le résultat est gardé health_ttl secondes. Une fois expiré, la dernière
+        valeur connue est renvoyée immédiatement et un seul rafraîchissement est
+        lancé en arrière-plan. Le premier appel (ou force=True) est synchrone.
+        """
+        with self._health_lock:
+            known = self._healthy
+            expired = time.monotonic() - self._health_checked_at >= self.health_ttl
+            refresh = known is not None and expired and not self._health_refreshing
+            if refresh:
+                self._health_refreshing = True
+        
+        if force or known is None:
+            return self._probe()
+        
+        if refresh:
+            threading.Thread(target=self._probe, name="ollama-health", daemon=True).start()
+        return known
+    
+    def close(self):
+        """Fermer les connexions persistantes"""
+        self.session.close()
+    
+    def warm_up(self) -> bool:
+        """Charger le modèle en mémoire (et l'y garder keep_alive) sans rien générer"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error(f"Impossible de charger le modèle {self.model}: {e}")
             return False
     
-    def generate_response(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None) -> str:
-        """Génère une réponse avec le LLM"""
-        # Construire le prompt complet
-        full_prompt = self._build_prompt(prompt, context, user_name)
+    def _build_payload(self, prompt: str, stream: bool, system: Optional[str] = None,
+                       conversation: Optional[ConversationState] = None) -> Dict[str, Any]:
+        """
+        Préparer la requête avec des paramètres optimisés
         
-        # Préparer la requête avec des paramètres optimisés
+        Premier tour : instructions fixes dans system. Tours suivants : tokens
+        de la conversation dans context (ils contiennent déjà les instructions).
+        """
         payload = {
             "model": self.model,
-            "prompt": full_prompt,
-            "stream": False,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
             "options": {
                 "temperature": 0.3,  # Réduire pour des réponses plus cohérentes
                 "top_p": 0.8,        # Réduire pour plus de précision
-                "num_predict": 1000,  # Augmenter la limite de réponse
-                "repeat_penalty": 1.1
+                "num_predict": NUM_PREDICT,  # Augmenter la limite de réponse
+                "repeat_penalty": 1.1,
+                "num_ctx": self.num_ctx
             }
         }
+        if conversation is not None and conversation.tokens:
+            payload["context"] = conversation.tokens
+        elif system:
+            payload["system"] = system
+        return payload
+    
+    def _record_stats(self, start: float, first_token: Optional[float], chunks: int,
+                      final: Dict[str, Any], trace: Optional[Trace] = None) -> GenerationStats:
+        """Enregistrer TTFT et débit d'une génération (compteurs Ollama si présents, et dans la trace)"""
+        end = time.perf_counter()
+        first_token = first_token if first_token is not None else end
+        tokens = final.get("eval_count", chunks)
+        eval_seconds = final.get("eval_duration", 0) / 1e9
+        if not eval_seconds:
+            eval_seconds = end - first_token
+        
+        stats = GenerationStats(
+            ttft=first_token - start,
+            total_time=end - start,
+            tokens=tokens,
+            tokens_per_second=tokens / eval_seconds if eval_seconds > 0 else 0.0,
+            prompt_tokens=final.get("prompt_eval_count", 0),
+            prompt_eval_time=final.get("prompt_eval_duration", 0) / 1e9
+        )
+        self.last_stats = stats
+        logger.info(
+            f"Génération: TTFT {stats.ttft:.2f}s, {tokens} tokens, "
+            f"{stats.tokens_per_second:.1f} tokens/s"
+        )
+        if trace is not None:
+            trace.add_generation(stats, final, start)
+        return stats
+    
+    def _request(self, payload: Dict[str, Any], trace: Optional[Trace] = None) -> Dict[str, Any]:
+        """Envoyer une génération complète à Ollama (les erreurs sont levées)"""
+        start = time.perf_counter()
+        response = self.session.post(
+            f"{self.base_url}/api/generate",
+            json=payload,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        self._record_stats(start, None, 1, data, trace)
+        return data
+    
+    def _request_stream(self, payload: Dict[str, Any], trace: Optional[Trace] = None) -> Iterator[str]:
+        """
+        Envoyer une génération en flux à Ollama (les erreurs sont levées)
+        
+        Produit les fragments de texte et renvoie (StopIteration.value) la
+        dernière ligne d'Ollama, qui porte les compteurs et le contexte.
+        """
+        start = time.perf_counter()
+        first_token = None
+        chunks = 0
+        final: Dict[str, Any] = {}
+        with self.session.post(
+            f"{self.base_url}/api/generate",
+            json=payload,
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                token = data.get("response", "")
+                if token:
+                    if first_token is None:
+                        # Le début de la réponse est sans espaces, comme generate_response
+                        token = token.lstrip()
+                        if not token:
+                            continue
+                        first_token = time.perf_counter()
+                    chunks += 1
+                    yield token
+                if data.get("done"):
+                    final = data
+                    break
+        if not final:
+            raise RuntimeError("flux interrompu avant la fin de la génération")
+        self._record_stats(start, first_token, chunks, final, trace)
+        return final
+    
+    def generate_response(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                          conversation: Optional[ConversationState] = None, trace: Optional[Trace] = None) -> str:
+        """
+        Génère une réponse avec le LLM
+        
+        Args:
+            prompt: Question
+            context: Documents internes retrouvés
+            user_name: Nom de l'utilisateur qui pose la question
+            conversation: État de la conversation, mis à jour avec les tokens évalués
+            trace: Trace de la question (construction du prompt, génération)
+        """
+        with traced(trace, "prompt_build"):
+            payload = self._build_payload(
+                self._build_prompt(prompt, context, user_name), stream=False,
+                system=self._system_prompt(context), conversation=conversation
+            )
         
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
+            data = self._request(payload, trace)
+            if conversation is not None:
+                conversation.update(data.get("context"))
+            return generated_text(data)
+        except requests.exceptions.Timeout:
+            logger.error("Timeout lors de la génération de la réponse")
+            return TIMEOUT_ANSWER
+        except Exception as e:
+            logger.error(f"Erreur: {e}")
+            return ErrorAnswer(f"Erreur: {str(e)}")
+    
+    def generate_stream(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                        conversation: Optional[ConversationState] = None,
+                        trace: Optional[Trace] = None) -> Iterator[str]:
+        """
+        Génère une réponse en flux : les tokens sont produits dès leur arrivée
+        
+        Ollama renvoie une ligne JSON (NDJSON) par token ; la dernière ligne
+        ("done": true) porte les compteurs eval_count/eval_duration. Le timeout
+        s'applique entre deux lignes, pas à la réponse complète. Les mesures
+        (TTFT, tokens/s) sont dans trace.generation une fois le flux consommé
+        (last_stats est partagé par toutes les requêtes du client).
+        
+        Yields:
+            Fragments de texte de la réponse
+        
+        Raises:
+            GenerationError: si la génération n'est pas allée jusqu'au bout
+        """
+        with traced(trace, "prompt_build"):
+            payload = self._build_payload(
+                self._build_prompt(prompt, context, user_name), stream=True,
+                system=self._system_prompt(context), conversation=conversation
             )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("response", "Erreur lors de la génération").strip()
+        
+        try:
+            final = yield from self._request_stream(payload, trace)
+            if conversation is not None:
+                conversation.update(final.get("context"))
         except requests.exceptions.Timeout:
             logger.error("Timeout lors de la génération de la réponse")
-            return "Délai d'attente dépassé. Veuillez réessayer."
+            raise GenerationError(TIMEOUT_ANSWER)
         except Exception as e:
             logger.error(f"Erreur: {e}")
-            return f"Erreur: {str(e)}"
+            raise GenerationError(f"Erreur: {str(e)}") from e
+    
+    @staticmethod
+    def _system_prompt(context: Optional[str]) -> str:
+        """Instructions fixes (champ system), selon qu'il y a des documents ou non"""
+        return SYSTEM_PROMPT if context else SYSTEM_PROMPT_NO_CONTEXT
     
     def _build_prompt(self, question: str, context: Optional[str], user_name: Optional[str] = None) -> str:
-        """Construire le prompt avec le contexte"""
+        """
+        Construire la partie variable du prompt (documents, utilisateur, question)
         
-        # Ajouter le nom d'utilisateur à l'instruction
-        user_context = ""
-        if user_name:
-            user_context = f"\n- L'utilisateur qui pose la question est: {user_name}. Ne confonds PAS ce nom avec les noms mentionnés dans les documents."
+        Les instructions sont dans le champ system (voir SYSTEM_PROMPT) : le
+        prompt évalué commence toujours par le même préfixe.
+        """
+        user_context = f"UTILISATEUR: {user_name}\n" if user_name else ""
         
         if context:
-            return f"""Tu es un assistant IA interne d'entreprise. Réponds en français en utilisant uniquement les informations des documents fournis.
-
-DOCUMENTS INTERNES:
+            return f"""DOCUMENTS INTERNES:
 {context}
 
-QUESTION: {question}
-
-INSTRUCTIONS:
-- Réponds uniquement en français
-- Utilise uniquement les informations des documents ci-dessus
-- Donne une réponse complète et détaillée
-- Si l'information n'est pas dans les documents, réponds: "Je ne trouve pas cette information dans les documents internes disponibles."
-- Sois précis et cite les sources quand c'est possible
-- Réponds de manière professionnelle et utile
-- Ne mentionne JAMAIS les noms des personnes trouvés dans les documents dans ta réponse{user_context}
+{user_context}QUESTION: {question}
 
 RÉPONSE:"""
         else:
-            user_context = ""
-            if user_name:
-                user_context = f"\n\nL'utilisateur qui pose la question est: {user_name}."
-            
-            return f"""Tu es un assistant IA interne d'entreprise. Réponds en français.{user_context}
-
-QUESTION: {question}
+            return f"""{user_context}QUESTION: {question}
 
 RÉPONSE:"""
-
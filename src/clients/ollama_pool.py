@@ -0,0 +1,298 @@
+"""
+Répartition des générations sur plusieurs serveurs Ollama
+
+Chaque requête part vers le serveur sain dont la fin de traitement estimée
+est la plus proche : (générations en cours + 1) × latence moyenne (moyenne
+mobile exponentielle). Un serveur jamais mesuré reçoit la meilleure latence
+des autres.
+
+Santé des serveurs :
+- passive : une erreur de connexion écarte le serveur pendant eject_seconds
+  (après max_failures échecs consécutifs) et la requête bascule sur un autre ;
+- active : un thread interroge régulièrement tous les serveurs (/api/tags)
+  et réintègre ceux qui répondent de nouveau.
+
+Une génération en flux ne bascule que si la connexion échoue avant le
+premier token (sinon la réponse serait produite deux fois).
+"""
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import logging
+
+import requests
+
+from src.clients.ollama_client import (
+    ConversationState, ErrorAnswer, GenerationError, GenerationStats, OllamaClient, TIMEOUT_ANSWER, generated_text
+)
+from src.core.config import OLLAMA_BASE_URLS, OLLAMA_HEALTH_TTL, OLLAMA_POOL_SIZE
+from src.core.tracing import Trace, traced
+
+logger = logging.getLogger(__name__)
+
+NO_ENDPOINT_ANSWER = ErrorAnswer("Erreur: aucun serveur Ollama disponible")
+
+
+class _Endpoint:
+    """Un serveur Ollama et ses mesures"""
+
+    def __init__(self, client: OllamaClient):
+        self.client = client
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # Moyenne mobile de la durée d'une requête (s)
+        self.healthy = True
+        self.failures = 0                     # Échecs de connexion consécutifs
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.failovers = 0                    # Requêtes basculées vers un autre serveur
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.client.base_url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency_ewma": self.latency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "failovers": self.failovers
+        }
+
+
+class OllamaClientPool:
+    """
+    Client Ollama réparti sur plusieurs serveurs (même interface qu'OllamaClient)
+    """
+
+    def __init__(self, base_urls: Optional[Sequence[str]] = None, pool_size: int = OLLAMA_POOL_SIZE,
+                 health_interval: float = OLLAMA_HEALTH_TTL, eject_seconds: float = OLLAMA_HEALTH_TTL,
+                 max_failures: int = 1, ewma_alpha: float = 0.3, active_checks: bool = True):
+        """
+        Args:
+            base_urls: URLs des serveurs (OLLAMA_BASE_URLS, sinon le serveur par défaut)
+            pool_size: Connexions persistantes par serveur
+            health_interval: Intervalle des tests de connexion actifs (secondes)
+            eject_seconds: Durée d'exclusion d'un serveur après des erreurs de connexion
+            max_failures: Échecs de connexion consécutifs avant exclusion
+            ewma_alpha: Poids de la dernière mesure dans la latence moyenne
+            active_checks: Lancer le thread de tests de connexion
+        """
+        urls = list(base_urls or OLLAMA_BASE_URLS) or [None]
+        self.endpoints = [_Endpoint(OllamaClient(base_url=url, pool_size=pool_size)) for url in urls]
+        self.health_interval = health_interval
+        self.eject_seconds = eject_seconds
+        self.max_failures = max_failures
+        self.ewma_alpha = ewma_alpha
+        self.last_stats: Optional[GenerationStats] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        if active_checks:
+            self._health_thread = threading.Thread(target=self._health_loop, name="ollama-pool-health", daemon=True)
+            self._health_thread.start()
+
+    # Paramètres communs, appliqués à tous les serveurs
+    @property
+    def model(self) -> str:
+        return self.endpoints[0].client.model
+
+    @model.setter
+    def model(self, value: str):
+        for endpoint in self.endpoints:
+            endpoint.client.model = value
+
+    @property
+    def base_url(self) -> str:
+        return ",".join(endpoint.client.base_url for endpoint in self.endpoints)
+
+    def _choose(self, exclude: List[_Endpoint]) -> Optional[_Endpoint]:
+        """Serveur disponible le moins chargé, réservé pour une requête (verrou pris ici)"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            available = [endpoint for endpoint in candidates
+                         if endpoint.healthy or endpoint.ejected_until <= now]
+            if not available:
+                return None
+
+            # Serveur jamais mesuré : crédité de la meilleure latence connue, et
+            # préféré à égalité pour être mesuré à son tour
+            known = [endpoint.latency for endpoint in self.endpoints if endpoint.latency is not None]
+            default_latency = min(known) if known else 1.0
+            chosen = min(available, key=lambda endpoint: (
+                (endpoint.in_flight + 1) * (endpoint.latency if endpoint.latency is not None else default_latency),
+                endpoint.in_flight,
+                endpoint.latency is not None
+            ))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def _succeeded(self, endpoint: _Endpoint, duration: float):
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.failures = 0
+            endpoint.healthy = True
+            endpoint.latency = duration if endpoint.latency is None \
+                else (1 - self.ewma_alpha) * endpoint.latency + self.ewma_alpha * duration
+            self.last_stats = endpoint.client.last_stats
+
+    def _failed(self, endpoint: _Endpoint, error: Exception, connection: bool):
+        """Erreur sur un serveur ; une erreur de connexion compte pour son exclusion"""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.errors += 1
+            if not connection:
+                return
+            endpoint.failures += 1
+            endpoint.failovers += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.healthy = False
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        logger.warning(f"Serveur Ollama {endpoint.client.base_url} injoignable ({error}), bascule")
+
+    def check_health(self) -> List[bool]:
+        """Tester tous les serveurs maintenant (test actif)"""
+        results = []
+        for endpoint in self.endpoints:
+            healthy = endpoint.client._probe()
+            with self._lock:
+                endpoint.healthy = healthy
+                if healthy:
+                    endpoint.failures = 0
+                    endpoint.ejected_until = 0.0
+                else:
+                    endpoint.ejected_until = time.monotonic() + self.eject_seconds
+            results.append(healthy)
+        return results
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def check_connection(self, force: bool = False) -> bool:
+        """Au moins un serveur est-il accessible ?"""
+        if force or all(endpoint.client._healthy is None for endpoint in self.endpoints):
+            return any(self.check_health())
+        with self._lock:
+            return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def warm_up(self) -> bool:
+        """Charger le modèle sur tous les serveurs"""
+        return any([endpoint.client.warm_up() for endpoint in self.endpoints])
+
+    def close(self):
+        """Arrêter les tests de connexion et fermer les connexions"""
+        self._stop.set()
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    def _payload(self, prompt: str, context: Optional[str], user_name: Optional[str], stream: bool,
+                 conversation: Optional[ConversationState]) -> Dict[str, Any]:
+        client = self.endpoints[0].client
+        return client._build_payload(
+            client._build_prompt(prompt, context, user_name), stream=stream,
+            system=client._system_prompt(context), conversation=conversation
+        )
+
+    def generate_response(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                          conversation: Optional[ConversationState] = None, trace: Optional[Trace] = None) -> str:
+        """Génère une réponse sur le serveur le moins chargé (bascule si injoignable)"""
+        with traced(trace, "prompt_build"):
+            payload = self._payload(prompt, context, user_name, False, conversation)
+        tried: List[_Endpoint] = []
+
+        while True:
+            endpoint = self._choose(tried)
+            if endpoint is None:
+                logger.error(NO_ENDPOINT_ANSWER)
+                return NO_ENDPOINT_ANSWER
+            tried.append(endpoint)
+
+            start = time.perf_counter()
+            try:
+                data = endpoint.client._request(payload, trace)
+            except requests.exceptions.ConnectionError as e:
+                self._failed(endpoint, e, connection=True)
+                continue
+            except requests.exceptions.Timeout as e:
+                self._failed(endpoint, e, connection=False)
+                logger.error("Timeout lors de la génération de la réponse")
+                return TIMEOUT_ANSWER
+            except Exception as e:
+                self._failed(endpoint, e, connection=False)
+                logger.error(f"Erreur: {e}")
+                return ErrorAnswer(f"Erreur: {str(e)}")
+
+            self._succeeded(endpoint, time.perf_counter() - start)
+            if trace is not None:
+                trace.set(endpoint=endpoint.client.base_url)
+            if conversation is not None:
+                conversation.update(data.get("context"))
+            return generated_text(data)
+
+    def generate_stream(self, prompt: str, context: Optional[str] = None, user_name: Optional[str] = None,
+                        conversation: Optional[ConversationState] = None,
+                        trace: Optional[Trace] = None) -> Iterator[str]:
+        """
+        Génère une réponse en flux sur le serveur le moins chargé (bascule avant le premier token)
+        
+        Raises:
+            GenerationError: si la génération n'est pas allée jusqu'au bout
+        """
+        with traced(trace, "prompt_build"):
+            payload = self._payload(prompt, context, user_name, True, conversation)
+        tried: List[_Endpoint] = []
+
+        while True:
+            endpoint = self._choose(tried)
+            if endpoint is None:
+                logger.error(NO_ENDPOINT_ANSWER)
+                raise GenerationError(NO_ENDPOINT_ANSWER)
+            tried.append(endpoint)
+
+            start = time.perf_counter()
+            tokens = endpoint.client._request_stream(payload, trace)
+            started = False
+            try:
+                try:
+                    first = next(tokens)
+                except StopIteration as stop:
+                    final = stop.value or {}
+                else:
+                    started = True
+                    yield first
+                    final = yield from tokens
+            except requests.exceptions.ConnectionError as e:
+                self._failed(endpoint, e, connection=not started)
+                if not started:
+                    continue
+                logger.error(f"Erreur: {e}")
+                raise GenerationError(f"Erreur: {str(e)}") from e
+            except requests.exceptions.Timeout as e:
+                self._failed(endpoint, e, connection=False)
+                logger.error("Timeout lors de la génération de la réponse")
+                raise GenerationError(TIMEOUT_ANSWER)
+            except GeneratorExit:
+                # Flux abandonné par le lecteur
+                tokens.close()
+                with self._lock:
+                    endpoint.in_flight -= 1
+                raise
+            except Exception as e:
+                self._failed(endpoint, e, connection=False)
+                logger.error(f"Erreur: {e}")
+                raise GenerationError(f"Erreur: {str(e)}") from e
+
+            self._succeeded(endpoint, time.perf_counter() - start)
+            if trace is not None:
+                trace.set(endpoint=endpoint.client.base_url)
+            if conversation is not None:
+                conversation.update(final.get("context"))
+            return
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Mesures par serveur (santé, requêtes en cours, latence moyenne, erreurs, bascules)"""
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -2,11 +2,14 @@
 Package core - Modules de base (auth, config)
 """
 from src.core.auth import SimpleAuth
+from src.core.sessions import SessionTokens, create_session_tokens
+from src.core.tracing import Trace, TraceSink, LogSink, JsonlSink, OpenTelemetrySink, create_sink
 from src.core.config import (
     BASE_DIR,
     DATA_DIR,
     CHROMA_DB_DIR,
     LOGS_DIR,
+    CACHE_DIR,
     STREAMLIT_PORT,
     STREAMLIT_HOST,
     CHROMA_COLLECTION_NAME,
@@ -14,14 +17,74 @@ from src.core.config import (
     EMBEDDING_MODEL,
     OLLAMA_BASE_URL,
     OLLAMA_MODEL,
+    OLLAMA_BASE_URLS,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_HEALTH_TTL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX,
+    OLLAMA_MAX_CONCURRENCY,
+    LLM_QUEUE_SIZE,
+    LLM_QUEUE_TIMEOUT,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_CANDIDATES,
+    CONTEXT_TOKEN_SCALE,
+    DocumentLimits,
+    DOCUMENT_LIMITS,
+    PDF_BACKEND,
+    EXTRACTION_CACHE_DIR,
+    EXTRACTION_CACHE_MAX_MB,
+    DEDUP_THRESHOLD,
+    DEDUP_ACTION,
+    DEDUP_INDEX_PATH,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_HOURS,
+    RELEVANCE_MIN_TOP_SCORE,
+    RELEVANCE_MIN_AVG_SCORE,
+    RELEVANCE_AVG_TOP_K,
+    RELEVANCE_GATE_PATH,
+    CV_INDEX_PATH,
+    CV_LIST_LIMIT,
+    INGEST_DB_PATH,
+    INGEST_STAGING_DIR,
+    INGEST_EMBED_BATCH,
+    INGEST_LEASE_SECONDS,
+    API_HOST,
+    API_PORT,
+    API_WORKERS,
+    API_THREADS,
+    API_URL,
+    SECRET_KEY,
+    SECRET_KEY_PATH,
+    JWT_ALGORITHM,
+    JWT_EXPIRATION_HOURS,
+    SESSION_CACHE_SIZE,
+    SESSION_COOKIE_URL,
+    USERS_DB_PATH,
+    HISTORY_MAX_TURNS,
+    HISTORY_MAX_BYTES,
+    HISTORY_SUMMARY_CHARS,
+    HISTORY_DB_PATH,
+    TRACE_SINK,
+    TRACE_PATH,
 )
 
 __all__ = [
     'SimpleAuth',
+    'SessionTokens',
+    'create_session_tokens',
+    'Trace',
+    'TraceSink',
+    'LogSink',
+    'JsonlSink',
+    'OpenTelemetrySink',
+    'create_sink',
     'BASE_DIR',
     'DATA_DIR',
     'CHROMA_DB_DIR',
     'LOGS_DIR',
+    'CACHE_DIR',
     'STREAMLIT_PORT',
     'STREAMLIT_HOST',
     'CHROMA_COLLECTION_NAME',
@@ -29,5 +92,56 @@ __all__ = [
     'EMBEDDING_MODEL',
     'OLLAMA_BASE_URL',
     'OLLAMA_MODEL',
+    'OLLAMA_BASE_URLS',
+    'OLLAMA_POOL_SIZE',
+    'OLLAMA_HEALTH_TTL',
+    'OLLAMA_KEEP_ALIVE',
+    'OLLAMA_NUM_CTX',
+    'OLLAMA_MAX_CONCURRENCY',
+    'LLM_QUEUE_SIZE',
+    'LLM_QUEUE_TIMEOUT',
+    'CONTEXT_TOKEN_BUDGET',
+    'CONTEXT_CANDIDATES',
+    'CONTEXT_TOKEN_SCALE',
+    'DocumentLimits',
+    'DOCUMENT_LIMITS',
+    'PDF_BACKEND',
+    'EXTRACTION_CACHE_DIR',
+    'EXTRACTION_CACHE_MAX_MB',
+    'DEDUP_THRESHOLD',
+    'DEDUP_ACTION',
+    'DEDUP_INDEX_PATH',
+    'ANSWER_CACHE_PATH',
+    'ANSWER_CACHE_THRESHOLD',
+    'ANSWER_CACHE_MAX_ENTRIES',
+    'ANSWER_CACHE_TTL_HOURS',
+    'RELEVANCE_MIN_TOP_SCORE',
+    'RELEVANCE_MIN_AVG_SCORE',
+    'RELEVANCE_AVG_TOP_K',
+    'RELEVANCE_GATE_PATH',
+    'CV_INDEX_PATH',
+    'CV_LIST_LIMIT',
+    'INGEST_DB_PATH',
+    'INGEST_STAGING_DIR',
+    'INGEST_EMBED_BATCH',
+    'INGEST_LEASE_SECONDS',
+    'API_HOST',
+    'API_PORT',
+    'API_WORKERS',
+    'API_THREADS',
+    'API_URL',
+    'SECRET_KEY',
+    'SECRET_KEY_PATH',
+    'JWT_ALGORITHM',
+    'JWT_EXPIRATION_HOURS',
+    'SESSION_CACHE_SIZE',
+    'SESSION_COOKIE_URL',
+    'USERS_DB_PATH',
+    'HISTORY_MAX_TURNS',
+    'HISTORY_MAX_BYTES',
+    'HISTORY_SUMMARY_CHARS',
+    'HISTORY_DB_PATH',
+    'TRACE_SINK',
+    'TRACE_PATH',
 ]
 
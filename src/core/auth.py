@@ -1,54 +1,143 @@
 """
 Système d'authentification simple
+
+La connexion produit un jeton de session signé (src/core/sessions.py),
+gardé dans un cookie (SameSite=Strict, Secure en HTTPS, jamais dans l'URL :
+ni journaux nginx, ni historique, ni en-tête Referer) : une page rechargée ou
+une reconnexion servie par un autre réplica retrouve la session en vérifiant
+le jeton, sans état partagé. Les comptes (UserStore) et la clé de signature
+sont chargés une fois par processus.
+
+Streamlit 1.28 n'écrit pas de cookie : un composant HTML invisible le fait
+poser, et il est relu dans les en-têtes de la connexion WebSocket.
+
+Limites :
+    - Avec SESSION_COOKIE_URL (route /session de l'API servie sur la même
+      origine, ex. /api/session derrière nginx), le composant envoie le jeton
+      à l'API qui pose un cookie HttpOnly : les scripts de la page ne peuvent
+      plus le lire, mais le jeton passe une fois par le script du composant.
+    - Sans SESSION_COOKIE_URL (développement, Streamlit seul), le cookie est
+      écrit en JavaScript et ne peut pas être HttpOnly : tout script de la
+      page (extension, XSS) peut le lire. Sa durée (JWT_EXPIRATION_HOURS,
+      8 h par défaut) limite l'usage d'un jeton volé, qui reste valable
+      jusqu'à son expiration même après une déconnexion.
 """
+import json
+from http.cookies import CookieError, SimpleCookie
+
 import streamlit as st
-import hashlib
+import streamlit.components.v1 as components
 from typing import Optional, Dict
 
+from src.core.sessions import SESSION_COOKIE, SessionTokens, create_session_tokens
+from src.storage.user_store import UserStore
+
+
+@st.cache_resource
+def get_user_store() -> UserStore:
+    """Comptes utilisateurs, lus une fois par processus"""
+    from src.core.config import USERS_DB_PATH
+    return UserStore(USERS_DB_PATH)
+
+
+@st.cache_resource
+def get_session_tokens() -> SessionTokens:
+    """Clé de signature et jetons vérifiés, partagés par toutes les sessions du processus"""
+    return create_session_tokens()
+
+
 class SimpleAuth:
     """Système d'authentification basique avec Streamlit"""
     
-    def __init__(self):
-        # Utilisateurs par défaut (en production, utiliser une vraie base de données)
-        # Format: {username: {password_hash, name, role}}
-        self.users = {
-            "admin": {
-                "password_hash": self._hash_password("admin123"),
-                "name": "Administrateur",
-                "role": "admin"
-            },
-            "user": {
-                "password_hash": self._hash_password("user123"),
-                "name": "Utilisateur Standard",
-                "role": "user"
-            }
-        }
+    def __init__(self, user_store: Optional[UserStore] = None, tokens: Optional[SessionTokens] = None):
+        """
+        Args:
+            user_store: Comptes utilisateurs (get_user_store() si None)
+            tokens: Jetons de session (get_session_tokens() si None)
+        """
+        self.user_store = user_store if user_store is not None else get_user_store()
+        self.tokens = tokens if tokens is not None else get_session_tokens()
     
-    def _hash_password(self, password: str) -> str:
-        """Hasher un mot de passe avec SHA256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    @property
+    def users(self) -> Dict[str, Dict]:
+        """Comptes : {username: {password_hash, name, role}}"""
+        return self.user_store.users
     
     def authenticate(self, username: str, password: str) -> bool:
         """Authentifier un utilisateur"""
-        if username in self.users:
-            password_hash = self._hash_password(password)
-            if self.users[username]["password_hash"] == password_hash:
-                return True
-        return False
+        return self.user_store.authenticate(username, password)
     
     def get_user_info(self, username: str) -> Optional[Dict]:
         """Obtenir les informations d'un utilisateur"""
-        if username in self.users:
-            return {
-                "username": username,
-                "name": self.users[username]["name"],
-                "role": self.users[username]["role"]
-            }
-        return None
+        return self.user_store.get_user_info(username)
+    
+    @staticmethod
+    def _cookie_token() -> Optional[str]:
+        """Jeton du cookie envoyé à l'ouverture de la connexion WebSocket"""
+        try:
+            from streamlit.web.server.websocket_headers import _get_websocket_headers
+            headers = _get_websocket_headers() or {}
+            cookie = SimpleCookie(headers.get("Cookie", ""))
+        except (CookieError, RuntimeError, ImportError):
+            return None
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel.value if morsel is not None and morsel.value else None
+    
+    @staticmethod
+    def _write_cookie(token: str, max_age: int):
+        """Poser (ou effacer, max_age=0) le cookie de session dans le navigateur"""
+        from src.core.config import SESSION_COOKIE_URL
+        if SESSION_COOKIE_URL:
+            # Cookie HttpOnly posé (POST) ou effacé (DELETE) par l'API sur la même origine
+            method = "POST" if max_age > 0 else "DELETE"
+            headers = {"Authorization": f"Bearer {token}"} if max_age > 0 else {}
+            components.html(
+                f"<script>window.parent.fetch({json.dumps(SESSION_COOKIE_URL)}, "
+                f"{{method: {json.dumps(method)}, headers: {json.dumps(headers)}, "
+                "credentials: 'same-origin'});</script>",
+                height=0
+            )
+            return
+        components.html(
+            "<script>window.parent.document.cookie = "
+            f"{json.dumps(f'{SESSION_COOKIE}={token}; path=/; max-age={max_age}; SameSite=Strict')}"
+            " + (window.parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+            height=0
+        )
+    
+    def _session_token(self) -> Optional[str]:
+        """Jeton de la session Streamlit, sinon celui du cookie (sauf s'il a été déconnecté)"""
+        token = st.session_state.get("session_token")
+        if token is None:
+            token = self._cookie_token()
+            if token is not None and token == st.session_state.get("revoked_token"):
+                return None
+        return token
+    
+    def _clear_session(self):
+        for key in ("authenticated", "username", "user_info", "session_token", "cookie_written"):
+            if key in st.session_state:
+                del st.session_state[key]
     
     def is_authenticated(self) -> bool:
-        """Vérifier si l'utilisateur est authentifié dans la session"""
-        return "authenticated" in st.session_state and st.session_state["authenticated"]
+        """Vérifier le jeton de session (signature et expiration, sans état serveur)"""
+        if st.session_state.pop("clear_cookie", False):
+            self._write_cookie("", 0)
+        token = self._session_token()
+        user_info = self.tokens.verify(token)
+        if user_info is None:
+            self._clear_session()
+            return False
+        st.session_state["authenticated"] = True
+        st.session_state["username"] = user_info["username"]
+        st.session_state["user_info"] = user_info
+        st.session_state["session_token"] = token
+        # Cookie posé une fois par session, au premier affichage après la connexion
+        if not st.session_state.get("cookie_written"):
+            if self._cookie_token() != token:
+                self._write_cookie(token, int(self.tokens.expiration_hours * 3600))
+            st.session_state["cookie_written"] = True
+        return True
     
     def login_page(self):
         """Afficher la page de connexion"""
@@ -77,10 +166,13 @@ class SimpleAuth:
             
             if submit:
                 if self.authenticate(username, password):
-                    # Sauvegarder dans la session
+                    # Jeton signé : valable sur tous les réplicas jusqu'à son expiration
+                    user_info = self.get_user_info(username)
+                    token = self.tokens.issue(user_info)
                     st.session_state["authenticated"] = True
                     st.session_state["username"] = username
-                    st.session_state["user_info"] = self.get_user_info(username)
+                    st.session_state["user_info"] = user_info
+                    st.session_state["session_token"] = token
                     
                     st.success(f"✅ Bienvenue, {st.session_state['user_info']['name']} !")
                     st.rerun()
@@ -98,13 +190,10 @@ class SimpleAuth:
             """)
     
     def logout(self):
-        """Déconnecter l'utilisateur"""
-        if "authenticated" in st.session_state:
-            del st.session_state["authenticated"]
-        if "username" in st.session_state:
-            del st.session_state["username"]
-        if "user_info" in st.session_state:
-            del st.session_state["user_info"]
+        """Déconnecter l'utilisateur (cookie effacé ; le jeton n'est plus accepté par cette session)"""
+        st.session_state["revoked_token"] = st.session_state.get("session_token")
+        self._clear_session()
+        st.session_state["clear_cookie"] = True
         st.rerun()
     
     def require_auth(self):
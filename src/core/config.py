@@ -2,6 +2,7 @@
 Configuration de l'application
 """
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
 # Chemins
@@ -9,6 +10,7 @@ BASE_DIR = Path(__file__).parent.parent.parent  # Racine du projet
 DATA_DIR = BASE_DIR / "data"
 CHROMA_DB_DIR = BASE_DIR / "chroma_db"
 LOGS_DIR = BASE_DIR / "logs"
+CACHE_DIR = BASE_DIR / "cache"
 
 # Configuration Streamlit
 STREAMLIT_PORT = 8501
@@ -25,6 +27,151 @@ EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "llama3:8b"
 
+# Plusieurs serveurs Ollama (URLs séparées par des virgules) : les requêtes sont
+# réparties sur le moins chargé ; vide = un seul serveur (OLLAMA_BASE_URL)
+OLLAMA_BASE_URLS = [url.strip() for url in os.getenv("OLLAMA_BASE_URLS", "").split(",") if url.strip()]
+
+# Ollama : connexions HTTP persistantes (keep-alive) et cache du test de connexion
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "30"))
+
+# Ollama : durée pendant laquelle le modèle reste chargé après une requête
+# (ex. "30m", "-1" = toujours) et taille de la fenêtre de contexte (tokens) :
+# assez grande pour garder le tour précédent d'une conversation en plus du
+# contexte et de la réponse (voir KnowledgeAgent.conversation)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+
+# Générations envoyées simultanément à Ollama (les autres attendent)
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+
+# File d'attente devant le LLM : nombre maximal de questions en attente et
+# attente maximale (s) avant de répondre « service surchargé »
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "20"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+
+# Contexte du LLM : budget en tokens (pris sur OLLAMA_NUM_CTX, avec
+# ~200 pour les instructions et jusqu'à num_predict pour la réponse), nombre de
+# chunks candidats retrouvés, et facteur de calibration de l'estimation des tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "5"))
+CONTEXT_TOKEN_SCALE = float(os.getenv("CONTEXT_TOKEN_SCALE", "1.0"))
+
+
+@dataclass(frozen=True)
+class DocumentLimits:
+    """
+    Limites appliquées à chaque document (config.env)
+    
+    - max_document_size_mb : taille maximale du fichier, vérifiée avant lecture.
+      Borne la mémoire brute (fichier + objets du parseur PDF/Word) et rejette
+      immédiatement les uploads trop gros, sans coût d'extraction.
+    - max_chunk_size : nombre maximal de mots par chunk. Borne la taille d'un
+      texte envoyé au modèle d'embeddings et la longueur du contexte LLM.
+    - max_chunks_per_document : nombre maximal de chunks conservés. L'extraction
+      s'arrête dès que max_chunk_size * max_chunks_per_document mots sont lus :
+      la mémoire, le temps d'embedding et la taille de l'index par document
+      sont bornés et linéaires en cette valeur.
+    """
+    max_document_size_mb: float = 50
+    max_chunk_size: int = 1000
+    max_chunks_per_document: int = 100
+    
+    @property
+    def max_document_bytes(self) -> int:
+        """Taille maximale d'un document en octets"""
+        return int(self.max_document_size_mb * 1024 * 1024)
+    
+    @classmethod
+    def from_env(cls) -> "DocumentLimits":
+        """Charger les limites depuis les variables d'environnement"""
+        return cls(
+            max_document_size_mb=float(os.getenv("MAX_DOCUMENT_SIZE_MB", cls.max_document_size_mb)),
+            max_chunk_size=int(os.getenv("MAX_CHUNK_SIZE", cls.max_chunk_size)),
+            max_chunks_per_document=int(os.getenv("MAX_CHUNKS_PER_DOCUMENT", cls.max_chunks_per_document)),
+        )
+
+
+# Limites des documents
+DOCUMENT_LIMITS = DocumentLimits.from_env()
+
+# Extraction PDF : "auto" (le plus rapide installé) ou liste ordonnée, ex. "pypdfium2,PyPDF2"
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+
+# Cache des extractions (clé : SHA-256 du fichier + extracteur + découpage)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", str(CACHE_DIR / "extractions"))
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "500"))
+
+# Quasi-doublons (MinHash/LSH) : seuil de Jaccard et action "flag" (signaler) ou "skip" (écarter)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_ACTION = os.getenv("DEDUP_ACTION", "flag")
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", str(CACHE_DIR / "dedup_index.sqlite"))
+
+# Cache sémantique des réponses : similarité cosinus minimale entre questions,
+# taille maximale (LRU) et durée de vie ; 0 entrée = désactivé
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", str(CACHE_DIR / "answers.sqlite"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24"))
+
+# Filtre de pertinence : sans chunk assez proche de la question (meilleur score,
+# moyenne des RELEVANCE_AVG_TOP_K meilleurs), réponse directe sans appel au LLM ;
+# seuils calibrés sur des questions étiquetées relus depuis RELEVANCE_GATE_PATH
+RELEVANCE_MIN_TOP_SCORE = float(os.getenv("RELEVANCE_MIN_TOP_SCORE", "0.3"))
+RELEVANCE_MIN_AVG_SCORE = float(os.getenv("RELEVANCE_MIN_AVG_SCORE", "0.2"))
+RELEVANCE_AVG_TOP_K = int(os.getenv("RELEVANCE_AVG_TOP_K", "3"))
+RELEVANCE_GATE_PATH = os.getenv("RELEVANCE_GATE_PATH", str(CACHE_DIR / "relevance_gate.json"))
+
+# Index structuré des CV (poste, technologies, expérience, ville, langages) :
+# fichier SQLite (vide = désactivé) et nombre maximal de CV listés par réponse
+CV_INDEX_PATH = os.getenv("CV_INDEX_PATH", str(CACHE_DIR / "cv_index.sqlite"))
+CV_LIST_LIMIT = int(os.getenv("CV_LIST_LIMIT", "20"))
+
+# Historique des conversations : échanges gardés en mémoire (nombre, octets),
+# taille du résumé des échanges plus anciens, et fichier SQLite où les déverser
+# par utilisateur (vide = anciens échanges seulement résumés)
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "50"))
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(256 * 1024)))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "600"))
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "")
+
+# Indexation en arrière-plan : tâches (SQLite), répertoire des fichiers envoyés
+# et des résultats intermédiaires (chunks, embeddings), chunks encodés ensemble,
+# durée du bail d'un fichier en cours (renouvelé pendant son traitement ; un
+# fichier dont le bail expire, processus arrêté, est repris par un autre)
+INGEST_DB_PATH = os.getenv("INGEST_DB_PATH", str(CACHE_DIR / "ingestion.sqlite"))
+INGEST_STAGING_DIR = os.getenv("INGEST_STAGING_DIR", str(CACHE_DIR / "staging"))
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "60"))
+
+# Serveur HTTP (python -m src.api.server) : adresse, processus, threads par
+# processus pour le travail bloquant (embeddings, recherche, extraction) ; URL
+# de l'API pour l'interface Streamlit (vide = l'interface fait tout elle-même)
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_THREADS = int(os.getenv("API_THREADS", "8"))
+API_URL = os.getenv("API_URL", "").rstrip("/")
+
+# Sessions : jetons signés (JWT) vérifiés sans état partagé, valables sur tous
+# les réplicas qui ont la même clé (SECRET_KEY, sinon clé générée au premier
+# démarrage dans SECRET_KEY_PATH) ; jetons déjà vérifiés gardés en mémoire ;
+# comptes utilisateurs (SQLite), lus une fois par processus ; route de l'API
+# (même origine, derrière nginx) qui pose le cookie de session HttpOnly pour
+# l'interface (vide = cookie écrit en JavaScript, lisible par les scripts de la page)
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+SECRET_KEY_PATH = os.getenv("SECRET_KEY_PATH", str(DATA_DIR / "secret_key"))
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_EXPIRATION_HOURS = float(os.getenv("JWT_EXPIRATION_HOURS", "8"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_COOKIE_URL = os.getenv("SESSION_COOKIE_URL", "")
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", str(DATA_DIR / "users.sqlite"))
+
+# Traces des étapes de chaque question : "log" (ligne JSON dans les logs),
+# "jsonl" (fichier TRACE_PATH), "otel" (OpenTelemetry) ou "none"
+TRACE_SINK = os.getenv("TRACE_SINK", "log")
+TRACE_PATH = os.getenv("TRACE_PATH", str(LOGS_DIR / "traces.jsonl"))
+
 # Créer les répertoires
 DATA_DIR.mkdir(exist_ok=True)
 CHROMA_DB_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,134 @@
+"""
+Jetons de session signés (JWT)
+
+Le jeton porte l'utilisateur (nom, rôle) et sa date d'expiration ; il est
+signé avec SECRET_KEY, si bien que n'importe quel processus ou réplica qui
+a la même clé le vérifie seul, sans session partagée ni affinité derrière
+nginx. La clé est préparée une fois par processus et les jetons déjà
+vérifiés sont gardés en mémoire (SESSION_CACHE_SIZE) : la vérification
+d'un jeton connu ne coûte qu'une lecture de dictionnaire et une comparaison
+de dates.
+
+Sans état côté serveur, un jeton reste valable jusqu'à son expiration
+(JWT_EXPIRATION_HOURS) ; changer SECRET_KEY invalide tous les jetons.
+
+Sans SECRET_KEY, la clé du déploiement est générée au premier démarrage et
+gardée dans SECRET_KEY_PATH (volume data/ partagé par les réplicas). La clé
+d'exemple de config.env, publique, est refusée.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+
+from jose import JWTError, jwk, jwt
+
+from src.core.config import JWT_ALGORITHM, JWT_EXPIRATION_HOURS, SECRET_KEY, SECRET_KEY_PATH, SESSION_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SECRET_KEY = "your-secret-key-change-in-production"
+
+# Cookie qui porte le jeton de session de l'interface
+SESSION_COOKIE = "eka_session"
+
+
+def load_secret_key(path: str = SECRET_KEY_PATH) -> str:
+    """Clé du déploiement, créée au premier démarrage (le premier processus qui l'écrit l'emporte)"""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(secrets.token_hex(32), encoding="utf-8")
+        os.chmod(temporary, 0o600)
+        try:
+            # Lien atomique : échoue si un autre processus a déjà créé la clé
+            os.link(temporary, path)
+            logger.info(f"Clé de signature des sessions créée dans {path}")
+        except FileExistsError:
+            pass
+        finally:
+            temporary.unlink(missing_ok=True)
+    return path.read_text(encoding="utf-8").strip()
+
+
+class SessionTokens:
+    """Émission et vérification des jetons de session"""
+
+    def __init__(self, secret_key: Optional[str] = None, algorithm: str = JWT_ALGORITHM,
+                 expiration_hours: float = JWT_EXPIRATION_HOURS, cache_size: int = SESSION_CACHE_SIZE):
+        """
+        Args:
+            secret_key: Clé de signature, identique sur tous les réplicas
+                (None : SECRET_KEY, sinon la clé du déploiement, load_secret_key())
+            algorithm: Algorithme de signature (HS256...)
+            expiration_hours: Durée de validité d'un jeton
+            cache_size: Jetons vérifiés gardés en mémoire (0 = vérifier à chaque fois)
+        """
+        if secret_key is None:
+            secret_key = SECRET_KEY or load_secret_key()
+        if not secret_key or secret_key == DEFAULT_SECRET_KEY:
+            # Clé connue de tous : n'importe qui pourrait signer un jeton administrateur
+            raise ValueError("SECRET_KEY vide ou clé d'exemple publique : définir une clé secrète "
+                             "ou laisser SECRET_KEY vide pour générer celle du déploiement")
+        self.algorithm = algorithm
+        self.expiration_hours = expiration_hours
+        self.cache_size = cache_size
+        self._key = jwk.construct(secret_key, algorithm)
+
+        self._lock = threading.Lock()
+        self._verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def issue(self, user_info: Dict[str, Any]) -> str:
+        """Jeton signé pour un utilisateur ({'username', 'name', 'role'})"""
+        now = int(time.time())
+        claims = {
+            "sub": user_info["username"], "name": user_info["name"], "role": user_info["role"],
+            "iat": now, "exp": now + int(self.expiration_hours * 3600)
+        }
+        return jwt.encode(claims, self._key, algorithm=self.algorithm)
+
+    def verify(self, token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Utilisateur d'un jeton valide ({'username', 'name', 'role'}), ou None"""
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            claims = self._verified.get(token)
+            if claims is not None:
+                if claims["exp"] > now:
+                    self._verified.move_to_end(token)
+                    self.hits += 1
+                    return claims["user"]
+                del self._verified[token]
+                return None
+
+        try:
+            decoded = jwt.decode(token, self._key, algorithms=[self.algorithm])
+            user = {"username": decoded["sub"], "name": decoded["name"], "role": decoded["role"]}
+        except (JWTError, KeyError) as e:
+            logger.debug(f"Jeton de session refusé: {e}")
+            return None
+
+        with self._lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                self._verified[token] = {"user": user, "exp": decoded["exp"]}
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return user
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached": len(self._verified), "hits": self.hits, "misses": self.misses}
+
+
+def create_session_tokens() -> SessionTokens:
+    """Jetons configurés (SECRET_KEY ou SECRET_KEY_PATH, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, SESSION_CACHE_SIZE)"""
+    return SessionTokens()
@@ -0,0 +1,238 @@
+"""
+Traces des étapes du traitement d'une question
+
+Une trace regroupe les durées (spans) de chaque étape : embedding de la
+question, recherche vectorielle, construction du contexte et du prompt,
+attente dans la file du LLM, premier token et génération complète, avec les
+compteurs d'Ollama (eval_count, eval_duration, prompt_eval_duration...).
+
+Une trace terminée est exportée vers un « sink » interchangeable :
+- LogSink : une ligne JSON par question dans les logs ;
+- JsonlSink : une ligne JSON par question dans un fichier ;
+- OpenTelemetrySink : spans OpenTelemetry (si opentelemetry-api est installé),
+  envoyés par l'exporteur configuré dans l'application (OTLP, Jaeger...).
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+
+from src.core.config import TRACE_SINK, TRACE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """Étape mesurée : début relatif au début de la trace et durée (secondes)"""
+    name: str
+    start: float
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round(self.start * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            **({"attributes": self.attributes} if self.attributes else {})
+        }
+
+
+class Trace:
+    """Ensemble des étapes d'une requête"""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.duration: Optional[float] = None
+        # Mesures (GenerationStats) de la dernière génération de cette requête
+        self.generation = None
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Mesurer la durée du bloc"""
+        span = Span(name, self._now(), attributes=dict(attributes))
+        try:
+            yield span
+        finally:
+            span.duration = self._now() - span.start
+            with self._lock:
+                self.spans.append(span)
+
+    def add_span(self, name: str, duration: float, start: Optional[float] = None, **attributes) -> Span:
+        """Ajouter une étape mesurée ailleurs (par défaut, terminée maintenant)"""
+        span = Span(name, self._now() - duration if start is None else start - self._origin,
+                    duration, dict(attributes))
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def add_generation(self, stats, final: Dict[str, Any], start: float):
+        """
+        Étapes d'une génération Ollama
+
+        Args:
+            stats: GenerationStats de la génération
+            final: Dernière réponse d'Ollama (compteurs en nanosecondes)
+            start: Début de la requête (time.perf_counter())
+        """
+        self.generation = stats
+        self.add_span("llm_time_to_first_token", stats.ttft, start=start)
+        self.add_span(
+            "llm_generation", stats.total_time, start=start,
+            eval_count=final.get("eval_count", 0),
+            eval_duration_ms=final.get("eval_duration", 0) / 1e6,
+            prompt_eval_count=final.get("prompt_eval_count", 0),
+            prompt_eval_duration_ms=final.get("prompt_eval_duration", 0) / 1e6,
+            load_duration_ms=final.get("load_duration", 0) / 1e6,
+            tokens_per_second=stats.tokens_per_second
+        )
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self) -> "Trace":
+        if self.duration is None:
+            self.duration = self._now()
+        return self
+
+    def timings(self) -> Dict[str, float]:
+        """Durée de chaque étape en millisecondes (étapes répétées additionnées)"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration * 1000
+        return {name: round(value, 3) for name, value in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration if self.duration is not None else self._now()) * 1000, 3),
+            "attributes": self.attributes,
+            "timings": self.timings(),
+            "spans": spans
+        }
+
+
+class TraceSink:
+    """Destination des traces terminées"""
+
+    def export(self, trace: Trace):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LogSink(TraceSink):
+    """Une ligne JSON par trace dans les logs"""
+
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def export(self, trace: Trace):
+        logger.log(self.level, json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+
+class JsonlSink(TraceSink):
+    """Une ligne JSON par trace, ajoutée à un fichier"""
+
+    def __init__(self, path: str = TRACE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock, self.path.open("a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class OpenTelemetrySink(TraceSink):
+    """
+    Spans OpenTelemetry : un span racine par trace et un span enfant par étape
+
+    Les spans sont envoyés par le TracerProvider configuré dans l'application
+    (exporteur OTLP, console...) ; sans configuration, ils sont ignorés.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            from opentelemetry import trace as otel_trace
+            tracer = otel_trace.get_tracer("enterprise-knowledge-agent")
+        self.tracer = tracer
+
+    def export(self, trace: Trace):
+        from opentelemetry import trace as otel_trace
+
+        origin_ns = int(trace.started_at * 1e9)
+        end_ns = origin_ns + int((trace.duration or 0.0) * 1e9)
+        root = self.tracer.start_span(trace.name, start_time=origin_ns,
+                                      attributes=_otel_attributes(trace.attributes))
+        context = otel_trace.set_span_in_context(root)
+        for span in trace.spans:
+            start_ns = origin_ns + int(span.start * 1e9)
+            child = self.tracer.start_span(span.name, context=context, start_time=start_ns,
+                                           attributes=_otel_attributes(span.attributes))
+            child.end(end_time=start_ns + int(span.duration * 1e9))
+        root.end(end_time=end_ns)
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Attributs acceptés par OpenTelemetry (types simples uniquement)"""
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attributes.items() if value is not None}
+
+
+def traced(trace: Optional[Trace], name: str, **attributes):
+    """Span du bloc si une trace est en cours, sinon rien"""
+    return trace.span(name, **attributes) if trace is not None else nullcontext()
+
+
+def export_trace(sink: Optional[TraceSink], trace: Trace):
+    """Terminer et exporter une trace ; une erreur d'export n'interrompt jamais la requête"""
+    trace.finish()
+    if sink is None:
+        return
+    try:
+        sink.export(trace)
+    except Exception as e:
+        logger.warning(f"Export de la trace {trace.trace_id} impossible: {e}")
+
+
+def create_sink(kind: str = TRACE_SINK, path: str = TRACE_PATH) -> Optional[TraceSink]:
+    """
+    Sink configuré (TRACE_SINK) : "log", "jsonl", "otel" ou "none"
+    """
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind == "log":
+        return LogSink()
+    if kind == "jsonl":
+        return JsonlSink(path)
+    if kind == "otel":
+        try:
+            return OpenTelemetrySink()
+        except ImportError:
+            logger.warning("opentelemetry-api n'est pas installé : traces envoyées dans les logs")
+            return LogSink()
+    raise ValueError(f"TRACE_SINK invalide: {kind} (attendu: log, jsonl, otel ou none)")
@@ -0,0 +1,148 @@
+"""
+Extraction des champs structurés d'un CV
+
+Reconnaît la mise en page des CV produits par generate_cvs.py (texte extrait
+du PDF) :
+
+    Prénom Nom
+    Intitulé du poste
+    Email: ... / Téléphone: ... / Adresse: rue ..., 75001 Ville
+    Compétences Techniques
+    Python • Django • ...
+    Expérience Professionnelle
+    Poste - Entreprise
+    09/2021 - Aujourd'hui (Aujourd'hui)
+    Poste - Entreprise
+    03/2015 - 06/2019 (51 mois)
+    Formation ...
+
+et en tire le poste, les technologies, les années d'expérience (somme des
+durées des postes), la ville et les langages (langages de programmation
+parmi les technologies, et langues parlées si une section « Langues »
+existe). Ces champs alimentent l'index des CV (src/storage/cv_index.py).
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# Titres de section de la mise en page
+_SECTIONS = ("Compétences Techniques", "Expérience Professionnelle", "Formation", "Centres d'intérêt",
+             "Engagements associatifs", "Langues")
+
+_ADDRESS = re.compile(r"^Adresse:\s*(?P<address>.+)$", re.MULTILINE)
+_POSTCODE_CITY = re.compile(r"\b\d{5}\s+(?P<city>[^,\d][^,]*)$")
+_PERIOD = re.compile(
+    r"^(?P<start_month>\d{2})/(?P<start_year>\d{4})\s*-\s*(?:(?P<end_month>\d{2})/(?P<end_year>\d{4})|Aujourd'hui)"
+    r"\s*\((?:(?P<months>\d+)\s*mois|Aujourd'hui)\)",
+    re.MULTILINE
+)
+
+# Langages de programmation reconnus parmi les technologies
+PROGRAMMING_LANGUAGES = {
+    "python", "java", "javascript", "typescript", "php", "c#", "c++", "go", "rust", "ruby", "kotlin",
+    "scala", "swift", "sql", "shell", "bash"
+}
+
+
+def normalize(text: str) -> str:
+    """Forme de comparaison : minuscules, sans accents, espaces simples"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+@dataclass
+class CVFields:
+    """Champs structurés d'un CV"""
+    name: str
+    job_title: str
+    city: str = ""
+    experience_years: float = 0.0
+    technologies: List[str] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "job_title": self.job_title,
+            "city": self.city,
+            "experience_years": self.experience_years,
+            "technologies": self.technologies,
+            "languages": self.languages
+        }
+
+
+def _lines(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _section(lines: List[str], title: str) -> List[str]:
+    """Lignes d'une section, jusqu'au titre de section suivant"""
+    try:
+        start = lines.index(title) + 1
+    except ValueError:
+        return []
+    end = next((i for i in range(start, len(lines)) if lines[i] in _SECTIONS), len(lines))
+    return lines[start:end]
+
+
+def _split_items(lines: List[str], separators: str = "•,") -> List[str]:
+    items = re.split(f"[{re.escape(separators)}]", " ".join(lines))
+    seen, result = set(), []
+    for item in (item.strip() for item in items):
+        if item and normalize(item) not in seen:
+            seen.add(normalize(item))
+            result.append(item)
+    return result
+
+
+def _experience_months(text: str, today: date) -> int:
+    """Somme des durées des postes (le poste actuel jusqu'à today)"""
+    months = 0
+    for match in _PERIOD.finditer(text):
+        if match.group("months"):
+            months += int(match.group("months"))
+        elif match.group("end_year") is None:
+            start_year, start_month = int(match.group("start_year")), int(match.group("start_month"))
+            months += max(0, (today.year - start_year) * 12 + today.month - start_month)
+        else:
+            months += max(0, (int(match.group("end_year")) - int(match.group("start_year"))) * 12
+                          + int(match.group("end_month")) - int(match.group("start_month")))
+    return months
+
+
+def extract_cv_fields(text: str, today: Optional[date] = None) -> Optional[CVFields]:
+    """
+    Champs structurés d'un CV
+
+    Args:
+        text: Texte extrait du document
+        today: Date de référence pour le poste actuel (aujourd'hui par défaut)
+
+    Returns:
+        CVFields, ou None si le texte n'a pas la mise en page d'un CV
+    """
+    lines = _lines(text)
+    if len(lines) < 2 or "Expérience Professionnelle" not in lines or "Compétences Techniques" not in lines:
+        return None
+
+    city = ""
+    address = _ADDRESS.search(text)
+    if address:
+        match = _POSTCODE_CITY.search(address.group("address").strip())
+        city = match.group("city").strip() if match else ""
+
+    technologies = _split_items(_section(lines, "Compétences Techniques"))
+    spoken = _split_items(_section(lines, "Langues"))
+    languages = [tech for tech in technologies if normalize(tech) in PROGRAMMING_LANGUAGES] + spoken
+
+    return CVFields(
+        name=lines[0],
+        job_title=lines[1],
+        city=city,
+        experience_years=round(_experience_months(text, today or date.today()) / 12, 1),
+        technologies=technologies,
+        languages=languages
+    )
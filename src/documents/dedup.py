@@ -0,0 +1,407 @@
+"""
+Détection de quasi-doublons à l'ingestion (MinHash + LSH par bandes)
+
+Chaque document (et chaque chunk) est réduit à une signature MinHash de ses
+k-grammes de mots. L'index LSH découpe les signatures en bandes : deux textes
+partageant une bande deviennent candidats, puis la similarité de Jaccard
+estimée sur la signature complète est comparée au seuil. Les quasi-doublons
+sont signalés ou écartés avant le calcul des embeddings.
+
+L'index est persisté dans SQLite, partagé par les processus qui indexent
+(serveur HTTP, file d'indexation, interface) : chaque signature est une
+ligne, écrite par save() dans une transaction, et les signatures ajoutées
+par les autres processus sont relues avant chaque recherche.
+"""
+import json
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Nombre premier > 2^32 pour les permutations (a*x + b) mod p
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Nombre de k-grammes hachés à la fois
+_BATCH_SIZE = 4096
+
+
+class MinHasher:
+    """Calcul de signatures MinHash sur des k-grammes de mots"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        generator = np.random.RandomState(seed)
+        # a < 2^31 et x < 2^32 : a*x + b tient dans un uint64 sans débordement
+        self._a = generator.randint(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[int]:
+        """Ensemble des k-grammes de mots (normalisés) hachés sur 32 bits"""
+        words = text.lower().split()
+        if not words:
+            return set()
+        k = min(self.shingle_size, len(words))
+        return {
+            zlib.crc32(" ".join(words[i:i + k]).encode('utf-8'))
+            for i in range(len(words) - k + 1)
+        }
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Signature MinHash d'un texte
+
+        Returns:
+            Tableau uint64 de num_perm valeurs, ou None pour un texte vide
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # Par lots pour borner la mémoire (lot x num_perm entiers)
+        for start in range(0, len(values), _BATCH_SIZE):
+            batch = values[start:start + _BATCH_SIZE]
+            hashed = (np.outer(batch, self._a) + self._b) % _PRIME & _MAX_HASH
+            np.minimum(signature, hashed.min(axis=0), out=signature)
+        return signature
+
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Similarité de Jaccard estimée entre deux signatures"""
+    return float(np.mean(first == second))
+
+
+def choose_bands(num_perm: int, threshold: float) -> int:
+    """
+    Choisir le nombre de bandes LSH pour un seuil de Jaccard
+
+    Le seuil effectif d'une configuration (b bandes de r lignes) vaut
+    environ (1/b)^(1/r). On prend le plus proche en dessous du seuil voulu :
+    on privilégie le rappel, les faux positifs sont éliminés par la
+    vérification sur la signature complète.
+    """
+    best_bands, best_threshold = num_perm, 0.0
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        effective = (1 / bands) ** (1 / rows)
+        if best_threshold < effective <= threshold:
+            best_bands, best_threshold = bands, effective
+    return best_bands
+
+
+class LSHIndex:
+    """Index LSH par bandes sur des signatures MinHash"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) doit être divisible par bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, signature: np.ndarray):
+        """Ajouter une signature"""
+        self.remove(key)
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].add(key)
+
+    def remove(self, key: str):
+        """Retirer une signature"""
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def query(self, signature: np.ndarray) -> Set[str]:
+        """Clés candidates partageant au moins une bande"""
+        candidates: Set[str] = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+class NearDuplicateDetector:
+    """
+    Détecteur de documents et de chunks quasi-dupliqués
+
+    Les documents sont indexés par identifiant (nom de fichier), les chunks
+    par "<identifiant>#<index>". Les paires détectées alimentent des clusters
+    de doublons consultables par les administrateurs.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3,
+                 index_path: Optional[str] = None):
+        """
+        Args:
+            threshold: Similarité de Jaccard à partir de laquelle deux textes sont des doublons
+            num_perm: Taille des signatures MinHash
+            shingle_size: Nombre de mots par k-gramme
+            index_path: Fichier SQLite de persistance de l'index (optionnel ; un
+                ancien index JSON du même nom est importé)
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        bands = choose_bands(num_perm, threshold)
+        self.documents = LSHIndex(num_perm, bands)
+        self.chunks = LSHIndex(num_perm, bands)
+        self.duplicate_pairs: Dict[Tuple[str, str], float] = {}
+
+        # Modifications pas encore sauvegardées : (type, clé) -> signature (None = supprimée)
+        self._pending: Dict[Tuple[str, str], Optional[np.ndarray]] = {}
+        self._pending_pairs: Dict[Tuple[str, str], float] = {}
+        self._last_row = 0  # Dernière ligne relue dans la base
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        self.index_path = Path(index_path) if index_path else None
+        if self.index_path is not None:
+            legacy = None
+            if self.index_path.suffix == ".json":
+                legacy, self.index_path = self.index_path, self.index_path.with_suffix(".sqlite")
+            created = not self.index_path.exists()
+            self._open()
+            self.load()
+            if created and legacy is not None and legacy.exists():
+                self._import_json(legacy)
+
+    def _open(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.index_path), timeout=30, check_same_thread=False)
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                UNIQUE (kind, key)
+            );
+            CREATE TABLE IF NOT EXISTS pairs (
+                first TEXT NOT NULL,
+                second TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                PRIMARY KEY (first, second)
+            );"""
+        )
+        self._connection.commit()
+
+    def _index_of(self, kind: str) -> LSHIndex:
+        return self.documents if kind == "document" else self.chunks
+
+    def _put(self, kind: str, key: str, signature: np.ndarray):
+        """Indexer une signature (écrite dans la base au prochain save())"""
+        self._index_of(kind).add(key, signature)
+        self._pending[(kind, key)] = signature
+
+    def _drop(self, kind: str, key: str):
+        """Retirer une signature (supprimée de la base au prochain save())"""
+        index = self._index_of(kind)
+        if key in index.signatures:
+            index.remove(key)
+            self._pending[(kind, key)] = None
+
+    def _refresh(self):
+        """Relire les signatures ajoutées ou remplacées par d'autres processus"""
+        if self._connection is None:
+            return
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, kind, key, signature FROM signatures WHERE id > ? ORDER BY id", (self._last_row,)
+            ).fetchall()
+            for row_id, kind, key, signature in rows:
+                # Une modification locale pas encore sauvegardée l'emporte
+                if (kind, key) not in self._pending:
+                    self._index_of(kind).add(key, np.frombuffer(signature, dtype=np.uint64).copy())
+                self._last_row = row_id
+
+    def _find(self, index: LSHIndex, signature: np.ndarray) -> List[Tuple[str, float]]:
+        """Candidats LSH vérifiés sur la signature complète, du plus similaire au moins similaire"""
+        matches = []
+        for key in index.query(signature):
+            similarity = estimate_jaccard(signature, index.signatures[key])
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def find_document(self, doc_id: str, signature: Optional[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Chercher les quasi-doublons d'un document, sans l'indexer
+
+        Args:
+            doc_id: Identifiant du document (une version déjà indexée sous ce nom est ignorée)
+            signature: Signature du texte (hasher.signature), None pour un texte vide
+
+        Returns:
+            Liste (identifiant, similarité estimée) des documents quasi-identiques
+        """
+        if signature is None:
+            return []
+        self._refresh()
+        matches = [(other, similarity) for other, similarity in self._find(self.documents, signature)
+                   if other != doc_id]
+        if matches:
+            logger.info(f"Document quasi-dupliqué: {doc_id} ~ {[other for other, _ in matches]}")
+        return matches
+
+    def add_document(self, doc_id: str, signature: Optional[np.ndarray],
+                     matches: Iterable[Tuple[str, float]] = ()):
+        """
+        Indexer un document gardé (un document de même identifiant est remplacé)
+
+        Args:
+            doc_id: Identifiant du document
+            signature: Signature du texte, None pour un texte vide
+            matches: Quasi-doublons trouvés par find_document, ajoutés aux clusters
+        """
+        self._drop("document", doc_id)
+        if signature is None:
+            return
+        for other, similarity in matches:
+            pair = tuple(sorted((doc_id, other)))
+            self.duplicate_pairs[pair] = similarity
+            self._pending_pairs[pair] = similarity
+        self._put("document", doc_id, signature)
+
+    def check_document(self, doc_id: str, text: str) -> List[Tuple[str, float]]:
+        """
+        Chercher les quasi-doublons d'un document puis l'indexer dans tous les cas
+        (find_document puis add_document)
+
+        Returns:
+            Liste (identifiant, similarité estimée) des documents quasi-identiques
+        """
+        signature = self.hasher.signature(text)
+        matches = self.find_document(doc_id, signature)
+        self.add_document(doc_id, signature, matches)
+        return matches
+
+    def check_chunks(self, doc_id: str, chunks: List[str]) -> Dict[int, str]:
+        """
+        Chercher les chunks quasi-dupliqués (d'autres documents ou du même) puis indexer les autres
+
+        Returns:
+            {index du chunk: clé du chunk déjà indexé dont il est le doublon}
+        """
+        self._refresh()
+        for key in [key for key in self.chunks.signatures if key.startswith(doc_id + "#")]:
+            self._drop("chunk", key)
+
+        duplicates = {}
+        for i, chunk in enumerate(chunks):
+            signature = self.hasher.signature(chunk)
+            if signature is None:
+                continue
+            matches = self._find(self.chunks, signature)
+            if matches:
+                duplicates[i] = matches[0][0]
+            else:
+                self._put("chunk", f"{doc_id}#{i}", signature)
+        return duplicates
+
+    def remove_document(self, doc_id: str):
+        """Retirer un document et ses chunks de l'index"""
+        self._drop("document", doc_id)
+        for key in [key for key in self.chunks.signatures if key.startswith(doc_id + "#")]:
+            self._drop("chunk", key)
+
+    def get_clusters(self) -> List[List[str]]:
+        """Clusters de documents quasi-dupliqués (composantes connexes des paires détectées)"""
+        parent: Dict[str, str] = {}
+
+        def find(key: str) -> str:
+            parent.setdefault(key, key)
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for first, second in self.duplicate_pairs:
+            parent[find(first)] = find(second)
+
+        clusters = defaultdict(list)
+        for key in parent:
+            clusters[find(key)].append(key)
+        return sorted((sorted(members) for members in clusters.values()), key=len, reverse=True)
+
+    def save(self):
+        """
+        Écrire les modifications depuis le dernier save() dans index_path (une
+        transaction : seules les signatures modifiées par ce processus sont écrites)
+        """
+        if self._connection is None:
+            return
+        with self._lock:
+            if not self._pending and not self._pending_pairs:
+                return
+            with self._connection:
+                for (kind, key), signature in self._pending.items():
+                    if signature is None:
+                        self._connection.execute("DELETE FROM signatures WHERE kind = ? AND key = ?", (kind, key))
+                    else:
+                        self._connection.execute(
+                            "INSERT OR REPLACE INTO signatures (kind, key, signature) VALUES (?, ?, ?)",
+                            (kind, key, signature.astype(np.uint64).tobytes())
+                        )
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO pairs (first, second, similarity) VALUES (?, ?, ?)",
+                    [(first, second, similarity) for (first, second), similarity in self._pending_pairs.items()]
+                )
+            self._pending.clear()
+            self._pending_pairs.clear()
+
+    def load(self):
+        """Charger l'index depuis index_path"""
+        if self._connection is None:
+            return
+        self._refresh()
+        with self._lock:
+            for first, second, similarity in self._connection.execute("SELECT first, second, similarity FROM pairs"):
+                self.duplicate_pairs[(first, second)] = similarity
+
+    def _import_json(self, path: Path):
+        """Importer un index JSON (format précédent) puis le sauvegarder dans la base"""
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Index de doublons illisible ({path}): {e}")
+            return
+        for key, sig in data.get("documents", {}).items():
+            self._put("document", key, np.array(sig, dtype=np.uint64))
+        for key, sig in data.get("chunks", {}).items():
+            self._put("chunk", key, np.array(sig, dtype=np.uint64))
+        for first, second, similarity in data.get("pairs", []):
+            self.duplicate_pairs[(first, second)] = similarity
+            self._pending_pairs[(first, second)] = similarity
+        self.save()
+        logger.info(f"Index de doublons importé depuis {path}")
+
+    def close(self):
+        """Fermer la base"""
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+                self._connection = None
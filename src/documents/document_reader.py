@@ -1,17 +1,51 @@
 """
 Extracteur de texte pour différents formats de documents
 Supporte : PDF, Word, TXT, Markdown
+Sources : chemin sur disque ou contenu en mémoire (bytes, memoryview, BytesIO)
 """
 from pathlib import Path
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 import logging
 
+from src.core.config import DocumentLimits, DOCUMENT_LIMITS, PDF_BACKEND, DEDUP_ACTION
+from src.documents.dedup import NearDuplicateDetector
+from src.documents.docx_reader import iter_docx_paragraphs
+from src.documents.pdf_backends import PDFBackend, iter_pdf_pages, select_backends
+from src.documents.sources import DocumentSource, is_path, open_buffer, open_source, source_size
+from src.documents.text_reader import iter_text_blocks
+from src.storage.extraction_cache import ExtractionCache, file_sha256
+
 logger = logging.getLogger(__name__)
 
 class DocumentReader:
     """Extraire le texte de différents types de documents"""
     
-    def __init__(self):
+    # Version de la logique d'extraction/découpage : à incrémenter pour invalider le cache
+    EXTRACTOR_VERSION = "1"
+    
+    def __init__(self, limits: Optional[DocumentLimits] = None, pdf_backend: Optional[str] = None,
+                 extraction_cache: Optional[ExtractionCache] = None,
+                 dedup: Optional[NearDuplicateDetector] = None, dedup_action: Optional[str] = None):
+        # Limites de taille (config.env : MAX_DOCUMENT_SIZE_MB, MAX_CHUNK_SIZE, MAX_CHUNKS_PER_DOCUMENT)
+        self.limits = limits or DOCUMENT_LIMITS
+        
+        # Cache persistant des extractions (désactivé si None)
+        self.extraction_cache = extraction_cache
+        
+        # Détection des quasi-doublons (désactivée si None) : "flag" (signaler) ou "skip" (écarter)
+        self.dedup = dedup
+        self.dedup_action = dedup_action or DEDUP_ACTION
+        if self.dedup_action not in ("flag", "skip"):
+            raise ValueError(f"dedup_action invalide: {self.dedup_action} (attendu: flag ou skip)")
+        
+        # Backends PDF ("auto", un nom ou une liste ordonnée), résolus à la première lecture
+        self.pdf_backend = pdf_backend or PDF_BACKEND
+        self._pdf_backends = None
+        
+        # Fichiers tronqués ou rejetés par les limites : [{filename, action, reason}]
+        self.limit_events: List[Dict[str, Any]] = []
+        
         # Extensions supportées avec leurs fonctions de lecture
         self.supported_extensions = {
             '.pdf': self.read_pdf,
@@ -21,78 +55,159 @@ class DocumentReader:
             '.md': self.read_text,
             '.markdown': self.read_text
         }
+        
+        # Lecture en flux : morceaux de texte à concaténer (pages, paragraphes, blocs)
+        self.stream_extensions = {
+            '.pdf': self.iter_pdf,
+            '.docx': self.iter_word,
+            '.doc': self.iter_word,
+            '.txt': self.iter_text,
+            '.md': self.iter_text,
+            '.markdown': self.iter_text
+        }
+    
+    @property
+    def pdf_backends(self) -> List[PDFBackend]:
+        """Backends PDF ordonnés : le premier est utilisé, les suivants servent de repli par page"""
+        if self._pdf_backends is None:
+            self._pdf_backends = select_backends(self.pdf_backend)
+            logger.info(f"Backends PDF: {[backend.name for backend in self._pdf_backends]}")
+        return self._pdf_backends
     
-    def read_pdf(self, file_path: Path) -> str:
+    def iter_pdf(self, file_path: DocumentSource) -> Iterator[str]:
+        """Extraire le texte d'un fichier PDF page par page"""
+        for page_text in iter_pdf_pages(open_source(file_path), self.pdf_backends):
+            yield page_text + "\n"
+    
+    def read_pdf(self, file_path: DocumentSource) -> str:
         """Extraire le texte d'un fichier PDF"""
         try:
-            import PyPDF2
-            
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    except Exception as e:
-                        logger.warning(f"Erreur lecture page {page_num} du PDF: {e}")
-            
-            return text.strip()
-            
+            return "".join(self.iter_pdf(file_path)).strip()
         except Exception as e:
             logger.error(f"Erreur lors de la lecture du PDF {file_path}: {e}")
             return ""
     
-    def read_word(self, file_path: Path) -> str:
+    def iter_word(self, file_path: DocumentSource) -> Iterator[str]:
+        """Extraire le texte d'un fichier Word paragraphe par paragraphe (tableaux, en-têtes et pieds de page inclus)"""
+        separator = ""
+        for paragraph in iter_docx_paragraphs(open_source(file_path)):
+            yield separator + paragraph
+            separator = "\n"
+    
+    def read_word(self, file_path: DocumentSource) -> str:
         """Extraire le texte d'un fichier Word"""
         try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text])
-            
-            return text
-            
+            return "".join(self.iter_word(file_path))
         except Exception as e:
             logger.error(f"Erreur lors de la lecture du Word {file_path}: {e}")
             return ""
     
-    def read_text(self, file_path: Path) -> str:
-        """Lire un fichier texte simple"""
+    def iter_text(self, file_path: DocumentSource) -> Iterator[str]:
+        """Lire un fichier texte par blocs décodés"""
+        return iter_text_blocks(open_source(file_path))
+    
+    def read_text(self, file_path: DocumentSource) -> str:
+        """Lire un fichier texte simple (encodage détecté, une seule lecture)"""
         try:
-            # Essayer différents encodages
-            encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-            
-            for encoding in encodings:
-                try:
-                    return file_path.read_text(encoding=encoding)
-                except UnicodeDecodeError:
-                    continue
-            
-            logger.error(f"Impossible de décoder le fichier {file_path}")
-            return ""
-            
+            return "".join(self.iter_text(file_path))
         except Exception as e:
             logger.error(f"Erreur lors de la lecture du fichier {file_path}: {e}")
             return ""
     
-    def extract_text(self, file_path: Path) -> str:
-        """Extraire le texte d'un fichier selon son extension"""
-        ext = file_path.suffix.lower()
+    def extract_text(self, file_path: DocumentSource, filename: Optional[str] = None) -> str:
+        """Extraire le texte d'un fichier selon son extension (filename requis pour un contenu en mémoire)"""
+        name = self._source_name(file_path, filename)
+        ext = Path(name).suffix.lower()
         
         if ext not in self.supported_extensions:
             raise ValueError(f"Format non supporté: {ext}. Extensions supportées: {list(self.supported_extensions.keys())}")
         
-        logger.info(f"Extraction du texte de: {file_path.name}")
+        logger.info(f"Extraction du texte de: {name}")
         text = self.supported_extensions[ext](file_path)
         
         if not text:
-            logger.warning(f"Aucun texte extrait de {file_path.name}")
+            logger.warning(f"Aucun texte extrait de {name}")
         
         return text
     
+    def extract_text_bounded(self, file_path: DocumentSource, max_words: int,
+                             filename: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Extraire le texte en flux en s'arrêtant dès que max_words mots sont lus
+        
+        Les pages/paragraphes/blocs restants ne sont ni lus ni décodés.
+        
+        Args:
+            file_path: Chemin du document ou contenu en mémoire
+            max_words: Nombre maximal de mots à extraire
+            filename: Nom du fichier (requis pour un contenu en mémoire)
+        
+        Returns:
+            (texte extrait, True si l'extraction a été interrompue)
+        """
+        name = self._source_name(file_path, filename)
+        ext = Path(name).suffix.lower()
+        
+        if ext not in self.stream_extensions:
+            raise ValueError(f"Format non supporté: {ext}. Extensions supportées: {list(self.supported_extensions.keys())}")
+        
+        logger.info(f"Extraction du texte de: {name}")
+        pieces = []
+        word_count = 0
+        truncated = False
+        
+        try:
+            stream = self.stream_extensions[ext](file_path)
+            for piece in stream:
+                pieces.append(piece)
+                word_count += len(piece.split())
+                if word_count >= max_words:
+                    # On ne sait pas s'il reste du texte : on regarde un morceau de plus
+                    truncated = any(next_piece.strip() for next_piece in islice(stream, 1))
+                    break
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de {name}: {e}")
+        
+        text = "".join(pieces).strip() if ext == '.pdf' else "".join(pieces)
+        
+        if not text:
+            logger.warning(f"Aucun texte extrait de {name}")
+        
+        return text, truncated
+    
+    @staticmethod
+    def _source_name(file_path: DocumentSource, filename: Optional[str] = None) -> str:
+        """Nom du document : filename s'il est fourni, sinon nom du fichier sur disque"""
+        if filename:
+            return filename
+        if is_path(file_path):
+            return Path(file_path).name
+        name = getattr(file_path, "name", None)
+        if isinstance(name, str) and name:
+            return Path(name).name
+        raise ValueError("filename est requis pour un document fourni en mémoire")
+    
+    def extractor_id(self, file_path: Union[Path, str]) -> str:
+        """Identifiant de l'extracteur utilisé pour un fichier (nom et version, pour le cache)"""
+        ext = Path(file_path).suffix.lower()
+        extractor = f"{ext}:v{self.EXTRACTOR_VERSION}"
+        if ext == '.pdf':
+            extractor += ":" + ",".join(f"{backend.name}-{backend.version()}" for backend in self.pdf_backends)
+        return extractor
+    
+    def _record_limit(self, filename: str, action: str, reason: str):
+        """Enregistrer un fichier tronqué ou rejeté par les limites"""
+        logger.warning(f"Document {action}: {filename} ({reason})")
+        self.limit_events.append({
+            "filename": filename,
+            "action": action,
+            "reason": reason
+        })
+    
+    def get_limit_report(self) -> List[Dict[str, Any]]:
+        """Obtenir la liste des fichiers tronqués ou rejetés"""
+        return list(self.limit_events)
+    
     def create_chunks(self, text: str, chunk_size: int = 1000) -> List[str]:
         """
         Découper le texte en morceaux (chunks)
@@ -104,52 +219,194 @@ class DocumentReader:
         Returns:
             Liste de chunks de texte
         """
-        words = text.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size):
-            chunk = ' '.join(words[i:i+chunk_size])
-            chunks.append(chunk)
+        chunks = list(self.iter_chunks([text], chunk_size))
         
         logger.info(f"Texte découpé en {len(chunks)} chunks")
         return chunks
     
-    def process_document(self, file_path: Path, chunk_size: int = 1000) -> Dict[str, Any]:
+    def iter_chunks(self, blocks: Iterable[str], chunk_size: int = 1000) -> Iterator[str]:
+        """
+        Découper un flux de blocs de texte en chunks, sans tout charger en mémoire
+        
+        Un mot coupé entre deux blocs est recollé avant d'être compté.
+        
+        Args:
+            blocks: Blocs de texte successifs
+            chunk_size: Nombre de mots par chunk
+        
+        Yields:
+            Chunks de texte (identiques à ceux de create_chunks)
+        """
+        words: List[str] = []
+        partial = ""
+        
+        for block in blocks:
+            if not block:
+                continue
+            block_words = (partial + block).split()
+            # Le dernier mot peut continuer dans le bloc suivant
+            if block_words and not block[-1].isspace():
+                partial = block_words.pop()
+            else:
+                partial = ""
+            words.extend(block_words)
+            
+            while len(words) >= chunk_size:
+                yield ' '.join(words[:chunk_size])
+                del words[:chunk_size]
+        
+        if partial:
+            words.append(partial)
+        for i in range(0, len(words), chunk_size):
+            yield ' '.join(words[i:i+chunk_size])
+    
+    def stream_chunks(self, file_path: DocumentSource, chunk_size: int = 1000) -> Iterator[str]:
+        """
+        Lire un fichier texte par blocs et produire ses chunks au fil de l'eau
+        
+        Mémoire bornée : seul le bloc courant et le chunk en cours sont conservés.
+        
+        Args:
+            file_path: Chemin du fichier texte ou contenu en mémoire
+            chunk_size: Nombre de mots par chunk
+        
+        Yields:
+            Chunks de texte
+        """
+        return self.iter_chunks(self.iter_text(file_path), chunk_size)
+    
+    def process_document(self, file_path: DocumentSource, chunk_size: int = 1000,
+                         filename: Optional[str] = None) -> Dict[str, Any]:
         """
         Traiter un document complet : extraction + découpage
         
         Args:
-            file_path: Chemin du document
+            file_path: Chemin du document, ou contenu en mémoire (bytes, memoryview,
+                BytesIO, UploadedFile Streamlit) traité sans fichier temporaire
             chunk_size: Taille des chunks en mots
+            filename: Nom du fichier (requis pour un contenu en mémoire sans attribut name)
         
         Returns:
             Dictionnaire avec texte, chunks et métadonnées
         """
-        logger.info(f"Traitement du document: {file_path.name}")
+        name = self._source_name(file_path, filename)
+        logger.info(f"Traitement du document: {name}")
         
-        # Extraire le texte
-        text = self.extract_text(file_path)
+        if not self.is_supported(name):
+            raise ValueError(f"Format non supporté: {Path(name).suffix.lower()}. Extensions supportées: {self.get_supported_extensions()}")
         
-        if not text:
-            logger.warning(f"Aucun texte extrait de {file_path.name}")
+        source = open_source(file_path)
+        
+        # Rejeter les fichiers trop gros avant toute lecture
+        try:
+            file_size = source_size(source)
+        except OSError:
+            file_size = 0
+        
+        if file_size > self.limits.max_document_bytes:
+            reason = f"{file_size / (1024 * 1024):.1f} Mo > {self.limits.max_document_size_mb} Mo"
+            self._record_limit(name, "rejected", reason)
             return {
                 "success": False,
                 "text": "",
                 "chunks": [],
-                "metadata": {}
+                "metadata": {},
+                "error": f"Document trop volumineux ({reason})"
             }
         
-        # Créer les chunks
-        chunks = self.create_chunks(text, chunk_size)
+        chunk_size = min(chunk_size, self.limits.max_chunk_size)
+        
+        # Cache d'extraction : un contenu déjà vu n'est pas re-parsé
+        cache_key = None
+        cached = None
+        if self.extraction_cache is not None:
+            try:
+                if is_path(source):
+                    content_hash = file_sha256(source)
+                else:
+                    with open_buffer(source) as view:
+                        content_hash = file_sha256(view)
+                cache_key = self.extraction_cache.make_key(
+                    content_hash,
+                    self.extractor_id(name),
+                    {"chunk_size": chunk_size, "max_chunks": self.limits.max_chunks_per_document}
+                )
+                cached = self.extraction_cache.get(cache_key)
+            except OSError as e:
+                logger.warning(f"Cache d'extraction indisponible pour {name}: {e}")
+        
+        if cached is not None:
+            logger.info(f"Extraction trouvée dans le cache: {name}")
+            text = cached["text"]
+            truncated = cached["truncated"]
+            words = text.split()
+            bounds = cached["chunk_bounds"]
+            chunks = [' '.join(words[start:end]) for start, end in zip(bounds, bounds[1:])]
+        else:
+            # Extraire le texte en flux, arrêt dès que le nombre de chunks maximal est atteint
+            text, truncated = self.extract_text_bounded(source, chunk_size * self.limits.max_chunks_per_document, name)
+            
+            if not text:
+                logger.warning(f"Aucun texte extrait de {name}")
+                return {
+                    "success": False,
+                    "text": "",
+                    "chunks": [],
+                    "metadata": {}
+                }
+            
+            # Créer les chunks
+            chunks = self.create_chunks(text, chunk_size)
+            
+            if len(chunks) > self.limits.max_chunks_per_document:
+                chunks = chunks[:self.limits.max_chunks_per_document]
+                truncated = True
+            
+            if cache_key is not None:
+                bounds = [0]
+                for chunk in chunks:
+                    bounds.append(bounds[-1] + len(chunk.split()))
+                self.extraction_cache.put(cache_key, text, bounds, truncated)
+        
+        if truncated:
+            self._record_limit(name, "truncated", f"limité à {self.limits.max_chunks_per_document} chunks de {chunk_size} mots")
+        
+        # Quasi-doublons (MinHash/LSH), avant le calcul des embeddings
+        duplicate_of = []
+        duplicate_chunks = {}
+        if self.dedup is not None:
+            # Un document écarté n'est pas indexé : les suivants ne lui sont pas comparés
+            signature = self.dedup.hasher.signature(text)
+            matches = self.dedup.find_document(name, signature)
+            duplicate_of = [doc_id for doc_id, _ in matches]
+            if duplicate_of and self.dedup_action == "skip":
+                logger.warning(f"Document ignoré (quasi-doublon de {duplicate_of}): {name}")
+                return {
+                    "success": False,
+                    "text": "",
+                    "chunks": [],
+                    "metadata": {"filename": name, "duplicate_of": duplicate_of},
+                    "error": f"Document quasi-identique à: {', '.join(duplicate_of)}"
+                }
+            
+            self.dedup.add_document(name, signature, matches)
+            duplicate_chunks = self.dedup.check_chunks(name, chunks)
+            if duplicate_chunks and self.dedup_action == "skip":
+                chunks = [chunk for i, chunk in enumerate(chunks) if i not in duplicate_chunks]
+                logger.info(f"{len(duplicate_chunks)} chunks quasi-dupliqués ignorés dans {name}")
         
         # Métadonnées du document
         metadata = {
-            "filename": file_path.name,
-            "source": str(file_path),
-            "file_type": file_path.suffix.lower(),
+            "filename": name,
+            "source": str(file_path) if is_path(file_path) else name,
+            "file_type": Path(name).suffix.lower(),
             "num_chunks": len(chunks),
             "total_words": len(text.split()),
-            "total_characters": len(text)
+            "total_characters": len(text),
+            "truncated": truncated,
+            "cached": cached is not None,
+            "duplicate_of": duplicate_of,
+            "duplicate_chunks": len(duplicate_chunks)
         }
         
         logger.info(f"✅ Document traité: {metadata['num_chunks']} chunks créés")
@@ -165,7 +422,7 @@ class DocumentReader:
         """Obtenir la liste des extensions supportées"""
         return list(self.supported_extensions.keys())
     
-    def is_supported(self, file_path: Path) -> bool:
+    def is_supported(self, file_path: Union[Path, str]) -> bool:
         """Vérifier si un fichier est supporté"""
-        return file_path.suffix.lower() in self.supported_extensions
+        return Path(file_path).suffix.lower() in self.supported_extensions
 
@@ -0,0 +1,137 @@
+"""
+Extraction en flux du texte des fichiers Word (.docx)
+
+Un .docx est une archive zip contenant du WordprocessingML. Au lieu de
+construire tout le modèle objet de python-docx, on lit directement
+word/document.xml (ainsi que les en-têtes et pieds de page) avec un parseur
+XML incrémental et on produit les paragraphes au fur et à mesure. Les tableaux
+sont restitués ligne par ligne, cellules séparées par « | ».
+"""
+import re
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Union
+from xml.etree import ElementTree
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Espace de noms WordprocessingML
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_PARAGRAPH = _W + 'p'
+_TEXT = _W + 't'
+_TAB = _W + 'tab'
+_BREAKS = (_W + 'br', _W + 'cr')
+_TABLE = _W + 'tbl'
+_ROW = _W + 'tr'
+_CELL = _W + 'tc'
+_BODY = _W + 'body'
+
+_HEADER_PATTERN = re.compile(r'^word/header\d*\.xml$')
+_FOOTER_PATTERN = re.compile(r'^word/footer\d*\.xml$')
+
+
+def _iter_part_paragraphs(stream) -> Iterator[str]:
+    """
+    Produire les paragraphes (et lignes de tableau) d'une partie XML Word
+
+    Args:
+        stream: Flux binaire de la partie XML (ouvert depuis le zip)
+
+    Yields:
+        Texte de chaque paragraphe hors tableau, ou de chaque ligne de tableau
+    """
+    runs: List[str] = []
+    # Pile des tableaux en cours : pour chacun, cellules de la ligne courante
+    # et paragraphes de la cellule courante
+    tables: List[dict] = []
+    depth = 0
+    container_depth = None
+    container = None
+
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if container is None and elem.tag in (_BODY, _W + 'hdr', _W + 'ftr'):
+                container, container_depth = elem, depth
+            elif elem.tag == _TABLE:
+                tables.append({'cells': [], 'paragraphs': []})
+            continue
+
+        depth -= 1
+        tag = elem.tag
+
+        if tag == _TEXT:
+            if elem.text:
+                runs.append(elem.text)
+        elif tag == _TAB:
+            runs.append('\t')
+        elif tag in _BREAKS:
+            runs.append('\n')
+        elif tag == _PARAGRAPH:
+            text = ''.join(runs)
+            runs = []
+            if tables:
+                if text:
+                    tables[-1]['paragraphs'].append(text)
+            elif text:
+                yield text
+        elif tag == _CELL and tables:
+            table = tables[-1]
+            table['cells'].append(' '.join(table['paragraphs']))
+            table['paragraphs'] = []
+        elif tag == _ROW and tables:
+            table = tables[-1]
+            cells = [cell for cell in table['cells'] if cell]
+            table['cells'] = []
+            if cells:
+                row = ' | '.join(cells)
+                if len(tables) > 1:
+                    # Tableau imbriqué : la ligne devient un paragraphe de la cellule parente
+                    tables[-2]['paragraphs'].append(row)
+                else:
+                    yield row
+        elif tag == _TABLE and tables:
+            tables.pop()
+
+        # Libérer les éléments de premier niveau déjà traités (mémoire bornée)
+        if container is not None and depth == container_depth:
+            container.clear()
+
+
+def iter_docx_paragraphs(file_path: Union[Path, BinaryIO]) -> Iterator[str]:
+    """
+    Extraire en flux le texte d'un fichier .docx
+
+    Ordre de lecture : en-têtes, corps du document (paragraphes et tableaux),
+    pieds de page. Les en-têtes/pieds de page identiques ne sont produits
+    qu'une fois.
+
+    Args:
+        file_path: Chemin du fichier .docx ou flux binaire en mémoire
+
+    Yields:
+        Paragraphes non vides
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+        headers = sorted(name for name in names if _HEADER_PATTERN.match(name))
+        footers = sorted(name for name in names if _FOOTER_PATTERN.match(name))
+
+        def iter_unique(parts: List[str]) -> Iterator[str]:
+            seen = set()
+            for part in parts:
+                with archive.open(part) as stream:
+                    paragraphs = list(_iter_part_paragraphs(stream))
+                key = tuple(paragraphs)
+                if paragraphs and key not in seen:
+                    seen.add(key)
+                    yield from paragraphs
+
+        yield from iter_unique(headers)
+
+        with archive.open('word/document.xml') as stream:
+            yield from _iter_part_paragraphs(stream)
+
+        yield from iter_unique(footers)
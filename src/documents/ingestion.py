@@ -0,0 +1,84 @@
+"""
+Indexation d'un document traité : embeddings, base vectorielle et index des CV
+
+Étape commune à l'interface Streamlit et au serveur HTTP, après
+DocumentReader.process_document().
+"""
+from typing import Any, Dict, List, Optional
+import logging
+
+from src.documents.cv_extractor import extract_cv_fields
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_metadata(name: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Métadonnées de chaque chunk d'un document (source, position, type)"""
+    chunks = result["chunks"]
+    return [
+        {
+            "source": name,
+            "chunk_index": i,
+            "total_chunks": len(chunks),
+            "file_type": result["metadata"].get("file_type", "")
+        }
+        for i in range(len(chunks))
+    ]
+
+
+def index_document(name: str, result: Dict[str, Any], embedding_model, vector_store,
+                   cv_index=None, embeddings: Optional[List[List[float]]] = None,
+                   answer_cache=None) -> Dict[str, Any]:
+    """
+    Stocker les chunks d'un document dans la base vectorielle (et son CV dans l'index des CV)
+    
+    Un document réindexé sous le même nom (fichier modifié) remplace ses
+    chunks : les identifiants {name}_{i} existants sont mis à jour et ceux
+    au-delà du nouveau nombre de chunks sont supprimés. Les réponses en
+    cache fondées sur ces chunks sont supprimées.
+
+    Args:
+        name: Nom du document (source des chunks, préfixe des identifiants)
+        result: Résultat de DocumentReader.process_document (success = True)
+        embedding_model: Modèle d'embeddings (encode), inutile si embeddings est donné
+        vector_store: Base vectorielle (upsert_documents, get_source_ids, delete_documents)
+        cv_index: Index des CV (CVIndex), ou None
+        embeddings: Embeddings des chunks déjà calculés
+        answer_cache: Cache des réponses (SemanticAnswerCache), ou None
+
+    Returns:
+        {'file', 'chunks', 'cv_indexed'}
+    """
+    chunks = result["chunks"]
+    ids = [f"{name}_{i}" for i in range(len(chunks))]
+    if chunks:
+        if embeddings is None:
+            embeddings = [
+                embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+                for embedding in embedding_model.encode(chunks, convert_to_tensor=False)
+            ]
+        vector_store.upsert_documents(
+            embeddings=embeddings,
+            documents=chunks,
+            metadatas=chunk_metadata(name, result),
+            ids=ids
+        )
+
+    # Chunks d'une version précédente plus longue
+    stale_ids = sorted(set(vector_store.get_source_ids(name)) - set(ids))
+    vector_store.delete_documents(stale_ids)
+
+    if answer_cache is not None:
+        invalidated = answer_cache.invalidate_chunks(ids + stale_ids)
+        if invalidated:
+            logger.info(f"{invalidated} réponse(s) en cache invalidée(s) par la réindexation de {name}")
+
+    cv_indexed = False
+    if cv_index is not None:
+        fields = extract_cv_fields(result.get("text", ""))
+        if fields is not None:
+            cv_index.add(name, fields)
+            cv_indexed = True
+
+    logger.info(f"Document indexé: {name} ({len(chunks)} chunks{', CV indexé' if cv_indexed else ''})")
+    return {"file": name, "chunks": len(chunks), "cv_indexed": cv_indexed}
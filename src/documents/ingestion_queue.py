@@ -0,0 +1,257 @@
+"""
+Indexation des documents en arrière-plan
+
+Un envoi de documents crée une tâche (submit_job) et rend la main
+immédiatement : les fichiers sont écrits dans le répertoire de préparation
+et un thread de traitement les extrait, calcule leurs embeddings et les
+stocke, un fichier à la fois. Le résultat de chaque étape est écrit sur
+disque avant que l'étape soit enregistrée (JobStore) :
+
+    <staging>/<empreinte>/<nom>               fichier envoyé
+    <staging>/<empreinte>/<nom>.chunks.json   texte et chunks extraits
+    <staging>/<empreinte>/<nom>.npy           embeddings des chunks
+
+Plusieurs processus (workers de l'API, Streamlit) peuvent partager la même
+base : chaque file prend un fichier sous son nom (owner) pour un bail
+qu'elle renouvelle pendant le traitement. Après un arrêt, le bail du fichier
+interrompu expire et il reprend à l'étape suivante (sans ré-extraire ni
+ré-encoder) ; un fichier en cours dans un processus vivant n'est jamais
+repris ; un fichier déjà indexé ou en file (même nom, même contenu)
+n'est pas traité deux fois. Les fichiers préparés sont supprimés une fois
+le document stocké. L'interface suit l'avancement avec get_job().
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+
+from src.core.config import INGEST_DB_PATH, INGEST_EMBED_BATCH, INGEST_LEASE_SECONDS, INGEST_STAGING_DIR
+from src.documents.ingestion import index_document
+from src.storage.job_store import JobStore, LeaseLost
+
+logger = logging.getLogger(__name__)
+
+
+def _atomic_write(path: Path, write):
+    """Écrire un fichier d'étape en entier ou pas du tout (fichier temporaire puis renommage)"""
+    temporary = path.with_name(path.name + ".tmp")
+    with temporary.open("wb") as file:
+        write(file)
+    os.replace(temporary, path)
+
+
+class IngestionQueue:
+    """Tâches d'indexation traitées par un thread en arrière-plan"""
+
+    def __init__(self, store: JobStore, staging_dir: str, reader, embedding_model, vector_store,
+                 cv_index=None, batch_size: int = INGEST_EMBED_BATCH,
+                 lease_seconds: float = INGEST_LEASE_SECONDS, answer_cache=None):
+        """
+        Args:
+            store: Tâches et étapes des fichiers (JobStore)
+            staging_dir: Répertoire des fichiers envoyés et des résultats intermédiaires
+            reader: DocumentReader (process_document)
+            embedding_model: Modèle d'embeddings (encode)
+            vector_store: Base vectorielle (upsert_documents, get_source_ids, delete_documents)
+            cv_index: Index des CV (CVIndex), ou None
+            batch_size: Chunks encodés ensemble
+            lease_seconds: Bail d'un fichier en cours, renouvelé toutes les lease_seconds / 3
+            answer_cache: Cache des réponses (SemanticAnswerCache) dont les réponses
+                sur les chunks réindexés sont supprimées, ou None
+        """
+        self.store = store
+        self.staging_dir = Path(staging_dir)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.reader = reader
+        self.embedding_model = embedding_model
+        self.vector_store = vector_store
+        self.cv_index = cv_index
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.answer_cache = answer_cache
+        # Propriétaire des baux de cette file (processus et instance)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        expired = store.expired()
+        if expired:
+            logger.info(f"{expired} fichier(s) interrompu(s) (bail expiré) à reprendre")
+
+    def start(self):
+        """Démarrer le thread de traitement"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Arrêter le thread après le fichier en cours"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _staged(self, name: str, content_hash: str) -> Tuple[Path, Path, Path]:
+        """Fichier envoyé, chunks extraits et embeddings d'un fichier"""
+        directory = self.staging_dir / content_hash
+        source = directory / Path(name).name
+        return source, source.with_name(source.name + ".chunks.json"), source.with_name(source.name + ".npy")
+
+    def submit_job(self, files: Sequence[Tuple[str, Union[bytes, BinaryIO]]], user_id: str = "default") -> str:
+        """
+        Créer une tâche d'indexation (rend la main sans attendre le traitement)
+
+        Args:
+            files: (nom du fichier, contenu ou fichier ouvert)
+            user_id: Utilisateur qui envoie les fichiers
+
+        Returns:
+            Identifiant de la tâche (get_job)
+        """
+        staged = []
+        for name, content in files:
+            data = content if isinstance(content, (bytes, bytearray, memoryview)) else content.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+            source = self._staged(name, content_hash)[0]
+            source.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(source, lambda file: file.write(data))
+            staged.append((name, content_hash))
+
+        job_id, job_files = self.store.create_job(user_id, staged)
+        for file in job_files:
+            if file["stage"] == "skipped" and file["error"].startswith("déjà indexé"):
+                self._cleanup(file)
+        logger.info(f"Tâche d'indexation {job_id}: {len(job_files)} fichier(s)")
+        self._wake.set()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Avancement d'une tâche (JobStore.get_job)"""
+        return self.store.get_job(job_id)
+
+    def list_jobs(self, user_id: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.store.list_jobs(user_id, limit)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, interval: float = 0.1) -> Optional[Dict[str, Any]]:
+        """Attendre la fin d'une tâche (ou timeout) et renvoyer son état"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job is None or job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.process_next():
+                self._wake.wait(timeout=1.0)
+                self._wake.clear()
+
+    def process_next(self) -> bool:
+        """Traiter le prochain fichier en file (False si la file est vide)"""
+        file = self.store.claim_next(self.owner, self.lease_seconds)
+        if file is None:
+            return False
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(file, done), name="ingestion-lease", daemon=True)
+        heartbeat.start()
+        try:
+            self._process(file)
+        except LeaseLost as e:
+            # Repris par un autre processus : il termine le fichier
+            logger.warning(f"Indexation de {file['name']} abandonnée: {e}")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation de {file['name']}: {e}")
+            try:
+                self._advance(file, "failed", error=str(e))
+                self._cleanup(file)
+            except LeaseLost:
+                pass
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, file: Dict[str, Any], done: threading.Event):
+        """Renouveler le bail du fichier tant qu'il est traité"""
+        while not done.wait(self.lease_seconds / 3):
+            if not self.store.renew(file["id"], self.owner, self.lease_seconds):
+                logger.warning(f"Bail perdu pour {file['name']}")
+                return
+
+    def _advance(self, file: Dict[str, Any], stage: str, **fields):
+        """Enregistrer une étape si cette file détient toujours le bail (sinon LeaseLost)"""
+        self.store.advance(file["id"], stage, owner=self.owner, **fields)
+
+    def _process(self, file: Dict[str, Any]):
+        """Étapes restantes d'un fichier, chacune enregistrée une fois son résultat écrit"""
+        name, stage = file["name"], file["stage"]
+        source, extracted, embedded = self._staged(name, file["content_hash"])
+
+        if stage == "queued":
+            try:
+                result = self.reader.process_document(source, filename=name)
+            finally:
+                if self.reader.dedup is not None:
+                    self.reader.dedup.save()
+            if not result["success"]:
+                self._advance(file, "failed", error=result.get("error", "aucun texte extrait"))
+                self._cleanup(file)
+                return
+            _atomic_write(extracted, lambda out: out.write(
+                json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")))
+            self._advance(file, "extracted", chunks=len(result["chunks"]))
+            stage = "extracted"
+
+        result = json.loads(extracted.read_text(encoding="utf-8"))
+
+        if stage == "extracted":
+            if result["chunks"]:
+                embeddings = np.asarray(self.embedding_model.encode(
+                    result["chunks"], batch_size=self.batch_size, convert_to_tensor=False
+                ), dtype=np.float32)
+            else:
+                embeddings = np.zeros((0, 0), dtype=np.float32)
+            _atomic_write(embedded, lambda out: np.save(out, embeddings))
+            self._advance(file, "embedded")
+
+        embeddings = np.load(embedded)
+        indexed = index_document(name, result, self.embedding_model, self.vector_store, self.cv_index,
+                                 embeddings=embeddings.tolist(), answer_cache=self.answer_cache)
+        self._advance(file, "stored", chunks=indexed["chunks"], cv_indexed=int(indexed["cv_indexed"]))
+        self._cleanup(file)
+
+    def _cleanup(self, file: Dict[str, Any]):
+        """Supprimer les fichiers préparés d'un fichier terminé"""
+        paths = self._staged(file["name"], file["content_hash"])
+        for path in paths:
+            path.unlink(missing_ok=True)
+        try:
+            paths[0].parent.rmdir()
+        except OSError:
+            pass  # D'autres fichiers de même contenu y sont encore préparés
+
+
+def create_ingestion_queue(reader, embedding_model, vector_store, cv_index=None,
+                           db_path: str = INGEST_DB_PATH, staging_dir: str = INGEST_STAGING_DIR,
+                           start: bool = True, answer_cache=None) -> IngestionQueue:
+    """File configurée (INGEST_*), démarrée"""
+    queue = IngestionQueue(JobStore(db_path), staging_dir, reader, embedding_model, vector_store, cv_index,
+                           answer_cache=answer_cache)
+    if start:
+        queue.start()
+    return queue
@@ -0,0 +1,262 @@
+"""
+Backends d'extraction de texte PDF interchangeables
+
+Chaque backend (PyPDF2, pypdf, pdfminer.six, pypdfium2) n'est importé que
+lorsqu'il est utilisé. La sélection se fait par nom ("pypdfium2",
+"pypdf,PyPDF2"...) ou automatiquement ("auto" : du plus rapide au plus lent
+parmi ceux installés). En cas d'erreur sur une page, les backends suivants
+sont essayés pour cette page uniquement.
+"""
+import importlib
+import importlib.metadata
+import importlib.util
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Type, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registre des backends : nom -> classe
+PDF_BACKENDS: Dict[str, Type["PDFBackend"]] = {}
+
+# Ordre de sélection automatique (du plus rapide au plus lent, mesuré avec
+# benchmarks/bench_pdf_backends.py sur les CV de generate_cvs.py)
+AUTO_ORDER = ["pypdfium2", "PyPDF2", "pypdf", "pdfminer"]
+
+
+def register_backend(cls: Type["PDFBackend"]) -> Type["PDFBackend"]:
+    """Décorateur : enregistrer un backend PDF"""
+    PDF_BACKENDS[cls.name] = cls
+    return cls
+
+
+class PDFBackend(ABC):
+    """
+    Interface d'un backend PDF
+
+    open() reçoit un chemin ou un flux binaire en mémoire et retourne un
+    document ouvert ; page_count() et extract_page() permettent l'accès page
+    par page, close() libère les ressources. Un backend qui n'implémente pas
+    les trois premières ne peut pas être instancié (TypeError).
+    """
+    name = ""
+    module = ""
+    distribution = ""
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Vérifier que la bibliothèque est installée (sans l'importer)"""
+        return importlib.util.find_spec(cls.module) is not None
+
+    @classmethod
+    def version(cls) -> str:
+        """Version de la bibliothèque installée"""
+        try:
+            return importlib.metadata.version(cls.distribution or cls.module)
+        except importlib.metadata.PackageNotFoundError:
+            return "unknown"
+
+    @abstractmethod
+    def open(self, source: Union[Path, BinaryIO]):
+        """Document ouvert depuis un chemin ou un flux binaire"""
+
+    @abstractmethod
+    def page_count(self, document) -> int:
+        """Nombre de pages du document"""
+
+    @abstractmethod
+    def extract_page(self, document, page_num: int) -> str:
+        """Texte de la page page_num (à partir de 0)"""
+
+    def close(self, document):
+        pass
+
+
+class _PdfReaderBackend(PDFBackend):
+    """Backends à API PdfReader (PyPDF2 et son successeur pypdf)"""
+
+    def open(self, source: Union[Path, BinaryIO]):
+        module = importlib.import_module(self.module)
+        return module.PdfReader(str(source) if isinstance(source, Path) else source)
+
+    def page_count(self, document) -> int:
+        return len(document.pages)
+
+    def extract_page(self, document, page_num: int) -> str:
+        return document.pages[page_num].extract_text() or ""
+
+
+@register_backend
+class PyPDF2Backend(_PdfReaderBackend):
+    name = "PyPDF2"
+    module = "PyPDF2"
+
+
+@register_backend
+class PypdfBackend(_PdfReaderBackend):
+    name = "pypdf"
+    module = "pypdf"
+
+
+@register_backend
+class PdfminerBackend(PDFBackend):
+    """pdfminer.six : lent mais analyse fine de la mise en page"""
+    name = "pdfminer"
+    module = "pdfminer"
+    distribution = "pdfminer.six"
+
+    def open(self, source: Union[Path, BinaryIO]):
+        from pdfminer.pdfpage import PDFPage
+
+        # Flux en mémoire : appartient à l'appelant, il ne sera pas fermé
+        file = open(source, 'rb') if isinstance(source, Path) else None
+        try:
+            pages = list(PDFPage.get_pages(file or source))
+        except Exception:
+            if file:
+                file.close()
+            raise
+        return {"file": file, "pages": pages}
+
+    def page_count(self, document) -> int:
+        return len(document["pages"])
+
+    def extract_page(self, document, page_num: int) -> str:
+        from io import StringIO
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+        output = StringIO()
+        manager = PDFResourceManager()
+        with TextConverter(manager, output, laparams=LAParams()) as converter:
+            PDFPageInterpreter(manager, converter).process_page(document["pages"][page_num])
+        return output.getvalue().replace("\x0c", "")
+
+    def close(self, document):
+        if document["file"]:
+            document["file"].close()
+
+
+@register_backend
+class Pypdfium2Backend(PDFBackend):
+    """pypdfium2 : liaison vers PDFium (C++), le plus rapide"""
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def open(self, source: Union[Path, BinaryIO]):
+        import pypdfium2
+        return pypdfium2.PdfDocument(str(source) if isinstance(source, Path) else source)
+
+    def page_count(self, document) -> int:
+        return len(document)
+
+    def extract_page(self, document, page_num: int) -> str:
+        page = document[page_num]
+        try:
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+    def close(self, document):
+        document.close()
+
+
+def available_backends() -> List[str]:
+    """Noms des backends installés, dans l'ordre de sélection automatique"""
+    ordered = AUTO_ORDER + [name for name in PDF_BACKENDS if name not in AUTO_ORDER]
+    return [name for name in ordered if name in PDF_BACKENDS and PDF_BACKENDS[name].is_available()]
+
+
+def select_backends(preference: Optional[Union[str, List[str]]] = "auto") -> List[PDFBackend]:
+    """
+    Construire la liste ordonnée des backends à utiliser
+
+    Args:
+        preference: "auto", un nom ou une liste de noms (séparés par des virgules)
+
+    Returns:
+        Instances de backends installés ; le premier est le backend principal,
+        les suivants servent de repli
+    """
+    if preference is None or preference == "auto":
+        names = available_backends()
+    else:
+        if isinstance(preference, str):
+            preference = [name.strip() for name in preference.split(",") if name.strip()]
+        unknown = [name for name in preference if name not in PDF_BACKENDS]
+        if unknown:
+            raise ValueError(f"Backend PDF inconnu: {unknown}. Backends disponibles: {list(PDF_BACKENDS)}")
+        names = [name for name in preference if PDF_BACKENDS[name].is_available()]
+        if not names:
+            logger.warning(f"Aucun des backends PDF {preference} n'est installé, sélection automatique")
+            names = available_backends()
+
+    if not names:
+        raise ImportError("Aucune bibliothèque PDF installée (PyPDF2, pypdf, pdfminer.six ou pypdfium2)")
+
+    return [PDF_BACKENDS[name]() for name in names]
+
+
+def iter_pdf_pages(file_path: Union[Path, BinaryIO], backends: List[PDFBackend]) -> Iterator[str]:
+    """
+    Extraire le texte d'un PDF page par page avec repli par page
+
+    Args:
+        file_path: Chemin du PDF ou flux binaire en mémoire
+        backends: Backends ordonnés (voir select_backends)
+
+    Yields:
+        Texte de chaque page (les pages vides ou illisibles sont omises)
+    """
+    opened = {}
+    failed = set()
+
+    def get_document(index: int):
+        if index in failed:
+            raise ValueError(f"{backends[index].name} n'a pas pu ouvrir le fichier")
+        if index not in opened:
+            try:
+                opened[index] = backends[index].open(file_path)
+            except Exception:
+                failed.add(index)
+                raise
+        return opened[index]
+
+    try:
+        # Backend principal : le premier qui parvient à ouvrir le fichier
+        primary = None
+        for index, backend in enumerate(backends):
+            try:
+                page_count = backend.page_count(get_document(index))
+                primary = index
+                break
+            except Exception as e:
+                logger.warning(f"Backend PDF {backend.name} n'a pas pu ouvrir {file_path}: {e}")
+
+        if primary is None:
+            raise ValueError(f"Aucun backend PDF n'a pu ouvrir {file_path}")
+
+        for page_num in range(page_count):
+            for index in range(primary, len(backends)):
+                try:
+                    page_text = backends[index].extract_page(get_document(index), page_num)
+                    break
+                except Exception as e:
+                    logger.warning(f"Erreur lecture page {page_num} du PDF avec {backends[index].name}: {e}")
+            else:
+                continue
+
+            if page_text:
+                yield page_text
+    finally:
+        for index, document in opened.items():
+            try:
+                backends[index].close(document)
+            except Exception:
+                pass
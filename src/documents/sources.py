@@ -0,0 +1,156 @@
+"""
+Sources de documents : chemin sur disque ou contenu en mémoire
+
+Un document peut être fourni par son chemin, ou directement en mémoire
+(bytes, bytearray, memoryview, BytesIO ou tout objet fichier binaire, comme
+l'UploadedFile de Streamlit). Les buffers en mémoire sont lus sans copie :
+les extracteurs reçoivent un flux positionnable ou une memoryview.
+"""
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Union
+
+DocumentSource = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
+
+
+class BufferStream(io.RawIOBase):
+    """Flux binaire en lecture seule sur un buffer, sans copie du contenu"""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        super().__init__()
+        self._view = memoryview(data).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"whence invalide: {whence}")
+        if position < 0:
+            raise ValueError("Position négative")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        return self._position
+
+    def getbuffer(self) -> memoryview:
+        """Vue sur le contenu complet (même API que BytesIO.getbuffer)"""
+        return self._view[:]
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+
+def is_path(source: DocumentSource) -> bool:
+    """La source est-elle un chemin sur disque ?"""
+    return isinstance(source, (str, Path))
+
+
+def open_source(source: DocumentSource) -> Union[Path, BinaryIO]:
+    """
+    Normaliser une source pour les extracteurs
+
+    Returns:
+        Path pour un chemin, sinon un flux binaire positionnable (au début)
+    """
+    if is_path(source):
+        return Path(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BufferStream(source)
+    source.seek(0)
+    return source
+
+
+def rewind(source: Union[Path, BinaryIO]) -> Union[Path, BinaryIO]:
+    """Repositionner un flux au début (sans effet sur un chemin)"""
+    if not isinstance(source, Path):
+        source.seek(0)
+    return source
+
+
+def source_size(source: Union[Path, BinaryIO]) -> int:
+    """Taille en octets d'une source normalisée"""
+    if isinstance(source, Path):
+        return source.stat().st_size
+    position = source.tell()
+    size = source.seek(0, io.SEEK_END)
+    source.seek(position)
+    return size
+
+
+@contextmanager
+def open_buffer(source: Union[Path, BinaryIO, bytes, bytearray, memoryview]) -> Iterator[memoryview]:
+    """
+    Accéder au contenu complet d'une source sous forme de memoryview
+
+    Fichier sur disque : mappé en mémoire (mmap), lu à la demande par l'OS.
+    Buffer en mémoire : vue directe, sans copie.
+    """
+    if is_path(source):
+        with open(source, 'rb') as file:
+            if file.seek(0, io.SEEK_END) == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source).cast('B')
+    elif hasattr(source, 'getbuffer'):
+        view = source.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+    else:
+        source.seek(0)
+        yield memoryview(source.read())
+
+
+def persist_source(source: DocumentSource, destination: Union[str, Path]) -> Path:
+    """
+    Écrire une copie d'une source sur disque de façon atomique
+
+    Le contenu est écrit dans un fichier temporaire unique du même dossier puis
+    renommé : deux uploads simultanés du même nom ne s'écrasent jamais à moitié.
+
+    Returns:
+        Chemin du fichier écrit
+    """
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_name = tempfile.mkstemp(dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, 'wb') as file, open_buffer(source) as view:
+            file.write(view)
+        os.replace(temp_name, destination)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return destination
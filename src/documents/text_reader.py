@@ -0,0 +1,168 @@
+"""
+Lecture rapide des fichiers texte : détection d'encodage et lecture par blocs
+
+Le fichier est mappé en mémoire (mmap) une seule fois, ou lu directement
+depuis un buffer en mémoire. L'encodage est détecté à partir d'un échantillon
+d'octets (BOM, validité UTF-8, heuristique cp1252/latin-1), puis le contenu
+est décodé de façon incrémentale par blocs, ce qui garde une mémoire bornée
+même pour des exports de plusieurs Go.
+
+L'échantillon ne voit que le début et la fin du fichier : le décodage reste
+strict, et une séquence invalide plus loin (un « é » cp1252 dans un export
+UTF-8) est décodée avec l'encodage de repli au lieu de devenir U+FFFD.
+Le nombre de séquences concernées est journalisé.
+"""
+import codecs
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+import logging
+
+from src.documents.sources import open_buffer
+
+logger = logging.getLogger(__name__)
+
+# Taille par défaut des blocs décodés (1 Mo)
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Taille de l'échantillon lu au début et à la fin du fichier pour la détection
+SAMPLE_SIZE = 64 * 1024
+
+# BOM connus, du plus long au plus court (UTF-32 LE commence comme UTF-16 LE)
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Octets 0x80-0x9F : caractères imprimables en cp1252 (€, ’, œ...),
+# caractères de contrôle C1 en latin-1 (quasi absents des vrais textes)
+_CP1252_MARKERS = bytes(range(0x80, 0xA0))
+
+# Encodage de repli pour une séquence invalide dans l'encodage détecté
+# (latin-1 en dernier recours : tout octet y est valide)
+_FALLBACKS = {
+    'utf-8': 'cp1252',
+    'utf-8-sig': 'cp1252',
+    'cp1252': 'latin-1',
+}
+
+
+def _is_valid_utf8(sample: bytes) -> bool:
+    """Vérifier qu'un échantillon est de l'UTF-8 valide (tolère un caractère coupé en fin)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        decoder.decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(sample: bytes, tail: bytes = b"") -> str:
+    """
+    Détecter l'encodage d'un texte à partir d'un échantillon d'octets
+
+    Args:
+        sample: Premiers octets du fichier
+        tail: Derniers octets du fichier (optionnel, améliore la détection)
+
+    Returns:
+        Nom de l'encodage utilisable par codecs
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    # La fin du fichier peut commencer au milieu d'un caractère multi-octets :
+    # on ignore les octets de continuation initiaux (10xxxxxx)
+    tail_start = 0
+    while tail_start < min(len(tail), 3) and 0x80 <= tail[tail_start] < 0xC0:
+        tail_start += 1
+
+    if _is_valid_utf8(sample) and _is_valid_utf8(tail[tail_start:]):
+        return 'utf-8'
+
+    if any(byte in _CP1252_MARKERS for byte in sample + tail):
+        return 'cp1252'
+
+    return 'latin-1'
+
+
+class _FallbackDecoder:
+    """Décodeur incrémental strict qui décode chaque séquence invalide avec l'encodage de repli"""
+
+    def __init__(self, encoding: str, fallback: str):
+        # Après le BOM, la suite d'un fichier utf-8-sig est de l'UTF-8
+        self.encoding = 'utf-8' if encoding == 'utf-8-sig' else encoding
+        self.fallback = fallback
+        self.fallbacks = 0  # Séquences invalides décodées avec l'encodage de repli
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+
+    def _decode_invalid(self, raw: bytes) -> str:
+        try:
+            return raw.decode(self.fallback)
+        except UnicodeDecodeError:
+            return raw.decode('latin-1')
+
+    def decode(self, data, final: bool = False) -> str:
+        parts = []
+        while True:
+            try:
+                parts.append(self._decoder.decode(data, final=final))
+                return "".join(parts)
+            except UnicodeDecodeError as e:
+                # e.object : octets en attente + bloc courant, valides jusqu'à e.start
+                raw = bytes(e.object)
+                parts.append(raw[:e.start].decode(self.encoding))
+                parts.append(self._decode_invalid(raw[e.start:e.end]))
+                self.fallbacks += 1
+                self._decoder = codecs.getincrementaldecoder(self.encoding)()
+                data = raw[e.end:]
+
+
+def iter_text_blocks(source: Union[Path, BinaryIO, bytes, memoryview], block_size: int = DEFAULT_BLOCK_SIZE,
+                     encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    Décoder un fichier texte par blocs, en une seule lecture
+
+    Args:
+        source: Chemin du fichier, ou contenu en mémoire (bytes, memoryview, BytesIO)
+        block_size: Nombre d'octets décodés par bloc
+        encoding: Encodage à utiliser (détecté automatiquement si None)
+
+    Yields:
+        Blocs de texte décodés (les caractères multi-octets ne sont jamais coupés)
+    """
+    with open_buffer(source) as view:
+        size = len(view)
+        if size == 0:
+            return
+
+        if encoding is None:
+            tail = bytes(view[max(SAMPLE_SIZE, size - SAMPLE_SIZE):]) if size > SAMPLE_SIZE else b""
+            encoding = detect_encoding(bytes(view[:SAMPLE_SIZE]), tail)
+            logger.debug(f"Encodage détecté: {encoding}")
+
+        # Un octet invalide au milieu d'un fichier ne doit pas faire échouer la
+        # lecture complète : décodé avec l'encodage de repli (UTF-16/32, choisis
+        # d'après leur BOM, n'en ont pas et gardent U+FFFD)
+        fallback = _FALLBACKS.get(encoding)
+        if fallback is not None:
+            decoder = _FallbackDecoder(encoding, fallback)
+        else:
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+        for offset in range(0, size, block_size):
+            block = decoder.decode(view[offset:offset + block_size], final=False)
+            if block:
+                yield block
+
+        remainder = decoder.decode(b"", final=True)
+        if remainder:
+            yield remainder
+
+        if fallback is not None and decoder.fallbacks:
+            logger.warning(
+                f"{decoder.fallbacks} séquence(s) invalide(s) en {encoding}, décodée(s) en {fallback}"
+            )
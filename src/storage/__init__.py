@@ -2,6 +2,12 @@
 Package storage - Gestion du stockage de données
 """
 from src.storage.vector_store import VectorStore
+from src.storage.extraction_cache import ExtractionCache
+from src.storage.answer_cache import SemanticAnswerCache
+from src.storage.conversation_store import ConversationStore
+from src.storage.cv_index import CVIndex
+from src.storage.job_store import JobStore
+from src.storage.user_store import UserStore
 
-__all__ = ['VectorStore']
+__all__ = ['VectorStore', 'ExtractionCache', 'SemanticAnswerCache', 'ConversationStore', 'CVIndex', 'JobStore', 'UserStore']
 
@@ -0,0 +1,306 @@
+"""
+Cache sémantique des réponses du LLM
+
+Une réponse est réutilisée si la nouvelle question est proche d'une question
+déjà posée (similarité cosinus des embeddings ≥ seuil) ET si la recherche a
+retourné exactement les mêmes chunks, avec le même contenu et le même modèle
+(empreinte du contenu), pour le même utilisateur et le même état de
+conversation (empreinte de la réponse, voir scoped_fingerprint). Une
+paraphrase évite ainsi la génération, sans jamais servir une réponse fondée
+sur d'autres documents ou écrite pour un autre échange.
+
+Quand un chunk est modifié, l'empreinte du contenu change : les réponses qui
+l'utilisaient ne sont plus servies et sont supprimées à la première
+recherche qui le retrouve (ou dès la réindexation, voir invalidate_chunks).
+Les réponses d'autres utilisateurs ou conversations sur les mêmes chunks
+inchangés sont gardées. Les entrées sont persistées dans SQLite, bornées en
+nombre (LRU) et en âge (TTL).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def context_fingerprint(chunks: Sequence[Dict[str, Any]], model: str = "") -> str:
+    """
+    Empreinte d'un contexte : identifiants et contenu des chunks, et modèle
+
+    Args:
+        chunks: Chunks retrouvés ({'id', 'content'}), dans l'ordre du prompt
+        model: Modèle LLM utilisé pour la réponse
+    """
+    digest = hashlib.sha256(model.encode('utf-8'))
+    for chunk in chunks:
+        digest.update(b"\0" + str(chunk.get('id', '')).encode('utf-8'))
+        digest.update(b"\0" + chunk.get('content', '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def scoped_fingerprint(content_hash: str, *scopes: str) -> str:
+    """
+    Empreinte d'une réponse : empreinte du contenu (context_fingerprint) et ce
+    qui, en plus du contexte, change la réponse (utilisateur, conversation)
+
+    Args:
+        content_hash: Empreinte du contenu (context_fingerprint)
+        scopes: Parties de la requête envoyées au LLM ('' = absente)
+    """
+    scopes = tuple(scope for scope in scopes if scope)
+    if not scopes:
+        return content_hash
+    return hashlib.sha256("|".join((content_hash,) + scopes).encode('utf-8')).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Cache des réponses indexé par embedding de la question et empreinte de la réponse
+    """
+
+    def __init__(self, cache_path: str = "cache/answers.sqlite", threshold: float = 0.95,
+                 max_entries: int = 1000, ttl_hours: float = 24):
+        """
+        Args:
+            cache_path: Fichier SQLite du cache
+            threshold: Similarité cosinus minimale entre deux questions
+            max_entries: Nombre maximal de réponses gardées (LRU au-delà)
+            ttl_hours: Durée de vie d'une réponse (0 = illimitée)
+        """
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_hours * 3600
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(answers)")}
+        if "content_hash" not in columns:
+            # Base créée avant la séparation des empreintes : contenu = réponse
+            self._connection.execute("ALTER TABLE answers ADD COLUMN content_hash TEXT")
+            self._connection.execute("UPDATE answers SET content_hash = fingerprint")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_answers_fingerprint ON answers(fingerprint)")
+        self._connection.commit()
+
+        # Index en mémoire : empreinte -> [(id, embedding normalisé)],
+        # chunks -> {id: (empreinte, empreinte du contenu)}
+        self._by_fingerprint: Dict[str, List[tuple]] = {}
+        self._by_chunks: Dict[str, Dict[int, tuple]] = {}
+        self._load()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _index(self, entry_id: int, fingerprint: str, content_hash: str, chunk_key: str, vector: np.ndarray):
+        self._by_fingerprint.setdefault(fingerprint, []).append((entry_id, vector))
+        self._by_chunks.setdefault(chunk_key, {})[entry_id] = (fingerprint, content_hash)
+
+    def _unindex(self, entry_id: int, fingerprint: str, chunk_key: str):
+        entries = [entry for entry in self._by_fingerprint.get(fingerprint, []) if entry[0] != entry_id]
+        if entries:
+            self._by_fingerprint[fingerprint] = entries
+        else:
+            self._by_fingerprint.pop(fingerprint, None)
+        chunk_entries = self._by_chunks.get(chunk_key, {})
+        chunk_entries.pop(entry_id, None)
+        if not chunk_entries:
+            self._by_chunks.pop(chunk_key, None)
+
+    def _load(self):
+        """Charger l'index en mémoire depuis SQLite (entrées expirées supprimées)"""
+        self._purge_expired()
+        for entry_id, fingerprint, content_hash, chunk_ids, embedding in self._connection.execute(
+            "SELECT id, fingerprint, content_hash, chunk_ids, embedding FROM answers"
+        ):
+            self._index(entry_id, fingerprint, content_hash, chunk_ids, np.frombuffer(embedding, dtype=np.float32))
+        logger.info(f"Cache de réponses : {self._count()} entrées chargées")
+
+    def _count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def _delete(self, rows: List[tuple]):
+        """Supprimer des entrées (id, fingerprint, chunk_ids)"""
+        for entry_id, fingerprint, chunk_key in rows:
+            self._connection.execute("DELETE FROM answers WHERE id = ?", (entry_id,))
+            self._unindex(entry_id, fingerprint, chunk_key)
+
+    def _purge_expired(self):
+        if not self.ttl_seconds:
+            return
+        rows = self._connection.execute(
+            "SELECT id, fingerprint, chunk_ids FROM answers WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,)
+        ).fetchall()
+        if rows:
+            self._delete(rows)
+            self.evictions += len(rows)
+            self._connection.commit()
+
+    def get(self, query_embedding: Sequence[float], chunk_ids: Sequence[str], fingerprint: str,
+            content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        Chercher une réponse pour une question et un contexte
+
+        Args:
+            query_embedding: Embedding de la question
+            chunk_ids: Identifiants des chunks retrouvés (ordre du prompt)
+            fingerprint: Empreinte de la réponse (voir scoped_fingerprint)
+            content_hash: Empreinte du contenu des chunks (voir context_fingerprint ;
+                fingerprint si None)
+
+        Returns:
+            Réponse en cache ou None
+        """
+        chunk_key = json.dumps(list(chunk_ids))
+        query = self._normalize(query_embedding)
+        content_hash = content_hash if content_hash is not None else fingerprint
+
+        with self._lock:
+            # Mêmes chunks mais contenu ou modèle différent : réponses périmées
+            # (un autre utilisateur ou une autre conversation ne l'est pas)
+            stale = [(entry_id, fp, chunk_key)
+                     for entry_id, (fp, content) in self._by_chunks.get(chunk_key, {}).items()
+                     if content != content_hash]
+            if stale:
+                self._delete(stale)
+                self.invalidations += len(stale)
+                self._connection.commit()
+
+            best_id, best_score = None, self.threshold
+            for entry_id, vector in self._by_fingerprint.get(fingerprint, []):
+                if vector.shape != query.shape:
+                    continue
+                score = float(np.dot(vector, query))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            row = self._connection.execute(
+                "SELECT answer, created_at FROM answers WHERE id = ?", (best_id,)
+            ).fetchone()
+            if row is None:
+                # Supprimée par un autre processus (réindexation, éviction)
+                self._unindex(best_id, fingerprint, chunk_key)
+                self.misses += 1
+                return None
+            if self.ttl_seconds and row[1] < time.time() - self.ttl_seconds:
+                self._delete([(best_id, fingerprint, chunk_key)])
+                self.evictions += 1
+                self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE answers SET last_access = ? WHERE id = ?", (time.time(), best_id))
+            self._connection.commit()
+            self.hits += 1
+
+        logger.info(f"Réponse trouvée dans le cache (similarité {best_score:.3f})")
+        return row[0]
+
+    def put(self, query_embedding: Sequence[float], chunk_ids: Sequence[str], fingerprint: str,
+            question: str, answer: str, content_hash: Optional[str] = None):
+        """Stocker une réponse puis évincer les entrées les moins récemment utilisées si besoin"""
+        chunk_key = json.dumps(list(chunk_ids))
+        vector = self._normalize(query_embedding)
+        content_hash = content_hash if content_hash is not None else fingerprint
+        now = time.time()
+
+        with self._lock:
+            cursor = self._connection.execute(
+                """INSERT INTO answers (fingerprint, content_hash, chunk_ids, embedding, question, answer,
+                created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (fingerprint, content_hash, chunk_key, vector.tobytes(), question, answer, now, now)
+            )
+            self._index(cursor.lastrowid, fingerprint, content_hash, chunk_key, vector)
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Supprimer les entrées expirées puis les moins récemment utilisées au-delà de max_entries"""
+        self._purge_expired()
+        excess = self._count() - self.max_entries
+        if excess <= 0:
+            return
+        rows = self._connection.execute(
+            "SELECT id, fingerprint, chunk_ids FROM answers ORDER BY last_access ASC LIMIT ?", (excess,)
+        ).fetchall()
+        self._delete(rows)
+        self.evictions += len(rows)
+
+    def invalidate_chunks(self, chunk_ids: Sequence[str]) -> int:
+        """
+        Supprimer les réponses qui utilisent au moins un des chunks donnés
+
+        Returns:
+            Nombre de réponses supprimées
+        """
+        targets = set(chunk_ids)
+        with self._lock:
+            rows = [
+                (entry_id, fingerprint, chunk_key)
+                for chunk_key, entries in list(self._by_chunks.items())
+                if targets.intersection(json.loads(chunk_key))
+                for entry_id, (fingerprint, _) in list(entries.items())
+            ]
+            self._delete(rows)
+            self.invalidations += len(rows)
+            self._connection.commit()
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (entrées, hits, misses, taux de succès, invalidations, évictions)"""
+        with self._lock:
+            entries = self._count()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
+
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._connection.execute("DELETE FROM answers")
+            self._connection.commit()
+            self._by_fingerprint.clear()
+            self._by_chunks.clear()
+
+    def close(self):
+        """Fermer la base"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,82 @@
+"""
+Historique des conversations sur disque (SQLite), par utilisateur
+
+Les échanges qui sortent de l'historique en mémoire (ConversationHistory)
+y sont déversés : la mémoire d'une session reste bornée sans perdre les
+anciens échanges, relus à la demande.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Échanges déversés par l'historique en mémoire, dans SQLite"""
+
+    def __init__(self, db_path: str = "cache/conversations.sqlite"):
+        """
+        Args:
+            db_path: Fichier SQLite des échanges
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_turns_user ON turns(user_id, id)")
+        self._connection.commit()
+
+    def append(self, user_id: str, turn: Dict[str, Any]):
+        """Ajouter un échange ({'question', 'answer', 'sources', 'confidence', 'created_at'})"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO turns (user_id, question, answer, sources, confidence, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, turn['question'], turn['answer'], json.dumps(turn['sources'], ensure_ascii=False),
+                 turn['confidence'], turn['created_at'])
+            )
+            self._connection.commit()
+
+    def load(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Échanges déversés d'un utilisateur, du plus ancien au plus récent (les limit derniers)"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT question, answer, sources, confidence, created_at FROM turns "
+                "WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, -1 if limit is None else limit)
+            ).fetchall()
+        return [
+            {'question': question, 'answer': answer, 'sources': json.loads(sources),
+             'confidence': confidence, 'created_at': created_at}
+            for question, answer, sources, confidence, created_at in reversed(rows)
+        ]
+
+    def count(self, user_id: str) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM turns WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def clear(self, user_id: str):
+        """Supprimer les échanges d'un utilisateur"""
+        with self._lock:
+            self._connection.execute("DELETE FROM turns WHERE user_id = ?", (user_id,))
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
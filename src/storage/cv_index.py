@@ -0,0 +1,198 @@
+"""
+Index SQLite des champs structurés des CV
+
+Une ligne par CV (poste, ville, années d'expérience) et une ligne par
+technologie et par langage, avec des index sur chaque critère : les
+questions de comptage, de filtre et de liste (« combien de DevOps »,
+« développeurs React avec 5 ans d'expérience ») sont servies en quelques
+millisecondes, sans recherche vectorielle ni LLM.
+
+Les valeurs sont comparées sous forme normalisée (minuscules, sans accents).
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+from src.documents.cv_extractor import CVFields, normalize
+
+logger = logging.getLogger(__name__)
+
+# Regroupements autorisés pour count(group_by=...)
+GROUP_COLUMNS = {"job_title": "c.job_title", "city": "c.city"}
+
+
+class CVIndex:
+    """Champs structurés des CV, indexés pour les filtres et agrégats"""
+
+    def __init__(self, db_path: str = "cache/cv_index.sqlite"):
+        """
+        Args:
+            db_path: Fichier SQLite de l'index
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cvs (
+                source TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                job_title TEXT NOT NULL,
+                job_title_norm TEXT NOT NULL,
+                city TEXT NOT NULL,
+                city_norm TEXT NOT NULL,
+                experience_years REAL NOT NULL,
+                technologies TEXT NOT NULL,
+                languages TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cvs_job ON cvs(job_title_norm);
+            CREATE INDEX IF NOT EXISTS idx_cvs_city ON cvs(city_norm);
+            CREATE INDEX IF NOT EXISTS idx_cvs_experience ON cvs(experience_years);
+            CREATE TABLE IF NOT EXISTS cv_technologies (
+                source TEXT NOT NULL,
+                technology_norm TEXT NOT NULL,
+                PRIMARY KEY (technology_norm, source)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cv_languages (
+                source TEXT NOT NULL,
+                language_norm TEXT NOT NULL,
+                PRIMARY KEY (language_norm, source)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._connection.commit()
+
+    def add(self, source: str, fields: CVFields):
+        """Indexer (ou ré-indexer) le CV d'un document"""
+        with self._lock:
+            self._delete(source)
+            self._connection.execute(
+                "INSERT INTO cvs (source, name, job_title, job_title_norm, city, city_norm, experience_years, "
+                "technologies, languages, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, fields.name, fields.job_title, normalize(fields.job_title), fields.city,
+                 normalize(fields.city), fields.experience_years,
+                 json.dumps(fields.technologies, ensure_ascii=False), json.dumps(fields.languages, ensure_ascii=False),
+                 time.time())
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO cv_technologies (source, technology_norm) VALUES (?, ?)",
+                [(source, normalize(tech)) for tech in fields.technologies]
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO cv_languages (source, language_norm) VALUES (?, ?)",
+                [(source, normalize(language)) for language in fields.languages]
+            )
+            self._connection.commit()
+
+    def _delete(self, source: str):
+        for table in ("cvs", "cv_technologies", "cv_languages"):
+            self._connection.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+
+    def remove(self, source: str):
+        """Retirer le CV d'un document"""
+        with self._lock:
+            self._delete(source)
+            self._connection.commit()
+
+    def _where(self, job_titles: Sequence[str] = (), job_prefix: Optional[str] = None,
+               technologies: Sequence[str] = (), languages: Sequence[str] = (),
+               cities: Sequence[str] = (), min_years: Optional[float] = None,
+               max_years: Optional[float] = None) -> tuple:
+        """Clause WHERE et paramètres (critères combinés par ET, valeurs d'un critère par OU)"""
+        clauses, params = [], []
+        if job_titles:
+            clauses.append(f"c.job_title_norm IN ({','.join('?' * len(job_titles))})")
+            params += [normalize(title) for title in job_titles]
+        if job_prefix:
+            clauses.append("c.job_title_norm LIKE ?")
+            params.append(normalize(job_prefix) + "%")
+        for tech in technologies:
+            clauses.append("c.source IN (SELECT source FROM cv_technologies WHERE technology_norm = ?)")
+            params.append(normalize(tech))
+        for language in languages:
+            clauses.append("c.source IN (SELECT source FROM cv_languages WHERE language_norm = ?)")
+            params.append(normalize(language))
+        if cities:
+            clauses.append(f"c.city_norm IN ({','.join('?' * len(cities))})")
+            params += [normalize(city) for city in cities]
+        if min_years is not None:
+            clauses.append("c.experience_years >= ?")
+            params.append(min_years)
+        if max_years is not None:
+            clauses.append("c.experience_years < ?")
+            params.append(max_years)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, group_by: Optional[str] = None, **filters) -> Any:
+        """
+        Nombre de CV correspondant aux filtres (voir search)
+
+        Args:
+            group_by: "job_title" ou "city" : {valeur: nombre}, du plus fréquent au moins fréquent
+        """
+        where, params = self._where(**filters)
+        with self._lock:
+            if group_by is None:
+                return self._connection.execute(f"SELECT COUNT(*) FROM cvs c{where}", params).fetchone()[0]
+            column = GROUP_COLUMNS[group_by]
+            rows = self._connection.execute(
+                f"SELECT {column}, COUNT(*) AS n FROM cvs c{where} GROUP BY {column} ORDER BY n DESC, {column}",
+                params
+            ).fetchall()
+        return dict(rows)
+
+    def search(self, limit: Optional[int] = 50, **filters) -> List[Dict[str, Any]]:
+        """
+        CV correspondant aux filtres, les plus expérimentés d'abord
+
+        Args:
+            limit: Nombre maximal de CV
+            job_titles: Postes exacts ; job_prefix : début du poste (ex. "Développeur")
+            technologies, languages: Tous requis
+            cities: Une des villes
+            min_years, max_years: Années d'expérience (min incluse, max exclue)
+        """
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT source, name, job_title, city, experience_years, technologies, languages "
+                f"FROM cvs c{where} ORDER BY c.experience_years DESC, c.name LIMIT ?",
+                params + [-1 if limit is None else limit]
+            ).fetchall()
+        return [
+            {"source": source, "name": name, "job_title": job_title, "city": city,
+             "experience_years": years, "technologies": json.loads(technologies), "languages": json.loads(languages)}
+            for source, name, job_title, city, years, technologies, languages in rows
+        ]
+
+    def vocabulary(self) -> Dict[str, Any]:
+        """
+        Valeurs connues (normalisées) : postes et villes ({forme normalisée: libellé}),
+        technologies et langages (listes)
+        """
+        with self._lock:
+            return {
+                "job_titles": dict(self._connection.execute(
+                    "SELECT job_title_norm, MIN(job_title) FROM cvs GROUP BY job_title_norm")),
+                "cities": dict(self._connection.execute(
+                    "SELECT city_norm, MIN(city) FROM cvs WHERE city_norm != '' GROUP BY city_norm")),
+                "technologies": [row[0] for row in self._connection.execute(
+                    "SELECT DISTINCT technology_norm FROM cv_technologies")],
+                "languages": [row[0] for row in self._connection.execute(
+                    "SELECT DISTINCT language_norm FROM cv_languages")]
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM cvs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
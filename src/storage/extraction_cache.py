@@ -0,0 +1,163 @@
+"""
+Cache persistant des extractions de documents
+
+Clé : (SHA-256 du contenu, extracteur et sa version, paramètres de découpage).
+Valeur : texte extrait et bornes des chunks (indices de mots), compressés
+avec zlib dans une base SQLite. Un document déjà vu (même contenu, quel que
+soit son nom ou l'utilisateur) n'est plus parsé. La taille totale est bornée ;
+les entrées les moins récemment utilisées sont évincées.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus pour le calcul du SHA-256
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: Union[Path, bytes, memoryview]) -> str:
+    """Calculer le SHA-256 d'un fichier par blocs (ou d'un contenu déjà en mémoire)"""
+    if isinstance(file_path, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(file_path).hexdigest()
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Cache LRU sur disque des résultats d'extraction
+    """
+
+    def __init__(self, cache_dir: str = "cache", max_size_mb: float = 500):
+        """
+        Args:
+            cache_dir: Répertoire du cache (contient extractions.sqlite)
+            max_size_mb: Taille maximale des données compressées
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.cache_dir / "extractions.sqlite"), check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON extractions(last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(content_hash: str, extractor: str, chunking: Dict[str, Any]) -> str:
+        """
+        Construire la clé de cache
+
+        Args:
+            content_hash: SHA-256 du fichier
+            extractor: Nom et version de l'extracteur (ex. "pdf:pypdfium2-4.25.0")
+            chunking: Paramètres de découpage (taille des chunks, limites)
+        """
+        params = json.dumps(chunking, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}|{extractor}|{params}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupérer une extraction
+
+        Returns:
+            {"text", "chunk_bounds", "truncated"} ou None si absente
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def put(self, key: str, text: str, chunk_bounds: List[int], truncated: bool = False):
+        """
+        Stocker une extraction puis évincer les entrées les plus anciennes si besoin
+
+        Args:
+            key: Clé (voir make_key)
+            text: Texte extrait
+            chunk_bounds: Indices de mots de début de chaque chunk, suivis du nombre total de mots
+            truncated: Le document a-t-il été tronqué par les limites
+        """
+        payload = json.dumps({"text": text, "chunk_bounds": chunk_bounds, "truncated": truncated}, ensure_ascii=False)
+        data = zlib.compress(payload.encode('utf-8'), 6)
+
+        if len(data) > self.max_size_bytes:
+            logger.info(f"Extraction trop volumineuse pour le cache ({len(data)} octets)")
+            return
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO extractions (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Supprimer les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+
+        evicted = 0
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM extractions ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_size_bytes:
+                break
+            self._connection.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Cache d'extraction : {evicted} entrées évincées")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (entrées, taille, hits, misses)"""
+        with self._lock:
+            count, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+        return {
+            "entries": count,
+            "size_bytes": size,
+            "max_size_bytes": self.max_size_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._connection.execute("DELETE FROM extractions")
+            self._connection.commit()
+
+    def close(self):
+        """Fermer la base"""
+        with self._lock:
+            self._connection.close()
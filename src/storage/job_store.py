@@ -0,0 +1,256 @@
+"""
+Tâches d'indexation et avancement de chaque fichier (SQLite)
+
+Chaque fichier d'une tâche passe par les étapes queued → extracted →
+embedded → stored ; l'étape n'est enregistrée qu'une fois son résultat écrit
+sur disque, si bien qu'après un arrêt le fichier reprend à l'étape suivante
+sans refaire les précédentes. Les états finaux sont stored, failed et
+skipped (même fichier, même contenu, déjà indexé ou en cours).
+
+Plusieurs processus peuvent traiter les tâches d'une même base : un fichier
+est pris par un seul propriétaire, pour un bail (lease) que son processus
+renouvelle tant qu'il y travaille (renew). Un fichier dont le bail a expiré
+(processus arrêté) peut être repris par un autre ; un propriétaire qui a
+perdu son bail ne peut plus faire avancer le fichier (LeaseLost).
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Étapes d'un fichier, dans l'ordre ; les étapes PENDING restent à traiter
+STAGES = ("queued", "extracted", "embedded", "stored")
+PENDING = ("queued", "extracted", "embedded")
+FINAL = ("stored", "failed", "skipped")
+
+_FILE_COLUMNS = ("id, job_id, name, content_hash, stage, running, chunks, cv_indexed, error, updated_at, "
+                 "owner, lease_until")
+
+
+class LeaseLost(Exception):
+    """Le bail du fichier a expiré et un autre processus l'a repris"""
+
+
+class JobStore:
+    """Tâches d'indexation persistantes, dans SQLite"""
+
+    def __init__(self, db_path: str = "cache/ingestion.sqlite"):
+        """
+        Args:
+            db_path: Fichier SQLite des tâches
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                running INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER,
+                cv_indexed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_until REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_files_job ON job_files(job_id);
+            CREATE INDEX IF NOT EXISTS idx_job_files_stage ON job_files(stage, running, id);
+            CREATE INDEX IF NOT EXISTS idx_job_files_content ON job_files(name, content_hash);
+            CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, created_at);
+            """
+        )
+        # Bases créées avant les baux
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(job_files)")}
+        if "owner" not in columns:
+            self._connection.execute("ALTER TABLE job_files ADD COLUMN owner TEXT")
+            self._connection.execute("ALTER TABLE job_files ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        self._connection.commit()
+
+    @staticmethod
+    def _file(row: tuple) -> Dict[str, Any]:
+        (file_id, job_id, name, content_hash, stage, running, chunks, cv_indexed, error, updated_at,
+         owner, lease_until) = row
+        return {
+            "id": file_id, "job_id": job_id, "name": name, "content_hash": content_hash, "stage": stage,
+            "running": bool(running), "chunks": chunks, "cv_indexed": bool(cv_indexed), "error": error,
+            "updated_at": updated_at, "owner": owner, "lease_until": lease_until
+        }
+
+    def create_job(self, user_id: str, files: Sequence[Tuple[str, str]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Créer une tâche
+
+        Un fichier (même nom, même contenu) déjà indexé ou en file n'est pas
+        traité une seconde fois : il est marqué skipped.
+
+        Args:
+            user_id: Utilisateur qui a envoyé les fichiers
+            files: (nom, empreinte du contenu) de chaque fichier
+
+        Returns:
+            (identifiant de la tâche, fichiers de la tâche)
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("INSERT INTO jobs (id, user_id, created_at) VALUES (?, ?, ?)",
+                                     (job_id, user_id, now))
+            for name, content_hash in files:
+                previous = self._connection.execute(
+                    "SELECT job_id, stage FROM job_files WHERE name = ? AND content_hash = ? "
+                    "AND stage NOT IN ('failed', 'skipped') ORDER BY id DESC LIMIT 1",
+                    (name, content_hash)
+                ).fetchone()
+                if previous is None:
+                    self._connection.execute(
+                        "INSERT INTO job_files (job_id, name, content_hash, stage, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (job_id, name, content_hash, "queued", now)
+                    )
+                else:
+                    state = "déjà indexé" if previous[1] == "stored" else "déjà en file"
+                    self._connection.execute(
+                        "INSERT INTO job_files (job_id, name, content_hash, stage, error, updated_at) "
+                        "VALUES (?, ?, ?, 'skipped', ?, ?)",
+                        (job_id, name, content_hash, f"{state} (tâche {previous[0]})", now)
+                    )
+            rows = self._connection.execute(
+                f"SELECT {_FILE_COLUMNS} FROM job_files WHERE job_id = ? ORDER BY id", (job_id,)
+            ).fetchall()
+        return job_id, [self._file(row) for row in rows]
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Prendre le prochain fichier à traiter (le plus ancien, libre ou dont le
+        bail a expiré) pour lease_seconds, ou None
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._connection.execute(
+                    f"SELECT {_FILE_COLUMNS} FROM job_files WHERE stage IN ({','.join('?' * len(PENDING))}) "
+                    "AND (running = 0 OR lease_until < ?) ORDER BY id LIMIT 1", (*PENDING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                # Pris par un autre processus entre-temps : fichier suivant
+                with self._connection:
+                    claimed = self._connection.execute(
+                        "UPDATE job_files SET running = 1, owner = ?, lease_until = ?, updated_at = ? "
+                        "WHERE id = ? AND (running = 0 OR lease_until < ?)",
+                        (owner, now + lease_seconds, now, row[0], now)
+                    ).rowcount
+                if claimed:
+                    if row[5]:
+                        logger.warning(f"Bail expiré de {row[10]} : {row[2]} repris par {owner}")
+                    file = self._file(row)
+                    file.update(running=True, owner=owner, lease_until=now + lease_seconds)
+                    return file
+
+    def renew(self, file_id: int, owner: str, lease_seconds: float) -> bool:
+        """Prolonger le bail d'un fichier (False s'il a été perdu)"""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "UPDATE job_files SET lease_until = ? WHERE id = ? AND owner = ? AND running = 1",
+                (time.time() + lease_seconds, file_id, owner)
+            ).rowcount > 0
+
+    def advance(self, file_id: int, stage: str, owner: Optional[str] = None, **fields):
+        """
+        Enregistrer l'étape atteinte par un fichier (et chunks, cv_indexed, error)
+
+        Une étape finale libère le fichier. Avec owner, l'étape n'est
+        enregistrée que si owner détient toujours le bail (sinon LeaseLost).
+        """
+        if stage not in STAGES and stage not in FINAL:
+            raise ValueError(f"Étape inconnue: {stage}")
+        columns = {"stage": stage, "updated_at": time.time(), **fields}
+        if stage in FINAL:
+            columns.update(running=0, owner=None, lease_until=0)
+        condition, parameters = "id = ?", [file_id]
+        if owner is not None:
+            condition, parameters = "id = ? AND owner = ? AND running = 1", [file_id, owner]
+        with self._lock, self._connection:
+            updated = self._connection.execute(
+                f"UPDATE job_files SET {', '.join(f'{column} = ?' for column in columns)} WHERE {condition}",
+                [*columns.values(), *parameters]
+            ).rowcount
+        if not updated and owner is not None:
+            raise LeaseLost(f"Fichier {file_id} : bail perdu par {owner}")
+
+    def expired(self) -> int:
+        """Fichiers en cours dont le bail a expiré (processus arrêté), repris par claim_next"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM job_files WHERE running = 1 AND lease_until < ?", (time.time(),)
+            ).fetchone()[0]
+
+    def pending(self) -> int:
+        """Nombre de fichiers qui restent à traiter"""
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT COUNT(*) FROM job_files WHERE stage IN ({','.join('?' * len(PENDING))})", PENDING
+            ).fetchone()[0]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Tâche et avancement de ses fichiers
+
+        Returns:
+            {'id', 'user_id', 'created_at', 'status', 'total', 'done', 'progress', 'files'}
+            ou None ; status : queued, running, done ou failed (au moins un fichier en échec)
+        """
+        with self._lock:
+            job = self._connection.execute("SELECT id, user_id, created_at FROM jobs WHERE id = ?",
+                                           (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = self._connection.execute(
+                f"SELECT {_FILE_COLUMNS} FROM job_files WHERE job_id = ? ORDER BY id", (job_id,)
+            ).fetchall()
+        files = [self._file(row) for row in rows]
+        done = sum(file["stage"] in FINAL for file in files)
+        # Avancement : chaque fichier compte pour une part, répartie entre ses étapes
+        steps = len(STAGES) - 1
+        progress = sum(1.0 if file["stage"] in FINAL else STAGES.index(file["stage"]) / steps for file in files)
+        if done < len(files):
+            status = "running" if any(file["running"] or file["stage"] != "queued" for file in files) else "queued"
+        else:
+            status = "failed" if any(file["stage"] == "failed" for file in files) else "done"
+        return {
+            "id": job[0], "user_id": job[1], "created_at": job[2], "status": status,
+            "total": len(files), "done": done, "progress": progress / len(files) if files else 1.0,
+            "files": files
+        }
+
+    def list_jobs(self, user_id: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Tâches les plus récentes (d'un utilisateur si user_id est donné)"""
+        with self._lock:
+            if user_id is None:
+                rows = self._connection.execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?",
+                                                (limit,)).fetchall()
+            else:
+                rows = self._connection.execute(
+                    "SELECT id FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+                ).fetchall()
+        return [job for job in (self.get_job(row[0]) for row in rows) if job is not None]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
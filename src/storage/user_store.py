@@ -0,0 +1,115 @@
+"""
+Comptes utilisateurs persistants (SQLite)
+
+Les comptes sont lus une fois à la création du store (une fois par
+processus) et gardés en mémoire : vérifier un mot de passe ne relit pas la
+base. Les mots de passe sont hachés avec PBKDF2-SHA256 et un sel propre à
+chaque compte ; le hachage n'est calculé qu'à la connexion et à la création
+d'un compte. Au premier démarrage, les comptes par défaut (admin, user)
+sont créés.
+"""
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PBKDF2_ITERATIONS = 200_000
+
+# Comptes créés au premier démarrage : {username: (mot de passe, nom, rôle)}
+DEFAULT_USERS = {
+    "admin": ("admin123", "Administrateur", "admin"),
+    "user": ("user123", "Utilisateur Standard", "user"),
+}
+
+
+def hash_password(password: str, salt: Optional[bytes] = None, iterations: int = PBKDF2_ITERATIONS) -> str:
+    """Hacher un mot de passe : "pbkdf2_sha256$<itérations>$<sel>$<hash>" (hexadécimal)"""
+    salt = salt if salt is not None else os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Comparer un mot de passe à son hash (temps constant)"""
+    try:
+        scheme, iterations, salt, expected = password_hash.split("$")
+    except ValueError:
+        return False
+    if scheme != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+class UserStore:
+    """Comptes utilisateurs, dans SQLite et en mémoire"""
+
+    def __init__(self, db_path: str = "data/users.sqlite"):
+        """
+        Args:
+            db_path: Fichier SQLite des comptes
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                password_hash TEXT NOT NULL,
+                name TEXT NOT NULL,
+                role TEXT NOT NULL
+            );
+            """
+        )
+        self._connection.commit()
+
+        self.users: Dict[str, Dict[str, str]] = {}
+        self.reload()
+        if not self.users:
+            for username, (password, name, role) in DEFAULT_USERS.items():
+                self.add_user(username, password, name, role)
+            logger.info(f"Comptes par défaut créés dans {self.db_path}")
+
+    def reload(self):
+        """Relire les comptes (ceux créés par un autre processus)"""
+        with self._lock:
+            rows = self._connection.execute("SELECT username, password_hash, name, role FROM users").fetchall()
+        self.users = {
+            username: {"password_hash": password_hash, "name": name, "role": role}
+            for username, password_hash, name, role in rows
+        }
+
+    def add_user(self, username: str, password: str, name: str, role: str = "user"):
+        """Créer ou remplacer un compte"""
+        user = {"password_hash": hash_password(password), "name": name, "role": role}
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO users (username, password_hash, name, role) VALUES (?, ?, ?, ?)",
+                (username, user["password_hash"], name, role)
+            )
+        self.users = {**self.users, username: user}
+
+    def authenticate(self, username: str, password: str) -> bool:
+        """Vérifier le mot de passe d'un compte"""
+        user = self.users.get(username)
+        return user is not None and bool(password) and verify_password(password, user["password_hash"])
+
+    def get_user_info(self, username: str) -> Optional[Dict[str, Any]]:
+        """{'username', 'name', 'role'} d'un compte, ou None"""
+        user = self.users.get(username)
+        if user is None:
+            return None
+        return {"username": username, "name": user["name"], "role": user["role"]}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
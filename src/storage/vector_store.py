@@ -4,7 +4,7 @@ Module pour gérer le stockage vectoriel avec ChromaDB
 import chromadb
 from chromadb.config import Settings
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -87,6 +87,73 @@ class VectorStore:
             logger.error(f"Erreur lors de l'ajout des documents: {e}")
             raise
     
+    def upsert_documents(
+        self,
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str]
+    ):
+        """
+        Ajoute ou remplace des documents (un identifiant existant est mis à jour,
+        add_documents l'ignorerait)
+        
+        Args:
+            embeddings: Liste des vecteurs (embeddings)
+            documents: Liste des textes originaux
+            metadatas: Liste des métadonnées pour chaque document
+            ids: Liste des identifiants uniques
+        """
+        if self.collection is None:
+            self.create_collection()
+        
+        try:
+            self.collection.upsert(
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
+            )
+            logger.info(f"Ajouté ou mis à jour {len(documents)} documents dans la base")
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour des documents: {e}")
+            raise
+    
+    def get_source_ids(self, source: str) -> List[str]:
+        """
+        Identifiants des chunks d'un document
+        
+        Args:
+            source: Nom du document (métadonnée 'source')
+        """
+        if self.collection is None:
+            self.create_collection()
+        
+        try:
+            return self.collection.get(where={"source": source}, include=[])["ids"]
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des chunks de {source}: {e}")
+            raise
+    
+    def delete_documents(self, ids: List[str]):
+        """
+        Supprime des documents de la base
+        
+        Args:
+            ids: Identifiants des documents à supprimer
+        """
+        if not ids:
+            return
+        if self.collection is None:
+            self.create_collection()
+        
+        try:
+            self.collection.delete(ids=ids)
+            logger.info(f"Supprimé {len(ids)} documents de la base")
+        except Exception as e:
+            logger.error(f"Erreur lors de la suppression des documents: {e}")
+            raise
+    
     def search(
         self,
         query_embedding: List[float],
@@ -119,7 +186,8 @@ class VectorStore:
         self,
         query_text: str,
         n_results: int = 5,
-        embedding_model=None
+        embedding_model=None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Recherche des documents similaires à partir d'un texte (nécessite un modèle d'embedding)
@@ -128,11 +196,12 @@ class VectorStore:
             query_text: Texte de la requête
             n_results: Nombre de résultats à retourner
             embedding_model: Modèle pour générer les embeddings (SentenceTransformer)
+            query_embedding: Embedding de la requête déjà calculé (embedding_model inutile)
             
         Returns:
-            Liste de dictionnaires avec 'content', 'metadata', 'similarity_score'
+            Liste de dictionnaires avec 'id', 'content', 'metadata', 'similarity_score'
         """
-        if embedding_model is None:
+        if embedding_model is None and query_embedding is None:
             raise ValueError("embedding_model est requis pour search_similar")
         
         if self.collection is None:
@@ -140,7 +209,8 @@ class VectorStore:
         
         try:
             # Générer l'embedding de la requête
-            query_embedding = embedding_model.encode([query_text], convert_to_tensor=False)[0].tolist()
+            if query_embedding is None:
+                query_embedding = embedding_model.encode([query_text], convert_to_tensor=False)[0].tolist()
             
             # Rechercher dans la base
             results = self.collection.query(
@@ -148,26 +218,61 @@ class VectorStore:
                 n_results=n_results,
                 include=['documents', 'metadatas', 'distances']
             )
+            return self._format_results(results, 0)
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche similaire: {e}")
+            raise
+    
+    def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Recherche des documents similaires pour plusieurs requêtes en un seul appel
+        
+        Args:
+            query_embeddings: Embeddings des requêtes
+            n_results: Nombre de résultats par requête
             
-            # Formater les résultats comme attendu par knowledge_agent
-            formatted_results = []
-            if results['documents'] and len(results['documents'][0]) > 0:
-                for i, doc in enumerate(results['documents'][0]):
-                    # Calculer le score de similarité (1 - distance pour cosine)
-                    distance = results['distances'][0][i] if results.get('distances') and results['distances'][0] else 1.0
-                    similarity_score = 1.0 - distance  # Pour cosine distance, plus proche de 0 = plus similaire
-                    
-                    formatted_results.append({
-                        'content': doc,
-                        'metadata': results['metadatas'][0][i] if results.get('metadatas') and results['metadatas'][0] else {},
-                        'similarity_score': max(0.0, min(1.0, similarity_score))  # S'assurer que c'est entre 0 et 1
-                    })
-            
-            return formatted_results
+        Returns:
+            Pour chaque requête, la liste de search_similar
+        """
+        if not query_embeddings:
+            return []
+        
+        if self.collection is None:
+            self.create_collection()
+        
+        try:
+            results = self.collection.query(
+                query_embeddings=list(query_embeddings),
+                n_results=n_results,
+                include=['documents', 'metadatas', 'distances']
+            )
+            return [self._format_results(results, row) for row in range(len(query_embeddings))]
         except Exception as e:
             logger.error(f"Erreur lors de la recherche similaire: {e}")
             raise
     
+    @staticmethod
+    def _format_results(results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """Résultats d'une requête, formatés comme attendu par knowledge_agent"""
+        formatted_results = []
+        if results['documents'] and len(results['documents'][row]) > 0:
+            for i, doc in enumerate(results['documents'][row]):
+                # Calculer le score de similarité (1 - distance pour cosine)
+                distance = results['distances'][row][i] if results.get('distances') and results['distances'][row] else 1.0
+                similarity_score = 1.0 - distance  # Pour cosine distance, plus proche de 0 = plus similaire
+                
+                formatted_results.append({
+                    'id': results['ids'][row][i],
+                    'content': doc,
+                    'metadata': results['metadatas'][row][i] if results.get('metadatas') and results['metadatas'][row] else {},
+                    'similarity_score': max(0.0, min(1.0, similarity_score))  # S'assurer que c'est entre 0 et 1
+                })
+        return formatted_results
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """
         Retourne des informations sur la collection
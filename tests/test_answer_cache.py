@@ -0,0 +1,205 @@
+"""
+Tests pour le module answer_cache.py
+"""
+import unittest
+import tempfile
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.ollama_client import ErrorAnswer
+from src.storage.answer_cache import SemanticAnswerCache, context_fingerprint, scoped_fingerprint
+
+CHUNKS = [{"id": "rh_0", "content": "Deux jours de télétravail par semaine."}]
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    """Tests pour SemanticAnswerCache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.path = str(Path(self.temp_dir) / "answers.sqlite")
+        self.cache = SemanticAnswerCache(self.path, threshold=0.95)
+        self.addCleanup(self.cache.close)
+        self.fingerprint = context_fingerprint(CHUNKS, "llama3:8b")
+
+    def test_paraphrase_hit(self):
+        """Test qu'une question proche sur les mêmes chunks est servie depuis le cache"""
+        self.cache.put([1.0, 0.0, 0.0], ["rh_0"], self.fingerprint, "Télétravail ?", "Deux jours.")
+
+        self.assertEqual(self.cache.get([0.99, 0.05, 0.0], ["rh_0"], self.fingerprint), "Deux jours.")
+        self.assertIsNone(self.cache.get([0.0, 1.0, 0.0], ["rh_0"], self.fingerprint))
+        self.assertEqual(self.cache.get_stats()["hit_rate"], 0.5)
+
+    def test_different_chunks_miss(self):
+        """Test qu'une réponse n'est pas servie si la recherche retrouve d'autres chunks"""
+        self.cache.put([1.0, 0.0], ["rh_0"], self.fingerprint, "Q", "R")
+        other = context_fingerprint([{"id": "frais_0", "content": "Notes de frais."}], "llama3:8b")
+
+        self.assertIsNone(self.cache.get([1.0, 0.0], ["frais_0"], other))
+
+    def test_changed_chunk_invalidates(self):
+        """Test que la modification d'un chunk invalide les réponses qui l'utilisaient"""
+        self.cache.put([1.0, 0.0], ["rh_0"], self.fingerprint, "Q", "R")
+        updated = context_fingerprint([{"id": "rh_0", "content": "Trois jours de télétravail."}], "llama3:8b")
+
+        self.assertIsNone(self.cache.get([1.0, 0.0], ["rh_0"], updated))
+        self.assertEqual(self.cache.get_stats()["invalidations"], 1)
+        self.assertIsNone(self.cache.get([1.0, 0.0], ["rh_0"], self.fingerprint))
+
+    def test_invalidate_chunks(self):
+        """Test de l'invalidation explicite par identifiant de chunk"""
+        self.cache.put([1.0, 0.0], ["rh_0", "rh_1"], self.fingerprint, "Q", "R")
+        self.assertEqual(self.cache.invalidate_chunks(["rh_1"]), 1)
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        """Test que les entrées les moins récemment utilisées sont évincées"""
+        cache = SemanticAnswerCache(str(Path(self.temp_dir) / "lru.sqlite"), max_entries=2)
+        self.addCleanup(cache.close)
+        vectors = np.eye(3).tolist()
+        for i, vector in enumerate(vectors[:2]):
+            cache.put(vector, ["rh_0"], self.fingerprint, f"Q{i}", f"R{i}")
+            time.sleep(0.01)
+        cache.get(vectors[0], ["rh_0"], self.fingerprint)
+        time.sleep(0.01)
+        cache.put(vectors[2], ["rh_0"], self.fingerprint, "Q2", "R2")
+
+        self.assertEqual(cache.get(vectors[0], ["rh_0"], self.fingerprint), "R0")
+        self.assertIsNone(cache.get(vectors[1], ["rh_0"], self.fingerprint))
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_ttl(self):
+        """Test qu'une réponse expirée n'est plus servie"""
+        cache = SemanticAnswerCache(str(Path(self.temp_dir) / "ttl.sqlite"), ttl_hours=0.1 / 3600)
+        self.addCleanup(cache.close)
+        cache.put([1.0], ["rh_0"], self.fingerprint, "Q", "R")
+        time.sleep(0.15)
+        self.assertIsNone(cache.get([1.0], ["rh_0"], self.fingerprint))
+
+    def test_persistence(self):
+        """Test que les réponses survivent à un redémarrage"""
+        self.cache.put([1.0, 0.0], ["rh_0"], self.fingerprint, "Q", "R")
+        reloaded = SemanticAnswerCache(self.path)
+        self.addCleanup(reloaded.close)
+        self.assertEqual(reloaded.get([1.0, 0.0], ["rh_0"], self.fingerprint), "R")
+
+
+    def test_users_on_same_chunks(self):
+        """Test que la recherche d'un utilisateur ne supprime pas la réponse d'un autre sur les mêmes chunks"""
+        alice = scoped_fingerprint(self.fingerprint, "Alice")
+        bob = scoped_fingerprint(self.fingerprint, "Bob")
+        self.cache.put([1.0, 0.0], ["rh_0"], alice, "Q", "Bonjour Alice", self.fingerprint)
+
+        self.assertIsNone(self.cache.get([1.0, 0.0], ["rh_0"], bob, self.fingerprint))
+        self.cache.put([1.0, 0.0], ["rh_0"], bob, "Q", "Bonjour Bob", self.fingerprint)
+
+        self.assertEqual(self.cache.get([1.0, 0.0], ["rh_0"], alice, self.fingerprint), "Bonjour Alice")
+        self.assertEqual(self.cache.get([1.0, 0.0], ["rh_0"], bob, self.fingerprint), "Bonjour Bob")
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["invalidations"], 0)
+
+        # Contenu modifié : les réponses des deux utilisateurs sont périmées
+        updated = context_fingerprint([{"id": "rh_0", "content": "Trois jours."}], "llama3:8b")
+        self.assertIsNone(self.cache.get([1.0, 0.0], ["rh_0"], scoped_fingerprint(updated, "Alice"), updated))
+        self.assertEqual(self.cache.get_stats()["invalidations"], 2)
+
+
+class TestKnowledgeAgentAnswerCache(unittest.TestCase):
+    """Tests du cache de réponses dans KnowledgeAgent"""
+
+    def _agent(self, embeddings, threshold: float = 0.9) -> KnowledgeAgent:
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        cache = SemanticAnswerCache(str(Path(temp_dir) / "answers.sqlite"), threshold=threshold)
+        self.addCleanup(cache.close)
+
+        embedding_model = Mock()
+        embedding_model.encode.side_effect = lambda texts, convert_to_tensor: np.array([embeddings[texts[0]]])
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"id": "rh_0", "content": CHUNKS[0]["content"], "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.7}
+        ]
+        ollama_client = Mock(model="llama3:8b")
+        ollama_client.generate_response.return_value = "Deux jours."
+        return KnowledgeAgent(vector_store, ollama_client, embedding_model=embedding_model, answer_cache=cache)
+
+    def test_generation_skipped_on_paraphrase(self):
+        """Test qu'une paraphrase (nouvelle conversation) n'appelle pas Ollama"""
+        agent = self._agent({"Combien de jours de télétravail ?": [1.0, 0.1],
+                             "Télétravail : combien de jours ?": [1.0, 0.12]})
+
+        first = agent.ask_question("Combien de jours de télétravail ?")
+        second = agent.for_user("bob").ask_question("Télétravail : combien de jours ?")
+
+        self.assertEqual(first["answer"], second["answer"])
+        agent.ollama_client.generate_response.assert_called_once()
+        self.assertEqual(agent.answer_cache.get_stats()["hits"], 1)
+
+    def test_conversation_in_fingerprint(self):
+        """Test qu'une réponse générée avec les échanges précédents ne sert pas une autre conversation"""
+        agent = self._agent({"Combien de jours de télétravail ?": [1.0, 0.1], "Et pour les stagiaires ?": [0.1, 1.0]})
+        agent.ask_question("Combien de jours de télétravail ?")
+        agent.ask_question("Et pour les stagiaires ?")
+
+        # Même question sans les échanges précédents : pas la réponse de suivi
+        other = agent.for_user("bob")
+        other.ask_question("Et pour les stagiaires ?")
+        self.assertEqual(agent.ollama_client.generate_response.call_count, 3)
+        self.assertNotIn("ÉCHANGES PRÉCÉDENTS", agent.ollama_client.generate_response.call_args[0][1])
+
+        # Même état de conversation (premier échange) : servie depuis le cache
+        agent.for_user("carol").ask_question("Et pour les stagiaires ?")
+        self.assertEqual(agent.ollama_client.generate_response.call_count, 3)
+        self.assertNotEqual(other._conversation_key(), agent._conversation_key())
+
+    def test_follow_up_keeps_earlier_turns(self):
+        """Test qu'un tour de suivi sur les mêmes chunks ne supprime pas les réponses des autres tours"""
+        agent = self._agent({"Combien de jours de télétravail ?": [1.0, 0.1], "Et pour les stagiaires ?": [0.1, 1.0]})
+        agent.ask_question("Combien de jours de télétravail ?")
+        agent.ask_question("Et pour les stagiaires ?")
+
+        stats = agent.answer_cache.get_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["invalidations"], 0)
+
+        # Premier tour d'une autre conversation : réponse du premier tour en cache
+        agent.for_user("bob").ask_question("Combien de jours de télétravail ?")
+        self.assertEqual(agent.ollama_client.generate_response.call_count, 2)
+
+    def test_errors_not_cached(self):
+        """Test qu'un message d'erreur n'est jamais mis en cache"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        cache = SemanticAnswerCache(str(Path(temp_dir) / "answers.sqlite"))
+        self.addCleanup(cache.close)
+
+        embedding_model = Mock()
+        embedding_model.encode.return_value = np.array([[1.0, 0.0]])
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"id": "rh_0", "content": "x", "metadata": {}, "similarity_score": 0.7}
+        ]
+        ollama_client = Mock(model="llama3:8b")
+        ollama_client.generate_response.return_value = ErrorAnswer("Erreur: connexion refusée")
+        agent = KnowledgeAgent(vector_store, ollama_client, embedding_model=embedding_model, answer_cache=cache)
+
+        agent.ask_question("Q")
+
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+        # Une vraie réponse peut commencer par « Erreur » : elle est mise en cache
+        ollama_client.generate_response.return_value = "Erreurs de saisie : corrigez-les dans le portail RH."
+        agent.ask_question("Q")
+
+        self.assertEqual(cache.get_stats()["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
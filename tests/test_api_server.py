@@ -0,0 +1,199 @@
+"""
+Tests pour le serveur HTTP de l'agent (src/api/server.py)
+"""
+import asyncio
+import io
+import json
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.agents.relevance_gate import RelevanceGate
+from src.api.server import UPLOAD_READ_SIZE, Services, create_app, read_upload
+from src.core.config import DocumentLimits
+from src.core.sessions import SessionTokens
+from src.documents.ingestion_queue import IngestionQueue
+from src.storage.job_store import JobStore
+from src.storage.user_store import UserStore
+
+ALICE = {"username": "alice", "name": "Alice", "role": "user"}
+BOB = {"username": "bob", "name": "Bob", "role": "user"}
+
+
+def _docs():
+    return [{"id": "rh.pdf_0", "content": "Deux jours de télétravail par semaine.",
+             "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.8}]
+
+
+class FakeAsyncClient:
+    """Client Ollama asynchrone qui répond en trois fragments"""
+
+    def __init__(self):
+        self.generate = AsyncMock(return_value="Deux jours.")
+
+    async def generate_stream(self, prompt, context=None, user_name=None, conversation=None, trace=None):
+        for token in ("Deux", " jours", "."):
+            yield token
+
+    async def check_connection(self):
+        return True
+
+    def get_stats(self):
+        return {"in_flight": 0}
+
+    async def aclose(self):
+        pass
+
+
+class TestApiServer(unittest.TestCase):
+    """Tests des routes de l'API"""
+
+    def setUp(self):
+        self.vector_store = Mock()
+        self.vector_store.search_similar.return_value = _docs()
+        self.vector_store.get_collection_info.return_value = {"count": 1}
+        self.vector_store.get_source_ids.return_value = []
+        self.agent = KnowledgeAgent(self.vector_store, Mock(), async_client=FakeAsyncClient(),
+                                    relevance_gate=RelevanceGate(min_top_score=0.0, min_avg_score=0.0))
+        self.reader = Mock()
+        self.reader.dedup = None
+        self.reader.limits = DocumentLimits(max_document_size_mb=1)
+        self.embedding_model = Mock()
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.ingestion = IngestionQueue(JobStore(f"{directory}/jobs.sqlite"), f"{directory}/staging",
+                                        self.reader, self.embedding_model, self.vector_store)
+        self.ingestion.start()
+        self.tokens = SessionTokens("clé-de-test")
+        self.user_store = UserStore(f"{directory}/users.sqlite")
+        self.services = Services(self.agent, self.vector_store, self.embedding_model, self.ingestion,
+                                 self.tokens, self.user_store)
+        self.client = self.enterContext(TestClient(create_app(self.services)))
+        self.client.headers["Authorization"] = f"Bearer {self.tokens.issue(ALICE)}"
+
+    def test_authentication(self):
+        """Test que les routes demandent un jeton valide, sauf /health et /login"""
+        anonymous = TestClient(self.client.app)
+        self.assertEqual(anonymous.get("/health").status_code, 200)
+        for method, path in (("get", "/metrics"), ("post", "/search"), ("post", "/ask"), ("post", "/ingest"),
+                             ("get", "/ingest/tâche")):
+            self.assertEqual(getattr(anonymous, method)(path).status_code, 401, path)
+        forged = SessionTokens("autre-clé").issue({**ALICE, "role": "admin"})
+        self.assertEqual(anonymous.get("/metrics", headers={"Authorization": f"Bearer {forged}"}).status_code, 401)
+
+        self.assertEqual(anonymous.post("/login", json={"username": "admin", "password": "faux"}).status_code, 401)
+        token = anonymous.post("/login", json={"username": "admin", "password": "admin123"}).json()["token"]
+        self.assertEqual(self.tokens.verify(token)["role"], "admin")
+
+    def test_health_and_metrics(self):
+        """Test de l'état du service et des compteurs par route"""
+        self.assertEqual(self.client.get("/health").json(), {"status": "ok", "ollama": True, "documents": 1})
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        admin = {"Authorization": f"Bearer {self.tokens.issue({**ALICE, 'role': 'admin'})}"}
+        metrics = self.client.get("/metrics", headers=admin).json()
+        self.assertEqual(metrics["requests"]["routes"]["/health"]["requests"], 1)
+        self.assertIn("relevance", metrics)
+
+    def test_search(self):
+        """Test de la recherche avec le modèle d'embeddings partagé"""
+        response = self.client.post("/search", json={"query": "télétravail", "n_results": 3})
+        self.assertEqual(response.json()["results"][0]["id"], "rh.pdf_0")
+        self.vector_store.search_similar.assert_called_once_with("télétravail", n_results=3,
+                                                                 embedding_model=self.embedding_model)
+        self.assertEqual(self.client.post("/search", json={"query": ""}).status_code, 422)
+
+    def test_ask(self):
+        """Test de la réponse complète"""
+        result = self.client.post("/ask", json={"question": "Combien de jours de télétravail ?"}).json()
+        self.assertEqual(result["answer"], "Deux jours.")
+        self.assertEqual(result["sources"][0]["filename"], "rh.pdf")
+        self.assertIn("llm_answer", result["trace"]["timings"])
+
+    def test_ask_stream(self):
+        """Test du flux NDJSON : fragments puis ligne finale"""
+        response = self.client.post("/ask", json={"question": "Combien de jours ?", "stream": True})
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual("".join(line["token"] for line in lines[:-1]), "Deux jours.")
+        self.assertTrue(lines[-1]["done"])
+        self.assertIsNone(lines[-1]["error"])
+        self.assertEqual(lines[-1]["sources"][0]["filename"], "rh.pdf")
+        self.assertEqual(self.services.agent_for(ALICE).get_conversation_history()[-1]["answer"], "Deux jours.")
+
+    def test_history_per_user(self):
+        """Test que chaque utilisateur a son historique et que son nom est transmis au LLM"""
+        self.client.post("/ask", json={"question": "Combien de jours ?"})
+        self.assertEqual(len(self.services.agent_for(ALICE).get_conversation_history()), 1)
+        self.assertEqual(self.services.agent_for(BOB).get_conversation_history(), [])
+        self.assertEqual(self.agent.get_conversation_history(), [])
+        self.assertEqual(self.agent.async_client.generate.call_args.kwargs["user_name"], "Alice")
+
+    def test_ingest(self):
+        """Test de l'indexation en arrière-plan des documents envoyés"""
+        self.reader.is_supported.side_effect = lambda name: name.endswith(".txt")
+        self.reader.process_document.return_value = {
+            "success": True, "text": "Deux jours de télétravail.", "chunks": ["Deux jours de télétravail."],
+            "metadata": {"file_type": ".txt"}
+        }
+        self.embedding_model.encode.return_value = [[0.1, 0.2]]
+
+        response = self.client.post("/ingest", files=[("files", ("rh.txt", b"Deux jours de teletravail."))])
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+
+        job = self.ingestion.wait(job_id, timeout=5)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["user_id"], "alice")
+        self.assertEqual(self.client.get(f"/ingest/{job_id}").json()["files"][0]["chunks"], 1)
+        other = {"Authorization": f"Bearer {self.tokens.issue(BOB)}"}
+        self.assertEqual(self.client.get(f"/ingest/{job_id}", headers=other).status_code, 404)
+        self.vector_store.upsert_documents.assert_called_once()
+        self.assertEqual(self.vector_store.upsert_documents.call_args.kwargs["ids"], ["rh.txt_0"])
+
+        response = self.client.post("/ingest", files=[("files", ("image.png", b"..."))])
+        self.assertEqual(response.status_code, 415)
+        response = self.client.post("/ingest", files=[("files", ("gros.txt", b"x" * (1024 * 1024 + 1)))])
+        self.assertEqual(response.status_code, 413)
+        self.reader.process_document.assert_called_once()
+        self.assertEqual(self.client.get("/ingest/inconnue").status_code, 404)
+
+    def test_session_cookie(self):
+        """Test que /login et /session posent un cookie HttpOnly que les scripts ne lisent pas"""
+        anonymous = TestClient(self.client.app)
+        self.assertEqual(anonymous.post("/session").status_code, 401)
+
+        response = anonymous.post("/login", json={"username": "admin", "password": "admin123"})
+        self.assertIn("HttpOnly", response.headers["set-cookie"])
+
+        response = self.client.post("/session", headers={"X-Forwarded-Proto": "https"})
+        self.assertEqual(response.status_code, 204)
+        cookie = response.headers["set-cookie"]
+        self.assertTrue(cookie.startswith(f"eka_session={self.client.headers['Authorization'].split()[1]};"))
+        for attribute in ("HttpOnly", "SameSite=strict", "Secure", "Path=/", "Max-Age=28800"):
+            self.assertIn(attribute, cookie)
+
+        cleared = anonymous.delete("/session").headers["set-cookie"]
+        self.assertIn("Max-Age=0", cleared)
+        self.assertNotIn("Secure", cleared)
+
+    def test_read_upload_without_size(self):
+        """Test qu'un fichier sans taille annoncée est arrêté dès que la limite est dépassée"""
+        source = io.BytesIO(b"x" * (3 * UPLOAD_READ_SIZE))
+        upload = UploadFile(source, filename="gros.txt")
+
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(read_upload(upload, UPLOAD_READ_SIZE + 1))
+
+        self.assertEqual(raised.exception.status_code, 413)
+        self.assertEqual(source.tell(), 2 * UPLOAD_READ_SIZE)
+        upload.file.seek(0)
+        self.assertEqual(len(asyncio.run(read_upload(upload, 3 * UPLOAD_READ_SIZE))), 3 * UPLOAD_READ_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
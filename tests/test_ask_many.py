@@ -0,0 +1,128 @@
+"""
+Tests pour KnowledgeAgent.ask_many (questions par lots, JSONL et reprise)
+"""
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.agents.knowledge_agent import NO_DOCUMENTS_ANSWER, KnowledgeAgent
+from src.clients.llm_scheduler import PRIORITY_BATCH, LLMScheduler
+from src.clients.ollama_client import ErrorAnswer
+
+
+class _SlowClient:
+    """Client Ollama simulé : génération de durée fixe, générations simultanées comptées"""
+
+    def __init__(self, delay: float = 0.05, failures=()):
+        self.delay = delay
+        self.failures = set(failures)
+        self.model = "llama3:8b"
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def generate_response(self, question, context=None, user_name=None, conversation=None, trace=None):
+        with self._lock:
+            self.calls.append((question, conversation))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if question in self.failures:
+            return ErrorAnswer("Erreur: connexion refusée")
+        return f"Réponse à {question}"
+
+
+class TestAskMany(unittest.TestCase):
+    """Tests de ask_many"""
+
+    def _agent(self, client, **kwargs):
+        embedding_model = Mock()
+        embedding_model.encode.side_effect = lambda texts, **_: np.ones((len(texts), 2), dtype=np.float32)
+        self.vector_store = Mock()
+        self.vector_store.search_similar_batch.side_effect = lambda embeddings, n_results: [
+            [{"id": "rh_0", "content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"},
+              "similarity_score": 0.5}]
+            for _ in embeddings
+        ]
+        return KnowledgeAgent(self.vector_store, client, embedding_model=embedding_model, **kwargs)
+
+    def test_batched_and_concurrent(self):
+        """Test de la recherche par lots et des générations en parallèle"""
+        client = _SlowClient(delay=0.05)
+        agent = self._agent(client, scheduler=LLMScheduler(max_concurrency=4))
+        questions = [f"Question {i} ?" for i in range(20)]
+
+        start = time.perf_counter()
+        results = list(agent.ask_many(questions, batch_size=8))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sorted(result["index"] for result in results), list(range(20)))
+        self.assertTrue(all(result["answer"] == f"Réponse à {result['question']}" for result in results))
+        self.assertEqual(self.vector_store.search_similar_batch.call_count, 3)
+        self.vector_store.search_similar.assert_not_called()
+        self.assertEqual(client.max_running, 4)
+        self.assertLess(elapsed, 20 * 0.05 / 2)
+
+        # Questions indépendantes : ni conversation ni historique
+        self.assertTrue(all(conversation is None for _, conversation in client.calls))
+        self.assertEqual(agent.get_conversation_history(), [])
+        self.assertIn("vector_search", results[0]["timings"])
+
+    def test_jsonl_and_resume(self):
+        """Test de l'écriture JSONL et de la reprise (erreurs et lignes tronquées reposées)"""
+        questions = [f"Question {i} ?" for i in range(6)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "out" / "results.jsonl"
+
+            first = _SlowClient(delay=0.0, failures={"Question 2 ?"})
+            results = list(self._agent(first).ask_many(questions[:4], output_path=str(path)))
+            self.assertEqual(len(results), 4)
+            with path.open("a", encoding="utf-8") as file:
+                file.write('{"index": 4, "question": "Quest')
+
+            second = _SlowClient(delay=0.0)
+            results = list(self._agent(second).ask_many(questions, output_path=str(path)))
+            self.assertEqual(sorted(question for question, _ in second.calls),
+                             ["Question 2 ?", "Question 4 ?", "Question 5 ?"])
+            self.assertEqual(len(results), 3)
+
+            lines = path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(lines[4], '{"index": 4, "question": "Quest')
+            records = [json.loads(line) for line in lines[:4] + lines[5:]]
+            answered = {record["index"] for record in records if not record["error"]}
+            self.assertEqual(answered, set(range(6)))
+
+            self.assertEqual(list(self._agent(_SlowClient()).ask_many(questions, output_path=str(path))), [])
+
+    def test_no_documents(self):
+        """Test d'une question sans document pertinent"""
+        agent = self._agent(_SlowClient(delay=0.0))
+        self.vector_store.search_similar_batch.side_effect = lambda embeddings, n_results: [[] for _ in embeddings]
+
+        result, = agent.ask_many(["Question ?"], include_sources=False)
+        self.assertEqual(result["answer"], NO_DOCUMENTS_ANSWER)
+        self.assertFalse(result["error"])
+        self.assertNotIn("sources", result)
+
+    def test_batch_priority(self):
+        """Test que les générations passent par la file avec la priorité des traitements par lots"""
+        scheduler = Mock(max_concurrency=2)
+        scheduler.slot.return_value.__enter__ = Mock(return_value=0.0)
+        scheduler.slot.return_value.__exit__ = Mock(return_value=False)
+        agent = self._agent(_SlowClient(delay=0.0), scheduler=scheduler)
+
+        list(agent.ask_many(["A ?", "B ?"]))
+        self.assertEqual([call.args[0] for call in scheduler.slot.call_args_list], [PRIORITY_BATCH] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests pour AsyncOllamaClient et KnowledgeAgent.aask_question
+"""
+import asyncio
+import json
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.async_ollama_client import AsyncOllamaClient
+from src.clients.ollama_client import is_error_answer
+
+
+def _client(handler, **kwargs) -> AsyncOllamaClient:
+    return AsyncOllamaClient(base_url="http://ollama:11434", transport=httpx.MockTransport(handler), **kwargs)
+
+
+class TestAsyncOllamaClient:
+    """Tests pour AsyncOllamaClient"""
+
+    def test_generate(self):
+        """Test de génération non bloquante"""
+        def handler(request):
+            assert json.loads(request.content)["stream"] is False
+            return httpx.Response(200, json={"response": " Réponse ", "eval_count": 2, "eval_duration": 10**9})
+
+        async def run():
+            async with _client(handler) as client:
+                return await client.generate("Question", context="Contexte"), client.last_stats
+
+        answer, stats = asyncio.run(run())
+        assert answer == "Réponse"
+        assert stats.tokens_per_second == 2.0
+
+    def test_generate_stream(self):
+        """Test de génération en flux"""
+        lines = [{"response": " Deux"}, {"response": " jours."}, {"response": "", "done": True}]
+        body = "\n".join(json.dumps(line) for line in lines).encode()
+
+        async def run():
+            async with _client(lambda request: httpx.Response(200, content=body)) as client:
+                return [token async for token in client.generate_stream("Question")]
+
+        assert asyncio.run(run()) == ["Deux", " jours."]
+
+    def test_bounded_concurrency(self):
+        """Test que le nombre de générations simultanées est borné"""
+        active = {"now": 0, "max": 0}
+
+        async def handler(request):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return httpx.Response(200, json={"response": "ok"})
+
+        async def run():
+            async with _client(handler, max_concurrency=3) as client:
+                answers = await asyncio.gather(*(client.generate(f"Q{i}") for i in range(20)))
+                return answers, client.get_stats()
+
+        answers, stats = asyncio.run(run())
+        assert answers == ["ok"] * 20
+        assert active["max"] == 3
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+    def test_cancellation_releases_slot(self):
+        """Test qu'une génération annulée libère sa place"""
+        async def handler(request):
+            if b"lente" in request.content:
+                await asyncio.sleep(10)
+            return httpx.Response(200, json={"response": "ok"})
+
+        async def run():
+            async with _client(handler, max_concurrency=1) as client:
+                task = asyncio.create_task(client.generate("lente"))
+                await asyncio.sleep(0.01)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                answer = await asyncio.wait_for(client.generate("rapide"), timeout=1)
+                return answer, client.get_stats()
+
+        answer, stats = asyncio.run(run())
+        assert answer == "ok"
+        assert stats["cancelled"] == 1
+
+    def test_connection_error(self):
+        """Test qu'une erreur réseau est rendue comme message"""
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        async def run():
+            async with _client(handler) as client:
+                return await client.check_connection(), await client.generate("Question")
+
+        healthy, answer = asyncio.run(run())
+        assert healthy is False
+        assert answer.startswith("Erreur")
+        assert is_error_answer(answer)
+
+
+class TestKnowledgeAgentAsync:
+    """Tests pour KnowledgeAgent.aask_question"""
+
+    def _vector_store(self):
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.5}
+        ]
+        return vector_store
+
+    def test_aask_question(self):
+        """Test de bout en bout avec le client asynchrone"""
+        async def run():
+            async with _client(lambda request: httpx.Response(200, json={"response": "Deux jours."})) as client:
+                agent = KnowledgeAgent(self._vector_store(), Mock(), async_client=client)
+                results = await asyncio.gather(*(agent.aask_question(f"Q{i}") for i in range(10)))
+                return agent, results
+
+        agent, results = asyncio.run(run())
+        assert all(result["answer"] == "Deux jours." for result in results)
+        assert results[0]["sources"][0]["filename"] == "rh.pdf"
+        # Attente du sémaphore du client : distincte de la file du LLM (LLMScheduler)
+        timings = results[0]["trace"]["timings"]
+        assert "client_slot_wait" in timings and "llm_queue_wait" not in timings
+        assert len(agent.get_conversation_history()) == 10
+
+    def test_aask_question_sync_fallback(self):
+        """Test du repli sur le client synchrone exécuté dans un thread"""
+        ollama_client = Mock()
+        ollama_client.generate_response.return_value = "Réponse"
+        agent = KnowledgeAgent(self._vector_store(), ollama_client)
+
+        result = asyncio.run(agent.aask_question("Question", include_sources=False))
+
+        assert result.pop("trace")["name"] == "aask_question"
+        assert result == {"answer": "Réponse", "confidence": 0.6}
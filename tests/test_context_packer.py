@@ -0,0 +1,104 @@
+"""
+Tests pour le module context_packer.py
+"""
+import unittest
+from unittest.mock import Mock
+
+from src.agents.context_packer import ContextPacker, TokenCounter, split_sentences
+from src.agents.knowledge_agent import KnowledgeAgent
+
+
+def _doc(doc_id: str, content: str, score: float) -> dict:
+    return {"id": doc_id, "content": content, "metadata": {"filename": f"{doc_id}.pdf"}, "similarity_score": score}
+
+
+SENTENCES = " ".join(f"Phrase {i} sur la politique de télétravail de l'entreprise." for i in range(50))
+
+
+class TestTokenCounter(unittest.TestCase):
+    """Tests pour TokenCounter"""
+
+    def test_count(self):
+        """Test de l'approximation : mots courts, mots longs, ponctuation"""
+        counter = TokenCounter(scale=1.0)
+        self.assertEqual(counter.count(""), 0)
+        self.assertEqual(counter.count("les jours"), 3)
+        self.assertEqual(counter.count("télétravailler."), 5)
+
+    def test_calibrate(self):
+        """Test que la calibration ajuste l'échelle sur les comptes réels"""
+        counter = TokenCounter(scale=1.0)
+        raw = counter.count(SENTENCES)
+        scale = counter.calibrate([(SENTENCES, raw // 2)])
+        self.assertAlmostEqual(scale, (raw // 2) / raw)
+        self.assertLessEqual(abs(counter.count(SENTENCES) - raw // 2), 1)
+
+    def test_exact_tokenizer(self):
+        """Test qu'un tokenizer exact est prioritaire"""
+        counter = TokenCounter(tokenizer=lambda text: 42)
+        self.assertEqual(counter.count("texte"), 42)
+
+
+class TestContextPacker(unittest.TestCase):
+    """Tests pour ContextPacker"""
+
+    def setUp(self):
+        self.counter = TokenCounter(scale=1.0)
+
+    def test_split_sentences(self):
+        """Test du découpage en phrases"""
+        self.assertEqual(split_sentences("Un. Deux ! Trois"), ["Un. ", "Deux ! ", "Trois"])
+
+    def test_highest_score_first(self):
+        """Test que les chunks les plus pertinents passent en premier"""
+        packer = ContextPacker(budget_tokens=1000, counter=self.counter)
+        packed = packer.pack([_doc("faible", "Texte faible.", 0.2), _doc("fort", "Texte fort.", 0.9)])
+
+        self.assertEqual([chunk["id"] for chunk in packed["chunks"]], ["fort", "faible"])
+        self.assertTrue(packed["context"].startswith("Source: fort.pdf\nTexte fort."))
+
+    def test_budget_respected_and_trimmed_at_sentence(self):
+        """Test que le budget est respecté et que le dernier chunk est coupé à une fin de phrase"""
+        packer = ContextPacker(budget_tokens=200, counter=self.counter)
+        packed = packer.pack([_doc("a", SENTENCES, 0.9), _doc("b", SENTENCES, 0.8)])
+
+        self.assertLessEqual(self.counter.count(packed["context"]), 200)
+        self.assertLessEqual(packed["tokens"], 200)
+        self.assertEqual(packed["trimmed"], 1)
+        self.assertEqual(packed["dropped"], 1)
+        self.assertTrue(packed["chunks"][0]["content"].endswith("entreprise."))
+
+    def test_long_sentence_cut_at_word(self):
+        """Test qu'une phrase plus longue que le budget est coupée au dernier mot"""
+        packer = ContextPacker(budget_tokens=60, counter=self.counter, min_chunk_tokens=10)
+        packed = packer.pack([_doc("a", "mot " * 500, 0.9)])
+
+        self.assertTrue(packed["chunks"][0]["content"].endswith("..."))
+        self.assertLessEqual(packed["tokens"], 60)
+
+    def test_small_chunk_fills_remaining_budget(self):
+        """Test qu'un chunk qui tient encore est ajouté après un chunk trop grand omis"""
+        packer = ContextPacker(budget_tokens=120, counter=self.counter, min_chunk_tokens=100)
+        packed = packer.pack([_doc("grand", SENTENCES, 0.9), _doc("petit", "Deux jours.", 0.5)])
+
+        self.assertEqual([chunk["id"] for chunk in packed["chunks"]], ["petit"])
+
+    def test_agent_uses_packer(self):
+        """Test que KnowledgeAgent construit son contexte avec le packer"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [_doc("a", SENTENCES, 0.9), _doc("b", SENTENCES, 0.8)]
+        ollama_client = Mock()
+        ollama_client.generate_response.return_value = "Réponse"
+        agent = KnowledgeAgent(vector_store, ollama_client,
+                               context_packer=ContextPacker(budget_tokens=150, counter=self.counter))
+
+        result = agent.ask_question("Télétravail ?")
+
+        context = ollama_client.generate_response.call_args[0][1]
+        self.assertLessEqual(self.counter.count(context), 150)
+        self.assertEqual(len(result["sources"]), 1)
+        vector_store.search_similar.assert_called_once_with("Télétravail ?", n_results=agent.n_candidates)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests pour l'historique borné des conversations (ConversationHistory, ConversationStore)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.agents.conversation_history import ConversationHistory, Turn
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.storage.conversation_store import ConversationStore
+
+
+class TestConversationHistory(unittest.TestCase):
+    """Tests de ConversationHistory"""
+
+    def test_ring_buffer(self):
+        """Test que seuls les max_turns derniers échanges restent en mémoire"""
+        history = ConversationHistory(max_turns=3, max_bytes=10**6)
+        for i in range(10):
+            history.add(f"Question {i} ?", f"Réponse {i}. Détails.")
+
+        self.assertEqual([turn["question"] for turn in history.recent()],
+                         ["Question 7 ?", "Question 8 ?", "Question 9 ?"])
+        self.assertEqual(history.compacted, 7)
+        self.assertIn("- Question 6 ? → Réponse 6.", history.summary)
+        self.assertNotIn("Détails", history.summary)
+
+    def test_byte_budget(self):
+        """Test que la mémoire reste bornée quelle que soit la longueur des réponses"""
+        history = ConversationHistory(max_turns=100, max_bytes=5000, summary_chars=300)
+        for i in range(200):
+            history.add(f"Question {i} ?", "mot " * 500, [{"filename": "rh.pdf", "similarity_score": 0.8,
+                                                            "content_preview": "x" * 200}])
+            stats = history.get_stats()
+            self.assertLessEqual(stats["bytes"], 5000)
+            self.assertLessEqual(stats["summary_chars"], 300)
+
+        self.assertEqual(history.recent()[-1]["sources"], [{"filename": "rh.pdf", "similarity_score": 0.8}])
+
+    def test_last_turn_kept(self):
+        """Test qu'un échange plus gros que le budget est tout de même gardé"""
+        history = ConversationHistory(max_bytes=100)
+        history.add("Q1", "court")
+        history.add("Q2", "long " * 100)
+        self.assertEqual([turn["question"] for turn in history.recent()], ["Q2"])
+
+    def test_follow_up_context(self):
+        """Test du rappel de conversation borné, les échanges récents en dernier"""
+        history = ConversationHistory(max_turns=2, summary_chars=120)
+        for i in range(5):
+            history.add(f"Question {i} ?", f"Réponse {i}.")
+
+        context = history.follow_up_context()
+        self.assertLessEqual(len(context), 120)
+        self.assertTrue(context.endswith("- Question 4 ? → Réponse 4."))
+
+    def test_slots(self):
+        """Test que les échanges n'ont pas de __dict__"""
+        self.assertFalse(hasattr(Turn("Q", "R", [], 0.5), "__dict__"))
+
+    def test_spill_to_sqlite(self):
+        """Test que les échanges sortis du tampon sont déversés par utilisateur"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = ConversationStore(str(Path(temp_dir) / "conversations.sqlite"))
+            alice = ConversationHistory(max_turns=1, store=store, user_id="alice")
+            bob = ConversationHistory(max_turns=1, store=store, user_id="bob")
+            for i in range(3):
+                alice.add(f"A{i}", "Réponse.", [{"filename": "rh.pdf", "similarity_score": 0.5}])
+            bob.add("B0", "Réponse.")
+
+            spilled = alice.load_spilled()
+            self.assertEqual([turn["question"] for turn in spilled], ["A0", "A1"])
+            self.assertEqual(spilled[0]["sources"], [{"filename": "rh.pdf", "similarity_score": 0.5}])
+            self.assertEqual(bob.load_spilled(), [])
+
+            alice.clear(spilled=True)
+            self.assertEqual((len(alice), store.count("alice")), (0, 0))
+            store.close()
+
+
+class TestAgentHistory(unittest.TestCase):
+    """Tests de l'historique de KnowledgeAgent"""
+
+    def test_summary_after_conversation_reset(self):
+        """Test que le résumé des échanges accompagne la question quand la conversation est réinitialisée"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.5}
+        ]
+        ollama_client = Mock()
+        ollama_client.generate_response.return_value = "Deux jours par semaine."
+        agent = KnowledgeAgent(vector_store, ollama_client, history=ConversationHistory(max_turns=2))
+
+        agent.ask_question("Combien de jours de télétravail ?")
+        self.assertNotIn("ÉCHANGES PRÉCÉDENTS", ollama_client.generate_response.call_args[0][1])
+
+        agent.ask_question("Et pour les stagiaires ?")
+        context = ollama_client.generate_response.call_args[0][1]
+        self.assertIn("ÉCHANGES PRÉCÉDENTS:\n- Combien de jours de télétravail ? → Deux jours par semaine.", context)
+
+        agent.conversation.update([1, 2, 3])
+        agent.ask_question("Et les intérimaires ?")
+        self.assertNotIn("ÉCHANGES PRÉCÉDENTS", ollama_client.generate_response.call_args[0][1])
+
+        for i in range(3):
+            agent.ask_question(f"Question {i} ?")
+        self.assertEqual(len(agent.get_conversation_history()), 2)
+        self.assertEqual(len(agent.get_conversation_history(limit=1)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests pour l'index structuré des CV (extraction, CVIndex, CVQueryRouter) et son usage par KnowledgeAgent
+"""
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.agents.cv_query import CVQueryRouter
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.documents.cv_extractor import CVFields, extract_cv_fields
+from src.storage.cv_index import CVIndex
+
+CV_TEXT = """Lucie Marie
+Développeur React
+Email: lucie.marie@example.com
+Téléphone: 06 12 34 56 78
+Adresse: 12, rue de la Paix, 75002 Saint Michelle
+Compétences Techniques
+React • TypeScript • Gestion de
+projet • Docker • Git
+Expérience Professionnelle
+Développeur React - Acme
+09/2021 - Aujourd'hui (Aujourd'hui)
+Développeur Front - Globex
+03/2019 - 06/2021 (27 mois)
+Formation
+Master Informatique - Université de Lyon
+"""
+
+
+class TestCVExtractor(unittest.TestCase):
+    """Tests de extract_cv_fields"""
+
+    def test_generated_layout(self):
+        """Test des champs tirés de la mise en page de generate_cvs.py"""
+        fields = extract_cv_fields(CV_TEXT, today=date(2024, 9, 1))  # Paragraphe des compétences sur deux lignes
+        self.assertEqual((fields.name, fields.job_title, fields.city), ("Lucie Marie", "Développeur React", "Saint Michelle"))
+        self.assertEqual(fields.technologies, ["React", "TypeScript", "Gestion de projet", "Docker", "Git"])
+        self.assertEqual(fields.languages, ["TypeScript"])
+        self.assertEqual(fields.experience_years, 5.2)  # 36 mois en cours + 27 mois
+
+    def test_not_a_cv(self):
+        """Test qu'un document sans la mise en page d'un CV n'est pas indexé"""
+        self.assertIsNone(extract_cv_fields("Politique de télétravail\nDeux jours par semaine."))
+
+
+class TestCVIndex(unittest.TestCase):
+    """Tests de CVIndex et CVQueryRouter"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = CVIndex(str(Path(self.temp_dir.name) / "cv_index.sqlite"))
+        self.index.add("lucie.pdf", CVFields("Lucie Marie", "Développeur React", "Saint Michelle", 5.2,
+                                             ["React", "TypeScript", "Docker"], ["TypeScript"]))
+        self.index.add("paul.pdf", CVFields("Paul Durand", "DevOps Engineer", "Paris", 7.5,
+                                            ["Docker", "Kubernetes", "Python", "Linux"], ["Python"]))
+        self.index.add("anne.pdf", CVFields("Anne Roy", "Développeur Python", "Lyon", 2.0,
+                                            ["Python", "Django"], ["Python"]))
+        self.index.add("marc.pdf", CVFields("Marc Lin", "Responsable RH", "Paris", 10.0, ["Recrutement", "Communication"], []))
+        self.router = CVQueryRouter(self.index)
+
+    def tearDown(self):
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_filters(self):
+        """Test des filtres combinés (ET entre critères, OU entre valeurs)"""
+        self.assertEqual(self.index.count(technologies=["docker"]), 2)
+        self.assertEqual(self.index.count(technologies=["Docker", "Python"]), 1)
+        self.assertEqual(self.index.count(job_prefix="Développeur", min_years=3), 1)
+        self.assertEqual(self.index.count(cities=["paris", "Lyon"]), 3)
+        self.assertEqual(self.index.count(group_by="city"), {"Paris": 2, "Lyon": 1, "Saint Michelle": 1})
+        self.assertEqual([row["name"] for row in self.index.search(languages=["python"])], ["Paul Durand", "Anne Roy"])
+
+        self.index.add("anne.pdf", CVFields("Anne Roy", "Développeur Python", "Lyon", 3.0, ["Python"], ["Python"]))
+        self.index.remove("marc.pdf")
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search(cities=["lyon"])[0]["experience_years"], 3.0)
+
+    def test_parse(self):
+        """Test de la reconnaissance des questions structurées"""
+        query = self.router.parse("Combien de DevOps à Paris ?")
+        self.assertEqual((query.intent, query.filters), ("count", {"job_titles": ["devops engineer"], "cities": ["paris"]}))
+
+        query = self.router.parse("CV de développeurs React avec au moins 5 ans d'expérience")
+        self.assertEqual((query.intent, query.filters), ("list", {"job_titles": ["developpeur react"], "min_years": 5.0}))
+
+        query = self.router.parse("Quels profils de développeurs connaissent Python ?")
+        self.assertEqual(query.filters, {"job_prefix": "developpeur", "technologies": ["python"]})
+
+        query = self.router.parse("Combien de candidats à Paris ?")
+        self.assertEqual((query.intent, query.filters), ("count", {"cities": ["paris"]}))
+
+        self.assertEqual(self.router.parse("Répartition des CV par ville").group_by, "city")
+
+        # Questions sur le contenu des documents : chemin habituel
+        self.assertIsNone(self.router.parse("Quelle est la politique de télétravail ?"))
+        self.assertIsNone(self.router.parse("Comment devenir développeur Python ?"))
+        self.assertIsNone(self.router.parse("Quelle est l'expérience de Lucie en Python ?"))
+
+        # Mots courants du vocabulaire des technologies, sans mot désignant des CV ni comptage
+        self.assertIsNone(self.router.parse("Qui gère la communication interne ?"))
+        self.assertIsNone(self.router.parse("Qui est responsable du recrutement ?"))
+        self.assertIsNone(self.router.parse("Qui administre les serveurs Linux ?"))
+        self.assertIsNone(self.router.parse("Quels développeurs connaissent Python ?"))
+        self.assertIsNone(self.router.parse("Combien de jours de congés à Paris ?"))
+
+    def test_answer(self):
+        """Test des réponses de comptage et de liste"""
+        self.assertEqual(self.router.answer("Combien de DevOps ?")["answer"], "1 CV correspondent (DevOps Engineer).")
+
+        result = self.router.answer("Quels profils connaissent Docker ?")
+        self.assertIn("2 CV correspondent (docker)", result["answer"])
+        self.assertLess(result["answer"].index("Paul Durand"), result["answer"].index("Lucie Marie"))
+        self.assertEqual([source["filename"] for source in result["sources"]], ["paul.pdf", "lucie.pdf"])
+        self.assertEqual(result["confidence"], 1.0)
+
+        self.router.list_limit = 1
+        self.assertIn("… et 1 autres.", self.router.answer("Candidats Docker")["answer"])
+
+    def test_agent_routes_without_llm(self):
+        """Test que l'agent répond depuis l'index sans recherche ni LLM"""
+        vector_store, ollama_client = Mock(), Mock()
+        agent = KnowledgeAgent(vector_store, ollama_client, cv_router=self.router)
+
+        result = agent.ask_question("Combien de développeurs avec plus de 3 ans d'expérience ?")
+        self.assertEqual(result["answer"], "1 CV correspondent (tous les développeurs, ≥ 3 ans d'expérience).")
+        self.assertEqual(result["trace"]["attributes"]["routed"], "cv_index")
+        self.assertEqual(list(agent.ask_question_stream("Combien de CV ?")["tokens"]),
+                         ["4 CV correspondent (tous les CV)."])
+        self.assertEqual(len(agent.get_conversation_history()), 2)
+
+        results = list(agent.ask_many(["Combien de RH ?", "Quels candidats connaissent Django ?"]))
+        self.assertEqual(sorted(result["index"] for result in results), [0, 1])
+        vector_store.search_similar.assert_not_called()
+        ollama_client.generate_response.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Tests pour le module dedup.py
+"""
+import json
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+from src.documents.dedup import (
+    LSHIndex,
+    MinHasher,
+    NearDuplicateDetector,
+    choose_bands,
+    estimate_jaccard,
+)
+from src.documents.document_reader import DocumentReader
+
+POLICY = " ".join(
+    f"Article {i} : les collaborateurs peuvent télétravailler deux jours par semaine après accord du manager."
+    for i in range(40)
+)
+
+
+class TestMinHash(unittest.TestCase):
+    """Tests pour MinHasher et l'index LSH"""
+
+    def setUp(self):
+        self.hasher = MinHasher()
+
+    def test_identical_texts(self):
+        """Test que deux textes identiques ont la même signature"""
+        self.assertEqual(estimate_jaccard(self.hasher.signature(POLICY), self.hasher.signature(POLICY)), 1.0)
+
+    def test_jaccard_estimate(self):
+        """Test que l'estimation est proche de la vraie similarité de Jaccard"""
+        other = POLICY.replace("Article 3 ", "Clause 3 ").replace("Article 7 ", "Clause 7 ")
+        first, second = self.hasher.shingles(POLICY), self.hasher.shingles(other)
+        exact = len(first & second) / len(first | second)
+
+        estimate = estimate_jaccard(self.hasher.signature(POLICY), self.hasher.signature(other))
+
+        self.assertAlmostEqual(estimate, exact, delta=0.1)
+
+    def test_empty_text(self):
+        """Test qu'un texte vide n'a pas de signature"""
+        self.assertIsNone(self.hasher.signature("   "))
+
+    def test_choose_bands(self):
+        """Test que le seuil effectif LSH est juste en dessous du seuil demandé"""
+        bands = choose_bands(128, 0.8)
+        rows = 128 // bands
+        self.assertLessEqual((1 / bands) ** (1 / rows), 0.8)
+
+    def test_lsh_query_and_remove(self):
+        """Test de recherche de candidats et de suppression dans l'index"""
+        index = LSHIndex(128, 16)
+        signature = self.hasher.signature(POLICY)
+        index.add("a", signature)
+
+        self.assertEqual(index.query(signature), {"a"})
+        index.remove("a")
+        self.assertEqual(index.query(signature), set())
+        self.assertEqual(len(index), 0)
+
+
+class TestNearDuplicateDetector(unittest.TestCase):
+    """Tests pour NearDuplicateDetector"""
+
+    def setUp(self):
+        self.detector = NearDuplicateDetector(threshold=0.8)
+
+    def test_near_duplicate_document(self):
+        """Test de détection d'une nouvelle version quasi-identique"""
+        self.assertEqual(self.detector.check_document("politique_v1.pdf", POLICY), [])
+
+        matches = self.detector.check_document("politique_v2.pdf", POLICY.replace("Article 5 ", "Article 5 bis "))
+
+        self.assertEqual([doc_id for doc_id, _ in matches], ["politique_v1.pdf"])
+        self.assertEqual(self.detector.get_clusters(), [["politique_v1.pdf", "politique_v2.pdf"]])
+
+    def test_different_document(self):
+        """Test qu'un document différent n'est pas signalé"""
+        self.detector.check_document("politique.pdf", POLICY)
+        other = " ".join(f"Note de frais {i} remboursée sous trente jours sur justificatif." for i in range(40))
+        self.assertEqual(self.detector.check_document("frais.pdf", other), [])
+
+    def test_same_id_replaced(self):
+        """Test qu'un document ré-indexé sous le même nom n'est pas son propre doublon"""
+        self.detector.check_document("politique.pdf", POLICY)
+        self.assertEqual(self.detector.check_document("politique.pdf", POLICY), [])
+
+    def test_duplicate_chunks(self):
+        """Test de détection des chunks quasi-dupliqués"""
+        chunks = [POLICY[:2000], "Un chunk sans rapport avec le reste du document interne.", POLICY[:2000]]
+
+        duplicates = self.detector.check_chunks("doc.pdf", chunks)
+
+        self.assertEqual(duplicates, {2: "doc.pdf#0"})
+
+    def test_persistence(self):
+        """Test de sauvegarde et rechargement de l'index"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = str(Path(temp_dir) / "index.sqlite")
+
+        detector = NearDuplicateDetector(index_path=path)
+        self.addCleanup(detector.close)
+        detector.check_document("v1.pdf", POLICY)
+        detector.check_document("v2.pdf", POLICY)
+        detector.save()
+
+        reloaded = NearDuplicateDetector(index_path=path)
+        self.addCleanup(reloaded.close)
+        self.assertEqual([doc_id for doc_id, _ in reloaded.check_document("v3.pdf", POLICY)], ["v1.pdf", "v2.pdf"])
+        self.assertEqual(reloaded.get_clusters(), [["v1.pdf", "v2.pdf", "v3.pdf"]])
+
+    def test_shared_index(self):
+        """Test que deux processus qui sauvegardent le même index ne perdent pas leurs signatures"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = str(Path(temp_dir) / "index.sqlite")
+        other = " ".join(f"Note de frais {i} remboursée sous trente jours sur justificatif." for i in range(40))
+
+        first = NearDuplicateDetector(index_path=path)
+        second = NearDuplicateDetector(index_path=path)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        first.check_document("politique.pdf", POLICY)
+        second.check_document("frais.pdf", other)
+        first.save()
+        second.save()
+
+        # Signatures de l'autre processus relues avant la recherche
+        self.assertEqual([doc_id for doc_id, _ in first.find_document("frais_v2.pdf", first.hasher.signature(other))],
+                         ["frais.pdf"])
+        reloaded = NearDuplicateDetector(index_path=path)
+        self.addCleanup(reloaded.close)
+        self.assertEqual(sorted(reloaded.documents.signatures), ["frais.pdf", "politique.pdf"])
+
+    def test_legacy_json_imported(self):
+        """Test de l'import d'un index JSON du format précédent"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        legacy = Path(temp_dir) / "index.json"
+        signature = self.detector.hasher.signature(POLICY)
+        legacy.write_text(json.dumps({"documents": {"v1.pdf": signature.tolist()}, "chunks": {}, "pairs": []}),
+                          encoding='utf-8')
+
+        detector = NearDuplicateDetector(index_path=str(legacy))
+        self.addCleanup(detector.close)
+
+        self.assertEqual(detector.index_path, legacy.with_suffix(".sqlite"))
+        self.assertEqual([doc_id for doc_id, _ in detector.find_document("v2.pdf", signature)], ["v1.pdf"])
+
+    def test_process_document_skip(self):
+        """Test que DocumentReader écarte un quasi-doublon en mode skip"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        first, second = Path(temp_dir) / "v1.txt", Path(temp_dir) / "v2.txt"
+        first.write_text(POLICY, encoding='utf-8')
+        second.write_text(POLICY + " Fin.", encoding='utf-8')
+
+        reader = DocumentReader(dedup=self.detector, dedup_action="skip")
+        self.assertTrue(reader.process_document(first)["success"])
+        result = reader.process_document(second)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["metadata"]["duplicate_of"], ["v1.txt"])
+
+        # Le doublon écarté n'est pas indexé : un troisième n'est comparé qu'au document gardé
+        self.assertEqual(list(self.detector.documents.signatures), ["v1.txt"])
+        self.assertEqual(self.detector.get_clusters(), [])
+        third = Path(temp_dir) / "v3.txt"
+        third.write_text(POLICY + " Fin du document.", encoding='utf-8')
+        self.assertEqual(reader.process_document(third)["metadata"]["duplicate_of"], ["v1.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
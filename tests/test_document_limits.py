@@ -0,0 +1,86 @@
+"""
+Tests pour les limites de documents (MAX_DOCUMENT_SIZE_MB, MAX_CHUNK_SIZE, MAX_CHUNKS_PER_DOCUMENT)
+"""
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from src.core.config import DocumentLimits
+from src.documents.document_reader import DocumentReader
+
+
+class TestDocumentLimits(unittest.TestCase):
+    """Tests pour DocumentLimits et leur application par DocumentReader"""
+
+    def _write(self, content: str) -> Path:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.unlink, f.name)
+        return Path(f.name)
+
+    def test_from_env(self):
+        """Test du chargement des limites depuis l'environnement"""
+        env = {"MAX_DOCUMENT_SIZE_MB": "2", "MAX_CHUNK_SIZE": "500", "MAX_CHUNKS_PER_DOCUMENT": "10"}
+        with patch.dict(os.environ, env):
+            limits = DocumentLimits.from_env()
+
+        self.assertEqual(limits.max_document_bytes, 2 * 1024 * 1024)
+        self.assertEqual(limits.max_chunk_size, 500)
+        self.assertEqual(limits.max_chunks_per_document, 10)
+
+    def test_reject_oversized_document(self):
+        """Test qu'un document trop gros est rejeté sans être lu"""
+        reader = DocumentReader(DocumentLimits(max_document_size_mb=0.001))
+        path = self._write("mot " * 1000)
+
+        with patch.object(reader, 'extract_text_bounded') as extract:
+            result = reader.process_document(path)
+
+        extract.assert_not_called()
+        self.assertFalse(result["success"])
+        self.assertIn("error", result)
+        self.assertEqual(reader.get_limit_report()[0]["action"], "rejected")
+
+    def test_truncate_chunks(self):
+        """Test que le nombre de chunks est limité et le document marqué tronqué"""
+        reader = DocumentReader(DocumentLimits(max_chunk_size=10, max_chunks_per_document=3))
+        path = self._write("mot " * 1000)
+
+        result = reader.process_document(path, chunk_size=1000)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(len(result["chunks"]), 3)
+        self.assertTrue(all(len(chunk.split()) == 10 for chunk in result["chunks"]))
+        self.assertTrue(result["metadata"]["truncated"])
+        self.assertEqual(reader.get_limit_report()[0]["action"], "truncated")
+
+    def test_early_abort_stops_reading(self):
+        """Test que l'extraction s'arrête dès que le budget de mots est atteint"""
+        reader = DocumentReader()
+        consumed = []
+
+        def blocks(_):
+            for i in range(100):
+                consumed.append(i)
+                yield "un deux trois quatre cinq "
+
+        reader.stream_extensions['.txt'] = blocks
+        text, truncated = reader.extract_text_bounded(Path("fichier.txt"), max_words=20)
+
+        self.assertTrue(truncated)
+        self.assertEqual(len(text.split()), 20)
+        self.assertLess(len(consumed), 10)
+
+    def test_small_document_not_truncated(self):
+        """Test qu'un petit document n'est pas marqué tronqué"""
+        reader = DocumentReader()
+        result = reader.process_document(self._write("Un petit document."))
+
+        self.assertFalse(result["metadata"]["truncated"])
+        self.assertEqual(reader.get_limit_report(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
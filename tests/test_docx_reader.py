@@ -0,0 +1,80 @@
+"""
+Tests pour le module docx_reader.py
+"""
+import unittest
+import tempfile
+import os
+import zipfile
+from pathlib import Path
+
+from src.documents.docx_reader import iter_docx_paragraphs
+from src.documents.document_reader import DocumentReader
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def _table(rows) -> str:
+    body = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{_paragraph(cell)}</w:tc>" for cell in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{body}</w:tbl>"
+
+
+class TestDocxReader(unittest.TestCase):
+    """Tests pour l'extraction Word en flux"""
+
+    def _write_docx(self, body: str, headers=(), footers=()) -> Path:
+        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as f:
+            path = Path(f.name)
+        self.addCleanup(os.unlink, path)
+
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('word/document.xml', f'<w:document xmlns:w="{W_NS}"><w:body>{body}</w:body></w:document>')
+            for i, text in enumerate(headers, 1):
+                archive.writestr(f'word/header{i}.xml', f'<w:hdr xmlns:w="{W_NS}">{_paragraph(text)}</w:hdr>')
+            for i, text in enumerate(footers, 1):
+                archive.writestr(f'word/footer{i}.xml', f'<w:ftr xmlns:w="{W_NS}">{_paragraph(text)}</w:ftr>')
+        return path
+
+    def test_paragraphs(self):
+        """Test de l'extraction des paragraphes dans l'ordre"""
+        path = self._write_docx(_paragraph("Premier") + "<w:p/>" + _paragraph("Second"))
+        self.assertEqual(list(iter_docx_paragraphs(path)), ["Premier", "Second"])
+
+    def test_runs_tabs_and_breaks(self):
+        """Test de la concaténation des runs, tabulations et sauts de ligne"""
+        body = '<w:p><w:r><w:t>Télé</w:t></w:r><w:r><w:t>travail</w:t><w:tab/><w:t>A</w:t><w:br/><w:t>B</w:t></w:r></w:p>'
+        path = self._write_docx(body)
+        self.assertEqual(list(iter_docx_paragraphs(path)), ["Télétravail\tA\nB"])
+
+    def test_tables(self):
+        """Test de l'extraction des tableaux ligne par ligne"""
+        body = _paragraph("Avant") + _table([["Nom", "Rôle"], ["Alice", "RH"]]) + _paragraph("Après")
+        path = self._write_docx(body)
+        self.assertEqual(list(iter_docx_paragraphs(path)), ["Avant", "Nom | Rôle", "Alice | RH", "Après"])
+
+    def test_headers_and_footers(self):
+        """Test de l'extraction des en-têtes et pieds de page (sans doublons)"""
+        path = self._write_docx(_paragraph("Corps"), headers=["Confidentiel", "Confidentiel"], footers=["Page"])
+        self.assertEqual(list(iter_docx_paragraphs(path)), ["Confidentiel", "Corps", "Page"])
+
+    def test_read_word(self):
+        """Test de DocumentReader.read_word avec le lecteur en flux"""
+        path = self._write_docx(_paragraph("Ligne 1") + _paragraph("Ligne 2"))
+        self.assertEqual(DocumentReader().read_word(path), "Ligne 1\nLigne 2")
+
+    def test_invalid_file(self):
+        """Test qu'un fichier non zip retourne une chaîne vide"""
+        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as f:
+            f.write(b"pas un docx")
+        self.addCleanup(os.unlink, f.name)
+        self.assertEqual(DocumentReader().read_word(Path(f.name)), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
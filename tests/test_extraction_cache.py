@@ -0,0 +1,88 @@
+"""
+Tests pour le module extraction_cache.py
+"""
+import unittest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from src.storage.extraction_cache import ExtractionCache, file_sha256
+from src.documents.document_reader import DocumentReader
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Tests pour la classe ExtractionCache"""
+
+    def setUp(self):
+        """Initialisation avant chaque test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(cache_dir=self.temp_dir)
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        self.cache.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name: str, content: str) -> Path:
+        path = Path(self.temp_dir) / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def test_put_get(self):
+        """Test de stockage et récupération d'une extraction"""
+        key = ExtractionCache.make_key("abc", ".txt:v1", {"chunk_size": 10})
+        self.cache.put(key, "un deux trois", [0, 3])
+
+        self.assertEqual(self.cache.get(key), {"text": "un deux trois", "chunk_bounds": [0, 3], "truncated": False})
+        self.assertIsNone(self.cache.get("absente"))
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+        self.assertEqual(self.cache.get_stats()["misses"], 1)
+
+    def test_key_depends_on_parameters(self):
+        """Test que la clé dépend de l'extracteur et du découpage"""
+        base = ExtractionCache.make_key("abc", ".pdf:v1:PyPDF2-3.0.1", {"chunk_size": 1000})
+        self.assertNotEqual(base, ExtractionCache.make_key("abc", ".pdf:v1:pypdf-3.17.1", {"chunk_size": 1000}))
+        self.assertNotEqual(base, ExtractionCache.make_key("abc", ".pdf:v1:PyPDF2-3.0.1", {"chunk_size": 500}))
+
+    def test_lru_eviction(self):
+        """Test de l'éviction des entrées les moins récemment utilisées"""
+        self.cache.max_size_bytes = 1500
+        texts = {name: os.urandom(600).hex() for name in ("a", "b", "c")}
+
+        self.cache.put("a", texts["a"], [0, 1])
+        self.cache.put("b", texts["b"], [0, 1])
+        self.cache.get("a")
+        self.cache.put("c", texts["c"], [0, 1])
+
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+        self.assertLessEqual(self.cache.get_stats()["size_bytes"], 1500)
+
+    def test_file_sha256(self):
+        """Test que le hash ne dépend que du contenu"""
+        first = self._write("a.txt", "même contenu")
+        second = self._write("b.txt", "même contenu")
+        self.assertEqual(file_sha256(first), file_sha256(second))
+
+    def test_process_document_uses_cache(self):
+        """Test qu'un fichier déjà traité (autre nom, même contenu) n'est pas re-parsé"""
+        reader = DocumentReader(extraction_cache=self.cache)
+        content = "Politique de télétravail. " * 50
+        first = reader.process_document(self._write("alice.txt", content), chunk_size=20)
+
+        with patch.object(reader, 'extract_text_bounded') as extract:
+            second = reader.process_document(self._write("bob.txt", content), chunk_size=20)
+
+        extract.assert_not_called()
+        self.assertFalse(first["metadata"]["cached"])
+        self.assertTrue(second["metadata"]["cached"])
+        self.assertEqual(second["chunks"], first["chunks"])
+        self.assertEqual(second["text"], first["text"])
+        self.assertEqual(second["metadata"]["filename"], "bob.txt")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Tests pour l'indexation en arrière-plan (JobStore, IngestionQueue)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from src.documents.ingestion_queue import IngestionQueue
+from src.storage.answer_cache import SemanticAnswerCache, context_fingerprint
+from src.storage.job_store import JobStore, LeaseLost
+
+
+def _result(text):
+    return {"success": True, "text": text, "chunks": [text], "metadata": {"file_type": ".txt"}}
+
+
+class TestIngestionQueue(unittest.TestCase):
+    """Tests des étapes, de la reprise et du suivi des tâches"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "jobs.sqlite")
+        self.staging_dir = Path(self.temp_dir.name) / "staging"
+
+        self.reader = Mock()
+        self.reader.dedup = None
+        self.reader.process_document.side_effect = lambda source, filename: _result(Path(source).read_text())
+        self.embedding_model = Mock()
+        self.embedding_model.encode.side_effect = lambda chunks, **kwargs: [[0.5, 0.25] for _ in chunks]
+        self.vector_store = Mock()
+        self.vector_store.get_source_ids.return_value = []
+        self.queue = self._queue()
+
+    def tearDown(self):
+        self.queue.store.close()
+        self.temp_dir.cleanup()
+
+    def _queue(self):
+        return IngestionQueue(JobStore(self.db_path), str(self.staging_dir), self.reader,
+                              self.embedding_model, self.vector_store)
+
+    def _drain(self):
+        while self.queue.process_next():
+            pass
+
+    def test_stages(self):
+        """Test qu'une tâche passe par toutes les étapes et que les fichiers préparés sont supprimés"""
+        job_id = self.queue.submit_job([("rh.txt", b"Deux jours."), ("it.txt", b"VPN obligatoire.")], user_id="alice")
+        job = self.queue.get_job(job_id)
+        self.assertEqual((job["status"], job["total"], job["progress"]), ("queued", 2, 0.0))
+
+        self._drain()
+
+        job = self.queue.get_job(job_id)
+        self.assertEqual((job["status"], job["done"], job["progress"]), ("done", 2, 1.0))
+        self.assertEqual([file["stage"] for file in job["files"]], ["stored", "stored"])
+        self.assertEqual(self.vector_store.upsert_documents.call_count, 2)
+        self.assertEqual(self.vector_store.upsert_documents.call_args.kwargs["ids"], ["it.txt_0"])
+        self.assertEqual(list(self.staging_dir.iterdir()), [])
+        self.assertEqual([job["id"] for job in self.queue.list_jobs("alice")], [job_id])
+
+    def test_resume_after_interruption(self):
+        """Test qu'un fichier interrompu après l'extraction reprend sans être ré-extrait"""
+        self.embedding_model.encode.side_effect = RuntimeError("arrêt")
+        job_id = self.queue.submit_job([("rh.txt", b"Deux jours.")])
+
+        # Arrêt pendant l'encodage : l'étape "extracted" est enregistrée, le fichier reste pris
+        crashed = self.queue
+        file = crashed.store.claim_next(crashed.owner, crashed.lease_seconds)
+        with self.assertRaises(RuntimeError):
+            crashed._process(file)
+        self.assertEqual(self.queue.get_job(job_id)["files"][0]["stage"], "extracted")
+
+        self.embedding_model.encode.side_effect = lambda chunks, **kwargs: [[0.5, 0.25] for _ in chunks]
+        self.queue = self._queue()  # Redémarrage
+        # Bail encore valable (le processus pourrait être vivant) : pas repris
+        self.assertFalse(self.queue.process_next())
+
+        # Bail expiré : le fichier reprend à l'étape suivante
+        expired = crashed.store.expired
+        with patch("src.storage.job_store.time.time", return_value=file["lease_until"] + 1):
+            self.assertEqual(expired(), 1)
+            self._drain()
+        crashed.store.close()
+
+        self.assertEqual(self.queue.get_job(job_id)["status"], "done")
+        self.reader.process_document.assert_called_once()
+        self.assertEqual(self.vector_store.upsert_documents.call_args.kwargs["embeddings"], [[0.5, 0.25]])
+
+    def test_leases(self):
+        """Test qu'un fichier en cours n'est pris que par un processus et que le bail perdu arrête l'ancien"""
+        self.queue.submit_job([("rh.txt", b"Deux jours.")])
+        other = self._queue()
+        try:
+            file = self.queue.store.claim_next(self.queue.owner, 60)
+            self.assertIsNotNone(file)
+            self.assertIsNone(other.store.claim_next(other.owner, 60))
+            self.assertTrue(self.queue.store.renew(file["id"], self.queue.owner, 60))
+            self.assertFalse(other.store.renew(file["id"], other.owner, 60))
+
+            # Processus figé : le bail expire, un autre processus reprend le fichier
+            with patch("src.storage.job_store.time.time", return_value=file["lease_until"] + 1):
+                self.assertEqual(other.store.claim_next(other.owner, 60)["id"], file["id"])
+            with self.assertRaises(LeaseLost):
+                self.queue.store.advance(file["id"], "extracted", owner=self.queue.owner)
+            self.assertFalse(self.queue.store.renew(file["id"], self.queue.owner, 60))
+            other.store.advance(file["id"], "failed", owner=other.owner, error="test")
+            self.assertEqual(other.store.get_job(file["job_id"])["files"][0]["owner"], None)
+        finally:
+            other.store.close()
+
+    def test_duplicates_skipped(self):
+        """Test qu'un fichier déjà indexé (même nom, même contenu) n'est pas retraité"""
+        self.queue.submit_job([("rh.txt", b"Deux jours.")])
+        self._drain()
+
+        job_id = self.queue.submit_job([("rh.txt", b"Deux jours."), ("rh.txt", b"Trois jours.")])
+        self._drain()
+
+        files = self.queue.get_job(job_id)["files"]
+        self.assertEqual([file["stage"] for file in files], ["skipped", "stored"])
+        self.assertTrue(files[0]["error"].startswith("déjà indexé"))
+        self.assertEqual(self.reader.process_document.call_count, 2)
+
+    def test_edited_file_replaces_chunks(self):
+        """Test qu'un fichier modifié (même nom) remplace ses chunks, y compris ceux en trop"""
+        from src.storage.vector_store import VectorStore
+
+        self.vector_store = VectorStore(str(Path(self.temp_dir.name) / "chroma"))
+        self.queue.store.close()
+        self.queue = self._queue()
+        self.reader.process_document.side_effect = lambda source, filename: {
+            **_result(""), "chunks": Path(source).read_text().split("|")
+        }
+
+        self.queue.submit_job([("rh.txt", b"Deux jours.|Lundi.|Vendredi.")])
+        self._drain()
+        self.queue.submit_job([("rh.txt", b"Trois jours.")])
+        self._drain()
+
+        stored = self.vector_store.collection.get()
+        self.assertEqual((stored["ids"], stored["documents"]), (["rh.txt_0"], ["Trois jours."]))
+
+    def test_reingest_invalidates_answers(self):
+        """Test qu'une réponse fondée sur un document réindexé n'est plus servie"""
+        cache = SemanticAnswerCache(str(Path(self.temp_dir.name) / "answers.sqlite"))
+        self.addCleanup(cache.close)
+        self.queue.store.close()
+        self.queue = IngestionQueue(JobStore(self.db_path), str(self.staging_dir), self.reader,
+                                    self.embedding_model, self.vector_store, answer_cache=cache)
+
+        self.queue.submit_job([("rh.txt", b"Deux jours.")])
+        self._drain()
+        fingerprint = context_fingerprint([{"id": "rh.txt_0", "content": "Deux jours."}], "llama3:8b")
+        cache.put([1.0, 0.0], ["rh.txt_0"], fingerprint, "Télétravail ?", "Deux jours.")
+
+        self.queue.submit_job([("rh.txt", b"Trois jours.")])
+        self._drain()
+
+        self.assertIsNone(cache.get([1.0, 0.0], ["rh.txt_0"], fingerprint))
+        self.assertEqual(cache.get_stats()["entries"], 0)
+        self.assertEqual(cache.get_stats()["invalidations"], 1)
+
+    def test_failure_recorded(self):
+        """Test qu'un échec d'extraction est enregistré sans bloquer la file"""
+        self.reader.process_document.side_effect = [{"success": False, "error": "PDF illisible"},
+                                                     _result("VPN obligatoire.")]
+        job_id = self.queue.submit_job([("scan.pdf", b"%PDF"), ("it.txt", b"VPN obligatoire.")])
+        self._drain()
+
+        job = self.queue.get_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual([(file["stage"], file["error"]) for file in job["files"]],
+                         [("failed", "PDF illisible"), ("stored", None)])
+        self.assertEqual(self.queue.store.pending(), 0)
+
+    def test_background_thread(self):
+        """Test du traitement par le thread et de wait()"""
+        self.queue.start()
+        try:
+            job = self.queue.wait(self.queue.submit_job([("rh.txt", b"Deux jours.")]), timeout=5)
+        finally:
+            self.queue.stop(timeout=5)
+        self.assertEqual(job["status"], "done")
+
+
+if __name__ == '__main__':
+    unittest.main()
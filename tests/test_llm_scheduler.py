@@ -0,0 +1,196 @@
+"""
+Tests pour le module llm_scheduler.py
+"""
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, OverloadError
+from src.clients.ollama_client import OVERLOAD_ANSWER, GenerationError, is_error_answer
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition non atteinte")
+        time.sleep(0.005)
+
+
+class TestLLMScheduler(unittest.TestCase):
+    """Tests pour LLMScheduler"""
+
+    def _waiter(self, scheduler, priority, results, name, timeout=None):
+        def run():
+            try:
+                scheduler.acquire(priority, timeout)
+                results.append(name)
+            except OverloadError as e:
+                results.append(f"{name}:{e.reason}")
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_concurrency_limit(self):
+        """Test qu'au-delà de max_concurrency les demandes attendent"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=5)
+        self.assertEqual(scheduler.acquire(), 0.0)
+
+        results = []
+        thread = self._waiter(scheduler, PRIORITY_INTERACTIVE, results, "a")
+        _wait_for(lambda: scheduler.get_stats()["queue_depth"] == 1)
+        self.assertEqual(results, [])
+
+        scheduler.release()
+        thread.join(2)
+        self.assertEqual(results, ["a"])
+        stats = scheduler.get_stats()
+        self.assertEqual((stats["running"], stats["queue_depth"], stats["admitted"]), (1, 0, 2))
+
+    def test_priority_order(self):
+        """Test que les questions interactives passent avant les lots"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=5)
+        scheduler.acquire()
+        results = []
+        threads = [self._waiter(scheduler, PRIORITY_BATCH, results, "lot")]
+        _wait_for(lambda: scheduler.get_stats()["queue_depth"] == 1)
+        threads.append(self._waiter(scheduler, PRIORITY_INTERACTIVE, results, "chat"))
+        _wait_for(lambda: scheduler.get_stats()["queue_depth"] == 2)
+
+        scheduler.release()
+        _wait_for(lambda: len(results) == 1)
+        scheduler.release()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(results, ["chat", "lot"])
+
+    def test_queue_full_preempts_batch(self):
+        """Test qu'une file pleine refuse tout de suite, sauf à évincer un lot moins prioritaire"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=1, queue_timeout=5)
+        scheduler.acquire()
+        results = []
+        batch = self._waiter(scheduler, PRIORITY_BATCH, results, "lot")
+        _wait_for(lambda: scheduler.get_stats()["queue_depth"] == 1)
+
+        with self.assertRaises(OverloadError):
+            scheduler.acquire(PRIORITY_BATCH)
+
+        chat = self._waiter(scheduler, PRIORITY_INTERACTIVE, results, "chat")
+        batch.join(2)
+        self.assertEqual(results, ["lot:preempted"])
+        scheduler.release()
+        chat.join(2)
+        self.assertEqual(results, ["lot:preempted", "chat"])
+        self.assertEqual(scheduler.get_stats()["rejected"]["queue_full"], 1)
+
+    def test_deadline(self):
+        """Test qu'une demande est refusée quand son délai d'attente expire"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=0.05)
+        scheduler.acquire()
+        start = time.monotonic()
+        with self.assertRaises(OverloadError) as raised:
+            scheduler.acquire()
+        self.assertEqual(raised.exception.reason, "deadline")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(scheduler.get_stats()["queue_depth"], 0)
+
+    def test_estimated_wait_rejected_immediately(self):
+        """Test du refus immédiat quand l'attente estimée dépasse le délai"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=10)
+        scheduler.acquire()
+        scheduler.release(service_time=30)
+        scheduler.acquire()
+
+        start = time.monotonic()
+        with self.assertRaises(OverloadError) as raised:
+            scheduler.acquire()
+        self.assertEqual(raised.exception.reason, "estimated_wait")
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+    def test_aacquire(self):
+        """Test de l'attente asynchrone : réveillée par release() d'un autre thread, sans thread en attente"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=5)
+        scheduler.acquire()
+
+        async def scenario():
+            threads = threading.active_count()
+            waiter = asyncio.ensure_future(scheduler.aacquire())
+            while scheduler.get_stats()["queue_depth"] < 1:
+                await asyncio.sleep(0.005)
+            self.assertEqual(threading.active_count(), threads)
+            threading.Thread(target=scheduler.release).start()
+            return await asyncio.wait_for(waiter, 2)
+
+        self.assertGreater(asyncio.run(scenario()), 0.0)
+        stats = scheduler.get_stats()
+        self.assertEqual((stats["running"], stats["queue_depth"], stats["admitted"]), (1, 0, 2))
+
+    def test_aacquire_cancel_and_deadline(self):
+        """Test qu'une attente asynchrone annulée ou expirée quitte la file sans garder de place"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=5)
+        scheduler.acquire()
+
+        async def scenario():
+            waiter = asyncio.ensure_future(scheduler.aacquire())
+            while scheduler.get_stats()["queue_depth"] < 1:
+                await asyncio.sleep(0.005)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(scheduler.get_stats()["queue_depth"], 0)
+
+            with self.assertRaises(OverloadError) as raised:
+                await scheduler.aacquire(timeout=0.05)
+            self.assertEqual(raised.exception.reason, "deadline")
+
+        asyncio.run(scenario())
+        scheduler.release()
+        stats = scheduler.get_stats()
+        self.assertEqual((stats["running"], stats["queue_depth"]), (0, 0))
+        self.assertEqual(scheduler.acquire(), 0.0)
+
+
+class TestKnowledgeAgentScheduler(unittest.TestCase):
+    """Tests de la file d'attente dans KnowledgeAgent"""
+
+    def setUp(self):
+        self.vector_store = Mock()
+        self.vector_store.search_similar.return_value = [
+            {"id": "rh_0", "content": "Deux jours.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.7}
+        ]
+        self.ollama_client = Mock()
+        self.ollama_client.generate_response.return_value = "Deux jours."
+        self.ollama_client.generate_stream.side_effect = lambda *args, **kwargs: iter(["Deux", " jours."])
+
+    def test_overload_answer(self):
+        """Test qu'une question refusée reçoit un message de surcharge, jamais mis en cache"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=0, queue_timeout=1)
+        scheduler.acquire()
+        agent = KnowledgeAgent(self.vector_store, self.ollama_client, scheduler=scheduler)
+
+        self.assertEqual(agent.ask_question("Télétravail ?")["answer"], OVERLOAD_ANSWER)
+        with self.assertRaises(GenerationError) as error:
+            list(agent.ask_question_stream("Congés ?")["tokens"])
+        self.assertEqual(str(error.exception), OVERLOAD_ANSWER)
+        self.assertTrue(is_error_answer(OVERLOAD_ANSWER))
+        self.ollama_client.generate_response.assert_not_called()
+
+    def test_slot_released(self):
+        """Test que la place est rendue après une génération (réponse, flux, asynchrone)"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=0, queue_timeout=1)
+        agent = KnowledgeAgent(self.vector_store, self.ollama_client, scheduler=scheduler)
+
+        self.assertEqual(agent.ask_question("Télétravail ?")["answer"], "Deux jours.")
+        self.assertEqual("".join(agent.ask_question_stream("Congés ?", priority=PRIORITY_BATCH)["tokens"]),
+                         "Deux jours.")
+        self.assertEqual(asyncio.run(agent.aask_question("Frais ?"))["answer"], "Deux jours.")
+        stats = scheduler.get_stats()
+        self.assertEqual((stats["running"], stats["admitted"]), (0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
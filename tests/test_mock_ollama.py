@@ -0,0 +1,71 @@
+"""
+Tests du serveur Ollama simulé (benchmarks/mock_ollama.py) avec les vrais clients
+"""
+import time
+import unittest
+
+from benchmarks.mock_ollama import MockOllama
+from src.clients.ollama_client import ConversationState, OllamaClient, is_error_answer
+from src.clients.ollama_pool import OllamaClientPool
+
+
+class TestMockOllama(unittest.TestCase):
+    """Tests de MockOllama"""
+
+    def _server(self, **kwargs) -> MockOllama:
+        server = MockOllama(seed=0, **kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _client(self, server: MockOllama) -> OllamaClient:
+        client = OllamaClient(base_url=server.url)
+        self.addCleanup(client.close)
+        return client
+
+    def test_generate_and_stream_match(self):
+        """Test que la réponse complète et le flux donnent le même texte, avec les compteurs d'Ollama"""
+        server = self._server(tokens=5)
+        client = self._client(server)
+        self.assertTrue(client.check_connection(force=True))
+
+        conversation = ConversationState(max_tokens=10_000)
+        answer = client.generate_response("Télétravail ?", "Deux jours.", conversation=conversation)
+        self.assertEqual(len(answer.split()), 5)
+        self.assertEqual(client.last_stats.tokens, 5)
+        self.assertTrue(conversation.tokens)
+
+        self.assertEqual("".join(client.generate_stream("Télétravail ?", "Deux jours.")), answer)
+        self.assertEqual(server.stats["generate"], 1)
+        self.assertEqual(server.stats["stream"], 1)
+
+    def test_latency_and_throughput(self):
+        """Test du délai du premier token et du débit simulés"""
+        server = self._server(latency=0.1, tokens_per_second=100, tokens=10)
+        client = self._client(server)
+
+        start = time.perf_counter()
+        list(client.generate_stream("Question ?"))
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(client.last_stats.ttft, 0.1)
+        self.assertGreaterEqual(elapsed, 0.19)
+
+    def test_error_injection(self):
+        """Test des erreurs HTTP 500 injectées"""
+        server = self._server(error_rate=1.0)
+        self.assertTrue(is_error_answer(self._client(server).generate_response("Question ?")))
+        self.assertEqual(server.stats["errors"], 1)
+
+    def test_dropped_connection_fails_over(self):
+        """Test qu'une connexion coupée fait basculer le pool sur un autre serveur"""
+        broken, healthy = self._server(drop_rate=1.0), self._server()
+        pool = OllamaClientPool([broken.url, healthy.url], active_checks=False)
+        self.addCleanup(pool.close)
+
+        self.assertFalse(is_error_answer(pool.generate_response("Question ?")))
+        self.assertEqual(broken.stats["drops"], 1)
+        self.assertEqual(healthy.stats["generate"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
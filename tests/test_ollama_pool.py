@@ -0,0 +1,149 @@
+"""
+Tests pour OllamaClientPool, contre des serveurs Ollama locaux simulés
+"""
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.clients.ollama_client import GenerationError
+from src.clients.ollama_pool import NO_ENDPOINT_ANSWER, OllamaClientPool
+
+
+class _StubOllama:
+    """Serveur HTTP local qui répond comme Ollama (/api/tags, /api/generate)"""
+
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.generations = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _send(self, body: bytes, content_type: str = "application/json"):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._send(b'{"models": []}')
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.generations += 1
+                time.sleep(stub.delay)
+                if payload.get("stream"):
+                    lines = [{"response": stub.name}, {"response": "", "done": True, "context": [1]}]
+                    self._send("\n".join(json.dumps(line) for line in lines).encode(), "application/x-ndjson")
+                else:
+                    self._send(json.dumps({"response": stub.name, "done": True, "context": [1]}).encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _dead_url() -> str:
+    """URL d'un port local sur lequel rien n'écoute"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestOllamaClientPool(unittest.TestCase):
+    """Tests pour OllamaClientPool"""
+
+    def _pool(self, urls, **kwargs) -> OllamaClientPool:
+        pool = OllamaClientPool(urls, active_checks=False, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def _stub(self, name: str, delay: float = 0.0) -> _StubOllama:
+        stub = _StubOllama(name, delay)
+        self.addCleanup(stub.stop)
+        return stub
+
+    def test_least_loaded(self):
+        """Test que les requêtes simultanées sont réparties sur les serveurs"""
+        stubs = [self._stub("a", 0.1), self._stub("b", 0.1)]
+        pool = self._pool([stub.url for stub in stubs])
+
+        threads = [threading.Thread(target=pool.generate_response, args=("Question ?",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual([stub.generations for stub in stubs], [2, 2])
+        self.assertTrue(all(endpoint["in_flight"] == 0 for endpoint in pool.get_stats()))
+
+    def test_latency_ewma_prefers_faster(self):
+        """Test qu'à charge égale le serveur le plus rapide est préféré"""
+        slow, fast = self._stub("lent", 0.15), self._stub("rapide")
+        pool = self._pool([slow.url, fast.url])
+        pool.generate_response("Q")
+        pool.generate_response("Q")
+
+        self.assertEqual([pool.generate_response("Q") for _ in range(3)], ["rapide"] * 3)
+        stats = pool.get_stats()
+        self.assertGreater(stats[0]["latency_ewma"], stats[1]["latency_ewma"])
+
+    def test_failover_on_connection_error(self):
+        """Test de la bascule et de l'exclusion d'un serveur injoignable"""
+        stub = self._stub("vivant")
+        dead = _dead_url()
+        pool = self._pool([dead, stub.url], eject_seconds=60)
+        pool.endpoints[1].latency = 10.0  # Le serveur injoignable est essayé en premier
+
+        self.assertEqual(pool.generate_response("Q"), "vivant")
+        self.assertEqual("".join(pool.generate_stream("Q")), "vivant")
+
+        stats = pool.get_stats()
+        self.assertFalse(stats[0]["healthy"])
+        self.assertEqual((stats[0]["errors"], stats[0]["failovers"]), (1, 1))
+        self.assertEqual(stats[1]["requests"], 2)
+
+    def test_all_down(self):
+        """Test du message d'erreur quand aucun serveur ne répond"""
+        pool = self._pool([_dead_url(), _dead_url()])
+        self.assertEqual(pool.generate_response("Q"), NO_ENDPOINT_ANSWER)
+        with self.assertRaises(GenerationError) as error:
+            list(pool.generate_stream("Q"))
+        self.assertEqual(str(error.exception), NO_ENDPOINT_ANSWER)
+
+    def test_active_check_restores(self):
+        """Test que le test actif réintègre un serveur de nouveau joignable"""
+        stub = self._stub("a")
+        pool = self._pool([stub.url], eject_seconds=60)
+        endpoint = pool.endpoints[0]
+        endpoint.healthy, endpoint.ejected_until = False, time.monotonic() + 60
+        self.assertEqual(pool.generate_response("Q"), NO_ENDPOINT_ANSWER)
+
+        self.assertEqual(pool.check_health(), [True])
+        self.assertTrue(pool.check_connection())
+        self.assertEqual(pool.generate_response("Q"), "a")
+
+    def test_model_shared(self):
+        """Test que le modèle est appliqué à tous les serveurs"""
+        pool = self._pool(["http://a:11434", "http://b:11434"])
+        pool.model = "mistral"
+        self.assertEqual([endpoint.client.model for endpoint in pool.endpoints], ["mistral", "mistral"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests pour la session HTTP partagée et le cache du test de connexion d'OllamaClient
+"""
+import time
+from unittest.mock import Mock, patch
+
+from src.clients.ollama_client import OllamaClient
+
+
+def _tags_response(status_code=200):
+    response = Mock()
+    response.status_code = status_code
+    return response
+
+
+class TestOllamaSession:
+    """Tests pour le pool de connexions et le cache de santé"""
+
+    def test_pool_size(self):
+        """Test que l'adaptateur HTTP est dimensionné selon pool_size"""
+        client = OllamaClient(base_url="http://ollama:11434", pool_size=4)
+        adapter = client.session.get_adapter("http://ollama:11434/api/generate")
+        assert adapter._pool_maxsize == 4
+        client.close()
+
+    def test_generate_uses_session(self):
+        """Test que la génération passe par la session (keep-alive)"""
+        client = OllamaClient(base_url="http://ollama:11434")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = Mock(json=Mock(return_value={"response": "Réponse"}))
+            assert client.generate_response("Question") == "Réponse"
+            mock_post.assert_called_once()
+
+    def test_health_cached(self):
+        """Test qu'un seul appel /api/tags est fait pendant la durée de validité"""
+        client = OllamaClient(base_url="http://ollama:11434", health_ttl=60)
+
+        with patch.object(client.session, 'get', return_value=_tags_response()) as mock_get:
+            assert client.check_connection() is True
+            assert client.check_connection() is True
+            mock_get.assert_called_once_with("http://ollama:11434/api/tags", timeout=5)
+
+    def test_health_refreshed_in_background(self):
+        """Test qu'un état expiré est renvoyé tout de suite puis rafraîchi en arrière-plan"""
+        client = OllamaClient(base_url="http://ollama:11434", health_ttl=0)
+
+        with patch.object(client.session, 'get', return_value=_tags_response()) as mock_get:
+            assert client.check_connection() is True
+
+            mock_get.return_value = _tags_response(503)
+            assert client.check_connection() is True
+
+            deadline = time.monotonic() + 2
+            while client._health_refreshing and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert client._healthy is False
+
+    def test_health_force(self):
+        """Test que force=True interroge Ollama immédiatement"""
+        client = OllamaClient(base_url="http://ollama:11434", health_ttl=60)
+
+        with patch.object(client.session, 'get', return_value=_tags_response()) as mock_get:
+            client.check_connection()
+            mock_get.side_effect = Exception("Connection error")
+            assert client.check_connection(force=True) is False
+            assert mock_get.call_count == 2
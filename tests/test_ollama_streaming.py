@@ -0,0 +1,173 @@
+"""
+Tests pour la génération en flux d'OllamaClient et de KnowledgeAgent
+"""
+import json
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy
+import pytest
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.ollama_client import TIMEOUT_ANSWER, GenerationError, OllamaClient
+from src.core.tracing import Trace
+
+
+def _stream_response(lines):
+    """Réponse requests simulée renvoyant des lignes NDJSON"""
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.raise_for_status = Mock()
+    response.iter_lines.return_value = [json.dumps(line).encode() for line in lines]
+    return response
+
+
+NDJSON = [
+    {"response": " Le", "done": False},
+    {"response": " télétravail", "done": False},
+    {"response": "", "done": False},
+    {"response": " est autorisé.", "done": False},
+    {"response": "", "done": True, "eval_count": 3, "eval_duration": 1_500_000_000},
+]
+
+
+class TestOllamaStreaming:
+    """Tests pour OllamaClient.generate_stream"""
+
+    def test_tokens_yielded_in_order(self):
+        """Test que les tokens sont produits un par un, dans l'ordre"""
+        client = OllamaClient(base_url="http://ollama:11434")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response(NDJSON)
+
+            tokens = list(client.generate_stream("Question", context="Contexte"))
+
+            assert tokens == ["Le", " télétravail", " est autorisé."]
+            call_args = mock_post.call_args
+            assert call_args[1]['json']['stream'] is True
+            assert call_args[1]['stream'] is True
+
+    def test_stats_recorded(self):
+        """Test que TTFT et tokens/s sont enregistrés (compteurs Ollama)"""
+        client = OllamaClient(base_url="http://ollama:11434")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response(NDJSON)
+            list(client.generate_stream("Question"))
+
+        stats = client.last_stats
+        assert stats.tokens == 3
+        assert stats.tokens_per_second == 2.0
+        assert 0 <= stats.ttft <= stats.total_time
+
+    def test_stats_in_trace(self):
+        """Test que les mesures d'une génération sont attachées à la trace de sa requête"""
+        client = OllamaClient(base_url="http://ollama:11434")
+        trace = Trace("chat")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response(NDJSON)
+            list(client.generate_stream("Question", trace=trace))
+            list(client.generate_stream("Autre question"))
+
+        assert trace.generation.tokens == 3
+        assert trace.generation is not client.last_stats
+
+    def test_stream_is_lazy(self):
+        """Test qu'aucune requête n'est envoyée avant de consommer le flux"""
+        client = OllamaClient(base_url="http://ollama:11434")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response(NDJSON)
+            stream = client.generate_stream("Question")
+            mock_post.assert_not_called()
+
+            assert next(stream) == "Le"
+
+    def test_stream_error(self):
+        """Test qu'une erreur Ollama est signalée hors du texte (GenerationError)"""
+        client = OllamaClient(base_url="http://ollama:11434")
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response([{"error": "model not found"}])
+
+            with pytest.raises(GenerationError, match="^Erreur: model not found$"):
+                list(client.generate_stream("Question"))
+
+    def test_stream_cut_before_done(self):
+        """Test qu'un flux coupé sans "done": true lève GenerationError après les tokens reçus"""
+        client = OllamaClient(base_url="http://ollama:11434")
+        tokens = []
+
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = _stream_response(NDJSON[:2])
+            with pytest.raises(GenerationError):
+                for token in client.generate_stream("Question"):
+                    tokens.append(token)
+
+        assert tokens == ["Le", " télétravail"]
+
+
+class TestKnowledgeAgentStreaming:
+    """Tests pour KnowledgeAgent.ask_question_stream"""
+
+    def test_stream_and_history(self):
+        """Test que la réponse est produite en flux puis ajoutée à l'historique"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.5}
+        ]
+        ollama_client = Mock()
+        ollama_client.generate_stream.return_value = iter(["Deux", " jours."])
+        agent = KnowledgeAgent(vector_store, ollama_client)
+
+        result = agent.ask_question_stream("Télétravail ?")
+
+        assert result['sources'][0]['filename'] == "rh.pdf"
+        assert agent.get_conversation_history() == []
+        assert "".join(result['tokens']) == "Deux jours."
+        assert agent.get_conversation_history()[0]['answer'] == "Deux jours."
+
+    def test_interrupted_stream_not_cached(self):
+        """Test qu'une réponse interrompue n'est ni mise en cache ni ajoutée à l'historique"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.5}
+        ]
+        embedding_model = Mock()
+        embedding_model.encode.return_value = numpy.array([[0.5, 0.25]])
+        answer_cache = Mock()
+        answer_cache.get.return_value = None
+
+        def interrupted(*args, **kwargs):
+            yield "Deux"
+            raise GenerationError(TIMEOUT_ANSWER)
+
+        ollama_client = Mock()
+        ollama_client.generate_stream.side_effect = interrupted
+        agent = KnowledgeAgent(vector_store, ollama_client, embedding_model=embedding_model,
+                               answer_cache=answer_cache)
+
+        result = agent.ask_question_stream("Télétravail ?")
+        tokens = []
+        with pytest.raises(GenerationError, match=TIMEOUT_ANSWER):
+            for token in result['tokens']:
+                tokens.append(token)
+
+        assert tokens == ["Deux"]
+        answer_cache.put.assert_not_called()
+        assert agent.get_conversation_history() == []
+        assert result['trace'].attributes['error'] is True
+
+    def test_no_documents(self):
+        """Test qu'aucun appel LLM n'est fait sans document pertinent"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = []
+        ollama_client = Mock()
+        agent = KnowledgeAgent(vector_store, ollama_client)
+
+        result = agent.ask_question_stream("Question")
+
+        assert result['confidence'] == 0.0
+        assert "Je ne trouve pas" in "".join(result['tokens'])
+        ollama_client.generate_stream.assert_not_called()
@@ -0,0 +1,133 @@
+"""
+Tests pour le module pdf_backends.py
+"""
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from src.documents.pdf_backends import (
+    PDF_BACKENDS,
+    PDFBackend,
+    available_backends,
+    iter_pdf_pages,
+    select_backends,
+)
+from src.documents.document_reader import DocumentReader
+
+
+class FakeBackend(PDFBackend):
+    """Backend factice : pages en mémoire, certaines en erreur"""
+    name = "fake"
+    module = "unittest"
+
+    def __init__(self, pages, failing=(), fail_open=False):
+        self.pages = pages
+        self.failing = set(failing)
+        self.fail_open = fail_open
+        self.closed = False
+
+    def open(self, file_path):
+        if self.fail_open:
+            raise ValueError("fichier illisible")
+        return self.pages
+
+    def page_count(self, document):
+        return len(document)
+
+    def extract_page(self, document, page_num):
+        if page_num in self.failing:
+            raise ValueError(f"page {page_num} corrompue")
+        return document[page_num]
+
+    def close(self, document):
+        self.closed = True
+
+
+class TestPdfBackends(unittest.TestCase):
+    """Tests pour le registre de backends PDF"""
+
+    def test_registry(self):
+        """Test que les backends attendus sont enregistrés"""
+        for name in ["PyPDF2", "pypdf", "pdfminer", "pypdfium2"]:
+            self.assertIn(name, PDF_BACKENDS)
+
+    def test_incomplete_backend(self):
+        """Test qu'un backend sans extract_page est refusé dès son instanciation"""
+        class IncompleteBackend(PDFBackend):
+            def open(self, source):
+                return source
+
+            def page_count(self, document):
+                return 0
+
+        with self.assertRaises(TypeError):
+            IncompleteBackend()
+
+    def test_select_unknown_backend(self):
+        """Test qu'un backend inconnu lève une erreur"""
+        with self.assertRaises(ValueError):
+            select_backends("inexistant")
+
+    def test_select_auto_order(self):
+        """Test que la sélection automatique suit l'ordre des backends installés"""
+        backends = select_backends("auto") if available_backends() else []
+        self.assertEqual([backend.name for backend in backends], available_backends())
+
+    def test_select_explicit_skips_missing(self):
+        """Test qu'un backend non installé est ignoré dans une liste explicite"""
+        with patch.object(PDF_BACKENDS["pypdf"], "is_available", return_value=False), \
+                patch.object(PDF_BACKENDS["PyPDF2"], "is_available", return_value=True):
+            backends = select_backends("pypdf, PyPDF2")
+        self.assertEqual([backend.name for backend in backends], ["PyPDF2"])
+
+    def test_page_fallback(self):
+        """Test du repli sur le backend suivant pour une page en erreur"""
+        primary = FakeBackend(["p1", "p2", "p3"], failing=[1])
+        fallback = FakeBackend(["f1", "f2", "f3"])
+
+        pages = list(iter_pdf_pages(Path("doc.pdf"), [primary, fallback]))
+
+        self.assertEqual(pages, ["p1", "f2", "p3"])
+        self.assertTrue(primary.closed)
+        self.assertTrue(fallback.closed)
+
+    def test_open_fallback(self):
+        """Test du repli complet si le backend principal ne peut pas ouvrir le fichier"""
+        primary = FakeBackend([], fail_open=True)
+        fallback = FakeBackend(["f1", "f2"])
+
+        self.assertEqual(list(iter_pdf_pages(Path("doc.pdf"), [primary, fallback])), ["f1", "f2"])
+
+    def test_page_skipped_when_all_fail(self):
+        """Test qu'une page illisible par tous les backends est omise"""
+        backends = [FakeBackend(["a", "b"], failing=[0]), FakeBackend(["c", "d"], failing=[0])]
+        self.assertEqual(list(iter_pdf_pages(Path("doc.pdf"), backends)), ["b"])
+
+    @unittest.skipUnless(available_backends(), "aucune bibliothèque PDF installée")
+    def test_read_pdf_each_backend(self):
+        """Test de lecture d'un vrai PDF avec chaque backend installé"""
+        try:
+            from reportlab.pdfgen import canvas
+        except ImportError:
+            self.skipTest("reportlab non installé")
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            path = Path(f.name)
+        self.addCleanup(os.unlink, path)
+        pdf = canvas.Canvas(str(path))
+        pdf.drawString(100, 750, "Politique de teletravail")
+        pdf.showPage()
+        pdf.drawString(100, 750, "Remboursement des frais")
+        pdf.save()
+
+        for name in available_backends():
+            with self.subTest(backend=name):
+                text = DocumentReader(pdf_backend=name).read_pdf(path)
+                self.assertIn("teletravail", text)
+                self.assertIn("Remboursement", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
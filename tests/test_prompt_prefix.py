@@ -0,0 +1,123 @@
+"""
+Tests de la réutilisation du préfixe du prompt (system, context, keep_alive)
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.ollama_client import (
+    NUM_PREDICT, ConversationState, OllamaClient, SYSTEM_PROMPT, SYSTEM_PROMPT_NO_CONTEXT
+)
+
+
+def _response(data: dict) -> Mock:
+    response = Mock()
+    response.json.return_value = data
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestPromptPrefix(unittest.TestCase):
+    """Tests de la requête envoyée à Ollama"""
+
+    def setUp(self):
+        self.client = OllamaClient(base_url="http://ollama.test")
+        self.addCleanup(self.client.close)
+        self.client.session.post = Mock(return_value=_response({"response": "Réponse", "context": [1, 2, 3]}))
+
+    def _payload(self, call: int = -1) -> dict:
+        return self.client.session.post.call_args_list[call][1]["json"]
+
+    def test_system_prefix_identical(self):
+        """Test que les instructions sont identiques d'une question à l'autre et les documents hors system"""
+        self.client.generate_response("Question 1 ?", "Document A")
+        self.client.generate_response("Question 2 ?", "Document B", user_name="Alice")
+
+        first, second = self._payload(0), self._payload(1)
+        self.assertEqual(first["system"], SYSTEM_PROMPT)
+        self.assertEqual(second["system"], SYSTEM_PROMPT)
+        self.assertIn("Document B", second["prompt"])
+        self.assertIn("UTILISATEUR: Alice", second["prompt"])
+        self.assertNotIn("Document", second["system"])
+
+    def test_no_context_system(self):
+        """Test des instructions sans documents"""
+        self.client.generate_response("Bonjour ?")
+        self.assertEqual(self._payload()["system"], SYSTEM_PROMPT_NO_CONTEXT)
+
+    def test_keep_alive_and_num_ctx(self):
+        """Test que keep_alive et num_ctx sont envoyés"""
+        self.client.keep_alive = "1h"
+        self.client.num_ctx = 4096
+        self.client.generate_response("Question ?", "Document")
+
+        payload = self._payload()
+        self.assertEqual(payload["keep_alive"], "1h")
+        self.assertEqual(payload["options"]["num_ctx"], 4096)
+
+    def test_conversation_context_reused(self):
+        """Test que les tokens du tour précédent remplacent system au tour suivant"""
+        conversation = ConversationState(max_tokens=100)
+        self.client.generate_response("Question 1 ?", "Document", conversation=conversation)
+        self.assertEqual(conversation.tokens, [1, 2, 3])
+        self.assertNotIn("context", self._payload())
+
+        self.client.generate_response("Question 2 ?", "Document", conversation=conversation)
+        payload = self._payload()
+        self.assertEqual(payload["context"], [1, 2, 3])
+        self.assertNotIn("system", payload)
+
+    def test_conversation_reset_over_limit(self):
+        """Test que la conversation repart de zéro au-delà de max_tokens"""
+        conversation = ConversationState(max_tokens=2)
+        conversation.update([1, 2, 3])
+        self.assertEqual(conversation.tokens, [])
+        conversation.update([1, 2])
+        self.assertEqual(conversation.tokens, [1, 2])
+
+    def test_warm_up(self):
+        """Test que le préchargement envoie uniquement le modèle et keep_alive"""
+        self.assertTrue(self.client.warm_up())
+        self.assertEqual(self._payload(), {"model": self.client.model, "keep_alive": self.client.keep_alive})
+
+        self.client.session.post.side_effect = ConnectionError("refusé")
+        self.assertFalse(self.client.warm_up())
+
+
+class TestKnowledgeAgentConversation(unittest.TestCase):
+    """Tests de l'état de conversation dans KnowledgeAgent"""
+
+    def test_conversation_passed_and_cleared(self):
+        """Test que l'agent transmet sa conversation et la réinitialise avec l'historique"""
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"id": "rh_0", "content": "Deux jours.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.7}
+        ]
+        ollama_client = Mock()
+        ollama_client.generate_response.return_value = "Deux jours."
+        agent = KnowledgeAgent(vector_store, ollama_client)
+
+        agent.ask_question("Télétravail ?")
+        self.assertIs(ollama_client.generate_response.call_args[1]["conversation"], agent.conversation)
+
+        agent.conversation.tokens = [1, 2, 3]
+        agent.clear_history()
+        self.assertEqual(agent.conversation.tokens, [])
+
+    def test_default_window_keeps_previous_turn(self):
+        """Test que la fenêtre par défaut laisse la place au tour précédent"""
+        agent = KnowledgeAgent(Mock(), Mock())
+        self.assertGreaterEqual(agent.conversation.max_tokens, agent.context_packer.budget_tokens + NUM_PREDICT)
+
+    def test_small_window_logged(self):
+        """Test qu'une fenêtre trop petite pour la réutilisation est signalée au démarrage"""
+        with patch("src.agents.knowledge_agent.OLLAMA_NUM_CTX", 2048), \
+                self.assertLogs("src.agents.knowledge_agent", level="WARNING") as logs:
+            agent = KnowledgeAgent(Mock(), Mock())
+
+        self.assertEqual(agent.conversation.max_tokens, 248)
+        self.assertIn("désactivée", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
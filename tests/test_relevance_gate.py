@@ -0,0 +1,101 @@
+"""
+Tests pour le filtre de pertinence (RelevanceGate) et son usage par KnowledgeAgent
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.agents.knowledge_agent import NO_DOCUMENTS_ANSWER, KnowledgeAgent
+from src.agents.relevance_gate import RelevanceGate, create_gate
+
+
+def _docs(*scores):
+    return [{"id": f"c{i}", "content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"},
+             "similarity_score": score} for i, score in enumerate(scores)]
+
+
+class TestRelevanceGate(unittest.TestCase):
+    """Tests de RelevanceGate"""
+
+    def test_thresholds(self):
+        """Test du meilleur score et de la moyenne des meilleurs chunks"""
+        gate = RelevanceGate(min_top_score=0.4, min_avg_score=0.3, avg_top_k=2)
+        self.assertTrue(gate.admit([0.1, 0.5, 0.3]))
+        self.assertFalse(gate.admit([0.35, 0.3]))      # meilleur score trop faible
+        self.assertFalse(gate.admit([0.45, 0.1, 0.1]))  # moyenne trop faible
+        self.assertFalse(gate.admit([]))
+
+        stats = gate.get_stats()
+        self.assertEqual((stats["checked"], stats["llm_calls_avoided"]), (4, 3))
+        self.assertEqual(stats["avoided_rate"], 0.75)
+
+    def test_calibrate(self):
+        """Test du seuil appris : le plus élevé qui garde le rappel voulu"""
+        gate = RelevanceGate(min_top_score=0.0, min_avg_score=0.0)
+        samples = [([score], True) for score in (0.9, 0.8, 0.7, 0.6, 0.5, 0.45, 0.42, 0.41, 0.40, 0.2)]
+        samples += [([score], False) for score in (0.35, 0.3, 0.1)]
+
+        self.assertEqual(gate.calibrate(samples, min_recall=0.9), 0.40)
+        self.assertEqual(gate.calibrate(samples, min_recall=1.0), 0.2)
+        with self.assertRaises(ValueError):
+            gate.calibrate([([0.3], False)])
+
+    def test_save_and_load(self):
+        """Test que les seuils calibrés sont relus au démarrage"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = str(Path(temp_dir) / "gate.json")
+            RelevanceGate(min_top_score=0.42, min_avg_score=0.1, avg_top_k=5).save(path)
+
+            gate = create_gate(path)
+            self.assertEqual((gate.min_top_score, gate.min_avg_score, gate.avg_top_k), (0.42, 0.1, 5))
+            self.assertIsInstance(create_gate(str(Path(temp_dir) / "absent.json")), RelevanceGate)
+
+
+class TestAgentRelevance(unittest.TestCase):
+    """Tests du filtre dans KnowledgeAgent"""
+
+    def _agent(self, scores):
+        self.vector_store = Mock()
+        self.vector_store.search_similar.return_value = _docs(*scores)
+        self.ollama_client = Mock()
+        self.ollama_client.generate_response.return_value = "Deux jours."
+        return KnowledgeAgent(self.vector_store, self.ollama_client,
+                              relevance_gate=RelevanceGate(min_top_score=0.3, min_avg_score=0.2))
+
+    def test_irrelevant_skips_llm(self):
+        """Test qu'une recherche hors sujet répond sans appel au LLM"""
+        agent = self._agent([0.12, 0.08])
+
+        result = agent.ask_question("Quelle est la météo demain ?")
+        self.assertEqual(result["answer"], NO_DOCUMENTS_ANSWER)
+        self.assertTrue(result["trace"]["attributes"]["relevance_gated"])
+        self.assertEqual(list(agent.ask_question_stream("Et après-demain ?")["tokens"]), [NO_DOCUMENTS_ANSWER])
+        self.ollama_client.generate_response.assert_not_called()
+        self.ollama_client.generate_stream.assert_not_called()
+        self.assertEqual(agent.get_relevance_stats()["llm_calls_avoided"], 2)
+
+    def test_relevant_reaches_llm(self):
+        """Test qu'une recherche pertinente interroge le LLM"""
+        agent = self._agent([0.62, 0.4])
+        self.assertEqual(agent.ask_question("Combien de jours de télétravail ?")["answer"], "Deux jours.")
+        self.assertEqual(agent.get_relevance_stats()["llm_calls_avoided"], 0)
+
+    def test_calibrate_relevance(self):
+        """Test de la calibration sur des questions étiquetées"""
+        agent = self._agent([])
+        scores = {"Télétravail ?": 0.7, "Congés ?": 0.55, "Météo ?": 0.25, "Football ?": 0.15}
+        self.vector_store.search_similar.side_effect = lambda question, n_results: _docs(scores[question])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "gate.json"
+            threshold = agent.calibrate_relevance(
+                [("Télétravail ?", True), ("Congés ?", True), ("Météo ?", False), ("Football ?", False)],
+                min_recall=1.0, save_path=str(path)
+            )
+            self.assertEqual(threshold, 0.55)
+            self.assertEqual(create_gate(str(path)).min_top_score, 0.55)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Tests pour les jetons de session (SessionTokens) et les comptes (UserStore)
+"""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.core.sessions import DEFAULT_SECRET_KEY, SessionTokens, load_secret_key
+from src.storage.user_store import UserStore, hash_password, verify_password
+
+ALICE = {"username": "alice", "name": "Alice", "role": "user"}
+
+
+class TestUserStore(unittest.TestCase):
+    """Tests des comptes persistants"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "users.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_default_users(self):
+        """Test des comptes par défaut, créés une seule fois"""
+        store = UserStore(self.db_path)
+        self.assertTrue(store.authenticate("admin", "admin123"))
+        self.assertTrue(store.authenticate("user", "user123"))
+        self.assertFalse(store.authenticate("admin", "wrongpassword"))
+        self.assertFalse(store.authenticate("admin", ""))
+        self.assertFalse(store.authenticate("nonexistent", "admin123"))
+        self.assertEqual(store.get_user_info("admin"), {"username": "admin", "name": "Administrateur", "role": "admin"})
+        admin_hash = store.users["admin"]["password_hash"]
+        store.close()
+
+        # Deuxième processus : comptes relus, mots de passe non re-hachés
+        with patch("src.storage.user_store.hash_password") as rehash:
+            store = UserStore(self.db_path)
+        rehash.assert_not_called()
+        self.assertEqual(store.users["admin"]["password_hash"], admin_hash)
+        store.close()
+
+    def test_add_user(self):
+        """Test de la création d'un compte, visible après reload() dans un autre processus"""
+        store, other = UserStore(self.db_path), UserStore(self.db_path)
+        store.add_user("alice", "secret", "Alice")
+        self.assertEqual(store.get_user_info("alice"), ALICE)
+        self.assertIsNone(other.get_user_info("alice"))
+
+        other.reload()
+        self.assertTrue(other.authenticate("alice", "secret"))
+        store.close()
+        other.close()
+
+    def test_password_hash(self):
+        """Test du hachage salé"""
+        first, second = hash_password("test123"), hash_password("test123")
+        self.assertNotEqual(first, second)
+        self.assertTrue(verify_password("test123", first))
+        self.assertFalse(verify_password("different", first))
+        self.assertFalse(verify_password("test123", "sha256-sans-sel"))
+
+
+class TestSessionTokens(unittest.TestCase):
+    """Tests des jetons signés"""
+
+    def setUp(self):
+        self.tokens = SessionTokens("clé-de-test", "HS256", expiration_hours=1, cache_size=2)
+
+    def test_verify_across_replicas(self):
+        """Test qu'un jeton est accepté par tout processus qui a la même clé"""
+        token = self.tokens.issue(ALICE)
+        replica = SessionTokens("clé-de-test", "HS256")
+        self.assertEqual(replica.verify(token), ALICE)
+        self.assertIsNone(SessionTokens("autre-clé", "HS256").verify(token))
+
+    def test_secret_key(self):
+        """Test de la clé générée une fois par déploiement et du refus de la clé d'exemple"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "secret_key"
+            key = load_secret_key(str(path))
+            self.assertEqual(len(key), 64)
+            self.assertEqual(load_secret_key(str(path)), key)
+            self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+            self.assertEqual(list(Path(directory).iterdir()), [path])
+
+        with self.assertRaises(ValueError):
+            SessionTokens(DEFAULT_SECRET_KEY)
+        with patch("src.core.sessions.SECRET_KEY", ""), patch("src.core.sessions.load_secret_key",
+                                                               return_value="clé-de-test"):
+            self.assertEqual(SessionTokens().verify(self.tokens.issue(ALICE)), ALICE)
+
+    def test_invalid_tokens(self):
+        """Test des jetons absents, altérés ou expirés"""
+        self.assertIsNone(self.tokens.verify(None))
+        self.assertIsNone(self.tokens.verify("pas-un-jeton"))
+
+        token = self.tokens.issue(ALICE)
+        header, claims, signature = token.split(".")
+        self.assertIsNone(self.tokens.verify(f"{header}.{claims}.{signature[::-1]}"))
+
+        expired = SessionTokens("clé-de-test", "HS256", expiration_hours=-1).issue(ALICE)
+        self.assertIsNone(self.tokens.verify(expired))
+
+    def test_cache(self):
+        """Test que les jetons déjà vérifiés ne sont pas re-décodés, jusqu'à leur expiration"""
+        token = self.tokens.issue(ALICE)
+        for _ in range(3):
+            self.assertEqual(self.tokens.verify(token), ALICE)
+        self.assertEqual(self.tokens.get_stats(), {"cached": 1, "hits": 2, "misses": 1})
+
+        with patch("src.core.sessions.time.time", return_value=time.time() + 7200):
+            self.assertIsNone(self.tokens.verify(token))
+        self.assertEqual(self.tokens.get_stats()["cached"], 0)
+
+        # Taille bornée : les jetons les plus anciens sont oubliés
+        for name in ("bob", "carole", "david"):
+            self.tokens.verify(self.tokens.issue({**ALICE, "username": name}))
+        self.assertEqual(self.tokens.get_stats()["cached"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Tests pour le module single_flight.py
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.agents.single_flight import SingleFlight, normalize_question
+
+
+def _agent(ollama_client) -> KnowledgeAgent:
+    vector_store = Mock()
+    vector_store.search_similar.return_value = [
+        {"id": "rh_0", "content": "Deux jours.", "metadata": {"filename": "rh.pdf"}, "similarity_score": 0.7}
+    ]
+    return KnowledgeAgent(vector_store, ollama_client)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests pour SingleFlight"""
+
+    def test_normalize_question(self):
+        """Test que casse, espaces et ponctuation finale sont ignorés"""
+        self.assertEqual(normalize_question("  Combien de  jours ? "), normalize_question("combien de jours"))
+
+    def test_do_coalesces(self):
+        """Test que les appels simultanés de même clé partagent un seul appel"""
+        flight = SingleFlight()
+        release = threading.Event()
+        fn = Mock(side_effect=lambda: release.wait() and "Réponse")
+
+        with ThreadPoolExecutor(5) as pool:
+            futures = [pool.submit(flight.do, "clé", fn) for _ in range(5)]
+            while flight.get_stats()["coalesced"] < 4:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, ["Réponse"] * 5)
+        fn.assert_called_once()
+        stats = flight.get_stats()
+        self.assertEqual((stats["flights"], stats["coalesced"], stats["max_waiters"], stats["in_flight"]), (1, 4, 5, 0))
+
+    def test_do_error_shared_then_retried(self):
+        """Test qu'une erreur est propagée et que l'appel suivant est relancé"""
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("clé", Mock(side_effect=ValueError("échec")))
+        self.assertEqual(flight.do("clé", lambda: "ok"), "ok")
+
+    def test_stream_replayed_to_late_reader(self):
+        """Test qu'un lecteur arrivé en cours de flux reçoit tous les tokens"""
+        flight = SingleFlight()
+        source = Mock(side_effect=lambda: iter(["Deux", " jours", "."]))
+
+        first = flight.stream("clé", source)
+        self.assertEqual(next(first), "Deux")
+        second = flight.stream("clé", source)
+
+        self.assertEqual(list(second), ["Deux", " jours", "."])
+        self.assertEqual(list(first), [" jours", "."])
+        source.assert_called_once()
+        self.assertEqual(flight.get_stats()["in_flight"], 0)
+
+    def test_stream_closed_when_abandoned(self):
+        """Test que la génération est arrêtée quand tous les lecteurs abandonnent"""
+        flight = SingleFlight()
+        closed = threading.Event()
+
+        def source():
+            try:
+                yield from ["a", "b", "c"]
+            finally:
+                closed.set()
+
+        reader = flight.stream("clé", source)
+        next(reader)
+        reader.close()
+
+        self.assertTrue(closed.is_set())
+        self.assertEqual(flight.get_stats()["in_flight"], 0)
+
+    def test_ado_cancel_only_when_all_waiters_gone(self):
+        """Test que l'annulation d'un appelant n'annule pas la coroutine partagée"""
+        flight = SingleFlight()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "Réponse"
+
+        async def run():
+            first = asyncio.ensure_future(flight.ado("clé", generate))
+            second = asyncio.ensure_future(flight.ado("clé", generate))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second, first.cancelled()
+
+        self.assertEqual(asyncio.run(run()), ("Réponse", True))
+        self.assertEqual(len(calls), 1)
+
+
+class TestKnowledgeAgentCoalescing(unittest.TestCase):
+    """Tests du regroupement dans KnowledgeAgent"""
+
+    def test_ask_question_coalesced(self):
+        """Test que des questions identiques simultanées n'appellent Ollama qu'une fois"""
+        release = threading.Event()
+        ollama_client = Mock()
+        ollama_client.generate_response.side_effect = lambda *args, **kwargs: release.wait() and "Deux jours."
+        agent = _agent(ollama_client)
+
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(agent.ask_question, question)
+                       for question in ("Télétravail ?", "télétravail", "Télétravail  ?")]
+            while agent.get_coalescing_stats()["coalesced"] < 2:
+                time.sleep(0.01)
+            release.set()
+            answers = [future.result()["answer"] for future in futures]
+
+        self.assertEqual(answers, ["Deux jours."] * 3)
+        ollama_client.generate_response.assert_called_once()
+        self.assertEqual(len(agent.get_conversation_history()), 3)
+
+    def test_stream_shared(self):
+        """Test qu'un flux en cours est partagé avec une question identique"""
+        ollama_client = Mock()
+        ollama_client.generate_stream.side_effect = lambda *args, **kwargs: iter(["Deux", " jours."])
+        agent = _agent(ollama_client)
+
+        first = agent.ask_question_stream("Télétravail ?")["tokens"]
+        self.assertEqual(next(first), "Deux")
+        second = agent.ask_question_stream("Télétravail ?")["tokens"]
+
+        self.assertEqual("".join(second), "Deux jours.")
+        self.assertEqual("".join(first), " jours.")
+        ollama_client.generate_stream.assert_called_once()
+        self.assertEqual(agent.get_coalescing_stats()["coalesced"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests pour le module sources.py (documents en mémoire)
+"""
+import unittest
+import tempfile
+import shutil
+import io
+import zipfile
+from pathlib import Path
+
+from src.documents.sources import BufferStream, open_buffer, open_source, persist_source, source_size
+from src.documents.document_reader import DocumentReader
+from src.documents.pdf_backends import available_backends
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+TEXT = "Les notes de frais sont remboursées sous trente jours. " * 20
+
+
+def _docx_bytes(text: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(
+            'word/document.xml',
+            f'<w:document xmlns:w="{W_NS}"><w:body><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:body></w:document>'
+        )
+    return buffer.getvalue()
+
+
+class TestBufferStream(unittest.TestCase):
+    """Tests pour BufferStream et les helpers de sources"""
+
+    def test_read_and_seek(self):
+        """Test de lecture et de positionnement sans copie"""
+        stream = BufferStream(memoryview(b"abcdef"))
+        self.assertEqual(stream.read(2), b"ab")
+        stream.seek(-2, io.SEEK_END)
+        self.assertEqual(stream.read(), b"ef")
+        self.assertEqual(len(stream), 6)
+
+    def test_open_source(self):
+        """Test de normalisation des sources"""
+        self.assertIsInstance(open_source("doc.txt"), Path)
+        self.assertIsInstance(open_source(b"abc"), BufferStream)
+
+        stream = io.BytesIO(b"abc")
+        stream.read()
+        self.assertEqual(open_source(stream).tell(), 0)
+        self.assertEqual(source_size(stream), 3)
+
+    def test_open_buffer_bytesio(self):
+        """Test que le buffer d'un BytesIO est exposé sans copie"""
+        stream = io.BytesIO(b"contenu")
+        with open_buffer(stream) as view:
+            self.assertEqual(bytes(view), b"contenu")
+        # La vue est libérée : le BytesIO reste modifiable
+        stream.write(b"!")
+
+    def test_persist_source(self):
+        """Test d'écriture atomique d'une copie sur disque"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+
+        path = persist_source(io.BytesIO(b"contenu"), Path(temp_dir) / "doc.txt")
+
+        self.assertEqual(path.read_bytes(), b"contenu")
+        self.assertEqual([p.name for p in Path(temp_dir).iterdir()], ["doc.txt"])
+
+
+class TestInMemoryDocuments(unittest.TestCase):
+    """Tests de DocumentReader sur des documents en mémoire"""
+
+    def setUp(self):
+        self.reader = DocumentReader()
+
+    def test_text_sources(self):
+        """Test d'un fichier texte fourni en bytes, memoryview et BytesIO"""
+        data = TEXT.encode('utf-8')
+        for source in (data, memoryview(data), io.BytesIO(data)):
+            with self.subTest(source=type(source).__name__):
+                result = self.reader.process_document(source, chunk_size=50, filename="frais.txt")
+                self.assertTrue(result["success"])
+                self.assertEqual(result["text"], TEXT)
+                self.assertEqual(result["metadata"]["source"], "frais.txt")
+                self.assertEqual(result["metadata"]["file_type"], ".txt")
+
+    def test_docx_source(self):
+        """Test d'un fichier Word fourni en mémoire"""
+        result = self.reader.process_document(io.BytesIO(_docx_bytes("Politique de télétravail")), filename="rh.docx")
+        self.assertTrue(result["success"])
+        self.assertEqual(result["text"], "Politique de télétravail")
+
+    @unittest.skipUnless(available_backends(), "aucune bibliothèque PDF installée")
+    def test_pdf_source(self):
+        """Test d'un PDF fourni en mémoire"""
+        try:
+            from reportlab.pdfgen import canvas
+        except ImportError:
+            self.skipTest("reportlab non installé")
+
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer)
+        pdf.drawString(100, 750, "Politique de teletravail")
+        pdf.save()
+
+        for name in available_backends():
+            with self.subTest(backend=name):
+                result = DocumentReader(pdf_backend=name).process_document(buffer.getvalue(), filename="rh.pdf")
+                self.assertTrue(result["success"])
+                self.assertIn("teletravail", result["text"])
+
+    def test_filename_required(self):
+        """Test qu'un contenu en mémoire sans nom est refusé"""
+        with self.assertRaises(ValueError):
+            self.reader.process_document(b"texte")
+
+    def test_named_stream(self):
+        """Test que le nom d'un flux (UploadedFile, fichier ouvert) est utilisé par défaut"""
+        stream = io.BytesIO(TEXT.encode('utf-8'))
+        stream.name = "uploads/frais.md"
+        result = self.reader.process_document(stream)
+        self.assertEqual(result["metadata"]["filename"], "frais.md")
+
+
+if __name__ == '__main__':
+    unittest.main()
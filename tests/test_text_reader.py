@@ -0,0 +1,114 @@
+"""
+Tests pour le module text_reader.py
+"""
+import codecs
+import unittest
+import tempfile
+import os
+from pathlib import Path
+
+from src.documents.text_reader import SAMPLE_SIZE, detect_encoding, iter_text_blocks
+from src.documents.document_reader import DocumentReader
+
+
+class TestDetectEncoding(unittest.TestCase):
+    """Tests pour la détection d'encodage"""
+
+    def test_bom_utf8(self):
+        """Test de détection d'un BOM UTF-8"""
+        self.assertEqual(detect_encoding(codecs.BOM_UTF8 + "été".encode('utf-8')), 'utf-8-sig')
+
+    def test_bom_utf16(self):
+        """Test de détection d'un BOM UTF-16"""
+        self.assertEqual(detect_encoding("été".encode('utf-16')), 'utf-16')
+
+    def test_utf8_without_bom(self):
+        """Test de détection d'UTF-8 sans BOM"""
+        self.assertEqual(detect_encoding("Café crème à Noël".encode('utf-8')), 'utf-8')
+
+    def test_utf8_truncated_character(self):
+        """Test qu'un caractère coupé en fin d'échantillon reste de l'UTF-8"""
+        sample = "Café".encode('utf-8')[:-1]
+        self.assertEqual(detect_encoding(sample), 'utf-8')
+
+    def test_cp1252(self):
+        """Test de détection de cp1252 (guillemets typographiques, euro)"""
+        self.assertEqual(detect_encoding("Prix : 10 € – l’été".encode('cp1252')), 'cp1252')
+
+    def test_latin1(self):
+        """Test du repli sur latin-1"""
+        self.assertEqual(detect_encoding("Café crème".encode('latin-1')), 'latin-1')
+
+
+class TestIterTextBlocks(unittest.TestCase):
+    """Tests pour la lecture par blocs"""
+
+    def _write(self, data: bytes) -> Path:
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.unlink, f.name)
+        return Path(f.name)
+
+    def test_multibyte_characters_across_blocks(self):
+        """Test que les caractères multi-octets ne sont pas coupés entre blocs"""
+        content = "éàü€" * 1000
+        path = self._write(content.encode('utf-8'))
+
+        blocks = list(iter_text_blocks(path, block_size=7))
+
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual("".join(blocks), content)
+
+    def test_empty_file(self):
+        """Test d'un fichier vide"""
+        path = self._write(b"")
+        self.assertEqual(list(iter_text_blocks(path)), [])
+
+    def test_cp1252_file(self):
+        """Test de lecture d'un fichier cp1252"""
+        content = "Le coût : 5 € – c’est l’été"
+        path = self._write(content.encode('cp1252'))
+        self.assertEqual("".join(iter_text_blocks(path)), content)
+
+    def test_cp1252_bytes_after_sample(self):
+        """Test qu'un octet cp1252 hors de l'échantillon n'est pas remplacé par U+FFFD"""
+        head = ("a" * (SAMPLE_SIZE + 10)).encode('utf-8')
+        tail = ("z" * SAMPLE_SIZE).encode('utf-8')
+        path = self._write(head + "café ".encode('cp1252') + "thé".encode('utf-8') + tail)
+
+        with self.assertLogs('src.documents.text_reader', level='WARNING') as logs:
+            text = "".join(iter_text_blocks(path, block_size=4096))
+
+        self.assertNotIn("�", text)
+        self.assertIn("café thé", text)
+        self.assertEqual(len(text), len(head) + len("café thé") + len(tail))
+        self.assertIn("1 séquence(s) invalide(s) en utf-8", logs.output[0])
+
+
+class TestStreamChunks(unittest.TestCase):
+    """Tests pour le découpage en flux"""
+
+    def setUp(self):
+        self.reader = DocumentReader()
+
+    def test_iter_chunks_matches_create_chunks(self):
+        """Test que le découpage en flux donne les mêmes chunks"""
+        text = " ".join(f"mot{i}" for i in range(2500))
+        blocks = [text[i:i + 13] for i in range(0, len(text), 13)]
+
+        self.assertEqual(list(self.reader.iter_chunks(blocks, 100)), self.reader.create_chunks(text, 100))
+
+    def test_stream_chunks_file(self):
+        """Test du découpage en flux d'un fichier"""
+        text = "Chunk test. " * 300
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write(text)
+        self.addCleanup(os.unlink, f.name)
+
+        chunks = list(self.reader.stream_chunks(Path(f.name), chunk_size=100))
+
+        self.assertEqual(chunks, self.reader.create_chunks(text, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests pour les traces des étapes d'une question (src/core/tracing.py)
+"""
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+from benchmarks.mock_ollama import MockOllama
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.clients.llm_scheduler import LLMScheduler
+from src.clients.ollama_client import OllamaClient
+from src.core.tracing import JsonlSink, LogSink, Trace, TraceSink, create_sink, export_trace
+
+
+class _ListSink(TraceSink):
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+class TestTrace(unittest.TestCase):
+    """Tests de Trace et des sinks"""
+
+    def test_spans_and_timings(self):
+        """Test des durées mesurées et additionnées par étape"""
+        trace = Trace("question", user="alice")
+        with trace.span("vector_search", candidates=5):
+            time.sleep(0.01)
+        trace.add_span("llm_queue_wait", 0.02)
+        trace.add_span("llm_queue_wait", 0.01)
+
+        data = trace.finish().to_dict()
+        self.assertGreaterEqual(data["timings"]["vector_search"], 10)
+        self.assertAlmostEqual(data["timings"]["llm_queue_wait"], 30, places=3)
+        self.assertEqual(data["spans"][0]["attributes"], {"candidates": 5})
+        self.assertEqual(data["attributes"], {"user": "alice"})
+        self.assertGreaterEqual(data["duration_ms"], 10)
+
+    def test_jsonl_sink(self):
+        """Test qu'une trace exportée ajoute une ligne JSON au fichier"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "traces" / "traces.jsonl"
+            sink = JsonlSink(str(path))
+            for name in ("a", "b"):
+                export_trace(sink, Trace(name))
+
+            lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([line["name"] for line in lines], ["a", "b"])
+
+    def test_export_errors_ignored(self):
+        """Test qu'un sink en erreur n'interrompt pas la requête"""
+        sink = Mock(spec=TraceSink)
+        sink.export.side_effect = OSError("disque plein")
+        trace = Trace("question")
+        export_trace(sink, trace)
+        self.assertIsNotNone(trace.duration)
+
+    def test_create_sink(self):
+        """Test des sinks configurables"""
+        self.assertIsNone(create_sink("none"))
+        self.assertIsInstance(create_sink("log"), LogSink)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertIsInstance(create_sink("jsonl", str(Path(temp_dir) / "t.jsonl")), JsonlSink)
+        with self.assertRaises(ValueError):
+            create_sink("stdout")
+
+
+class TestQuestionTracing(unittest.TestCase):
+    """Tests des traces produites par KnowledgeAgent"""
+
+    def setUp(self):
+        self.server = MockOllama(seed=0, tokens=5, tokens_per_second=500).start()
+        self.addCleanup(self.server.stop)
+        self.client = OllamaClient(base_url=self.server.url)
+        self.addCleanup(self.client.close)
+
+        embedding_model = Mock()
+        embedding_model.encode.return_value = [Mock(tolist=lambda: [1.0, 0.0])]
+        vector_store = Mock()
+        vector_store.search_similar.return_value = [
+            {"id": "rh_0", "content": "Deux jours de télétravail.", "metadata": {"filename": "rh.pdf"},
+             "similarity_score": 0.8}
+        ]
+        self.sink = _ListSink()
+        self.agent = KnowledgeAgent(vector_store, self.client, embedding_model=embedding_model,
+                                    scheduler=LLMScheduler(max_concurrency=1), trace_sink=self.sink)
+
+    def test_ask_question(self):
+        """Test que chaque étape est tracée, avec les compteurs d'Ollama"""
+        result = self.agent.ask_question("Combien de jours de télétravail ?")
+
+        timings = result["trace"]["timings"]
+        for stage in ("query_embedding", "vector_search", "context_packing", "prompt_build",
+                      "llm_queue_wait", "llm_time_to_first_token", "llm_generation", "llm_answer"):
+            self.assertIn(stage, timings)
+
+        generation = next(span for span in result["trace"]["spans"] if span["name"] == "llm_generation")
+        self.assertEqual(generation["attributes"]["eval_count"], 5)
+        self.assertAlmostEqual(generation["attributes"]["eval_duration_ms"], 10.0)
+        self.assertEqual(result["trace"]["attributes"]["coalesced"], False)
+        self.assertEqual([trace.trace_id for trace in self.sink.traces], [result["trace"]["trace_id"]])
+
+    def test_ask_question_stream(self):
+        """Test que la trace d'un flux est terminée et exportée à la fin du flux"""
+        result = self.agent.ask_question_stream("Combien de jours de télétravail ?")
+        self.assertEqual(self.sink.traces, [])
+
+        self.assertEqual(len("".join(result["tokens"]).split()), 5)
+        trace = result["trace"]
+        self.assertEqual(self.sink.traces, [trace])
+        self.assertIn("llm_time_to_first_token", trace.timings())
+        self.assertIsNotNone(trace.duration)
+
+
+if __name__ == '__main__':
+    unittest.main()